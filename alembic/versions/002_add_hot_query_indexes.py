@@ -0,0 +1,49 @@
+"""add indexes for hot document/chunk queries
+
+Revision ID: 002_add_hot_query_indexes
+Revises:
+Create Date: 2026-10-19 10:00:00.000000
+
+为高频查询补充索引：
+- documents(library_id, created_at)：按库列出文档（按创建时间倒序分页）、库统计的文档计数
+- documents(created_at)：跨库列出可访问文档
+- chunks(document_id, id)：向量化/删除文档时按文档取 chunk、预览回退（按 id 排序）、库统计的 chunk 计数
+
+用 scripts/explain_hot_queries.py 检查执行计划是否命中这些索引。
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "002_add_hot_query_indexes"
+down_revision: Union[str, None] = None
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+INDEXES: list[tuple[str, str, list[str]]] = [
+    ("ix_documents_library_id_created_at", "documents", ["library_id", "created_at"]),
+    ("ix_documents_created_at", "documents", ["created_at"]),
+    ("ix_chunks_document_id_id", "chunks", ["document_id", "id"]),
+]
+
+
+def _existing_indexes(table: str) -> set[str]:
+    inspector = sa.inspect(op.get_bind())
+    return {index["name"] for index in inspector.get_indexes(table)}
+
+
+def upgrade() -> None:
+    # 通过 init_db.py（create_all）新建的库已包含这些索引，跳过已存在的
+    for name, table, columns in INDEXES:
+        if name not in _existing_indexes(table):
+            op.create_index(name, table, columns)
+
+
+def downgrade() -> None:
+    for name, table, _ in reversed(INDEXES):
+        if name in _existing_indexes(table):
+            op.drop_index(name, table_name=table)
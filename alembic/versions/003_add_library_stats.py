@@ -0,0 +1,46 @@
+"""add library_stats counters table
+
+Revision ID: 003_add_library_stats
+Revises: 002_add_hot_query_indexes
+Create Date: 2026-10-19 12:00:00.000000
+
+文档库统计计数器（文档数、chunk 数、文件总大小、已向量化文档数），由入库/向量化/删除在同一事务内维护。
+已有文档库的计数行在首次读写时按实际数据计算；也可执行
+python -m scripts.reconcile_library_stats 一次性建立全部计数行。
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+from app.db.models import GUID
+
+
+# revision identifiers, used by Alembic.
+revision: str = "003_add_library_stats"
+down_revision: Union[str, None] = "002_add_hot_query_indexes"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    if sa.inspect(op.get_bind()).has_table("library_stats"):
+        return
+    op.create_table(
+        "library_stats",
+        sa.Column(
+            "library_id",
+            GUID(),
+            sa.ForeignKey("document_libraries.id", ondelete="CASCADE"),
+            primary_key=True,
+        ),
+        sa.Column("document_count", sa.BigInteger(), nullable=False, server_default="0"),
+        sa.Column("chunk_count", sa.BigInteger(), nullable=False, server_default="0"),
+        sa.Column("total_size_bytes", sa.BigInteger(), nullable=False, server_default="0"),
+        sa.Column("vectorized_count", sa.BigInteger(), nullable=False, server_default="0"),
+        sa.Column("updated_at", sa.DateTime(), nullable=True),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("library_stats")
@@ -0,0 +1,50 @@
+"""promote hot document metadata fields to columns
+
+Revision ID: 004_promote_document_columns
+Revises: 003_add_library_stats
+Create Date: 2026-10-19 14:00:00.000000
+
+把 documents.metadata JSON 中常用于筛选与统计的字段提升为列：
+- vectorized：按向量化状态筛选（配合 documents(library_id, vectorized) 索引）
+- file_type / file_size / chunk_size：文件类型、大小（库统计求和）与切分大小
+
+迁移只建列与索引；已有文档的值需执行 python -m scripts.backfill_document_columns 从 metadata 回填，
+回填完成前库统计对账会把这些文档视为未向量化、大小为 0。
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "004_promote_document_columns"
+down_revision: Union[str, None] = "003_add_library_stats"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+COLUMNS: list[sa.Column] = [
+    sa.Column("vectorized", sa.Boolean(), nullable=False, server_default=sa.false()),
+    sa.Column("file_type", sa.String(32), nullable=True),
+    sa.Column("file_size", sa.BigInteger(), nullable=False, server_default="0"),
+    sa.Column("chunk_size", sa.Integer(), nullable=True),
+]
+INDEX = ("ix_documents_library_id_vectorized", ["library_id", "vectorized"])
+
+
+def upgrade() -> None:
+    # 通过 init_db.py（create_all）新建的库已包含这些列与索引，跳过已存在的
+    inspector = sa.inspect(op.get_bind())
+    existing = {column["name"] for column in inspector.get_columns("documents")}
+    for column in COLUMNS:
+        if column.name not in existing:
+            op.add_column("documents", column)
+    if INDEX[0] not in {index["name"] for index in inspector.get_indexes("documents")}:
+        op.create_index(INDEX[0], "documents", INDEX[1])
+
+
+def downgrade() -> None:
+    op.drop_index(INDEX[0], table_name="documents")
+    for column in reversed(COLUMNS):
+        op.drop_column("documents", column.name)
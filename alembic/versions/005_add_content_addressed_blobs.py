@@ -0,0 +1,47 @@
+"""add content-addressed upload storage
+
+Revision ID: 005_add_content_addressed_blobs
+Revises: 004_promote_document_columns
+Create Date: 2026-10-19 16:00:00.000000
+
+上传文件按内容 SHA-256 存储并引用计数（app/core/blobs.py）：
+- stored_blobs：sha256、文件路径、大小、引用计数
+- documents.content_hash：文档对应的 blob；相同内容的文档向量化时复用已有的 chunk 与向量
+
+已有文档的 content_hash 为空，继续使用原来的 {uuid}_{文件名} 文件，不参与去重。
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "005_add_content_addressed_blobs"
+down_revision: Union[str, None] = "004_promote_document_columns"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # 通过 init_db.py（create_all）新建的库已包含这些表、列与索引，跳过已存在的
+    inspector = sa.inspect(op.get_bind())
+    if not inspector.has_table("stored_blobs"):
+        op.create_table(
+            "stored_blobs",
+            sa.Column("sha256", sa.String(64), primary_key=True),
+            sa.Column("path", sa.String(512), nullable=False),
+            sa.Column("size", sa.BigInteger(), nullable=False, server_default="0"),
+            sa.Column("ref_count", sa.Integer(), nullable=False, server_default="0"),
+            sa.Column("created_at", sa.DateTime(), nullable=True),
+        )
+    if "content_hash" not in {column["name"] for column in inspector.get_columns("documents")}:
+        op.add_column("documents", sa.Column("content_hash", sa.String(64), nullable=True))
+    if "ix_documents_content_hash" not in {index["name"] for index in inspector.get_indexes("documents")}:
+        op.create_index("ix_documents_content_hash", "documents", ["content_hash"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_documents_content_hash", table_name="documents")
+    op.drop_column("documents", "content_hash")
+    op.drop_table("stored_blobs")
@@ -0,0 +1,47 @@
+"""add resumable upload sessions
+
+Revision ID: 006_add_upload_sessions
+Revises: 005_add_content_addressed_blobs
+Create Date: 2026-10-19 18:00:00.000000
+
+分片续传会话（app/api/v1/uploads.py）：分片保存在 storage_dir/.uploads/<id>/ 下，
+过期会话与分片由后台任务（UPLOAD_GC_INTERVAL）清理。
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+from app.db.models import GUID
+
+
+# revision identifiers, used by Alembic.
+revision: str = "006_add_upload_sessions"
+down_revision: Union[str, None] = "005_add_content_addressed_blobs"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    if sa.inspect(op.get_bind()).has_table("upload_sessions"):
+        return
+    op.create_table(
+        "upload_sessions",
+        sa.Column("id", GUID(), primary_key=True),
+        sa.Column("user_id", GUID(), sa.ForeignKey("users.id", ondelete="CASCADE"), nullable=False),
+        sa.Column("library_id", GUID(), nullable=True),
+        sa.Column("filename", sa.String(255), nullable=False),
+        sa.Column("total_size", sa.BigInteger(), nullable=False),
+        sa.Column("part_size", sa.Integer(), nullable=False),
+        sa.Column("sha256", sa.String(64), nullable=True),
+        sa.Column("created_at", sa.DateTime(), nullable=True),
+        sa.Column("expires_at", sa.DateTime(), nullable=False),
+    )
+    op.create_index("ix_upload_sessions_user_id", "upload_sessions", ["user_id"])
+    op.create_index("ix_upload_sessions_expires_at", "upload_sessions", ["expires_at"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_upload_sessions_expires_at", table_name="upload_sessions")
+    op.drop_index("ix_upload_sessions_user_id", table_name="upload_sessions")
+    op.drop_table("upload_sessions")
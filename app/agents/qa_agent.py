@@ -1,3 +1,4 @@
+from collections.abc import AsyncIterator
 from dataclasses import dataclass
 from typing import Any
 from uuid import UUID
@@ -15,10 +16,11 @@ class QAAgent:
         top_k: int = 5,
         library_ids: list[str] | None = None,
         role: str | None = None,
+        debug: bool = False,
     ) -> dict[str, Any]:
-        # Convert string IDs to UUIDs if provided
+        # Convert string IDs to UUIDs if provided (an empty list means no searchable library)
         library_uuids: list[UUID] | None = None
-        if library_ids:
+        if library_ids is not None:
             library_uuids = [UUID(lib_id) for lib_id in library_ids]
 
         result: PipelineResult = await self.pipeline.run(
@@ -27,9 +29,37 @@ class QAAgent:
             library_ids=library_uuids,
             role=role,
         )
-        return {
+        response = {
             "answer": result.answer,
             "references": result.references,
             "latency_ms": result.latency_ms,
         }
+        if debug:
+            response["trace"] = result.trace
+        return response
+
+    async def run_batch(
+        self,
+        queries: list[str],
+        top_k: int = 5,
+        library_ids: list[str] | None = None,
+        role: str | None = None,
+    ) -> AsyncIterator[dict[str, Any]]:
+        library_uuids: list[UUID] | None = None
+        if library_ids is not None:
+            library_uuids = [UUID(lib_id) for lib_id in library_ids]
+
+        async for index, result in self.pipeline.run_batch(
+            queries=queries,
+            top_k=top_k,
+            library_ids=library_uuids,
+            role=role,
+        ):
+            yield {
+                "index": index,
+                "query": queries[index],
+                "answer": result.answer,
+                "references": result.references,
+                "latency_ms": result.latency_ms,
+            }
 
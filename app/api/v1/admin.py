@@ -1,15 +1,21 @@
 import time
 import uuid
 
-from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi import APIRouter, Depends, HTTPException, Query, Response, status
+from fastapi.responses import PlainTextResponse
 from pydantic import BaseModel, EmailStr, Field
 from sqlalchemy import select, func
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.core.response import StandardResponse
+from app.core.pagination import fetch_page, set_next_cursor
+from app.core.passwords import hash_password
+from app.core.profiling import profile_for
+from app.core.response import PagedResponse, StandardResponse
 from app.core.security import require_admin
+from app.core.access import invalidate_access
+from app.core.user_cache import UserSnapshot, invalidate_user
 from app.db.models import User, DocumentLibrary
-from app.deps import get_db_session
+from app.deps import get_db_session, get_read_db_session
 
 router = APIRouter(prefix="/admin", tags=["admin"])
 
@@ -60,18 +66,20 @@ async def ping() -> dict[str, str]:
     return {"message": "pong"}
 
 
-@router.get("/users", response_model=StandardResponse[list[UserResponse]])
+@router.get("/users", response_model=PagedResponse[UserResponse])
 async def list_all_users(
+    response: Response,
     limit: int = Query(default=50, ge=1, le=200, description="每页数量"),
-    offset: int = Query(default=0, ge=0, description="偏移量"),
+    cursor: str | None = Query(default=None, description="游标（上一页响应的 next_cursor），传入时忽略 offset"),
+    offset: int = Query(default=0, ge=0, description="偏移量（兼容旧客户端，深翻页请使用 cursor）"),
     role: str | None = Query(default=None, description="按角色过滤"),
-    session: AsyncSession = Depends(get_db_session),
-    current_user: User = Depends(require_admin),
-) -> StandardResponse[list[UserResponse]]:
+    session: AsyncSession = Depends(get_read_db_session),
+    current_user: UserSnapshot = Depends(require_admin),
+) -> PagedResponse[UserResponse]:
     """
     列出所有已注册用户。仅管理员可访问。
     
-    支持分页和按角色过滤。
+    支持分页和按角色过滤；下一页游标通过 next_cursor 与响应头 X-Next-Cursor 返回。
     """
     # 构建查询
     query = select(User)
@@ -81,11 +89,16 @@ async def list_all_users(
         query = query.where(User.role == role)
     
     # 排序和分页
-    query = query.order_by(User.created_at.desc()).limit(limit).offset(offset)
-    
-    # 执行查询
-    result = await session.execute(query)
-    users = result.scalars().all()
+    users, next_cursor = await fetch_page(
+        session,
+        query,
+        created_at_column=User.created_at,
+        id_column=User.id,
+        limit=limit,
+        cursor=cursor,
+        offset=offset,
+    )
+    set_next_cursor(response, next_cursor)
     
     # 构建响应
     data = [
@@ -103,13 +116,13 @@ async def list_all_users(
         for user in users
     ]
     
-    return StandardResponse(data=data)
+    return PagedResponse(data=data, next_cursor=next_cursor)
 
 
 @router.get("/users/stats", response_model=StandardResponse[dict])
 async def get_user_stats(
-    session: AsyncSession = Depends(get_db_session),
-    current_user: User = Depends(require_admin),
+    session: AsyncSession = Depends(get_read_db_session),
+    current_user: UserSnapshot = Depends(require_admin),
 ) -> StandardResponse[dict]:
     """
     获取用户统计信息。仅管理员可访问。
@@ -147,12 +160,6 @@ async def get_user_stats(
     return StandardResponse(data=data)
 
 
-def _hash_password(password: str) -> str:
-    """Hash password using bcrypt."""
-    import bcrypt
-    return bcrypt.hashpw(password.encode("utf-8"), bcrypt.gensalt()).decode("utf-8")
-
-
 def _personal_library_name(user: User) -> str:
     """Construct a default personal library name."""
     base = user.full_name or user.username or user.email.split("@")[0]
@@ -163,7 +170,7 @@ def _personal_library_name(user: User) -> str:
 async def create_user(
     payload: CreateUserRequest,
     session: AsyncSession = Depends(get_db_session),
-    current_user: User = Depends(require_admin),
+    current_user: UserSnapshot = Depends(require_admin),
 ) -> StandardResponse[UserResponse]:
     """
     创建新用户（包括管理员账号）。仅管理员可访问。
@@ -202,7 +209,7 @@ async def create_user(
         email=payload.email,
         username=payload.username,
         full_name=payload.full_name,
-        password_hash=_hash_password(payload.password),
+        password_hash=await hash_password(payload.password),
         role=payload.role.lower(),
         is_active=payload.is_active,
         is_verified=payload.is_verified,
@@ -245,7 +252,7 @@ async def update_user(
     user_id: uuid.UUID,
     payload: UpdateUserRequest,
     session: AsyncSession = Depends(get_db_session),
-    current_user: User = Depends(require_admin),
+    current_user: UserSnapshot = Depends(require_admin),
 ) -> StandardResponse[UserResponse]:
     """
     更新用户信息。仅管理员可访问。
@@ -289,10 +296,12 @@ async def update_user(
     if payload.is_verified is not None:
         user.is_verified = payload.is_verified
     if payload.password:
-        user.password_hash = _hash_password(payload.password)
+        user.password_hash = await hash_password(payload.password)
     
     await session.commit()
     await session.refresh(user)
+    # 角色或状态可能已变化，清除各 worker 缓存的用户快照
+    await invalidate_user(user.id)
     
     return StandardResponse(
         data=UserResponse(
@@ -313,7 +322,7 @@ async def update_user(
 async def delete_user(
     user_id: uuid.UUID,
     session: AsyncSession = Depends(get_db_session),
-    current_user: User = Depends(require_admin),
+    current_user: UserSnapshot = Depends(require_admin),
 ) -> StandardResponse[dict]:
     """
     删除用户。仅管理员可访问。
@@ -340,6 +349,32 @@ async def delete_user(
     # 删除用户（级联删除会处理相关数据）
     await session.delete(user)
     await session.commit()
+    await invalidate_user(user_id)
+    await invalidate_access(user_id)
     
     return StandardResponse(data={"deleted": True, "user_id": str(user_id)})
 
+
+@router.post("/profile", response_class=PlainTextResponse)
+async def run_sampling_profiler(
+    seconds: float = Query(default=10, gt=0, le=120, description="采样时长（秒）"),
+    interval_ms: float = Query(default=5, ge=1, le=100, description="采样间隔（毫秒）"),
+    all_threads: bool = Query(default=False, description="是否采样所有线程（默认只采样事件循环线程）"),
+    current_user: UserSnapshot = Depends(require_admin),
+) -> PlainTextResponse:
+    """
+    运行采样分析器 N 秒，返回折叠栈文件（可直接用 flamegraph.pl 或 speedscope 打开）。仅管理员可访问。
+    
+    同一进程同时只允许一个分析任务。
+    """
+    try:
+        collapsed = await profile_for(seconds, interval=interval_ms / 1000, all_threads=all_threads)
+    except RuntimeError:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="A profiling session is already running"
+        )
+    return PlainTextResponse(
+        collapsed,
+        headers={"Content-Disposition": f'attachment; filename="profile-{int(time.time())}.collapsed"'},
+    )
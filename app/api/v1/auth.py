@@ -1,12 +1,11 @@
 from __future__ import annotations
 
-import bcrypt
 import secrets
 import uuid
 from datetime import datetime
 
 import jwt
-from fastapi import APIRouter, Depends, HTTPException, Security, status
+from fastapi import APIRouter, Depends, HTTPException, Request, Security, status
 from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
 from pydantic import BaseModel, EmailStr, Field
 from sqlalchemy import select
@@ -14,6 +13,8 @@ from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.core.config import Settings, get_settings
 from app.core.email import EmailService
+from app.core.limits import KeyedConcurrencyLimiter
+from app.core.passwords import hash_password, needs_rehash, verify_password
 from app.core.response import StandardResponse
 from app.core.security import (
     bearer_scheme,
@@ -21,22 +22,21 @@ from app.core.security import (
     get_current_user,
     revoke_token,
 )
-from app.deps import get_db_session, get_redis
-from app.db.models import User, DocumentLibrary, Document, Chunk
+from app.core.redis_pool import get_redis_client
+from app.core.blobs import release_document_blobs, remove_blob_files
+from app.core.access import invalidate_access
+from app.core.user_cache import invalidate_user
+from app.deps import get_db_session, get_redis, require_redis
+from app.db.bulk import delete_documents
+from app.db.models import User, DocumentLibrary, Document, LibraryStats
 from app.users.email_verification import EmailVerificationService
 
 router = APIRouter(tags=["auth"])
 
 
-def _hash_password(password: str) -> str:
-    return bcrypt.hashpw(password.encode("utf-8"), bcrypt.gensalt()).decode("utf-8")
-
-
-def _verify_password(password: str, password_hash: str) -> bool:
-    try:
-        return bcrypt.checkpw(password.encode("utf-8"), password_hash.encode("utf-8"))
-    except ValueError:
-        return False
+# 登录并发限制（每个 worker 内）：避免单个来源或被撞库的账号占满密码哈希线程池
+_login_ip_limiter = KeyedConcurrencyLimiter(get_settings().login_max_concurrent_per_ip, "client")
+_login_account_limiter = KeyedConcurrencyLimiter(get_settings().login_max_concurrent_per_account, "account")
 
 
 class RegisterRequest(BaseModel):
@@ -133,7 +133,7 @@ async def register(
         email=payload.email,
         username=payload.username,
         full_name=payload.full_name,
-        password_hash=_hash_password(payload.password),
+        password_hash=await hash_password(payload.password),
         role=user_role,
         is_verified=not enable_email_verification,  # 如果启用邮箱验证，初始为未验证
     )
@@ -146,20 +146,18 @@ async def register(
         try:
             import logging
             logger = logging.getLogger(__name__)
-            # 直接创建 Redis 客户端用于发送邮件（不通过依赖注入）
-            import redis.asyncio as redis
-            redis_client = redis.from_url(settings.redis_url, decode_responses=False)
-            try:
-                email_service = EmailService(settings)
-                verification_service = EmailVerificationService(
-                    session=session,
-                    settings=settings,
-                    email_service=email_service,
-                    redis_client=redis_client,
-                )
-                await verification_service.send_verification_code(user.id)
-            finally:
-                await redis_client.aclose()
+            # 使用进程级共享 Redis 客户端（不通过依赖注入）
+            redis_client = get_redis_client()
+            if redis_client is None:
+                raise RuntimeError("Redis is not configured")
+            email_service = EmailService(settings)
+            verification_service = EmailVerificationService(
+                session=session,
+                settings=settings,
+                email_service=email_service,
+                redis_client=redis_client,
+            )
+            await verification_service.send_verification_code(user.id)
         except Exception as e:
             # 记录错误但不影响注册流程
             import logging
@@ -193,15 +191,22 @@ async def register(
 @router.post("/login")
 async def login(
     payload: LoginRequest,
+    request: Request,
     session: AsyncSession = Depends(get_db_session),
     settings: Settings = Depends(get_settings),
 ) -> StandardResponse[TokenResponse]:
-    result = await session.execute(select(User).where(User.email == payload.email))
-    user = result.scalar_one_or_none()
-    if not user or not user.is_active:
-        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid credentials")
-    if not _verify_password(payload.password, user.password_hash):
-        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid credentials")
+    client_ip = request.client.host if request.client else "unknown"
+    with _login_ip_limiter.acquire(client_ip), _login_account_limiter.acquire(payload.email.lower()):
+        result = await session.execute(select(User).where(User.email == payload.email))
+        user = result.scalar_one_or_none()
+        if not user or not user.is_active:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid credentials")
+        if not await verify_password(payload.password, user.password_hash):
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid credentials")
+
+        # 成本因子调整后，用户下次登录时按新成本重新哈希
+        if needs_rehash(user.password_hash):
+            user.password_hash = await hash_password(payload.password)
 
     user.last_login_at = datetime.utcnow()  # type: ignore[name-defined]
     await session.commit()
@@ -229,7 +234,7 @@ async def verify_email(
     payload: VerifyEmailRequest,
     session: AsyncSession = Depends(get_db_session),
     settings: Settings = Depends(get_settings),
-    redis_client=Depends(get_redis),
+    redis_client=Depends(require_redis),
 ) -> StandardResponse[dict]:
     """
     验证邮箱。
@@ -267,7 +272,7 @@ async def resend_verification(
     payload: ResendRequest,
     session: AsyncSession = Depends(get_db_session),
     settings: Settings = Depends(get_settings),
-    redis_client=Depends(get_redis),
+    redis_client=Depends(require_redis),
 ) -> StandardResponse[dict]:
     """
     重新发送验证码邮件。
@@ -363,7 +368,7 @@ async def logout(
         payload = jwt.decode(token, (get_settings()).jwt_secret, algorithms=[(get_settings()).jwt_algorithm])
         jti = payload.get("jti")
         exp = payload.get("exp")
-        if jti:
+        if jti and redis_client is not None:
             await revoke_token(redis_client, jti, exp)
     except jwt.InvalidTokenError:
         pass
@@ -376,7 +381,7 @@ async def forgot_password(
     payload: PasswordResetRequest,
     session: AsyncSession = Depends(get_db_session),
     settings: Settings = Depends(get_settings),
-    redis_client=Depends(get_redis),
+    redis_client=Depends(require_redis),
 ) -> StandardResponse[dict]:
     """
     发送密码重置邮件。
@@ -435,7 +440,7 @@ async def forgot_password(
 async def reset_password(
     payload: PasswordResetConfirmRequest,
     session: AsyncSession = Depends(get_db_session),
-    redis_client=Depends(get_redis),
+    redis_client=Depends(require_redis),
 ) -> StandardResponse[dict]:
     """
     重置密码。
@@ -461,7 +466,7 @@ async def reset_password(
         )
     
     # 更新密码
-    user.password_hash = _hash_password(payload.new_password)
+    user.password_hash = await hash_password(payload.new_password)
     await session.commit()
     await redis_client.delete(key)
     
@@ -595,11 +600,13 @@ async def delete_own_account(
         documents = documents_result.scalars().all()
         document_ids = [doc.id for doc in documents]
         
-        # 3. 收集所有需要删除的文件路径
+        # 3. 收集所有需要删除的文件路径（按内容寻址存储的文件可能被其它用户的文档引用，按引用计数释放）
+        # 文件在事务提交后才删除：提交失败时引用计数回滚，文件必须仍在
         file_paths = []
         for doc in documents:
-            if doc.source_path:
+            if doc.source_path and not doc.content_hash:
                 file_paths.append(Path(doc.source_path))
+        file_paths.extend(await release_document_blobs(session, document_ids))
         
         # 4. 删除向量数据库中的集合
         try:
@@ -615,32 +622,15 @@ async def delete_own_account(
         except Exception as e:
             logger.warning(f"Failed to delete vector collections: {e}")
         
-        # 5. 删除文件系统中的文件
-        deleted_files = 0
-        for file_path in file_paths:
-            try:
-                if file_path.exists():
-                    file_path.unlink()
-                    deleted_files += 1
-                    logger.info(f"Deleted file: {file_path}")
-            except Exception as e:
-                logger.warning(f"Failed to delete file {file_path}: {e}")
-        
-        # 6. 删除数据库记录（级联删除会处理相关数据）
-        # 先删除 chunks
-        if document_ids:
-            await session.execute(
-                delete(Chunk).where(Chunk.document_id.in_(document_ids))
-            )
+        # 5. 删除数据库记录
+        # 先删除 chunks 与 documents（按批 DELETE ... IN，避免超长 IN 列表）
+        await delete_documents(session, document_ids)
         
-        # 删除 documents
-        if document_ids:
+        # 删除 libraries（及其统计计数行）
+        if library_ids:
             await session.execute(
-                delete(Document).where(Document.id.in_(document_ids))
+                delete(LibraryStats).where(LibraryStats.library_id.in_(library_ids))
             )
-        
-        # 删除 libraries
-        if library_ids:
             await session.execute(
                 delete(DocumentLibrary).where(DocumentLibrary.id.in_(library_ids))
             )
@@ -657,41 +647,47 @@ async def delete_own_account(
             delete(Feedback).where(Feedback.user_id == user_id)
         )
         
-        # 7. 清理 Redis 缓存
-        try:
-            # 清理搜索缓存
-            from app.core.cache import invalidate_search_cache
-            for library_id in library_ids:
-                try:
-                    await invalidate_search_cache(redis_client, library_id=str(library_id))
-                except Exception as e:
-                    logger.warning(f"Failed to invalidate cache for library {library_id}: {e}")
+        # 6. 清理 Redis 缓存
+        if redis_client is not None:
+            try:
+                # 清理搜索缓存
+                from app.core.cache import invalidate_search_cache
+                for library_id in library_ids:
+                    try:
+                        await invalidate_search_cache(redis_client, library_id=str(library_id))
+                    except Exception as e:
+                        logger.warning(f"Failed to invalidate cache for library {library_id}: {e}")
             
-            # 清理用户相关的验证码和token
-            user_email = current_user.email
-            # 删除邮箱验证码
-            await redis_client.delete(f"email_verification_code:{user_email}")
-            await redis_client.delete(f"email_verification_user:{user_email}")
+                # 清理用户相关的验证码和token
+                user_email = current_user.email
+                # 删除邮箱验证码
+                await redis_client.delete(f"email_verification_code:{user_email}")
+                await redis_client.delete(f"email_verification_user:{user_email}")
             
-            # 删除密码重置token（使用 SCAN 查找匹配的键）
-            async for key in redis_client.scan_iter(match="password_reset:*"):
-                # 检查 token 对应的用户ID是否匹配
-                user_id_bytes = await redis_client.get(key)
-                if user_id_bytes:
-                    stored_user_id = user_id_bytes.decode() if isinstance(user_id_bytes, bytes) else user_id_bytes
-                    if stored_user_id == str(user_id):
-                        await redis_client.delete(key)
+                # 删除密码重置token（使用 SCAN 查找匹配的键）
+                async for key in redis_client.scan_iter(match="password_reset:*"):
+                    # 检查 token 对应的用户ID是否匹配
+                    user_id_bytes = await redis_client.get(key)
+                    if user_id_bytes:
+                        stored_user_id = user_id_bytes.decode() if isinstance(user_id_bytes, bytes) else user_id_bytes
+                        if stored_user_id == str(user_id):
+                            await redis_client.delete(key)
             
-            # 清理 JWT 黑名单（如果有）
-            # JWT 黑名单通常使用 jti，这里我们清理所有可能相关的键
-            # 实际实现中，JWT 黑名单会在 token 过期后自动清理，这里不需要特别处理
-        except Exception as e:
-            logger.warning(f"Failed to clean Redis cache: {e}")
+                # 清理 JWT 黑名单（如果有）
+                # JWT 黑名单通常使用 jti，这里我们清理所有可能相关的键
+                # 实际实现中，JWT 黑名单会在 token 过期后自动清理，这里不需要特别处理
+            except Exception as e:
+                logger.warning(f"Failed to clean Redis cache: {e}")
         
-        # 8. 删除用户记录
+        # 7. 删除用户记录
         await session.delete(current_user)
         await session.commit()
         
+        # 8. 提交成功后删除文件系统中的文件
+        deleted_files = remove_blob_files([file_path for file_path in file_paths if file_path.exists()])
+        await invalidate_user(user_id)
+        await invalidate_access(user_id)
+        
         logger.info(f"User account deleted: {user_id}, deleted {len(libraries)} libraries, {len(documents)} documents, {deleted_files} files")
         
         return StandardResponse(
@@ -4,6 +4,7 @@ import zipfile
 import io
 import logging
 from datetime import datetime
+from functools import lru_cache
 from typing import Any
 
 logger = logging.getLogger(__name__)
@@ -11,23 +12,37 @@ logger = logging.getLogger(__name__)
 from fastapi import APIRouter, Depends, UploadFile, File, HTTPException, Body, Query, status
 from fastapi.responses import StreamingResponse, Response
 from pydantic import BaseModel, Field
-from sqlalchemy import select, func, and_, or_
+from sqlalchemy import Select, select, or_, delete
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.core.response import StandardResponse
-from app.core.security import get_current_user
-from app.db.models import DocumentLibrary, User, Group, GroupMember, Document, Chunk
+from app.core.response import PagedResponse, StandardResponse
+from app.core.security import get_current_principal, get_current_user
+from app.core.user_cache import UserSnapshot
+from app.db.models import DocumentLibrary, User, Group, GroupMember, Document, Chunk, LibraryStats
+from app.db.bulk import delete_documents
 from app.db.session import async_session
-from app.deps import get_db_session, get_retriever
+from app.deps import get_db_session, get_read_db_session, get_retriever
 from app.core.config import get_settings
+from app.core.access import MANAGE_ROLES, get_library_access, invalidate_access, invalidate_access_all
+from app.core.library_stats import (
+    adjust_library_stats,
+    ensure_library_stats,
+    get_library_stats as load_library_stats,
+    record_documents_removed,
+)
+from app.core.pagination import fetch_page, set_next_cursor
+from app.core.query_log import record_query
+from app.core.blobs import acquire_blob, release_document_blobs, remove_blob_files
+from app.core.uploads import StagedUpload, staged_upload
 from app.rag.ingestion import DocumentIngestor, _extract_text_from_file
 from app.rag.retriever import LangchainRetriever
 from app.core.cache import (
-    generate_search_cache_key,
-    get_cached_search_result,
-    cache_search_result,
-    record_cache_stats,
+    TieredCache,
     calculate_cache_ttl,
+    generate_search_cache_key,
+    get_cache_redis,
+    get_search_cache_generation,
+    invalidate_search_cache,
 )
 
 
@@ -74,6 +89,7 @@ class LibraryStatsResponse(BaseModel):
     document_count: int
     total_chunks: int
     total_size_bytes: int | None = None
+    vectorized_count: int | None = None
 
 
 class BatchDeleteRequest(BaseModel):
@@ -120,6 +136,17 @@ class BatchDownloadRequest(BaseModel):
 router = APIRouter(prefix="/docs", tags=["docs"])
 
 
+@lru_cache
+def _get_search_cache() -> TieredCache:
+    """搜索结果缓存（每个进程一个实例）。"""
+    settings = get_settings()
+    return TieredCache.from_settings(
+        "search",
+        ttl=settings.search_cache_ttl,
+        negative_ttl=settings.search_cache_negative_ttl,
+    )
+
+
 def _assert_owner_exists(session: AsyncSession, owner_id: uuid.UUID, owner_type: str):
     if owner_type == "user":
         return session.execute(select(User).where(User.id == owner_id))
@@ -136,10 +163,36 @@ async def _get_library_or_404(session: AsyncSession, library_id: uuid.UUID) -> D
     return library
 
 
+async def _require_library_read(session: AsyncSession, library_id: uuid.UUID | None, user_id: uuid.UUID) -> None:
+    """
+    在主库上判断文档库读权限（session 必须是主库会话）。
+
+    只读接口的内容与列表可以走副本，但权限不能以副本为准：刚被移出群组的成员在复制延迟内仍能读取。
+    无权访问时区分文档库不存在（404）与无权限（403）。
+    """
+    access = await get_library_access(session, user_id)
+    if access.can(library_id):
+        return
+    await _get_library_or_404(session, library_id)
+    raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Forbidden")
+
+
 def _collection_name(library_id: uuid.UUID | None) -> str:
     return f"library_{library_id}" if library_id else "library_default"
 
 
+def _delete_document_vectors(document_ids_by_library: dict[uuid.UUID | None, list[uuid.UUID]]) -> None:
+    """按库批量删除已删除文档的向量（best-effort，失败只记录日志，可由 reconcile_vectors 脚本补删）。"""
+    if not document_ids_by_library:
+        return
+    try:
+        ingestor = DocumentIngestor(settings=get_settings())
+        for library_id, document_ids in document_ids_by_library.items():
+            ingestor.delete_document_vectors(library_id, document_ids)
+    except Exception as e:
+        logger.warning(f"⚠️ 删除文档向量失败: {e}")
+
+
 async def _get_or_create_personal_library(session: AsyncSession, user: User) -> DocumentLibrary:
     """Ensure the user has a personal default library; create if missing."""
     # First try to find the default library
@@ -182,6 +235,7 @@ async def _get_or_create_personal_library(session: AsyncSession, user: User) ->
     library.vector_collection_name = _collection_name(library.id)  # Use library.id, not user.id
     await session.commit()
     await session.refresh(library)
+    await invalidate_access(user.id)
     return library
 
 
@@ -208,7 +262,7 @@ async def _assert_group_member(
 async def create_library(
     payload: LibraryCreateRequest,
     session: AsyncSession = Depends(get_db_session),
-    current_user: User = Depends(get_current_user),
+    current_user: UserSnapshot = Depends(get_current_principal),
 ) -> StandardResponse[LibraryResponse]:
     owner_type = payload.owner_type or "user"
 
@@ -240,6 +294,11 @@ async def create_library(
     library.vector_collection_name = _collection_name(library.id)  # Use library.id, not owner_id
     await session.commit()
     await session.refresh(library)
+    # 新库对创建者（个人库）或全体群组成员（群组库）可见
+    if owner_type == "user":
+        await invalidate_access(current_user.id)
+    else:
+        await invalidate_access_all()
 
     data = LibraryResponse(
         id=str(library.id),
@@ -257,13 +316,15 @@ async def list_libraries(
     owner_id: uuid.UUID | None = Query(default=None),
     owner_type: str = Query(default="user", pattern="^(user|group)$"),
     session: AsyncSession = Depends(get_db_session),
-    current_user: User = Depends(get_current_user),
+    read_session: AsyncSession = Depends(get_read_db_session),
+    current_user: UserSnapshot = Depends(get_current_principal),
 ) -> StandardResponse[list[LibraryResponse]]:
     resolved_owner_id = owner_id or current_user.id
     if owner_type == "user":
         if resolved_owner_id != current_user.id:
             raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Forbidden")
     elif owner_type == "group":
+        # 成员关系在主库上判断，列表从副本读取
         await _assert_group_member(
             session, group_id=resolved_owner_id, user_id=current_user.id, allowed_roles=("owner", "admin", "member")
         )
@@ -273,7 +334,7 @@ async def list_libraries(
     query = select(DocumentLibrary).where(
         DocumentLibrary.owner_id == resolved_owner_id, DocumentLibrary.owner_type == owner_type
     )
-    result = await session.execute(query)
+    result = await read_session.execute(query)
     libraries = result.scalars().all()
     data = [
         LibraryResponse(
@@ -289,57 +350,84 @@ async def list_libraries(
     return StandardResponse(data=data)
 
 
-@router.post("/ingest", response_model=StandardResponse[IngestResponse])
-async def ingest_document(
-    file: UploadFile = File(...),
-    library_id: uuid.UUID | None = None,
-    current_user: User = Depends(get_current_user),
-) -> StandardResponse[IngestResponse]:
-    settings = get_settings()
-    storage_dir = Path(settings.storage_dir)
-    storage_dir.mkdir(parents=True, exist_ok=True)
+async def resolve_upload_library(session: AsyncSession, user: User, library_id: uuid.UUID | None) -> uuid.UUID:
+    """上传目标文档库：指定时校验上传权限，未指定时使用（必要时创建）个人默认库。"""
+    if library_id is None:
+        library = await _get_or_create_personal_library(session, user)
+        return library.id
+    library = await _get_library_or_404(session, library_id)
+    if library.owner_type == "user":
+        if library.owner_id != user.id:
+            raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Forbidden")
+    elif library.owner_type == "group":
+        await _assert_group_member(
+            session, group_id=library.owner_id, user_id=user.id, allowed_roles=("owner", "admin", "member")
+        )
+    return library.id
 
-    # prefix with uuid to avoid filename collisions
-    target_path = storage_dir / f"{uuid.uuid4()}_{file.filename}"
-    target_path.write_bytes(await file.read())
-
-    async with async_session() as session:
-        resolved_library_id = library_id
-        if resolved_library_id:
-            library = await _get_library_or_404(session, resolved_library_id)
-            if library.owner_type == "user":
-                if library.owner_id != current_user.id:
-                    raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Forbidden")
-            elif library.owner_type == "group":
-                await _assert_group_member(
-                    session, group_id=library.owner_id, user_id=current_user.id, allowed_roles=("owner", "admin", "member")
-                )
-        else:
-            library = await _get_or_create_personal_library(session, current_user)
-            resolved_library_id = library.id
 
-        # persist document metadata only; vectorization is opt-in via separate endpoint
-        file_size = target_path.stat().st_size if target_path.exists() else 0
-        file_type = target_path.suffix.lower()
+async def create_document_from_upload(
+    session: AsyncSession, upload: StagedUpload, library_id: uuid.UUID, title: str
+) -> Document:
+    """把已落盘的上传保存为文档（按内容哈希存储文件、写入文档记录并更新库统计），并提交事务。"""
+    storage_dir = Path(get_settings().storage_dir)
+    storage_dir.mkdir(parents=True, exist_ok=True)
+    # persist document metadata only; vectorization is opt-in via separate endpoint
+    file_size = upload.size
+    file_type = Path(upload.filename).suffix.lower()
+    created_blob: Path | None = None
+    try:
+        # 按内容哈希存储：相同内容只保留一份文件（引用计数），向量化时复用同内容文档的 chunk 与向量
+        blob, created = await acquire_blob(session, upload, storage_dir)
+        if created:
+            created_blob = Path(blob.path)
+        await ensure_library_stats(session, library_id)
         document = Document(
-            title=file.filename,
-            source_path=str(target_path),
-            library_id=resolved_library_id,
+            title=title,
+            source_path=blob.path,
+            library_id=library_id,
+            file_type=file_type,
+            file_size=file_size,
+            vectorized=False,
+            content_hash=upload.sha256,
             meta={
                 "file_type": file_type,
                 "file_size": file_size,
+                "sha256": upload.sha256,
                 "vectorized": False,
             },
         )
         session.add(document)
+        await adjust_library_stats(session, library_id, documents=1, size_bytes=file_size)
         await session.commit()
-        await session.refresh(document)
+    except Exception:
+        # 文档记录未写入；本次新建的存储文件没有其它引用，一并删除
+        if created_blob is not None:
+            created_blob.unlink(missing_ok=True)
+        raise
+    await session.refresh(document)
+    return document
+
+
+@router.post("/ingest", response_model=StandardResponse[IngestResponse])
+async def ingest_document(
+    file: UploadFile = File(...),
+    library_id: uuid.UUID | None = None,
+    current_user: User = Depends(get_current_user),
+) -> StandardResponse[IngestResponse]:
+    """Upload a document in one request (large files over unreliable networks: use the resumable /docs/uploads API)."""
+    settings = get_settings()
+
+    # 分块流式写入临时文件（请求体大小已由 UploadSizeLimitMiddleware 在解析前限制），权限校验通过后再原子移动到 storage_dir
+    async with staged_upload(file, settings) as upload, async_session() as session:
+        resolved_library_id = await resolve_upload_library(session, current_user, library_id)
+        document = await create_document_from_upload(session, upload, resolved_library_id, file.filename)
 
     return StandardResponse(
         data=IngestResponse(
             document_id=str(document.id),
             chunks=0,
-                library_id=str(resolved_library_id) if resolved_library_id else None,
+            library_id=str(resolved_library_id) if resolved_library_id else None,
             vectorized=False,
         )
     )
@@ -356,7 +444,7 @@ async def vectorize_document(
     document_id: uuid.UUID,
     payload: VectorizeRequest,
     session: AsyncSession = Depends(get_db_session),
-    current_user: User = Depends(get_current_user),
+    current_user: UserSnapshot = Depends(get_current_principal),
 ) -> StandardResponse[VectorizeResponse]:
     """Trigger vectorization for a single document."""
     document = await session.get(Document, document_id)
@@ -378,7 +466,7 @@ async def vectorize_document(
     report = await ingestor.vectorize_document(document=document, session=session, chunk_size=payload.chunk_size)
     await session.refresh(document)
 
-    vectorized = bool((document.meta or {}).get("vectorized", False))
+    vectorized = document.vectorized
     code = 0 if vectorized else 1
     message = "success" if vectorized else f"vectorization failed: {report.error or 'unknown error'}"
 
@@ -398,13 +486,7 @@ async def vectorize_document(
         try:
             settings = get_settings()
             if settings.enable_search_cache and settings.redis_url:
-                import redis.asyncio as redis
-                redis_client = redis.from_url(settings.redis_url, decode_responses=False)
-                try:
-                    from app.core.cache import invalidate_search_cache
-                    await invalidate_search_cache(redis_client, library_id=str(document.library_id))
-                finally:
-                    await redis_client.aclose()
+                await invalidate_search_cache(get_cache_redis(), library_id=str(document.library_id))
         except Exception as e:
             logger.warning(f"清除搜索缓存失败: {e}")
 
@@ -420,16 +502,12 @@ async def vectorize_document(
 async def get_library(
     library_id: uuid.UUID,
     session: AsyncSession = Depends(get_db_session),
-    current_user: User = Depends(get_current_user),
+    read_session: AsyncSession = Depends(get_read_db_session),
+    current_user: UserSnapshot = Depends(get_current_principal),
 ) -> StandardResponse[LibraryResponse]:
-    library = await _get_library_or_404(session, library_id)
-    if library.owner_type == "user":
-        if library.owner_id != current_user.id:
-            raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Forbidden")
-    elif library.owner_type == "group":
-        await _assert_group_member(
-            session, group_id=library.owner_id, user_id=current_user.id, allowed_roles=("owner", "admin", "member")
-        )
+    # 权限在主库上判断，内容从副本读取
+    await _require_library_read(session, library_id, current_user.id)
+    library = await _get_library_or_404(read_session, library_id)
     data = LibraryResponse(
         id=str(library.id),
         name=library.name,
@@ -446,7 +524,7 @@ async def update_library(
     library_id: uuid.UUID,
     payload: LibraryUpdateRequest,
     session: AsyncSession = Depends(get_db_session),
-    current_user: User = Depends(get_current_user),
+    current_user: UserSnapshot = Depends(get_current_principal),
 ) -> StandardResponse[LibraryResponse]:
     library = await _get_library_or_404(session, library_id)
     if library.owner_type == "user":
@@ -480,7 +558,7 @@ async def update_library(
 async def delete_library(
     library_id: uuid.UUID,
     session: AsyncSession = Depends(get_db_session),
-    current_user: User = Depends(get_current_user),
+    current_user: UserSnapshot = Depends(get_current_principal),
 ) -> StandardResponse[dict]:
     library = await _get_library_or_404(session, library_id)
     
@@ -500,8 +578,15 @@ async def delete_library(
         )
 
     collection_name = library.vector_collection_name or _collection_name(library.id)
+    # 库中的文档与 chunk 一并删除（整个向量集合随后删除，无需逐个删除向量）
+    document_ids = (await session.execute(select(Document.id).where(Document.library_id == library.id))).scalars().all()
+    orphaned_files = await release_document_blobs(session, document_ids)
+    await delete_documents(session, document_ids)
+    await session.execute(delete(LibraryStats).where(LibraryStats.library_id == library.id))
     await session.delete(library)
     await session.commit()
+    remove_blob_files(orphaned_files)
+    await invalidate_access_all()
 
     # best-effort delete vector collection
     try:
@@ -514,49 +599,44 @@ async def delete_library(
     # 清除搜索缓存（库删除后，相关查询结果已失效）
     try:
         if settings.enable_search_cache and settings.redis_url:
-            import redis.asyncio as redis
-            redis_client = redis.from_url(settings.redis_url, decode_responses=False)
-            try:
-                from app.core.cache import invalidate_search_cache
-                await invalidate_search_cache(redis_client, library_id=str(library_id))
-            finally:
-                await redis_client.aclose()
+            await invalidate_search_cache(get_cache_redis(), library_id=str(library_id))
     except Exception as e:
         logger.warning(f"清除搜索缓存失败: {e}")
 
     return StandardResponse(data={"deleted": True})
 
 
-@router.get("/libraries/{library_id}/documents", response_model=StandardResponse[list[DocumentResponse]])
+def _filter_vectorized(query: Select, vectorized: bool | None) -> Select:
+    return query if vectorized is None else query.where(Document.vectorized.is_(vectorized))
+
+
+@router.get("/libraries/{library_id}/documents", response_model=PagedResponse[DocumentResponse])
 async def list_documents(
     library_id: uuid.UUID,
+    response: Response,
     limit: int = Query(default=50, ge=1, le=200),
-    offset: int = Query(default=0, ge=0),
+    cursor: str | None = Query(default=None, description="游标（上一页响应的 next_cursor），传入时忽略 offset"),
+    offset: int = Query(default=0, ge=0, description="偏移量（兼容旧客户端，深翻页请使用 cursor）"),
+    vectorized: bool | None = Query(default=None, description="按向量化状态筛选（不传则不筛选）"),
     session: AsyncSession = Depends(get_db_session),
-    current_user: User = Depends(get_current_user),
-) -> StandardResponse[list[DocumentResponse]]:
-    """List documents in a library with pagination."""
-    library = await _get_library_or_404(session, library_id)
-    
-    # Check permissions
-    if library.owner_type == "user":
-        if library.owner_id != current_user.id:
-            raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Forbidden")
-    elif library.owner_type == "group":
-        await _assert_group_member(
-            session, group_id=library.owner_id, user_id=current_user.id, allowed_roles=("owner", "admin", "member")
-        )
+    read_session: AsyncSession = Depends(get_read_db_session),
+    current_user: UserSnapshot = Depends(get_current_principal),
+) -> PagedResponse[DocumentResponse]:
+    """List documents in a library with pagination (next page cursor in next_cursor and the X-Next-Cursor header)."""
+    # 权限在主库上判断，内容从副本读取
+    await _require_library_read(session, library_id, current_user.id)
     
     # Query documents
-    query = (
-        select(Document)
-        .where(Document.library_id == library_id)
-        .order_by(Document.created_at.desc())
-        .limit(limit)
-        .offset(offset)
+    documents, next_cursor = await fetch_page(
+        read_session,
+        _filter_vectorized(select(Document).where(Document.library_id == library_id), vectorized),
+        created_at_column=Document.created_at,
+        id_column=Document.id,
+        limit=limit,
+        cursor=cursor,
+        offset=offset,
     )
-    result = await session.execute(query)
-    documents = result.scalars().all()
+    set_next_cursor(response, next_cursor)
     
     data = [
         DocumentResponse(
@@ -565,52 +645,33 @@ async def list_documents(
             source_path=doc.source_path,
             library_id=str(doc.library_id) if doc.library_id else None,
             meta=doc.meta or {},
-            vectorized=bool((doc.meta or {}).get("vectorized", False)),
+            vectorized=doc.vectorized,
             created_at=doc.created_at.isoformat() if doc.created_at else "",
         )
         for doc in documents
     ]
-    return StandardResponse(data=data)
+    return PagedResponse(data=data, next_cursor=next_cursor)
 
 
-@router.get("/documents", response_model=StandardResponse[list[DocumentResponse]])
+@router.get("/documents", response_model=PagedResponse[DocumentResponse])
 async def list_all_documents(
+    response: Response,
     library_id: uuid.UUID | None = Query(default=None, description="Optional: filter by library ID"),
     limit: int = Query(default=50, ge=1, le=200),
-    offset: int = Query(default=0, ge=0),
+    cursor: str | None = Query(default=None, description="游标（上一页响应的 next_cursor），传入时忽略 offset"),
+    offset: int = Query(default=0, ge=0, description="偏移量（兼容旧客户端，深翻页请使用 cursor）"),
+    vectorized: bool | None = Query(default=None, description="按向量化状态筛选（不传则不筛选）"),
     session: AsyncSession = Depends(get_db_session),
-    current_user: User = Depends(get_current_user),
-) -> StandardResponse[list[DocumentResponse]]:
-    """List all documents accessible by the current user."""
-    # Get user's accessible libraries
-    user_libraries_query = select(DocumentLibrary).where(
-        and_(
-            DocumentLibrary.owner_type == "user",
-            DocumentLibrary.owner_id == current_user.id
-        )
-    )
-    user_libs_result = await session.execute(user_libraries_query)
-    user_library_ids = [lib.id for lib in user_libs_result.scalars().all()]
-    
-    # Get group libraries where user is a member
-    group_members_query = select(GroupMember.group_id).where(GroupMember.user_id == current_user.id)
-    group_members_result = await session.execute(group_members_query)
-    group_ids = [gm for gm in group_members_result.scalars().all()]
-    
-    group_libraries_query = select(DocumentLibrary).where(
-        and_(
-            DocumentLibrary.owner_type == "group",
-            DocumentLibrary.owner_id.in_(group_ids)
-        )
-    )
-    group_libs_result = await session.execute(group_libraries_query)
-    group_library_ids = [lib.id for lib in group_libs_result.scalars().all()]
-    
-    # Combine all accessible library IDs
-    accessible_library_ids = user_library_ids + group_library_ids
+    read_session: AsyncSession = Depends(get_read_db_session),
+    current_user: UserSnapshot = Depends(get_current_principal),
+) -> PagedResponse[DocumentResponse]:
+    """List all documents accessible by the current user (next page cursor in next_cursor and the X-Next-Cursor header)."""
+    # 权限从主库计算（结果会被缓存，不能基于有复制延迟的副本），文档列表从副本读取
+    access = await get_library_access(session, current_user.id)
+    accessible_library_ids = access.library_ids
     
     # Build query
-    query = select(Document).order_by(Document.created_at.desc())
+    query = select(Document)
     
     if library_id:
         # Filter by specific library if provided
@@ -623,11 +684,18 @@ async def list_all_documents(
             query = query.where(Document.library_id.in_(accessible_library_ids))
         else:
             # No accessible libraries, return empty list
-            return StandardResponse(data=[])
-    
-    query = query.limit(limit).offset(offset)
-    result = await session.execute(query)
-    documents = result.scalars().all()
+            return PagedResponse(data=[])
+    
+    documents, next_cursor = await fetch_page(
+        read_session,
+        _filter_vectorized(query, vectorized),
+        created_at_column=Document.created_at,
+        id_column=Document.id,
+        limit=limit,
+        cursor=cursor,
+        offset=offset,
+    )
+    set_next_cursor(response, next_cursor)
     
     data = [
         DocumentResponse(
@@ -636,19 +704,19 @@ async def list_all_documents(
             source_path=doc.source_path,
             library_id=str(doc.library_id) if doc.library_id else None,
             meta=doc.meta or {},
-            vectorized=bool((doc.meta or {}).get("vectorized", False)),
+            vectorized=doc.vectorized,
             created_at=doc.created_at.isoformat() if doc.created_at else "",
         )
         for doc in documents
     ]
-    return StandardResponse(data=data)
+    return PagedResponse(data=data, next_cursor=next_cursor)
 
 
 @router.post("/documents/batch-delete", response_model=StandardResponse[dict])
 async def batch_delete_documents(
     payload: BatchDeleteRequest,
     session: AsyncSession = Depends(get_db_session),
-    current_user: User = Depends(get_current_user),
+    current_user: UserSnapshot = Depends(get_current_principal),
 ) -> StandardResponse[dict]:
     """Batch delete multiple documents."""
     document_ids = [uuid.UUID(doc_id) for doc_id in payload.document_ids]
@@ -660,32 +728,23 @@ async def batch_delete_documents(
     if len(documents) != len(document_ids):
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Some documents not found")
     
-    # Check permissions for each document
+    # Check permissions for each document（一次查询取得全部可访问库，不再逐个文档查询）
+    access = await get_library_access(session, current_user.id)
     for document in documents:
-        if document.library_id:
-            library = await _get_library_or_404(session, document.library_id)
-            if library.owner_type == "user":
-                if library.owner_id != current_user.id:
-                    raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail=f"Forbidden: document {document.id}")
-            elif library.owner_type == "group":
-                await _assert_group_member(
-                    session, group_id=library.owner_id, user_id=current_user.id, allowed_roles=("owner", "admin")
-                )
-    
-    # Delete chunks
-    chunk_result = await session.execute(select(Chunk).where(Chunk.document_id.in_(document_ids)))
-    chunks = chunk_result.scalars().all()
-    for chunk in chunks:
-        await session.delete(chunk)
+        if not access.can(document.library_id, MANAGE_ROLES):
+            raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail=f"Forbidden: document {document.id}")
     
-    # Delete documents
-    library_ids_affected = set()
+    # Delete chunks and documents（按批 DELETE ... IN，不逐个加载删除）
+    document_ids_by_library: dict[uuid.UUID | None, list[uuid.UUID]] = {}
     for document in documents:
-        if document.library_id:
-            library_ids_affected.add(document.library_id)
-        await session.delete(document)
-    
+        document_ids_by_library.setdefault(document.library_id, []).append(document.id)
+    library_ids_affected = {lib_id for lib_id in document_ids_by_library if lib_id}
+    await record_documents_removed(session, documents)
+    orphaned_files = await release_document_blobs(session, document_ids)
+    await delete_documents(session, document_ids)
     await session.commit()
+    remove_blob_files(orphaned_files)
+    _delete_document_vectors(document_ids_by_library)
     
     # 清除受影响库的 BM25 缓存
     if library_ids_affected:
@@ -703,14 +762,8 @@ async def batch_delete_documents(
         try:
             settings = get_settings()
             if settings.enable_search_cache and settings.redis_url:
-                import redis.asyncio as redis
-                redis_client = redis.from_url(settings.redis_url, decode_responses=False)
-                try:
-                    from app.core.cache import invalidate_search_cache
-                    for lib_id in library_ids_affected:
-                        await invalidate_search_cache(redis_client, library_id=str(lib_id))
-                finally:
-                    await redis_client.aclose()
+                for lib_id in library_ids_affected:
+                    await invalidate_search_cache(get_cache_redis(), library_id=str(lib_id))
         except Exception as e:
             logger.warning(f"清除搜索缓存失败: {e}")
     
@@ -721,7 +774,7 @@ async def batch_delete_documents(
 async def batch_download_documents(
     payload: BatchDownloadRequest,
     session: AsyncSession = Depends(get_db_session),
-    current_user: User = Depends(get_current_user),
+    current_user: UserSnapshot = Depends(get_current_principal),
 ) -> StreamingResponse:
     """Download multiple documents as a zip file."""
     document_ids = [uuid.UUID(doc_id) for doc_id in payload.document_ids]
@@ -734,26 +787,8 @@ async def batch_download_documents(
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Some documents not found")
     
     # Check permissions for each document
-    accessible_docs = []
-    for document in documents:
-        has_access = False
-        if document.library_id:
-            library = await _get_library_or_404(session, document.library_id)
-            if library.owner_type == "user":
-                has_access = library.owner_id == current_user.id
-            elif library.owner_type == "group":
-                try:
-                    await _assert_group_member(
-                        session, group_id=library.owner_id, user_id=current_user.id, allowed_roles=("owner", "admin", "member")
-                    )
-                    has_access = True
-                except HTTPException:
-                    has_access = False
-        else:
-            has_access = True
-        
-        if has_access:
-            accessible_docs.append(document)
+    access = await get_library_access(session, current_user.id)
+    accessible_docs = [document for document in documents if access.can(document.library_id)]
     
     if not accessible_docs:
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="No accessible documents")
@@ -783,24 +818,17 @@ async def batch_download_documents(
 async def get_document(
     document_id: uuid.UUID,
     session: AsyncSession = Depends(get_db_session),
-    current_user: User = Depends(get_current_user),
+    read_session: AsyncSession = Depends(get_read_db_session),
+    current_user: UserSnapshot = Depends(get_current_principal),
 ) -> StandardResponse[DocumentResponse]:
     """Get document details."""
-    result = await session.execute(select(Document).where(Document.id == document_id))
+    result = await read_session.execute(select(Document).where(Document.id == document_id))
     document = result.scalar_one_or_none()
     if not document:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Document not found")
     
-    # Check library permissions
-    if document.library_id:
-        library = await _get_library_or_404(session, document.library_id)
-        if library.owner_type == "user":
-            if library.owner_id != current_user.id:
-                raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Forbidden")
-        elif library.owner_type == "group":
-            await _assert_group_member(
-                session, group_id=library.owner_id, user_id=current_user.id, allowed_roles=("owner", "admin", "member")
-            )
+    # 权限在主库上判断，内容从副本读取
+    await _require_library_read(session, document.library_id, current_user.id)
     
     data = DocumentResponse(
         id=str(document.id),
@@ -808,7 +836,7 @@ async def get_document(
         source_path=document.source_path,
         library_id=str(document.library_id) if document.library_id else None,
         meta=document.meta or {},
-        vectorized=bool((document.meta or {}).get("vectorized", False)),
+        vectorized=document.vectorized,
         created_at=document.created_at.isoformat() if document.created_at else "",
     )
     return StandardResponse(data=data)
@@ -818,7 +846,7 @@ async def get_document(
 async def delete_document(
     document_id: uuid.UUID,
     session: AsyncSession = Depends(get_db_session),
-    current_user: User = Depends(get_current_user),
+    current_user: UserSnapshot = Depends(get_current_principal),
 ) -> StandardResponse[dict]:
     """Delete a document and its chunks."""
     result = await session.execute(select(Document).where(Document.id == document_id))
@@ -837,18 +865,16 @@ async def delete_document(
                 session, group_id=library.owner_id, user_id=current_user.id, allowed_roles=("owner", "admin")
             )
     
-    # Delete chunks first (cascade should handle this, but explicit is better)
-    chunk_result = await session.execute(select(Chunk).where(Chunk.document_id == document_id))
-    chunks = chunk_result.scalars().all()
-    for chunk in chunks:
-        await session.delete(chunk)
-    
-    # Delete document
+    # Delete chunks and document
     library_id = document.library_id
-    await session.delete(document)
+    await record_documents_removed(session, [document])
+    orphaned_files = await release_document_blobs(session, [document_id])
+    await delete_documents(session, [document_id])
     await session.commit()
+    remove_blob_files(orphaned_files)
     
-    # TODO: Remove from vector store (best-effort)
+    # Remove from vector store (best-effort)
+    _delete_document_vectors({library_id: [document_id]})
     
     # 清除受影响库的 BM25 缓存
     if library_id:
@@ -865,13 +891,7 @@ async def delete_document(
     try:
         settings = get_settings()
         if settings.enable_search_cache and settings.redis_url:
-            import redis.asyncio as redis
-            redis_client = redis.from_url(settings.redis_url, decode_responses=False)
-            try:
-                from app.core.cache import invalidate_search_cache
-                await invalidate_search_cache(redis_client, library_id=str(library_id) if library_id else None)
-            finally:
-                await redis_client.aclose()
+            await invalidate_search_cache(get_cache_redis(), library_id=str(library_id) if library_id else None)
     except Exception as e:
         logger.warning(f"清除搜索缓存失败: {e}")
     
@@ -882,39 +902,22 @@ async def delete_document(
 async def get_library_stats(
     library_id: uuid.UUID,
     session: AsyncSession = Depends(get_db_session),
-    current_user: User = Depends(get_current_user),
+    read_session: AsyncSession = Depends(get_read_db_session),
+    current_user: UserSnapshot = Depends(get_current_principal),
 ) -> StandardResponse[LibraryStatsResponse]:
-    """Get library statistics (document count, chunk count, etc.)."""
-    library = await _get_library_or_404(session, library_id)
-    
-    # Check permissions
-    if library.owner_type == "user":
-        if library.owner_id != current_user.id:
-            raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Forbidden")
-    elif library.owner_type == "group":
-        await _assert_group_member(
-            session, group_id=library.owner_id, user_id=current_user.id, allowed_roles=("owner", "admin", "member")
-        )
-    
-    # Count documents
-    doc_count_result = await session.execute(
-        select(func.count(Document.id)).where(Document.library_id == library_id)
-    )
-    document_count = doc_count_result.scalar() or 0
+    """Get library statistics (document count, chunk count, size, vectorized count)."""
+    # 权限在主库上判断，内容从副本读取
+    await _require_library_read(session, library_id, current_user.id)
     
-    # Count chunks
-    chunk_count_result = await session.execute(
-        select(func.count(Chunk.id))
-        .join(Document)
-        .where(Document.library_id == library_id)
-    )
-    total_chunks = chunk_count_result.scalar() or 0
+    # 读取计数行（入库/向量化/删除时维护），不再每次 COUNT
+    stats = await load_library_stats(read_session, library_id)
     
     data = LibraryStatsResponse(
         library_id=str(library_id),
-        document_count=document_count,
-        total_chunks=total_chunks,
-        total_size_bytes=None,  # TODO: Calculate from source_path if files are stored
+        document_count=stats.document_count,
+        total_chunks=stats.chunk_count,
+        total_size_bytes=stats.total_size_bytes,
+        vectorized_count=stats.vectorized_count,
     )
     return StandardResponse(data=data)
 
@@ -923,7 +926,8 @@ async def get_library_stats(
 async def search_documents(
     payload: DocumentSearchRequest,
     session: AsyncSession = Depends(get_db_session),
-    current_user: User = Depends(get_current_user),
+    read_session: AsyncSession = Depends(get_read_db_session),
+    current_user: UserSnapshot = Depends(get_current_principal),
     retriever: LangchainRetriever = Depends(get_retriever),
 ) -> StandardResponse[list[DocumentSearchResult]]:
     """
@@ -936,222 +940,165 @@ async def search_documents(
     
     缓存策略：
     - 缓存键包含查询、库ID、限制和用户ID（权限隔离）
-    - 动态 TTL：根据结果数量和查询长度调整
-    - 缓存命中时直接返回，未命中时执行检索并缓存结果
+    - 动态 TTL：根据结果数量和查询长度调整；空结果短时间缓存
+    - 进程内 + Redis 两级缓存；同一查询并发未命中时只检索一次
     """
     from app.rag.retriever import RetrievedChunk
     from app.core.config import get_settings
     
     settings = get_settings()
-    redis_client = None
-    cache_key = None
-    
-    # 1. 尝试从缓存获取（如果启用缓存）
-    if settings.enable_search_cache and settings.redis_url:
-        try:
-            import redis.asyncio as redis
-            redis_client = redis.from_url(settings.redis_url, decode_responses=False)
-            cache_key = generate_search_cache_key(
-                query=payload.query,
-                library_id=str(payload.library_id) if payload.library_id else None,
-                limit=payload.limit,
-                user_id=str(current_user.id)
-            )
-            
-            cached_result = await get_cached_search_result(redis_client, cache_key)
-            if cached_result is not None:
-                # 记录缓存命中
-                await record_cache_stats(redis_client, hit=True)
-                logger.info(f"搜索缓存命中: {cache_key}")
-                await redis_client.aclose()
-                return StandardResponse(data=cached_result)
-        except Exception as e:
-            logger.warning(f"缓存读取失败: {e}")
-            if redis_client:
-                try:
-                    await redis_client.aclose()
-                except:
-                    pass
-                redis_client = None
-    
-    # 2. 使用混合检索获取相关 chunks
-    library_ids = [payload.library_id] if payload.library_id else None
-    # 获取更多候选结果，用于后续聚合和评分
-    chunks = await retriever.search(
-        query=payload.query,
-        top_k=payload.limit * 5,  # 获取更多候选，用于文档聚合
-        library_ids=library_ids,
-        use_hybrid=True
-    )
-    
-    if not chunks:
-        return StandardResponse(data=[])
-    
-    # 2. 按文档聚合结果，收集所有匹配的 chunks 和分数
-    doc_chunks: dict[str, list[RetrievedChunk]] = {}
-    doc_vector_scores: dict[str, list[float]] = {}
-    
-    for chunk in chunks:
-        doc_id = chunk.document_id
-        if doc_id not in doc_chunks:
-            doc_chunks[doc_id] = []
-            doc_vector_scores[doc_id] = []
-        doc_chunks[doc_id].append(chunk)
-        doc_vector_scores[doc_id].append(chunk.score)
+    # 检索前确定可访问的文档库，检索器只查询这些库的集合，候选名额不会被无权访问的 chunk 占用
+    access = await get_library_access(session, current_user.id)
+    library_ids = access.search_scope([payload.library_id] if payload.library_id else None)
+    # 与下方传给检索器的参数一致，预热回放时才能命中相同的查询向量与重排序缓存
+    record_query(payload.query, library_ids, payload.limit * 5)
+    
+    async def _search() -> list[dict]:
+        # 2. 使用混合检索获取相关 chunks
+        if not library_ids:
+            return []
+        # 获取更多候选结果，用于后续聚合和评分
+        chunks = await retriever.search(
+            query=payload.query,
+            top_k=payload.limit * 5,  # 获取更多候选，用于文档聚合
+            library_ids=library_ids,
+            use_hybrid=True
+        )
     
-    # 3. 获取所有相关文档信息（批量查询，避免 N+1）
-    doc_ids = list(doc_chunks.keys())
-    docs_result = await session.execute(
-        select(Document).where(Document.id.in_([uuid.UUID(doc_id) for doc_id in doc_ids]))
-    )
-    docs_dict = {str(doc.id): doc for doc in docs_result.scalars().all()}
+        if not chunks:
+            return []
+    
+        # 2. 按文档聚合结果，收集所有匹配的 chunks 和分数
+        doc_chunks: dict[str, list[RetrievedChunk]] = {}
+        doc_vector_scores: dict[str, list[float]] = {}
+    
+        for chunk in chunks:
+            doc_id = chunk.document_id
+            if doc_id not in doc_chunks:
+                doc_chunks[doc_id] = []
+                doc_vector_scores[doc_id] = []
+            doc_chunks[doc_id].append(chunk)
+            doc_vector_scores[doc_id].append(chunk.score)
+    
+        # 3. 获取所有相关文档信息（批量查询，避免 N+1；从只读副本读取）
+        doc_ids = list(doc_chunks.keys())
+        docs_result = await read_session.execute(
+            select(Document).where(Document.id.in_([uuid.UUID(doc_id) for doc_id in doc_ids]))
+        )
+        docs_dict = {str(doc.id): doc for doc in docs_result.scalars().all()}
     
-    # 4. 计算文档综合分数
-    query_lower = payload.query.lower()
-    doc_final_scores: dict[str, float] = {}
+        # 4. 计算文档综合分数
+        query_lower = payload.query.lower()
+        doc_final_scores: dict[str, float] = {}
     
-    for doc_id, chunks_list in doc_chunks.items():
-        doc = docs_dict.get(doc_id)
-        if not doc:
-            continue
+        for doc_id, chunks_list in doc_chunks.items():
+            doc = docs_dict.get(doc_id)
+            if not doc:
+                continue
         
-        # 权限检查
-        has_access = False
-        if doc.library_id:
-            try:
-                library = await _get_library_or_404(session, doc.library_id)
-                if library.owner_type == "user":
-                    has_access = library.owner_id == current_user.id
-                elif library.owner_type == "group":
-                    try:
-                        await _assert_group_member(
-                            session, group_id=library.owner_id, user_id=current_user.id, 
-                            allowed_roles=("owner", "admin", "member")
-                        )
-                        has_access = True
-                    except HTTPException:
-                        has_access = False
-            except HTTPException:
-                has_access = False
-        else:
-            # Documents without library are accessible to owner
-            has_access = True
+            # 权限检查（检索范围已限定在可访问的库内，这里兜底处理检索后才变更的权限）
+            has_access = access.can(doc.library_id)
         
-        if not has_access:
-            continue
+            if not has_access:
+                continue
         
-        # 计算综合分数
-        # 基础分数：向量检索的最高分（或加权平均）
-        vector_score = max(doc_vector_scores[doc_id]) if doc_vector_scores[doc_id] else 0.0
+            # 计算综合分数
+            # 基础分数：向量检索的最高分（或加权平均）
+            vector_score = max(doc_vector_scores[doc_id]) if doc_vector_scores[doc_id] else 0.0
         
-        # 标题匹配增强（完全匹配权重更高）
-        title_score = 0.0
-        title_lower = doc.title.lower()
-        if query_lower == title_lower:
-            title_score = 0.5  # 完全匹配
-        elif query_lower in title_lower:
-            title_score = 0.3  # 部分匹配
-        elif any(word in title_lower for word in query_lower.split() if len(word) > 1):
-            title_score = 0.1  # 关键词匹配
+            # 标题匹配增强（完全匹配权重更高）
+            title_score = 0.0
+            title_lower = doc.title.lower()
+            if query_lower == title_lower:
+                title_score = 0.5  # 完全匹配
+            elif query_lower in title_lower:
+                title_score = 0.3  # 部分匹配
+            elif any(word in title_lower for word in query_lower.split() if len(word) > 1):
+                title_score = 0.1  # 关键词匹配
         
-        # 匹配次数增强（多次匹配说明更相关）
-        match_count_boost = min(0.2, len(chunks_list) * 0.05)  # 最多增加 0.2
+            # 匹配次数增强（多次匹配说明更相关）
+            match_count_boost = min(0.2, len(chunks_list) * 0.05)  # 最多增加 0.2
         
-        # 综合分数 = 向量分数（归一化到 0-1） + 标题匹配 + 匹配次数增强
-        # 向量分数已经是归一化的，直接使用
-        final_score = vector_score + title_score + match_count_boost
+            # 综合分数 = 向量分数（归一化到 0-1） + 标题匹配 + 匹配次数增强
+            # 向量分数已经是归一化的，直接使用
+            final_score = vector_score + title_score + match_count_boost
         
-        doc_final_scores[doc_id] = final_score
-    
-    # 5. 按分数排序并限制数量
-    sorted_doc_ids = sorted(
-        doc_final_scores.items(), 
-        key=lambda x: x[1], 
-        reverse=True
-    )[:payload.limit]
-    
-    # 6. 构建响应
-    results: list[DocumentSearchResult] = []
-    for doc_id, score in sorted_doc_ids:
-        doc = docs_dict.get(doc_id)
-        if not doc:
-            continue
+            doc_final_scores[doc_id] = final_score
+    
+        # 5. 按分数排序并限制数量
+        sorted_doc_ids = sorted(
+            doc_final_scores.items(), 
+            key=lambda x: x[1], 
+            reverse=True
+        )[:payload.limit]
+    
+        # 6. 构建响应
+        results: list[DocumentSearchResult] = []
+        for doc_id, score in sorted_doc_ids:
+            doc = docs_dict.get(doc_id)
+            if not doc:
+                continue
         
-        # 获取最佳匹配的 chunk 作为 snippet
-        best_chunk = max(doc_chunks[doc_id], key=lambda c: c.score)
-        snippet = best_chunk.text
+            # 获取最佳匹配的 chunk 作为 snippet
+            best_chunk = max(doc_chunks[doc_id], key=lambda c: c.score)
+            snippet = best_chunk.text
         
-        # 如果 snippet 太长，截取并添加省略号
-        if len(snippet) > 200:
-            # 尝试在查询词附近截取
-            query_pos = snippet.lower().find(query_lower)
-            if query_pos >= 0:
-                start = max(0, query_pos - 80)
-                end = min(len(snippet), query_pos + len(payload.query) + 80)
-                snippet = snippet[start:end]
-                if start > 0:
-                    snippet = "..." + snippet
-                if end < len(best_chunk.text):
-                    snippet = snippet + "..."
-            else:
-                snippet = snippet[:200] + "..."
+            # 如果 snippet 太长，截取并添加省略号
+            if len(snippet) > 200:
+                # 尝试在查询词附近截取
+                query_pos = snippet.lower().find(query_lower)
+                if query_pos >= 0:
+                    start = max(0, query_pos - 80)
+                    end = min(len(snippet), query_pos + len(payload.query) + 80)
+                    snippet = snippet[start:end]
+                    if start > 0:
+                        snippet = "..." + snippet
+                    if end < len(best_chunk.text):
+                        snippet = snippet + "..."
+                else:
+                    snippet = snippet[:200] + "..."
         
-        results.append(
-            DocumentSearchResult(
-                document_id=doc_id,
-                title=doc.title,
-                snippet=snippet,
-                score=round(score, 4),  # 保留4位小数
-                library_id=str(doc.library_id) if doc.library_id else None,
-            )
-        )
-    
-    # 7. 缓存结果（如果启用缓存）
-    if settings.enable_search_cache and settings.redis_url and results:
-        try:
-            if not redis_client:
-                import redis.asyncio as redis
-                redis_client = redis.from_url(settings.redis_url, decode_responses=False)
-                cache_key = generate_search_cache_key(
-                    query=payload.query,
-                    library_id=str(payload.library_id) if payload.library_id else None,
-                    limit=payload.limit,
-                    user_id=str(current_user.id)
+            results.append(
+                DocumentSearchResult(
+                    document_id=doc_id,
+                    title=doc.title,
+                    snippet=snippet,
+                    score=round(score, 4),  # 保留4位小数
+                    library_id=str(doc.library_id) if doc.library_id else None,
                 )
-            
-            # 转换为可序列化的格式
-            cache_data = [
-                {
-                    "document_id": r.document_id,
-                    "title": r.title,
-                    "snippet": r.snippet,
-                    "score": r.score,
-                    "library_id": r.library_id
-                }
-                for r in results
-            ]
-            
-            # 动态计算 TTL
-            ttl = calculate_cache_ttl(
-                result_count=len(results),
-                query_length=len(payload.query)
             )
-            # 使用配置的 TTL 作为上限
-            ttl = min(ttl, settings.search_cache_ttl)
-            
-            await cache_search_result(redis_client, cache_key, cache_data, ttl)
-            # 记录缓存未命中
-            await record_cache_stats(redis_client, hit=False)
-            logger.debug(f"搜索缓存写入: {cache_key}, TTL: {ttl}s")
-        except Exception as e:
-            logger.warning(f"缓存写入失败: {e}")
-        finally:
-            if redis_client:
-                try:
-                    await redis_client.aclose()
-                except:
-                    pass
+        
+        return [r.model_dump() for r in results]
+    
+    # 缓存（进程内 + Redis 两级）；缓存键包含检索开始前读取的代数，
+    # 检索期间发生的失效会让这次写入落在旧代数下，不会被读到
+    redis_client = get_cache_redis()
+    if not (settings.enable_search_cache and redis_client is not None):
+        return StandardResponse(data=await _search())
     
+    library_key = str(payload.library_id) if payload.library_id else None
+    try:
+        generation = await get_search_cache_generation(redis_client, library_key)
+    except Exception as e:
+        logger.warning(f"读取搜索缓存代数失败，跳过缓存: {e}")
+        return StandardResponse(data=await _search())
+    
+    cache_key = generate_search_cache_key(
+        query=payload.query,
+        library_id=library_key,
+        limit=payload.limit,
+        user_id=str(current_user.id),
+        generation=generation,
+    )
+    # 动态 TTL：根据结果数量和查询长度调整，以配置的 TTL 为上限
+    results = await _get_search_cache().get_or_compute(
+        cache_key,
+        _search,
+        ttl=lambda data: min(
+            calculate_cache_ttl(result_count=len(data), query_length=len(payload.query)),
+            settings.search_cache_ttl,
+        ),
+    )
     return StandardResponse(data=results)
 
 
@@ -1160,24 +1107,17 @@ async def preview_document(
     document_id: uuid.UUID,
     max_length: int = Query(default=5000, ge=100, le=50000),
     session: AsyncSession = Depends(get_db_session),
-    current_user: User = Depends(get_current_user),
+    read_session: AsyncSession = Depends(get_read_db_session),
+    current_user: UserSnapshot = Depends(get_current_principal),
 ) -> StandardResponse[DocumentPreviewResponse]:
     """Preview document content."""
-    result = await session.execute(select(Document).where(Document.id == document_id))
+    result = await read_session.execute(select(Document).where(Document.id == document_id))
     document = result.scalar_one_or_none()
     if not document:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Document not found")
     
-    # Check permissions
-    if document.library_id:
-        library = await _get_library_or_404(session, document.library_id)
-        if library.owner_type == "user":
-            if library.owner_id != current_user.id:
-                raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Forbidden")
-        elif library.owner_type == "group":
-            await _assert_group_member(
-                session, group_id=library.owner_id, user_id=current_user.id, allowed_roles=("owner", "admin", "member")
-            )
+    # 权限在主库上判断，内容从副本读取
+    await _require_library_read(session, document.library_id, current_user.id)
     
     # Get document content
     path = Path(document.source_path)
@@ -1188,7 +1128,7 @@ async def preview_document(
             content = ""
     else:
         # Fallback: get from chunks
-        chunk_result = await session.execute(
+        chunk_result = await read_session.execute(
             select(Chunk).where(Chunk.document_id == document_id).order_by(Chunk.id)
         )
         chunks = chunk_result.scalars().all()
@@ -1199,8 +1139,8 @@ async def preview_document(
     if len(content) > max_length:
         content = content[:max_length] + "\n\n... (truncated)"
     
-    file_type = document.meta.get("file_type", "") if document.meta else None
-    vectorized = bool((document.meta or {}).get("vectorized", False))
+    file_type = document.file_type
+    vectorized = document.vectorized
     
     data = DocumentPreviewResponse(
         document_id=str(document_id),
@@ -1217,24 +1157,17 @@ async def preview_document(
 async def download_document(
     document_id: uuid.UUID,
     session: AsyncSession = Depends(get_db_session),
-    current_user: User = Depends(get_current_user),
+    read_session: AsyncSession = Depends(get_read_db_session),
+    current_user: UserSnapshot = Depends(get_current_principal),
 ) -> StreamingResponse:
     """Download a single document as a file."""
-    result = await session.execute(select(Document).where(Document.id == document_id))
+    result = await read_session.execute(select(Document).where(Document.id == document_id))
     document = result.scalar_one_or_none()
     if not document:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Document not found")
     
-    # Check permissions
-    if document.library_id:
-        library = await _get_library_or_404(session, document.library_id)
-        if library.owner_type == "user":
-            if library.owner_id != current_user.id:
-                raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Forbidden")
-        elif library.owner_type == "group":
-            await _assert_group_member(
-                session, group_id=library.owner_id, user_id=current_user.id, allowed_roles=("owner", "admin", "member")
-            )
+    # 权限在主库上判断，内容从副本读取
+    await _require_library_read(session, document.library_id, current_user.id)
     
     path = Path(document.source_path)
     if not path.exists():
@@ -6,10 +6,12 @@ from pydantic import BaseModel, Field, EmailStr
 from sqlalchemy import select, and_, func
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.core.access import invalidate_access, invalidate_access_all
 from app.core.response import StandardResponse
-from app.core.security import get_current_user
+from app.core.security import get_current_principal
+from app.core.user_cache import UserSnapshot
 from app.db.models import Group, GroupMember, User
-from app.deps import get_db_session
+from app.deps import get_db_session, get_read_db_session
 
 
 class GroupCreateRequest(BaseModel):
@@ -67,6 +69,47 @@ async def _get_group_or_404(session: AsyncSession, group_id: uuid.UUID) -> Group
     return group
 
 
+async def _assert_member(session: AsyncSession, group_id: uuid.UUID, user_id: uuid.UUID) -> None:
+    """在主库上校验成员身份（群组不存在 404，不是成员 403）；内容可以从副本读取，成员关系不能。"""
+    result = await session.execute(
+        select(Group.id, GroupMember.id)
+        .outerjoin(
+            GroupMember,
+            and_(GroupMember.group_id == Group.id, GroupMember.user_id == user_id),
+        )
+        .where(Group.id == group_id)
+    )
+    row = result.first()
+    if row is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Group not found")
+    if row[1] is None:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="You are not a member of this group"
+        )
+
+
+def _member_count_column():
+    """成员数（关联子查询），与群组在同一条 SELECT 中取出，不再每个群组单独 COUNT。"""
+    return (
+        select(func.count(GroupMember.id))
+        .where(GroupMember.group_id == Group.id)
+        .correlate(Group)
+        .scalar_subquery()
+        .label("member_count")
+    )
+
+
+def _group_response(group: Group, member_count: int) -> GroupResponse:
+    return GroupResponse(
+        id=str(group.id),
+        name=group.name,
+        description=group.description,
+        member_count=member_count or 0,
+        created_at=group.created_at.isoformat() if group.created_at else "",
+    )
+
+
 async def _assert_group_permission(
     session: AsyncSession,
     group_id: uuid.UUID,
@@ -96,7 +139,7 @@ async def _assert_group_permission(
 async def create_group(
     payload: GroupCreateRequest,
     session: AsyncSession = Depends(get_db_session),
-    current_user: User = Depends(get_current_user),
+    current_user: UserSnapshot = Depends(get_current_principal),
 ) -> StandardResponse[GroupResponse]:
     """Create a new group. The creator becomes the owner."""
     # Check if group name already exists
@@ -124,53 +167,25 @@ async def create_group(
     session.add(owner_member)
     await session.commit()
     await session.refresh(group)
+    await invalidate_access(current_user.id)
     
-    # Get member count
-    member_count_result = await session.execute(
-        select(func.count(GroupMember.id)).where(GroupMember.group_id == group.id)
-    )
-    member_count = member_count_result.scalar() or 0
-    
-    data = GroupResponse(
-        id=str(group.id),
-        name=group.name,
-        description=group.description,
-        member_count=member_count,
-        created_at=group.created_at.isoformat() if group.created_at else "",
-    )
-    return StandardResponse(data=data)
+    # 新建群组只有创建者一名成员
+    return StandardResponse(data=_group_response(group, member_count=1))
 
 
 @router.get("", response_model=StandardResponse[list[GroupResponse]])
 async def list_groups(
-    session: AsyncSession = Depends(get_db_session),
-    current_user: User = Depends(get_current_user),
+    session: AsyncSession = Depends(get_read_db_session),
+    current_user: UserSnapshot = Depends(get_current_principal),
 ) -> StandardResponse[list[GroupResponse]]:
     """List all groups the current user is a member of."""
-    # Get all groups where user is a member
+    # Get all groups where user is a member, with member counts (one query)
     result = await session.execute(
-        select(Group)
+        select(Group, _member_count_column())
         .join(GroupMember, Group.id == GroupMember.group_id)
         .where(GroupMember.user_id == current_user.id)
     )
-    groups = result.scalars().unique().all()
-    
-    data = []
-    for group in groups:
-        # Get member count
-        member_count_result = await session.execute(
-            select(func.count(GroupMember.id)).where(GroupMember.group_id == group.id)
-        )
-        member_count = member_count_result.scalar() or 0
-        
-        data.append(GroupResponse(
-            id=str(group.id),
-            name=group.name,
-            description=group.description,
-            member_count=member_count,
-            created_at=group.created_at.isoformat() if group.created_at else "",
-        ))
-    
+    data = [_group_response(group, member_count) for group, member_count in result.all()]
     return StandardResponse(data=data)
 
 
@@ -178,40 +193,20 @@ async def list_groups(
 async def get_group(
     group_id: uuid.UUID,
     session: AsyncSession = Depends(get_db_session),
-    current_user: User = Depends(get_current_user),
+    read_session: AsyncSession = Depends(get_read_db_session),
+    current_user: UserSnapshot = Depends(get_current_principal),
 ) -> StandardResponse[GroupResponse]:
     """Get group details. User must be a member."""
-    group = await _get_group_or_404(session, group_id)
-    
-    # Check if user is a member
-    result = await session.execute(
-        select(GroupMember).where(
-            and_(
-                GroupMember.group_id == group_id,
-                GroupMember.user_id == current_user.id,
-            )
-        )
-    )
-    if not result.scalar_one_or_none():
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="You are not a member of this group"
-        )
-    
-    # Get member count
-    member_count_result = await session.execute(
-        select(func.count(GroupMember.id)).where(GroupMember.group_id == group.id)
-    )
-    member_count = member_count_result.scalar() or 0
-    
-    data = GroupResponse(
-        id=str(group.id),
-        name=group.name,
-        description=group.description,
-        member_count=member_count,
-        created_at=group.created_at.isoformat() if group.created_at else "",
+    # 成员身份在主库上校验，群组与成员数从副本读取
+    await _assert_member(session, group_id, current_user.id)
+    result = await read_session.execute(
+        select(Group, _member_count_column()).where(Group.id == group_id)
     )
-    return StandardResponse(data=data)
+    row = result.first()
+    if row is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Group not found")
+    group, member_count = row
+    return StandardResponse(data=_group_response(group, member_count))
 
 
 @router.put("/{group_id}", response_model=StandardResponse[GroupResponse])
@@ -219,7 +214,7 @@ async def update_group(
     group_id: uuid.UUID,
     payload: GroupUpdateRequest,
     session: AsyncSession = Depends(get_db_session),
-    current_user: User = Depends(get_current_user),
+    current_user: UserSnapshot = Depends(get_current_principal),
 ) -> StandardResponse[GroupResponse]:
     """Update group. Only owners and admins can update."""
     group = await _get_group_or_404(session, group_id)
@@ -243,29 +238,18 @@ async def update_group(
         group.description = payload.description
     
     await session.commit()
-    await session.refresh(group)
-    
-    # Get member count
-    member_count_result = await session.execute(
-        select(func.count(GroupMember.id)).where(GroupMember.group_id == group.id)
-    )
-    member_count = member_count_result.scalar() or 0
     
-    data = GroupResponse(
-        id=str(group.id),
-        name=group.name,
-        description=group.description,
-        member_count=member_count,
-        created_at=group.created_at.isoformat() if group.created_at else "",
-    )
-    return StandardResponse(data=data)
+    # Reload with member count (one query)
+    result = await session.execute(select(Group, _member_count_column()).where(Group.id == group_id))
+    group, member_count = result.one()
+    return StandardResponse(data=_group_response(group, member_count))
 
 
 @router.delete("/{group_id}", response_model=StandardResponse[dict])
 async def delete_group(
     group_id: uuid.UUID,
     session: AsyncSession = Depends(get_db_session),
-    current_user: User = Depends(get_current_user),
+    current_user: UserSnapshot = Depends(get_current_principal),
 ) -> StandardResponse[dict]:
     """Delete group. Only owners can delete."""
     group = await _get_group_or_404(session, group_id)
@@ -276,6 +260,7 @@ async def delete_group(
     # Delete group (cascade will delete members and libraries)
     await session.delete(group)
     await session.commit()
+    await invalidate_access_all()
     
     return StandardResponse(data={"deleted": True, "group_id": str(group_id)})
 
@@ -285,7 +270,7 @@ async def invite_member(
     group_id: uuid.UUID,
     payload: InviteMemberRequest,
     session: AsyncSession = Depends(get_db_session),
-    current_user: User = Depends(get_current_user),
+    current_user: UserSnapshot = Depends(get_current_principal),
 ) -> StandardResponse[MemberResponse]:
     """Invite a user to join the group. Only owners and admins can invite."""
     group = await _get_group_or_404(session, group_id)
@@ -338,6 +323,7 @@ async def invite_member(
     session.add(member)
     await session.commit()
     await session.refresh(member)
+    await invalidate_access(user.id)
     
     data = MemberResponse(
         id=str(member.id),
@@ -355,28 +341,15 @@ async def invite_member(
 async def list_members(
     group_id: uuid.UUID,
     session: AsyncSession = Depends(get_db_session),
-    current_user: User = Depends(get_current_user),
+    read_session: AsyncSession = Depends(get_read_db_session),
+    current_user: UserSnapshot = Depends(get_current_principal),
 ) -> StandardResponse[list[MemberResponse]]:
     """List all members of a group. User must be a member."""
-    group = await _get_group_or_404(session, group_id)
-    
-    # Check if user is a member
-    result = await session.execute(
-        select(GroupMember).where(
-            and_(
-                GroupMember.group_id == group_id,
-                GroupMember.user_id == current_user.id,
-            )
-        )
-    )
-    if not result.scalar_one_or_none():
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="You are not a member of this group"
-        )
+    # 成员身份在主库上校验，成员列表从副本读取
+    await _assert_member(session, group_id, current_user.id)
     
     # Get all members
-    members_result = await session.execute(
+    members_result = await read_session.execute(
         select(GroupMember, User)
         .join(User, GroupMember.user_id == User.id)
         .where(GroupMember.group_id == group_id)
@@ -404,7 +377,7 @@ async def update_member_role(
     member_id: uuid.UUID,
     payload: UpdateMemberRoleRequest,
     session: AsyncSession = Depends(get_db_session),
-    current_user: User = Depends(get_current_user),
+    current_user: UserSnapshot = Depends(get_current_principal),
 ) -> StandardResponse[MemberResponse]:
     """Update a member's role. Only owners and admins can update roles."""
     group = await _get_group_or_404(session, group_id)
@@ -450,6 +423,7 @@ async def update_member_role(
     member.role = payload.role
     await session.commit()
     await session.refresh(member)
+    await invalidate_access(member.user_id)
     
     data = MemberResponse(
         id=str(member.id),
@@ -468,7 +442,7 @@ async def remove_member(
     group_id: uuid.UUID,
     member_id: uuid.UUID,
     session: AsyncSession = Depends(get_db_session),
-    current_user: User = Depends(get_current_user),
+    current_user: UserSnapshot = Depends(get_current_principal),
 ) -> StandardResponse[dict]:
     """Remove a member from the group. Only owners and admins can remove members."""
     group = await _get_group_or_404(session, group_id)
@@ -507,8 +481,10 @@ async def remove_member(
             )
     
     # Remove member
+    removed_user_id = member.user_id
     await session.delete(member)
     await session.commit()
+    await invalidate_access(removed_user_id)
     
     return StandardResponse(data={"removed": True, "member_id": str(member_id)})
 
@@ -518,7 +494,7 @@ async def transfer_ownership(
     group_id: uuid.UUID,
     payload: TransferOwnershipRequest,
     session: AsyncSession = Depends(get_db_session),
-    current_user: User = Depends(get_current_user),
+    current_user: UserSnapshot = Depends(get_current_principal),
 ) -> StandardResponse[dict]:
     """Transfer group ownership to another member. Only current owner can transfer."""
     group = await _get_group_or_404(session, group_id)
@@ -594,6 +570,7 @@ async def transfer_ownership(
     new_owner_member.role = "owner"
     
     await session.commit()
+    await invalidate_access(current_user.id, new_owner_user.id)
     
     return StandardResponse(data={
         "transferred": True,
@@ -1,13 +1,20 @@
+import json
+import uuid
 from typing import Annotated
 
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel, Field
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.agents.qa_agent import QAAgent
+from app.core.access import get_library_access
+from app.core.config import Settings, get_settings
+from app.core.query_log import record_query
 from app.core.response import StandardResponse
-from app.core.security import get_current_user
-from app.db.models import User
-from app.deps import get_pipeline
+from app.core.security import get_current_principal
+from app.core.user_cache import UserSnapshot
+from app.deps import get_db_session, get_pipeline
 from app.rag.pipeline import RAGPipeline
 
 
@@ -18,6 +25,7 @@ class AskRequest(BaseModel):
         description="指定的文档库ID列表，不指定则搜索所有可访问的文档库"
     )
     top_k: int = Field(default=5, ge=1, le=20, description="返回的检索结果数量")
+    debug: bool = Field(default=False, description="是否在响应中返回各阶段耗时追踪")
 
 
 class AskData(BaseModel):
@@ -25,23 +33,90 @@ class AskData(BaseModel):
     answer: str
     references: list[dict] = Field(default_factory=list)
     latency_ms: int
+    trace: dict | None = Field(default=None, description="各阶段耗时追踪（仅 debug=true 时返回）")
+
+
+class AskBatchRequest(BaseModel):
+    queries: list[Annotated[str, Field(min_length=3)]] = Field(
+        ..., min_length=1, description="批量问题列表"
+    )
+    library_ids: list[str] | None = Field(
+        default=None,
+        description="指定的文档库ID列表，不指定则搜索所有可访问的文档库"
+    )
+    top_k: int = Field(default=5, ge=1, le=20, description="每个问题返回的检索结果数量")
 
 
 router = APIRouter(tags=["qa"])
 
 
+async def _resolve_library_ids(
+    session: AsyncSession, user: UserSnapshot, library_ids: list[str] | None
+) -> list[str]:
+    """解析本次检索的文档库：未指定时为用户可访问的全部库，指定时校验权限。"""
+    requested: list[uuid.UUID] | None = None
+    if library_ids:
+        try:
+            requested = [uuid.UUID(lib_id) for lib_id in library_ids]
+        except ValueError:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid library_id")
+    access = await get_library_access(session, user.id)
+    return [str(lib_id) for lib_id in access.search_scope(requested)]
+
+
 @router.post("/ask")
 async def ask_entrypoint(
     payload: AskRequest,
     pipeline: Annotated[RAGPipeline, Depends(get_pipeline)],
-    current_user: Annotated[User, Depends(get_current_user)],
+    current_user: Annotated[UserSnapshot, Depends(get_current_principal)],
+    session: Annotated[AsyncSession, Depends(get_db_session)],
 ) -> StandardResponse[AskData]:
+    library_ids = await _resolve_library_ids(session, current_user, payload.library_ids)
+    record_query(payload.query, library_ids, payload.top_k)
     agent = QAAgent(pipeline=pipeline)
     result = await agent.run(
         query=payload.query,
         top_k=payload.top_k,
-        library_ids=payload.library_ids,
+        library_ids=library_ids,
         role=current_user.role,  # 传递用户角色，用于选择对应的 prompt
+        debug=payload.debug,
     )
     return StandardResponse(data=AskData(**result))
 
+
+@router.post("/ask/batch")
+async def ask_batch_entrypoint(
+    payload: AskBatchRequest,
+    pipeline: Annotated[RAGPipeline, Depends(get_pipeline)],
+    current_user: Annotated[UserSnapshot, Depends(get_current_principal)],
+    settings: Annotated[Settings, Depends(get_settings)],
+    session: Annotated[AsyncSession, Depends(get_db_session)],
+) -> StreamingResponse:
+    """
+    批量问答，结果以 NDJSON 按完成顺序流式返回。
+
+    每行格式: {"index", "query", "answer", "references", "latency_ms"}，
+    index 为问题在请求中的下标，latency_ms 为从批次开始到该问题完成的耗时。
+    """
+    if len(payload.queries) > settings.qa_batch_max_queries:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Too many queries, at most {settings.qa_batch_max_queries} per batch",
+        )
+
+    library_ids = await _resolve_library_ids(session, current_user, payload.library_ids)
+    for query in payload.queries:
+        record_query(query, library_ids, payload.top_k)
+    agent = QAAgent(pipeline=pipeline)
+    role = current_user.role
+
+    async def _stream():
+        async for item in agent.run_batch(
+            queries=payload.queries,
+            top_k=payload.top_k,
+            library_ids=library_ids,
+            role=role,
+        ):
+            yield json.dumps(item, ensure_ascii=False, default=str) + "\n"
+
+    return StreamingResponse(_stream(), media_type="application/x-ndjson")
@@ -0,0 +1,258 @@
+"""
+分片续传上传（大文件、不稳定网络）。
+
+1. POST   /docs/uploads                        创建会话（文件名、总大小、可选的整体 SHA-256 与分片大小）
+2. PUT    /docs/uploads/{id}/parts/{n}         上传第 n 个分片（从 1 开始），请求体为分片原始字节，
+                                               请求头 X-Part-SHA256 为分片的 SHA-256；可重复上传（覆盖）
+3. GET    /docs/uploads/{id}                   查询已接收的分片，断线后只需补传缺失的分片
+4. POST   /docs/uploads/{id}/complete          按顺序合并分片并入库（与 /docs/ingest 相同的文档创建流程）
+   DELETE /docs/uploads/{id}                   放弃上传
+
+分片直接流式写入磁盘（storage_dir/.uploads/<id>/），校验通过后原子重命名，合并时流式拷贝，不读入内存。
+会话在最后一次上传分片 UPLOAD_SESSION_TTL_HOURS 小时后过期，由后台任务清理。
+"""
+import asyncio
+import datetime as dt
+import math
+import os
+import re
+import uuid
+
+from fastapi import APIRouter, Depends, Header, HTTPException, Request, status
+from pydantic import BaseModel, Field
+from sqlalchemy import delete
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.api.v1.docs import IngestResponse, create_document_from_upload, resolve_upload_library
+from app.core.config import Settings
+from app.core.response import StandardResponse
+from app.core.security import get_current_user
+from app.core.uploads import (
+    max_upload_bytes,
+    parts_dir,
+    remove_parts,
+    safe_filename,
+    staged_parts,
+    too_large,
+    write_stream,
+)
+from app.db.models import UploadSession, User
+from app.deps import get_app_settings, get_db_session
+
+router = APIRouter(prefix="/docs/uploads", tags=["uploads"])
+
+MIN_PART_SIZE = 64 * 1024
+MAX_PART_SIZE = 64 * 1024 * 1024
+MAX_PARTS = 10_000
+_PART_FILE_RE = re.compile(r"^(\d+)\.part$")
+
+
+class UploadCreateRequest(BaseModel):
+    filename: str = Field(min_length=1, max_length=255)
+    total_size: int = Field(gt=0)
+    part_size: int | None = Field(default=None, ge=MIN_PART_SIZE, le=MAX_PART_SIZE)
+    library_id: uuid.UUID | None = None
+    sha256: str | None = Field(default=None, pattern="^[0-9a-fA-F]{64}$", description="整个文件的 SHA-256，合并后校验")
+
+
+class UploadSessionResponse(BaseModel):
+    upload_id: str
+    filename: str
+    total_size: int
+    part_size: int
+    part_count: int
+    received_parts: list[int]
+    expires_at: str
+
+
+class UploadPartResponse(BaseModel):
+    part_number: int
+    size: int
+
+
+def _part_count(upload: UploadSession) -> int:
+    return math.ceil(upload.total_size / upload.part_size)
+
+
+def _expected_part_size(upload: UploadSession, part_number: int) -> int:
+    if part_number < _part_count(upload):
+        return upload.part_size
+    return upload.total_size - upload.part_size * (_part_count(upload) - 1)
+
+
+def _received_parts(settings: Settings, upload: UploadSession) -> list[int]:
+    directory = parts_dir(settings, upload.id)
+    if not directory.exists():
+        return []
+    received = []
+    for path in directory.iterdir():
+        match = _PART_FILE_RE.match(path.name)
+        if match:
+            received.append(int(match.group(1)))
+    return sorted(received)
+
+
+def _expires_at(settings: Settings) -> dt.datetime:
+    return dt.datetime.utcnow() + dt.timedelta(hours=settings.upload_session_ttl_hours)
+
+
+async def _session_response(settings: Settings, upload: UploadSession) -> UploadSessionResponse:
+    return UploadSessionResponse(
+        upload_id=str(upload.id),
+        filename=upload.filename,
+        total_size=upload.total_size,
+        part_size=upload.part_size,
+        part_count=_part_count(upload),
+        received_parts=await asyncio.to_thread(_received_parts, settings, upload),
+        expires_at=upload.expires_at.isoformat(),
+    )
+
+
+def _completed_concurrently() -> HTTPException:
+    return HTTPException(status_code=status.HTTP_409_CONFLICT, detail="Upload session was completed or aborted concurrently")
+
+
+async def _get_upload_or_404(session: AsyncSession, upload_id: uuid.UUID, user: User) -> UploadSession:
+    upload = await session.get(UploadSession, upload_id)
+    if upload is None or upload.user_id != user.id or upload.expires_at < dt.datetime.utcnow():
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Upload session not found")
+    return upload
+
+
+@router.post("", response_model=StandardResponse[UploadSessionResponse])
+async def create_upload(
+    payload: UploadCreateRequest,
+    session: AsyncSession = Depends(get_db_session),
+    current_user: User = Depends(get_current_user),
+    settings: Settings = Depends(get_app_settings),
+) -> StandardResponse[UploadSessionResponse]:
+    """Start a resumable upload; the target library is checked now and again on completion."""
+    limit = max_upload_bytes(settings)
+    if limit is not None and payload.total_size > limit:
+        raise too_large(limit)
+    part_size = payload.part_size or settings.upload_part_size
+    if math.ceil(payload.total_size / part_size) > MAX_PARTS:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Too many parts (max {MAX_PARTS}), use a larger part_size")
+
+    library_id = await resolve_upload_library(session, current_user, payload.library_id)
+    upload = UploadSession(
+        user_id=current_user.id,
+        library_id=library_id,
+        filename=safe_filename(payload.filename),
+        total_size=payload.total_size,
+        part_size=part_size,
+        sha256=payload.sha256.lower() if payload.sha256 else None,
+        expires_at=_expires_at(settings),
+    )
+    session.add(upload)
+    await session.commit()
+    return StandardResponse(data=await _session_response(settings, upload))
+
+
+@router.get("/{upload_id}", response_model=StandardResponse[UploadSessionResponse])
+async def get_upload(
+    upload_id: uuid.UUID,
+    session: AsyncSession = Depends(get_db_session),
+    current_user: User = Depends(get_current_user),
+    settings: Settings = Depends(get_app_settings),
+) -> StandardResponse[UploadSessionResponse]:
+    """Report which parts have been received so an interrupted client can resume."""
+    upload = await _get_upload_or_404(session, upload_id, current_user)
+    return StandardResponse(data=await _session_response(settings, upload))
+
+
+@router.put("/{upload_id}/parts/{part_number}", response_model=StandardResponse[UploadPartResponse])
+async def upload_part(
+    upload_id: uuid.UUID,
+    part_number: int,
+    request: Request,
+    x_part_sha256: str = Header(..., pattern="^[0-9a-fA-F]{64}$", description="分片的 SHA-256"),
+    session: AsyncSession = Depends(get_db_session),
+    current_user: User = Depends(get_current_user),
+    settings: Settings = Depends(get_app_settings),
+) -> StandardResponse[UploadPartResponse]:
+    """Upload one part (raw request body); re-sending a part replaces it."""
+    upload = await _get_upload_or_404(session, upload_id, current_user)
+    if not 1 <= part_number <= _part_count(upload):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"part_number must be 1..{_part_count(upload)}")
+    expected_size = _expected_part_size(upload, part_number)
+    # 接收分片可能很慢，先结束事务归还数据库连接
+    await session.commit()
+
+    directory = parts_dir(settings, upload.id)
+    directory.mkdir(parents=True, exist_ok=True)
+    tmp_path = directory / f"{part_number}.part.{uuid.uuid4()}.tmp"
+    try:
+        size, sha256 = await write_stream(request.stream(), tmp_path, expected_size)
+        if size != expected_size:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Part {part_number} must be {expected_size} bytes, got {size}",
+            )
+        if sha256 != x_part_sha256.lower():
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Checksum mismatch for part {part_number}")
+        # 校验通过后才出现在已接收列表中
+        os.replace(tmp_path, directory / f"{part_number}.part")
+    finally:
+        tmp_path.unlink(missing_ok=True)
+
+    upload.expires_at = _expires_at(settings)
+    await session.commit()
+    return StandardResponse(data=UploadPartResponse(part_number=part_number, size=size))
+
+
+@router.post("/{upload_id}/complete", response_model=StandardResponse[IngestResponse])
+async def complete_upload(
+    upload_id: uuid.UUID,
+    session: AsyncSession = Depends(get_db_session),
+    current_user: User = Depends(get_current_user),
+    settings: Settings = Depends(get_app_settings),
+) -> StandardResponse[IngestResponse]:
+    """Assemble the received parts and create the document (same flow as /docs/ingest)."""
+    upload = await _get_upload_or_404(session, upload_id, current_user)
+    received = await asyncio.to_thread(_received_parts, settings, upload)
+    missing = sorted(set(range(1, _part_count(upload) + 1)) - set(received))
+    if missing:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=f"Missing parts: {missing[:50]}",
+        )
+    # 合并大文件耗时较长，先结束事务归还数据库连接
+    await session.commit()
+
+    directory = parts_dir(settings, upload.id)
+    part_paths = [directory / f"{number}.part" for number in range(1, _part_count(upload) + 1)]
+    try:
+        async with staged_parts(part_paths, upload.filename, settings) as staged:
+            if staged.size != upload.total_size:
+                raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Assembled size does not match total_size")
+            if upload.sha256 and staged.sha256 != upload.sha256:
+                raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Checksum mismatch for the assembled file")
+            library_id = await resolve_upload_library(session, current_user, upload.library_id)
+            # 并发或重试的 complete 只有删除到会话记录的一个能创建文档（会话删除与文档创建在同一事务中提交）
+            result = await session.execute(delete(UploadSession).where(UploadSession.id == upload.id))
+            if result.rowcount != 1:
+                raise _completed_concurrently()
+            document = await create_document_from_upload(session, staged, library_id, upload.filename)
+    except FileNotFoundError:
+        # 合并期间分片被并发的 complete 或 abort 删除
+        raise _completed_concurrently() from None
+    await asyncio.to_thread(remove_parts, settings, upload.id)
+
+    return StandardResponse(
+        data=IngestResponse(document_id=str(document.id), chunks=0, library_id=str(library_id), vectorized=False)
+    )
+
+
+@router.delete("/{upload_id}", response_model=StandardResponse[dict])
+async def abort_upload(
+    upload_id: uuid.UUID,
+    session: AsyncSession = Depends(get_db_session),
+    current_user: User = Depends(get_current_user),
+    settings: Settings = Depends(get_app_settings),
+) -> StandardResponse[dict]:
+    upload = await _get_upload_or_404(session, upload_id, current_user)
+    await session.delete(upload)
+    await session.commit()
+    await asyncio.to_thread(remove_parts, settings, upload.id)
+    return StandardResponse(data={"deleted": True})
@@ -0,0 +1,133 @@
+"""
+文档库访问权限解析。
+
+用一次联表查询取得用户可访问的全部文档库及其角色（个人库为 owner，群组库为成员角色），
+按用户缓存在进程内（ACCESS_CACHE_TTL，最多 ACCESS_CACHE_MAXSIZE 个用户，超出时淘汰最久未用的），批量接口据此在内存中判断权限，不再逐个文档查询库与成员关系；
+检索接口据此在检索前确定要查询的文档库（search_scope）。
+
+失效：群组成员变更、文档库创建/删除、账号删除时调用 invalidate_access（指定用户）或
+invalidate_access_all（影响未知的一批用户，如群组库增删），通过 pub/sub 通知所有 worker。
+查询期间发生过失效时不写入缓存，避免失效前开始的查询把旧权限再缓存一个 TTL。
+"""
+import time
+import uuid
+from collections import OrderedDict
+from dataclasses import dataclass
+
+from fastapi import HTTPException, status
+from sqlalchemy import and_, or_, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import get_settings
+from app.core.pubsub import publish, subscribe
+from app.db.models import DocumentLibrary, GroupMember
+
+ACCESS_INVALIDATE_CHANNEL = "access:invalidate"
+_ALL = "*"
+
+READ_ROLES = ("owner", "admin", "member")
+MANAGE_ROLES = ("owner", "admin")
+
+
+@dataclass(frozen=True)
+class LibraryAccess:
+    """用户可访问的文档库 → 角色（个人库为 "owner"）。"""
+
+    user_id: uuid.UUID
+    roles: dict[uuid.UUID, str]
+
+    @property
+    def library_ids(self) -> list[uuid.UUID]:
+        return list(self.roles)
+
+    def can(self, library_id: uuid.UUID | None, allowed_roles: tuple[str, ...] = READ_ROLES) -> bool:
+        """未归属任何文档库的文档沿用原有规则，视为可访问。"""
+        if library_id is None:
+            return True
+        return self.roles.get(library_id) in allowed_roles
+
+    def require(self, library_id: uuid.UUID | None, allowed_roles: tuple[str, ...] = READ_ROLES) -> None:
+        if not self.can(library_id, allowed_roles):
+            raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Forbidden")
+
+    def search_scope(self, requested: list[uuid.UUID] | None = None) -> list[uuid.UUID]:
+        """
+        检索范围：指定文档库时逐个校验读权限（任一无权访问返回 403），
+        未指定时为全部可访问的文档库。检索器只查询这些库，不再先取候选再丢弃无权访问的结果。
+        """
+        if not requested:
+            return self.library_ids
+        for library_id in requested:
+            self.require(library_id)
+        return list(dict.fromkeys(requested))
+
+
+_cache: OrderedDict[str, tuple[LibraryAccess, float]] = OrderedDict()
+# 每次失效加一；查询前后不一致说明查询可能读到了失效前的数据
+_generation = 0
+
+
+async def _load_access(session: AsyncSession, user_id: uuid.UUID) -> LibraryAccess:
+    result = await session.execute(
+        select(DocumentLibrary.id, DocumentLibrary.owner_type, GroupMember.role)
+        .outerjoin(
+            GroupMember,
+            and_(
+                DocumentLibrary.owner_type == "group",
+                GroupMember.group_id == DocumentLibrary.owner_id,
+                GroupMember.user_id == user_id,
+            ),
+        )
+        .where(
+            or_(
+                and_(DocumentLibrary.owner_type == "user", DocumentLibrary.owner_id == user_id),
+                GroupMember.id.is_not(None),
+            )
+        )
+    )
+    roles = {
+        library_id: "owner" if owner_type == "user" else role
+        for library_id, owner_type, role in result.all()
+    }
+    return LibraryAccess(user_id=user_id, roles=roles)
+
+
+async def get_library_access(session: AsyncSession, user_id: uuid.UUID) -> LibraryAccess:
+    """返回用户可访问的文档库（命中缓存时不查询数据库）。"""
+    key = str(user_id)
+    entry = _cache.get(key)
+    if entry is not None and entry[1] > time.monotonic():
+        _cache.move_to_end(key)
+        return entry[0]
+    generation = _generation
+    access = await _load_access(session, user_id)
+    settings = get_settings()
+    if settings.access_cache_ttl > 0 and generation == _generation:
+        _cache[key] = (access, time.monotonic() + settings.access_cache_ttl)
+        _cache.move_to_end(key)
+        while len(_cache) > settings.access_cache_maxsize:
+            _cache.popitem(last=False)
+    return access
+
+
+def _evict(message: str) -> None:
+    global _generation
+    _generation += 1
+    if message == _ALL:
+        _cache.clear()
+    else:
+        _cache.pop(message, None)
+
+
+async def invalidate_access(*user_ids: uuid.UUID | str) -> None:
+    """清除指定用户的权限缓存（所有 worker）。"""
+    for user_id in user_ids:
+        await publish(ACCESS_INVALIDATE_CHANNEL, str(user_id))
+
+
+async def invalidate_access_all() -> None:
+    """清除所有用户的权限缓存（群组库增删等影响一批用户的变更）。"""
+    await publish(ACCESS_INVALIDATE_CHANNEL, _ALL)
+
+
+subscribe(ACCESS_INVALIDATE_CHANNEL, _evict)
@@ -0,0 +1,128 @@
+"""
+内容寻址的上传文件存储。
+
+上传文件按 SHA-256 保存为 storage_dir/blobs/<前两位>/<sha256>-<随机串><后缀>，stored_blobs 表记录路径与引用计数：
+（文件名带随机串：引用归零的记录被删除后、文件删除前，相同内容的新上传会写入新文件，不会被旧记录的删除波及）
+- 入库时 acquire_blob：相同内容已存在则引用计数 +1，本次上传的临时文件直接丢弃；否则移入 blobs 目录并新建记录
+- 删除文档前 release_document_blobs：按文档的 content_hash 扣减引用计数，归零的记录被删除并返回其文件路径，
+  调用方提交事务后再用 remove_blob_files 删除文件（事务回滚时文件仍在）
+
+相同内容文档的 chunk 与向量由 DocumentIngestor 在向量化时从已向量化的同内容文档复制，不重新解析与嵌入。
+内容寻址存储之前入库的文档（content_hash 为空）不受影响，文件仍由原有流程管理。
+"""
+import asyncio
+import logging
+import uuid
+from collections import Counter, defaultdict
+from collections.abc import Sequence
+from pathlib import Path
+
+from sqlalchemy import delete, func, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.uploads import StagedUpload
+from app.db.bulk import batched
+from app.db.models import Document, StoredBlob
+
+logger = logging.getLogger(__name__)
+
+BLOB_DIR_NAME = "blobs"
+
+
+def blob_path(storage_dir: Path, sha256: str, suffix: str) -> Path:
+    # 保留扩展名：文本提取按后缀选择解析器
+    return storage_dir / BLOB_DIR_NAME / sha256[:2] / f"{sha256}-{uuid.uuid4().hex}{suffix.lower()}"
+
+
+async def acquire_blob(session: AsyncSession, upload: StagedUpload, storage_dir: Path) -> tuple[StoredBlob, bool]:
+    """
+    在当前事务中为上传内容增加一个引用，返回 (blob, 是否新建了文件)。
+
+    新建时调用方若未能提交事务，应删除 blob.path（记录随事务回滚，文件不会被其它文档引用）。
+    """
+    result = await session.execute(
+        update(StoredBlob)
+        .where(StoredBlob.sha256 == upload.sha256)
+        .values(ref_count=StoredBlob.ref_count + 1)
+        .execution_options(synchronize_session=False)
+    )
+    if result.rowcount:
+        blob = (
+            await session.execute(
+                select(StoredBlob).where(StoredBlob.sha256 == upload.sha256).execution_options(populate_existing=True)
+            )
+        ).scalar_one()
+        path = Path(blob.path)
+        if not await asyncio.to_thread(path.exists):
+            # 文件被手工清理过，用本次上传的相同内容恢复
+            logger.warning(f"⚠️ 存储文件缺失，已用新上传的内容恢复: {path}")
+            path.parent.mkdir(parents=True, exist_ok=True)
+            upload.commit(path)
+        return blob, False
+
+    path = blob_path(storage_dir, upload.sha256, Path(upload.filename).suffix)
+    blob = StoredBlob(sha256=upload.sha256, path=str(path), size=upload.size, ref_count=1)
+    try:
+        async with session.begin_nested():
+            session.add(blob)
+    except IntegrityError:
+        # 并发请求已创建记录，改为增加引用（本次的临时文件由调用方丢弃）
+        return await acquire_blob(session, upload, storage_dir)
+    # 记录插入成功后再移入文件，避免记录冲突时留下无人引用的文件
+    path.parent.mkdir(parents=True, exist_ok=True)
+    upload.commit(path)
+    return blob, True
+
+
+async def release_document_blobs(session: AsyncSession, document_ids: Sequence[uuid.UUID]) -> list[Path]:
+    """删除文档前调用：扣减这些文档引用的 blob 计数，删除归零的记录并返回待删除的文件路径。"""
+    references: Counter[str] = Counter()
+    for batch in batched(document_ids):
+        rows = await session.execute(
+            select(Document.content_hash, func.count(Document.id))
+            .where(Document.id.in_(batch), Document.content_hash.is_not(None))
+            .group_by(Document.content_hash)
+        )
+        references.update(dict(rows.all()))
+    if not references:
+        return []
+
+    hashes_by_delta: dict[int, list[str]] = defaultdict(list)
+    for sha256, count in references.items():
+        hashes_by_delta[count].append(sha256)
+    for delta, hashes in hashes_by_delta.items():
+        for batch in batched(hashes):
+            await session.execute(
+                update(StoredBlob)
+                .where(StoredBlob.sha256.in_(batch))
+                .values(ref_count=StoredBlob.ref_count - delta)
+                .execution_options(synchronize_session=False)
+            )
+
+    orphaned: list[Path] = []
+    for batch in batched(list(references)):
+        rows = await session.execute(
+            select(StoredBlob.sha256, StoredBlob.path).where(StoredBlob.sha256.in_(batch), StoredBlob.ref_count <= 0)
+        )
+        unreferenced = rows.all()
+        if unreferenced:
+            await session.execute(
+                delete(StoredBlob)
+                .where(StoredBlob.sha256.in_([sha256 for sha256, _ in unreferenced]))
+                .execution_options(synchronize_session=False)
+            )
+            orphaned.extend(Path(path) for _, path in unreferenced)
+    return orphaned
+
+
+def remove_blob_files(paths: Sequence[Path]) -> int:
+    """提交事务后删除已无引用的文件（best-effort），返回删除的文件数。"""
+    removed = 0
+    for path in paths:
+        try:
+            path.unlink(missing_ok=True)
+            removed += 1
+        except OSError as e:
+            logger.warning(f"⚠️ 删除存储文件失败 {path}: {e}")
+    return removed
@@ -1,10 +1,30 @@
 """
 缓存工具模块：提供查询结果缓存功能。
+
+TieredCache 为通用两级缓存（进程内 TTL/LRU + Redis），搜索、重排序与嵌入缓存均基于它实现。
 """
+import asyncio
 import hashlib
 import json
 import logging
-from typing import Any
+import math
+import random
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable
+
+from app.core.config import get_settings
+from app.core.metrics import metrics_registry, record_cache_lookup
+from app.core.redis_pool import get_redis_client
+from app.core.serialization import (
+    Compressor,
+    JsonSerializer,
+    PayloadCodec,
+    Serializer,
+    get_compressor,
+    get_serializer,
+)
 
 try:
     import redis.asyncio as redis
@@ -17,12 +37,317 @@ except ImportError:
 
 logger = logging.getLogger(__name__)
 
+def get_cache_redis():
+    """
+    获取缓存使用的 Redis 客户端（即进程级共享客户端），未配置 Redis 时返回 None。
+    """
+    return get_redis_client()
+
+
+class _ComputeAbandoned(Exception):
+    """计算方被取消（客户端断开、超时等），等待同一结果的请求改为自己计算。"""
+
+
+@dataclass
+class _Entry:
+    value: Any
+    expires_at: float
+    delta: float  # 计算耗时（秒），耗时越长越早开始刷新
+
+
+class TieredCache:
+    """
+    两级缓存：进程内 TTL/LRU 在前，Redis 在后。
+
+    - get_or_compute 未命中时，同一进程内对同一键的并发请求只计算一次（singleflight）
+    - 概率性提前刷新（XFetch）：越接近过期、计算越慢，越可能由某个请求提前重算，避免集中过期引发雪崩
+    - 负缓存：is_negative 判定为"空"的结果使用较短的 negative_ttl
+    - 序列化与压缩方式可替换（带版本头，切换格式无需清空缓存，见 app.core.serialization）
+
+    Args:
+        name: 缓存名称（用于指标标签，如 search/rerank/embedding）
+        ttl: 默认过期时间（秒），也可在调用时按值指定
+        redis_provider: 返回 Redis 客户端的函数，返回 None 时只使用进程内缓存
+        local_maxsize: 进程内缓存最大条目数（LRU 淘汰）
+        local_ttl: 进程内缓存的最长过期时间（秒），None 表示与 Redis 相同
+        negative_ttl: 空结果的过期时间（秒），None 表示不做区分
+        early_refresh_beta: 提前刷新强度，0 表示关闭，越大越早刷新
+        serializer: 写入使用的序列化器（默认 JSON）
+        compressor: 写入使用的压缩器，None 表示不压缩
+        compress_threshold: 超过该字节数才压缩
+        is_negative: 判断结果是否为"空"的函数，默认空列表/空字典等
+    """
+
+    def __init__(
+        self,
+        name: str,
+        *,
+        ttl: int,
+        redis_provider: Callable[[], Any] | None = get_cache_redis,
+        local_maxsize: int = 1024,
+        local_ttl: int | None = None,
+        negative_ttl: int | None = None,
+        early_refresh_beta: float = 1.0,
+        serializer: Serializer | None = None,
+        compressor: Compressor | None = None,
+        compress_threshold: int = 1024,
+        is_negative: Callable[[Any], bool] | None = None,
+    ) -> None:
+        self.name = name
+        self.ttl = ttl
+        self.redis_provider = redis_provider
+        self.local_maxsize = local_maxsize
+        self.local_ttl = local_ttl
+        self.negative_ttl = negative_ttl
+        self.early_refresh_beta = early_refresh_beta
+        self.codec = PayloadCodec(serializer or JsonSerializer(), compressor, compress_threshold)
+        self.is_negative = is_negative or (lambda value: not value)
+        self._local: OrderedDict[str, _Entry] = OrderedDict()
+        self._inflight: dict[str, asyncio.Future] = {}
+
+    @classmethod
+    def from_settings(cls, name: str, *, ttl: int, **kwargs: Any) -> "TieredCache":
+        """使用全局配置（进程内容量与 TTL、提前刷新强度、序列化与压缩）创建缓存。"""
+        settings = get_settings()
+        kwargs.setdefault("serializer", get_serializer(settings.cache_serializer))
+        kwargs.setdefault("compressor", get_compressor(settings.cache_compression))
+        kwargs.setdefault("compress_threshold", settings.cache_compress_threshold)
+        kwargs.setdefault("local_maxsize", settings.cache_local_maxsize)
+        kwargs.setdefault("local_ttl", settings.cache_local_ttl)
+        kwargs.setdefault("early_refresh_beta", settings.cache_early_refresh_beta)
+        return cls(name, ttl=ttl, **kwargs)
+
+    # ---- 进程内层 ----
+
+    def _local_get(self, key: str, now: float) -> _Entry | None:
+        entry = self._local.get(key)
+        if entry is None:
+            return None
+        if entry.expires_at <= now:
+            del self._local[key]
+            return None
+        self._local.move_to_end(key)
+        return entry
+
+    def _local_set(self, key: str, entry: _Entry, now: float) -> None:
+        if self.local_maxsize <= 0:
+            return
+        if self.local_ttl is not None:
+            entry = _Entry(entry.value, min(entry.expires_at, now + self.local_ttl), entry.delta)
+        self._local[key] = entry
+        self._local.move_to_end(key)
+        while len(self._local) > self.local_maxsize:
+            self._local.popitem(last=False)
+
+    # ---- Redis 层 ----
+
+    def _redis(self):
+        return self.redis_provider() if self.redis_provider else None
+
+    def _encode(self, entry: _Entry) -> bytes:
+        return self.codec.encode(entry.value, entry.expires_at, entry.delta)
+
+    def _decode(self, data: bytes) -> _Entry:
+        value, expires_at, delta = self.codec.decode(data)
+        if expires_at is None:
+            # 旧格式没有记录过期时间，只在进程内保留较短时间
+            expires_at = time.time() + (self.local_ttl or self.ttl)
+        return _Entry(value, expires_at, delta)
+
+    async def _lookup(self, key: str) -> _Entry | None:
+        now = time.time()
+        entry = self._local_get(key, now)
+        if entry is not None:
+            return entry
+        client = self._redis()
+        if client is None:
+            return None
+        try:
+            data = await client.get(key)
+            if not data:
+                return None
+            entry = self._decode(data)
+        except Exception as e:
+            logger.debug(f"{self.name} 缓存读取失败: {key}, {e}")
+            return None
+        self._local_set(key, entry, now)
+        return entry
+
+    # ---- 公共接口 ----
+
+    def _resolve_ttl(self, value: Any, ttl: int | Callable[[Any], int] | None) -> int:
+        if self.negative_ttl is not None and self.is_negative(value):
+            return self.negative_ttl
+        if callable(ttl):
+            return ttl(value)
+        return ttl or self.ttl
+
+    def _should_refresh(self, entry: _Entry, now: float) -> bool:
+        """XFetch：now - delta * beta * ln(rand) >= expiry 时提前刷新。"""
+        if self.early_refresh_beta <= 0 or entry.delta <= 0:
+            return False
+        return now - entry.delta * self.early_refresh_beta * math.log(1.0 - random.random()) >= entry.expires_at
+
+    async def get(self, key: str) -> Any | None:
+        """读取缓存，未命中返回 None。"""
+        entry = await self._lookup(key)
+        record_cache_lookup(self.name, entry is not None)
+        return entry.value if entry is not None else None
+
+    async def get_many(self, keys: list[str]) -> list[Any | None]:
+        """批量读取：先查进程内缓存，其余键一次 MGET。"""
+        now = time.time()
+        results: list[Any | None] = [None] * len(keys)
+        remote: list[int] = []
+        for i, key in enumerate(keys):
+            entry = self._local_get(key, now)
+            if entry is not None:
+                results[i] = entry.value
+            else:
+                remote.append(i)
+
+        client = self._redis()
+        if remote and client is not None:
+            try:
+                values = await client.mget(*[keys[i] for i in remote])
+                for i, data in zip(remote, values):
+                    if data:
+                        entry = self._decode(data)
+                        self._local_set(keys[i], entry, now)
+                        results[i] = entry.value
+            except Exception as e:
+                logger.debug(f"{self.name} 缓存批量读取失败: {e}")
+
+        for value in results:
+            record_cache_lookup(self.name, value is not None)
+        return results
+
+    async def set(
+        self,
+        key: str,
+        value: Any,
+        ttl: int | Callable[[Any], int] | None = None,
+        delta: float = 0.0,
+    ) -> None:
+        """写入两级缓存。None 不缓存。"""
+        if value is None:
+            return
+        await self.set_many([(key, value)], ttl=ttl, delta=delta)
+
+    async def set_many(
+        self,
+        items: list[tuple[str, Any]],
+        ttl: int | Callable[[Any], int] | None = None,
+        delta: float = 0.0,
+    ) -> None:
+        """批量写入，Redis 层使用一次 pipeline。"""
+        now = time.time()
+        payloads: list[tuple[str, int, bytes]] = []
+        for key, value in items:
+            if value is None:
+                continue
+            seconds = self._resolve_ttl(value, ttl)
+            entry = _Entry(value, now + seconds, delta)
+            self._local_set(key, entry, now)
+            payloads.append((key, seconds, self._encode(entry)))
+
+        client = self._redis()
+        if not payloads or client is None:
+            return
+        try:
+            pipe = client.pipeline(transaction=False)
+            for key, seconds, payload in payloads:
+                pipe.setex(key, seconds, payload)
+            await pipe.execute()
+        except Exception as e:
+            logger.debug(f"{self.name} 缓存写入失败: {e}")
+
+    async def get_or_compute(
+        self,
+        key: str,
+        compute: Callable[[], Awaitable[Any]],
+        ttl: int | Callable[[Any], int] | None = None,
+    ) -> Any:
+        """
+        读取缓存，未命中（或抽中提前刷新）时调用 compute 计算并写回。
+
+        同一键正在计算时，其他请求等待同一个结果；提前刷新期间其他请求继续使用旧值。
+        """
+        entry = await self._lookup(key)
+        if entry is not None:
+            if key in self._inflight or not self._should_refresh(entry, time.time()):
+                record_cache_lookup(self.name, True)
+                return entry.value
+            logger.debug(f"{self.name} 缓存提前刷新: {key}")
+        else:
+            record_cache_lookup(self.name, False)
+
+        while (pending := self._inflight.get(key)) is not None:
+            try:
+                return await asyncio.shield(pending)
+            except _ComputeAbandoned:
+                continue
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            start = time.perf_counter()
+            value = await compute()
+            await self.set(key, value, ttl=ttl, delta=time.perf_counter() - start)
+            future.set_result(value)
+            return value
+        except BaseException as e:
+            # 不取消共享的 future：取消只针对计算方自己，等待者收到 _ComputeAbandoned 后重新计算
+            future.set_exception(_ComputeAbandoned() if isinstance(e, asyncio.CancelledError) else e)
+            future.exception()  # 没有等待者时避免 "exception was never retrieved" 警告
+            raise
+        finally:
+            self._inflight.pop(key, None)
+
+    def clear_local(self) -> None:
+        self._local.clear()
+
+
+# 搜索缓存代数（generation）键：缓存键中嵌入代数，失效时只需 INCR，旧键不再被读取并随 TTL 自然过期
+SEARCH_GEN_EPOCH_KEY = "search:gen:epoch"  # 全量失效时递增，所有搜索缓存都依赖它
+SEARCH_GEN_ALL_KEY = "search:gen:all"  # 任一文档库变化时递增，不限定文档库的搜索依赖它
+
+
+def _library_generation_key(library_id: str) -> str:
+    return f"search:gen:lib:{library_id}"
+
+
+def _decode_generation(value: Any) -> str:
+    if value is None:
+        return "0"
+    return value.decode() if isinstance(value, bytes) else str(value)
+
+
+async def get_search_cache_generation(
+    redis_client: redis.Redis,
+    library_id: str | None
+) -> str:
+    """
+    读取搜索缓存的当前代数（一次 MGET）。
+    
+    Args:
+        redis_client: Redis 客户端
+        library_id: 文档库ID，None 表示跨库搜索
+    
+    Returns:
+        代数字符串，格式为 "<epoch>.<库代数>"
+    """
+    scope_key = _library_generation_key(library_id) if library_id else SEARCH_GEN_ALL_KEY
+    epoch, generation = await redis_client.mget(SEARCH_GEN_EPOCH_KEY, scope_key)
+    return f"{_decode_generation(epoch)}.{_decode_generation(generation)}"
+
 
 def generate_search_cache_key(
     query: str,
     library_id: str | None,
     limit: int,
-    user_id: str | None = None
+    user_id: str | None = None,
+    generation: str = "0.0"
 ) -> str:
     """
     生成搜索缓存键。
@@ -32,6 +357,7 @@ def generate_search_cache_key(
         library_id: 文档库ID
         limit: 返回结果数量限制
         user_id: 用户ID（用于权限隔离）
+        generation: 缓存代数（见 get_search_cache_generation）
     
     Returns:
         缓存键字符串
@@ -39,7 +365,8 @@ def generate_search_cache_key(
     # 构建键数据（包含用户ID确保权限隔离）
     key_data = f"{query}:{library_id}:{limit}:{user_id or ''}"
     key_hash = hashlib.md5(key_data.encode('utf-8')).hexdigest()
-    return f"search:doc:{key_hash}"
+    scope = library_id or "all"
+    return f"search:doc:{scope}:{generation}:{key_hash}"
 
 
 async def get_cached_search_result(
@@ -105,125 +432,85 @@ async def invalidate_search_cache(
     pattern: str | None = None
 ) -> int:
     """
-    清除搜索缓存。
+    使搜索缓存失效。
+    
+    通过递增缓存代数实现 O(1) 失效：
+    - 指定 library_id：递增该库代数与跨库代数（跨库搜索结果可能包含该库文档）
+    - 不指定：递增全局 epoch，所有搜索缓存失效
+    - 指定 pattern：按模式 SCAN + UNLINK 删除（运维场景，开销与缓存规模成正比）
     
     Args:
         redis_client: Redis 客户端
-        library_id: 文档库ID（如果提供，只清除该库的缓存）
-        pattern: 自定义缓存键模式（如果提供，使用此模式）
+        library_id: 文档库ID（如果提供，只失效该库相关的缓存）
+        pattern: 自定义缓存键模式（如果提供，使用此模式删除）
     
     Returns:
-        清除的缓存数量
+        pattern 模式下为删除的键数量，否则为递增的代数数量
     """
     if redis_client is None:
         return 0
     try:
         if pattern:
-            cache_pattern = pattern
-        elif library_id:
-            # 清除该库的所有搜索缓存
-            cache_pattern = f"search:doc:*"
-        else:
-            # 清除所有搜索缓存
-            cache_pattern = "search:doc:*"
-        
-        # 使用 SCAN 而不是 KEYS（避免阻塞 Redis）
-        deleted_count = 0
-        cursor = 0
-        
-        while True:
-            cursor, keys = await redis_client.scan(
-                cursor,
-                match=cache_pattern,
-                count=100  # 每次扫描100个键
-            )
-            
-            if keys:
-                # 如果指定了 library_id，需要进一步过滤
-                if library_id and not pattern:
-                    # 读取每个键的值，检查是否包含该 library_id
-                    # 注意：这需要反序列化，性能较差
-                    # 更好的方案是在缓存键中包含 library_id
-                    filtered_keys = []
-                    for key in keys:
-                        try:
-                            value = await redis_client.get(key)
-                            if value:
-                                data = json.loads(value)
-                                # 检查结果中是否有该库的文档
-                                if any(
-                                    item.get("library_id") == str(library_id)
-                                    for item in data
-                                    if isinstance(item, dict)
-                                ):
-                                    filtered_keys.append(key)
-                        except Exception:
-                            continue
-                    keys = filtered_keys
-                
-                if keys:
-                    deleted = await redis_client.delete(*keys)
-                    deleted_count += deleted
-            
-            if cursor == 0:
-                break
-        
-        if deleted_count > 0:
-            logger.info(f"清除搜索缓存: {cache_pattern}, 删除 {deleted_count} 个键")
+            return await _delete_by_pattern(redis_client, pattern)
         
-        return deleted_count
+        pipe = redis_client.pipeline(transaction=False)
+        if library_id:
+            pipe.incr(_library_generation_key(str(library_id)))
+            pipe.incr(SEARCH_GEN_ALL_KEY)
+        else:
+            pipe.incr(SEARCH_GEN_EPOCH_KEY)
+        bumped = len(await pipe.execute())
+        logger.info(f"搜索缓存已失效: library_id={library_id or 'ALL'}")
+        return bumped
     except Exception as e:
         logger.error(f"清除缓存失败: {e}", exc_info=True)
         return 0
 
 
+async def _delete_by_pattern(redis_client: redis.Redis, cache_pattern: str) -> int:
+    # 使用 SCAN 而不是 KEYS（避免阻塞 Redis），UNLINK 在后台释放内存
+    deleted_count = 0
+    cursor = 0
+    while True:
+        cursor, keys = await redis_client.scan(cursor, match=cache_pattern, count=100)
+        if keys:
+            deleted_count += await redis_client.unlink(*keys)
+        if cursor == 0:
+            break
+    if deleted_count > 0:
+        logger.info(f"清除搜索缓存: {cache_pattern}, 删除 {deleted_count} 个键")
+    return deleted_count
+
+
 async def record_cache_stats(
     redis_client: redis.Redis | None,
     hit: bool
 ) -> None:
     """
-    记录缓存统计信息。
+    记录缓存统计信息（Prometheus 计数器 cache_requests_total{cache="search"}）。
     
     Args:
-        redis_client: Redis 客户端
+        redis_client: Redis 客户端（保留参数以兼容旧调用，不再使用）
         hit: 是否命中缓存
     """
-    if redis_client is None:
-        return
-    try:
-        stats_key = "cache:stats:search"
-        if hit:
-            await redis_client.hincrby(stats_key, "hits", 1)
-        else:
-            await redis_client.hincrby(stats_key, "misses", 1)
-        
-        # 设置过期时间（24小时）
-        await redis_client.expire(stats_key, 86400)
-    except Exception as e:
-        logger.debug(f"缓存统计记录失败: {e}")
+    record_cache_lookup("search", hit)
 
 
-async def get_cache_hit_rate(redis_client: redis.Redis | None) -> float:
+async def get_cache_hit_rate(redis_client: redis.Redis | None = None) -> float:
     """
-    获取缓存命中率。
+    获取搜索缓存命中率（多 worker 部署时聚合所有 worker，与 /metrics 一致）。
     
     Args:
-        redis_client: Redis 客户端
+        redis_client: Redis 客户端（保留参数以兼容旧调用，不再使用）
     
     Returns:
         命中率（0.0-1.0），如果无法计算则返回 0.0
     """
-    if redis_client is None:
-        return 0.0
-    try:
-        stats = await redis_client.hgetall("cache:stats:search")
-        hits = int(stats.get(b"hits", 0) if isinstance(stats.get("hits"), bytes) else stats.get("hits", 0))
-        misses = int(stats.get(b"misses", 0) if isinstance(stats.get("misses"), bytes) else stats.get("misses", 0))
-        total = hits + misses
-        return hits / total if total > 0 else 0.0
-    except Exception as e:
-        logger.debug(f"获取缓存命中率失败: {e}")
-        return 0.0
+    registry = metrics_registry()
+    hits = registry.get_sample_value("cache_requests_total", {"cache": "search", "result": "hit"}) or 0.0
+    misses = registry.get_sample_value("cache_requests_total", {"cache": "search", "result": "miss"}) or 0.0
+    total = hits + misses
+    return hits / total if total > 0 else 0.0
 
 
 def calculate_cache_ttl(result_count: int, query_length: int) -> int:
@@ -19,10 +19,24 @@ class Settings(BaseSettings):
 
     # 数据库配置
     database_url: str = Field(default="")
+    database_replica_url: str = Field(default="", description="只读副本连接串；配置后列表、统计、预览等只读接口从副本读取，副本不可用时回退主库")
+    db_pool_size: int = Field(default=10, description="数据库连接池常驻连接数（每个 worker 进程，主库与副本各一个池）")
+    db_max_overflow: int = Field(default=20, description="连接池用满后允许额外创建的连接数")
+    db_pool_timeout: float = Field(default=30.0, description="连接池用满时等待空闲连接的最长时间（秒）")
+    db_pool_recycle: int = Field(default=1800, description="连接最长复用时间（秒），需小于数据库的空闲断开时间（MySQL wait_timeout），-1 表示不回收")
+    db_pool_pre_ping: bool = Field(default=True, description="取出连接前先探活，自动替换被数据库断开的连接")
+    db_replica_retry_interval: float = Field(default=30.0, description="副本连接失败后回退主库的时长（秒），期间不再尝试副本")
+    bulk_delete_batch_size: int = Field(default=500, description="批量删除时每条 DELETE ... IN (...) 语句包含的 ID 数")
+    library_stats_reconcile_interval: float = Field(default=3600.0, description="文档库统计计数的对账间隔（秒），0 表示不自动对账")
 
     # 向量数据库配置
     vector_db_uri: str = Field(default="chroma://./chroma_store")
     storage_dir: str = Field(default="data/uploads")
+    max_upload_size_mb: int = Field(default=200, description="单个上传文件的最大大小（MB），超过时在接收过程中中止并返回 413，0 表示不限制")
+    upload_chunk_size: int = Field(default=1024 * 1024, description="上传文件流式写盘时每次读取的字节数")
+    upload_part_size: int = Field(default=8 * 1024 * 1024, description="分片续传的默认分片大小（字节），客户端可在创建会话时指定")
+    upload_session_ttl_hours: float = Field(default=24.0, description="分片上传会话的有效期（小时），每上传一个分片重新计算")
+    upload_gc_interval: float = Field(default=600.0, description="清理过期分片上传会话的间隔（秒），0 表示不自动清理")
 
     # 模型配置
     embedding_model: str = Field(default="bge-large")
@@ -34,6 +48,10 @@ class Settings(BaseSettings):
     rerank_candidate_count: int = Field(default=0, description="重排序候选数量，0表示使用 top_k + 3，>0表示固定数量")
     rerank_cache_enable: bool = Field(default=True, description="是否启用重排序缓存")
     rerank_cache_ttl: int = Field(default=7200, description="重排序缓存过期时间（秒），默认2小时")
+    rerank_batch_size: int = Field(default=32, description="重排序模型单次推理的 pair 数量")
+    # 批量问答配置
+    qa_batch_max_queries: int = Field(default=500, description="批量问答单次请求允许的最大问题数")
+    qa_batch_llm_concurrency: int = Field(default=8, description="批量问答中 LLM 生成的最大并发数")
     hf_endpoint: str = Field(default="", description="Hugging Face 镜像端点（如 https://hf-mirror.com）")
     # 查询扩展配置
     synonym_dict_path: str = Field(default="", description="同义词词典文件路径（JSON格式）")
@@ -52,17 +70,57 @@ class Settings(BaseSettings):
 
     # 遥测
     telemetry_sample_rate: float = Field(default=0.0)
+    trace_log_enabled: bool = Field(default=True, description="是否为每个问答请求输出一行阶段耗时日志")
+    otel_exporter_endpoint: str = Field(default="", description="OpenTelemetry OTLP gRPC 端点（如 http://localhost:4317），留空不导出")
+    metrics_enabled: bool = Field(default=True, description="是否暴露 /metrics（Prometheus）并记录路由耗时")
+    metrics_sample_interval: float = Field(default=1.0, description="事件循环延迟与连接池指标的采样间隔（秒）")
+    loop_block_threshold_ms: int = Field(default=500, description="事件循环阻塞超过该时长（毫秒）时记录调用栈，0 表示关闭")
 
     # 缓存（Redis）
     redis_url: str = Field(default="")
+    redis_max_connections: int = Field(default=50, description="Redis 连接池最大连接数（每个 worker 进程）")
+    redis_pool_timeout: float = Field(default=5.0, description="连接池用满时等待空闲连接的最长时间（秒）")
+    redis_socket_timeout: float = Field(default=5.0, description="Redis 命令读写超时（秒）")
+    redis_socket_connect_timeout: float = Field(default=2.0, description="Redis 建立连接超时（秒）")
+    redis_health_check_interval: int = Field(default=30, description="空闲连接复用前的健康检查间隔（秒），0 表示关闭")
     # 搜索缓存配置
     enable_search_cache: bool = Field(default=True, description="是否启用搜索缓存")
     search_cache_ttl: int = Field(default=3600, description="搜索缓存过期时间（秒），默认1小时")
+    search_cache_negative_ttl: int = Field(default=60, description="空搜索结果的缓存时间（秒）")
+    # 两级缓存（进程内 + Redis）通用配置
+    cache_local_maxsize: int = Field(default=1024, description="每个缓存的进程内最大条目数（LRU 淘汰）")
+    cache_local_ttl: int = Field(default=60, description="进程内缓存的最长保留时间（秒）")
+    cache_early_refresh_beta: float = Field(default=1.0, description="缓存概率性提前刷新强度，0 表示关闭")
+    cache_serializer: str = Field(default="msgpack", description="缓存序列化格式：json 或 msgpack（未安装时回退 json）")
+    cache_compression: str = Field(default="zstd", description="缓存压缩算法：none、zstd 或 lz4（未安装时不压缩）")
+    cache_compress_threshold: int = Field(default=1024, description="缓存值超过该字节数才压缩")
+    # 嵌入缓存配置
+    embedding_cache_enable: bool = Field(default=True, description="是否缓存查询向量")
+    embedding_cache_ttl: int = Field(default=86400, description="查询向量缓存过期时间（秒），默认1天")
+    # 查询日志与缓存预热
+    query_log_enabled: bool = Field(default=True, description="是否记录检索查询及频率（用于缓存预热）")
+    query_log_max_entries: int = Field(default=10000, description="Redis 中保留的查询条数（按频率淘汰）")
+    query_log_path: str = Field(default="", description="未配置 Redis 时查询日志的本地 JSONL 文件路径，留空不记录")
+    cache_warmup_on_startup: bool = Field(default=False, description="启动时是否回放高频查询预热缓存")
+    cache_warmup_top_n: int = Field(default=200, description="预热回放的查询数量")
+    cache_warmup_rate: float = Field(default=5.0, description="预热回放速率（条/秒），避免启动时压垮模型与向量库")
+    cache_warmup_lock_ttl: int = Field(default=600, description="预热锁过期时间（秒），期间其他 worker 不重复预热")
 
     # JWT
     jwt_secret: str = Field(default="")
     jwt_algorithm: str = Field(default="HS256")
     access_token_expires_minutes: int = Field(default=60)
+    user_cache_ttl: int = Field(default=30, description="已认证用户快照的进程内缓存时间（秒），0 表示不缓存")
+    user_cache_maxsize: int = Field(default=10000, description="用户快照缓存最大条目数")
+    access_cache_ttl: int = Field(default=60, description="用户可访问文档库集合的进程内缓存时间（秒），0 表示不缓存")
+    access_cache_maxsize: int = Field(default=10000, description="可访问文档库缓存最大条目数（按用户）")
+    revocation_bloom_capacity: int = Field(default=100000, description="吊销令牌布隆过滤器的预期容量（一个令牌有效期内的吊销数）")
+    revocation_bloom_error_rate: float = Field(default=0.001, description="布隆过滤器目标误判率（误判时多一次 Redis 查询）")
+    revocation_sync_interval: float = Field(default=30.0, description="从 Redis 全量同步吊销列表的间隔（秒）")
+    bcrypt_rounds: int = Field(default=12, description="bcrypt 成本因子（每 +1 计算量翻倍），已有哈希在下次登录时按新值重新哈希")
+    password_hash_workers: int = Field(default=4, description="密码哈希线程池大小（每个 worker 同时进行的 bcrypt 计算数）")
+    login_max_concurrent_per_ip: int = Field(default=10, description="同一客户端 IP 的并发登录上限，超出返回 429，0 表示不限制")
+    login_max_concurrent_per_account: int = Field(default=2, description="同一账号的并发登录上限，超出返回 429，0 表示不限制")
 
     # 邮件服务（阿里云邮件推送）
     aliyun_access_key_id: str = Field(default="")
@@ -0,0 +1,211 @@
+"""
+文档库统计计数器（library_stats 表）。
+
+统计接口直接读取计数行（O(1)），不再每次 COUNT 文档并联表 COUNT chunk。计数在修改数据的同一事务内
+用 UPDATE ... SET x = x + :delta 原子增减：
+- 修改前调用 ensure_library_stats，确保计数行存在（旧库首次使用时按当前数据全量计算一次）
+- 修改时调用 adjust_library_stats 记录增量
+
+入库、向量化、删除之外的写入（手工改库、脚本、失败的外部步骤）可能造成偏差，
+由 reconcile_library_stats 定期按实际数据修正（LIBRARY_STATS_RECONCILE_INTERVAL）。
+"""
+import asyncio
+import datetime as dt
+import logging
+import uuid
+from collections.abc import Sequence
+from typing import Any
+
+from sqlalchemy import case, func, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from app.core.config import Settings
+from app.core.redis_pool import get_redis_client
+from app.db.bulk import batched
+from app.db.models import Chunk, Document, DocumentLibrary, LibraryStats
+
+logger = logging.getLogger(__name__)
+
+STAT_FIELDS = ("document_count", "chunk_count", "total_size_bytes", "vectorized_count")
+RECONCILE_LOCK_KEY = "library_stats:reconcile:lock"
+
+
+def document_size(document: Document) -> int:
+    return int(document.file_size or 0)
+
+
+def document_vectorized(document: Document) -> bool:
+    return bool(document.vectorized)
+
+
+async def compute_library_stats(session: AsyncSession, library_ids: Sequence[uuid.UUID]) -> dict[uuid.UUID, dict[str, int]]:
+    """按实际数据计算统计（对账与首次建立计数行时使用）。"""
+    stats = {library_id: dict.fromkeys(STAT_FIELDS, 0) for library_id in library_ids}
+    if not stats:
+        return stats
+    chunk_counts = await session.execute(
+        select(Document.library_id, func.count(Chunk.id))
+        .join(Chunk, Chunk.document_id == Document.id)
+        .where(Document.library_id.in_(library_ids))
+        .group_by(Document.library_id)
+    )
+    for library_id, count in chunk_counts.all():
+        stats[library_id]["chunk_count"] = count
+    document_totals = await session.execute(
+        select(
+            Document.library_id,
+            func.count(Document.id),
+            func.coalesce(func.sum(Document.file_size), 0),
+            func.count(case((Document.vectorized.is_(True), 1))),
+        )
+        .where(Document.library_id.in_(library_ids))
+        .group_by(Document.library_id)
+    )
+    for library_id, document_count, size_bytes, vectorized_count in document_totals.all():
+        entry = stats[library_id]
+        entry["document_count"] = document_count
+        entry["total_size_bytes"] = int(size_bytes)
+        entry["vectorized_count"] = vectorized_count
+    return stats
+
+
+async def ensure_library_stats(session: AsyncSession, library_id: uuid.UUID | None) -> None:
+    """确保计数行存在；必须在本次修改写入数据库之前调用，否则首次计算会把本次修改算进去。"""
+    if library_id is None or await session.get(LibraryStats, library_id) is not None:
+        return
+    computed = (await compute_library_stats(session, [library_id]))[library_id]
+    try:
+        async with session.begin_nested():
+            session.add(LibraryStats(library_id=library_id, **computed))
+    except IntegrityError:
+        # 并发请求已创建计数行
+        pass
+
+
+async def adjust_library_stats(
+    session: AsyncSession,
+    library_id: uuid.UUID | None,
+    *,
+    documents: int = 0,
+    chunks: int = 0,
+    size_bytes: int = 0,
+    vectorized: int = 0,
+) -> None:
+    """在当前事务中原子增减计数（随调用方的事务提交或回滚）。"""
+    if library_id is None or not (documents or chunks or size_bytes or vectorized):
+        return
+    result = await session.execute(
+        update(LibraryStats)
+        .where(LibraryStats.library_id == library_id)
+        .values(
+            document_count=LibraryStats.document_count + documents,
+            chunk_count=LibraryStats.chunk_count + chunks,
+            total_size_bytes=LibraryStats.total_size_bytes + size_bytes,
+            vectorized_count=LibraryStats.vectorized_count + vectorized,
+            updated_at=dt.datetime.utcnow(),
+        )
+        .execution_options(synchronize_session=False)
+    )
+    if not result.rowcount:
+        logger.warning(f"⚠️ 文档库 {library_id} 没有统计计数行，增量未记录（将由对账修正）")
+
+
+async def record_documents_removed(session: AsyncSession, documents: Sequence[Document]) -> None:
+    """删除文档前调用：按库扣减文档数、chunk 数、大小与已向量化数。"""
+    by_library: dict[uuid.UUID, list[Document]] = {}
+    for document in documents:
+        if document.library_id is not None:
+            by_library.setdefault(document.library_id, []).append(document)
+    if not by_library:
+        return
+    chunk_counts: dict[uuid.UUID, int] = {}
+    for batch in batched([document.id for document in documents]):
+        result = await session.execute(
+            select(Chunk.document_id, func.count(Chunk.id)).where(Chunk.document_id.in_(batch)).group_by(Chunk.document_id)
+        )
+        chunk_counts.update(dict(result.all()))
+    for library_id, library_documents in by_library.items():
+        await ensure_library_stats(session, library_id)
+        await adjust_library_stats(
+            session,
+            library_id,
+            documents=-len(library_documents),
+            chunks=-sum(chunk_counts.get(document.id, 0) for document in library_documents),
+            size_bytes=-sum(document_size(document) for document in library_documents),
+            vectorized=-sum(document_vectorized(document) for document in library_documents),
+        )
+
+
+async def get_library_stats(session: AsyncSession, library_id: uuid.UUID) -> LibraryStats:
+    """只读：计数行不存在时按实际数据计算但不写入（可在只读副本上调用），计数行由下次修改或对账建立。"""
+    stats = await session.get(LibraryStats, library_id)
+    if stats is None:
+        computed = (await compute_library_stats(session, [library_id]))[library_id]
+        stats = LibraryStats(library_id=library_id, **computed)
+    return stats
+
+
+async def reconcile_library_stats(session: AsyncSession, batch_size: int = 200) -> int:
+    """
+    按实际数据修正所有文档库的计数，返回修正（或新建）的行数。
+
+    每批先以 SELECT ... FOR UPDATE 锁住计数行，再计算实际值：并发的入库/删除要么已提交（计入实际值），
+    要么在 adjust_library_stats 处等待本批提交后再增减，计数行与实际值来自同一时刻，不会把并发修改当作偏差反向修正。
+    """
+    library_ids = (await session.execute(select(DocumentLibrary.id))).scalars().all()
+    # 结束读取库列表的事务：可重复读隔离级别下，之后的计算要在加锁之后开始新的快照
+    await session.commit()
+    corrected = 0
+    for batch in batched(library_ids, batch_size):
+        rows = await session.execute(
+            select(LibraryStats)
+            .where(LibraryStats.library_id.in_(batch))
+            .with_for_update()
+            .execution_options(populate_existing=True)
+        )
+        existing = {row.library_id: row for row in rows.scalars().all()}
+        computed = await compute_library_stats(session, batch)
+        for library_id, values in computed.items():
+            row = existing.get(library_id)
+            if row is None:
+                try:
+                    async with session.begin_nested():
+                        session.add(LibraryStats(library_id=library_id, **values))
+                except IntegrityError:
+                    # 并发的入库已创建计数行（按当时的实际数据），下次对账再核对
+                    continue
+                corrected += 1
+                continue
+            drift: dict[str, Any] = {
+                name: (getattr(row, name), value) for name, value in values.items() if getattr(row, name) != value
+            }
+            if drift:
+                logger.info(f"🔄 文档库 {library_id} 统计偏差已修正: {drift}")
+                for name, value in values.items():
+                    setattr(row, name, value)
+                row.updated_at = dt.datetime.utcnow()
+                corrected += 1
+        await session.commit()
+    return corrected
+
+
+async def run_stats_reconciler(session_factory: async_sessionmaker, settings: Settings) -> None:
+    """周期对账任务；多 worker 部署时通过 Redis 锁每个周期只由一个 worker 执行。"""
+    interval = settings.library_stats_reconcile_interval
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            redis_client = get_redis_client()
+            if redis_client is not None:
+                acquired = await redis_client.set(RECONCILE_LOCK_KEY, "1", nx=True, ex=max(int(interval) - 1, 1))
+                if not acquired:
+                    continue
+            async with session_factory() as session:
+                corrected = await reconcile_library_stats(session)
+            if corrected:
+                logger.info(f"✅ 文档库统计对账完成，修正 {corrected} 个库")
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.warning(f"⚠️ 文档库统计对账失败: {e}")
@@ -0,0 +1,41 @@
+"""
+按键（客户端 IP、账号等）限制同一 worker 内的并发请求数。
+
+超过上限时立即返回 429，而不是排队等待：登录高峰时避免单个来源占满密码哈希线程池。
+"""
+from collections import defaultdict
+from contextlib import contextmanager
+
+from fastapi import HTTPException, status
+
+
+class KeyedConcurrencyLimiter:
+    """
+    Args:
+        limit: 每个键允许的最大并发数，<= 0 表示不限制
+        name: 用于错误信息（如 "ip"、"account"）
+    """
+
+    def __init__(self, limit: int, name: str) -> None:
+        self.limit = limit
+        self.name = name
+        self._active: dict[str, int] = defaultdict(int)
+
+    def active(self, key: str) -> int:
+        return self._active.get(key, 0)
+
+    @contextmanager
+    def acquire(self, key: str):
+        if self.limit > 0 and self._active.get(key, 0) >= self.limit:
+            raise HTTPException(
+                status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                detail=f"Too many concurrent requests for this {self.name}, please retry later",
+                headers={"Retry-After": "1"},
+            )
+        self._active[key] += 1
+        try:
+            yield
+        finally:
+            self._active[key] -= 1
+            if self._active[key] <= 0:
+                del self._active[key]
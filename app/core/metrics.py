@@ -0,0 +1,202 @@
+"""
+Prometheus 指标：路由耗时、RAG 各阶段耗时、缓存命中、BM25 索引、批量队列、数据库/Redis 连接池（含取连接耗时与副本路由）、令牌吊销过滤器与事件循环延迟。
+
+多 worker 部署（gunicorn）时需设置环境变量 PROMETHEUS_MULTIPROC_DIR（且在进程启动前创建/清空该目录），
+/metrics 会聚合所有 worker 写入的指标文件；参见仓库根目录的 gunicorn.conf.py。
+"""
+import asyncio
+import logging
+import os
+import time
+
+from fastapi import Request, Response
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+    multiprocess,
+)
+
+from app.core.tracing import Span, add_span_listener
+
+logger = logging.getLogger(__name__)
+
+# 已知的缓存类型（预先初始化标签，保证未触发时也以 0 出现在输出中）
+CACHE_NAMES = ("search", "rerank", "embedding", "answer")
+
+REQUEST_LATENCY = Histogram(
+    "http_request_duration_seconds",
+    "HTTP 请求耗时（按路由模板）",
+    ["method", "route", "status"],
+    buckets=(0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60),
+)
+STAGE_LATENCY = Histogram(
+    "rag_stage_duration_seconds",
+    "RAG 各阶段耗时（expand/embed/vector_search/bm25_search/bm25_rebuild/fuse/rerank/retrieve/llm）",
+    ["stage"],
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30),
+)
+CACHE_REQUESTS = Counter(
+    "cache_requests_total",
+    "缓存查询次数（命中率 = hit / (hit + miss)）",
+    ["cache", "result"],
+)
+BM25_INDEX_DOCUMENTS = Gauge(
+    "rag_bm25_index_documents",
+    "BM25 索引中的文档数（按文档库）",
+    ["library_id"],
+    multiprocess_mode="livemax",
+)
+BATCH_QUEUE_DEPTH = Gauge(
+    "rag_batch_queue_depth",
+    "批量问答中等待 LLM 生成的问题数",
+    multiprocess_mode="livesum",
+)
+DB_POOL_CONNECTIONS = Gauge(
+    "db_pool_connections",
+    "数据库连接池状态（size/checked_out/overflow，按 role 区分主库/副本）",
+    ["role", "state"],
+    multiprocess_mode="livesum",
+)
+DB_POOL_WAIT = Histogram(
+    "db_pool_wait_seconds",
+    "从数据库连接池取连接的耗时（含池满排队与新建连接）",
+    ["role"],
+    buckets=(0.0005, 0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30),
+)
+DB_READ_ROUTE = Counter(
+    "db_read_sessions_total",
+    "只读会话路由（replica=副本，fallback=副本不可用回退主库）",
+    ["target"],
+)
+REDIS_POOL_CONNECTIONS = Gauge(
+    "redis_pool_connections",
+    "Redis 连接池状态（in_use/idle/max）",
+    ["state"],
+    multiprocess_mode="livesum",
+)
+REVOCATION_FILTER_CHECKS = Counter(
+    "revocation_filter_checks_total",
+    "令牌吊销检查：negative=布隆过滤器判定未吊销（未访问 Redis），revoked=确认已吊销，false_positive=误判",
+    ["result"],
+)
+REVOCATION_FILTER_ENTRIES = Gauge(
+    "revocation_filter_entries",
+    "本地布隆过滤器中的已吊销 jti 数",
+    multiprocess_mode="livemax",
+)
+REVOCATION_FILTER_SYNC_LAG = Gauge(
+    "revocation_filter_sync_lag_seconds",
+    "距上次从 Redis 全量同步吊销列表的时间（秒）",
+    multiprocess_mode="livemax",
+)
+REVOCATION_PROPAGATION_DELAY = Histogram(
+    "revocation_propagation_seconds",
+    "令牌吊销经 pub/sub 传播到本 worker 的延迟",
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 5),
+)
+EVENT_LOOP_BLOCKS = Counter(
+    "event_loop_blocks_total",
+    "事件循环阻塞超过阈值的次数（见 LOOP_BLOCK_THRESHOLD_MS）",
+)
+EVENT_LOOP_LAG = Histogram(
+    "event_loop_lag_seconds",
+    "事件循环调度延迟（定时器实际唤醒时间与预期的差值）",
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5),
+)
+
+for _result in ("negative", "revoked", "false_positive"):
+    REVOCATION_FILTER_CHECKS.labels(result=_result)
+
+for _cache in CACHE_NAMES:
+    for _result in ("hit", "miss"):
+        CACHE_REQUESTS.labels(cache=_cache, result=_result)
+
+
+def record_cache_lookup(cache: str, hit: bool) -> None:
+    """记录一次缓存查询结果。"""
+    CACHE_REQUESTS.labels(cache=cache, result="hit" if hit else "miss").inc()
+
+
+def _observe_span(span: Span) -> None:
+    STAGE_LATENCY.labels(stage=span.name).observe(span.duration_ms / 1000)
+
+
+add_span_listener(_observe_span)
+
+
+async def metrics_middleware(request: Request, call_next):
+    """按路由模板（而不是原始路径）记录请求耗时，避免路径参数导致标签爆炸。"""
+    if request.url.path == "/metrics":
+        return await call_next(request)
+    start = time.perf_counter()
+    status_code = 500
+    try:
+        response = await call_next(request)
+        status_code = response.status_code
+        return response
+    finally:
+        route = request.scope.get("route")
+        REQUEST_LATENCY.labels(
+            method=request.method,
+            route=getattr(route, "path", "unmatched"),
+            status=str(status_code),
+        ).observe(time.perf_counter() - start)
+
+
+def metrics_registry() -> CollectorRegistry:
+    """读取指标用的注册表；多进程模式下聚合所有 worker 写入的指标文件，否则为本进程的 REGISTRY。"""
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return registry
+    return REGISTRY
+
+
+def render_metrics() -> Response:
+    """输出 Prometheus 文本格式；多进程模式下聚合所有 worker 的指标。"""
+    return Response(content=generate_latest(metrics_registry()), media_type=CONTENT_TYPE_LATEST)
+
+
+def _sample_db_pool() -> None:
+    from app.db.session import engine, replica_engine
+
+    for role, role_engine in (("primary", engine), ("replica", replica_engine)):
+        if role_engine is None:
+            continue
+        pool = role_engine.sync_engine.pool
+        # SQLite 等使用的连接池不提供这些统计
+        for state, getter in (("size", "size"), ("checked_out", "checkedout"), ("overflow", "overflow")):
+            if hasattr(pool, getter):
+                # QueuePool.overflow() 在未溢出时为负数
+                DB_POOL_CONNECTIONS.labels(role=role, state=state).set(max(getattr(pool, getter)(), 0))
+
+
+def _sample_redis_pool() -> None:
+    from app.core.redis_pool import redis_pool_stats
+
+    stats = redis_pool_stats()
+    if stats:
+        for state, value in stats.items():
+            REDIS_POOL_CONNECTIONS.labels(state=state).set(value)
+
+
+async def monitor_runtime(interval: float = 1.0) -> None:
+    """
+    后台采样任务：测量事件循环延迟并采样数据库与 Redis 连接池状态。
+
+    事件循环被同步代码阻塞时，sleep 的实际唤醒时间会晚于预期，差值即为调度延迟。
+    """
+    while True:
+        start = time.perf_counter()
+        await asyncio.sleep(interval)
+        EVENT_LOOP_LAG.observe(max(time.perf_counter() - start - interval, 0.0))
+        for sample in (_sample_db_pool, _sample_redis_pool):
+            try:
+                sample()
+            except Exception as e:
+                logger.debug(f"连接池指标采样失败: {e}")
@@ -0,0 +1,79 @@
+"""
+列表接口的游标（keyset）分页。
+
+按 (created_at, id) 倒序排列，游标记录上一页最后一行的这两个值，下一页用
+WHERE (created_at, id) < (游标) 直接从索引位置开始读取，深翻页耗时与页码无关；
+LIMIT/OFFSET 需要扫描并丢弃前面所有行，页码越大越慢。
+
+游标对客户端不透明（base64 编码），在响应体的 next_cursor（PagedResponse）与响应头 X-Next-Cursor 中返回，
+没有下一页时 next_cursor 为 null、不返回该头。
+未传 cursor 时仍支持 offset（兼容旧客户端）。
+"""
+import base64
+import datetime as dt
+import json
+import uuid
+from typing import Any
+
+from fastapi import HTTPException, Response, status
+from sqlalchemy import or_
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import InstrumentedAttribute
+from sqlalchemy.sql import Select
+
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+def encode_cursor(created_at: dt.datetime, row_id: uuid.UUID) -> str:
+    payload = json.dumps({"t": created_at.isoformat(), "id": str(row_id)}, separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> tuple[dt.datetime, uuid.UUID]:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+        return dt.datetime.fromisoformat(payload["t"]), uuid.UUID(payload["id"])
+    except (ValueError, KeyError, TypeError):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor") from None
+
+
+async def fetch_page(
+    session: AsyncSession,
+    query: Select,
+    *,
+    created_at_column: InstrumentedAttribute,
+    id_column: InstrumentedAttribute,
+    limit: int,
+    cursor: str | None = None,
+    offset: int = 0,
+) -> tuple[list[Any], str | None]:
+    """
+    执行分页查询，返回 (本页结果, 下一页游标)。
+
+    query 为未排序的实体查询（如 select(Document).where(...)）；传入 cursor 时忽略 offset。
+    多取一行判断是否还有下一页。
+    """
+    query = query.order_by(created_at_column.desc(), id_column.desc())
+    if cursor:
+        created_at, row_id = decode_cursor(cursor)
+        # 冗余的 created_at <= 条件让优化器可以对索引做范围扫描（OR 条件本身无法直接定位）
+        query = query.where(
+            created_at_column <= created_at,
+            or_(created_at_column < created_at, id_column < row_id),
+        )
+    elif offset:
+        query = query.offset(offset)
+
+    result = await session.execute(query.limit(limit + 1))
+    rows = list(result.scalars().all())
+    if len(rows) <= limit:
+        return rows, None
+    rows = rows[:limit]
+    last = rows[-1]
+    return rows, encode_cursor(getattr(last, created_at_column.key), getattr(last, id_column.key))
+
+
+def set_next_cursor(response: Response, next_cursor: str | None) -> None:
+    if next_cursor:
+        response.headers[NEXT_CURSOR_HEADER] = next_cursor
@@ -0,0 +1,66 @@
+"""
+密码哈希：bcrypt 计算在专用的有界线程池中执行，不阻塞事件循环。
+
+bcrypt 在计算期间释放 GIL，线程池大小（PASSWORD_HASH_WORKERS）即同时进行的哈希数上限；
+超出的请求在线程池队列中等待，事件循环继续处理其他请求。
+成本因子由 BCRYPT_ROUNDS 配置；已有哈希的成本与配置不一致时，登录成功后按新成本重新哈希。
+"""
+import asyncio
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+import bcrypt
+
+from app.core.config import get_settings
+
+logger = logging.getLogger(__name__)
+
+_executor: ThreadPoolExecutor | None = None
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=get_settings().password_hash_workers,
+            thread_name_prefix="password-hash",
+        )
+    return _executor
+
+
+def hash_password_sync(password: str, rounds: int | None = None) -> str:
+    """同步哈希（脚本等没有事件循环的场景使用）。"""
+    rounds = rounds or get_settings().bcrypt_rounds
+    return bcrypt.hashpw(password.encode("utf-8"), bcrypt.gensalt(rounds=rounds)).decode("utf-8")
+
+
+def verify_password_sync(password: str, password_hash: str) -> bool:
+    try:
+        return bcrypt.checkpw(password.encode("utf-8"), password_hash.encode("utf-8"))
+    except ValueError:
+        return False
+
+
+def needs_rehash(password_hash: str) -> bool:
+    """哈希的成本因子与当前配置不一致时返回 True（格式: $2b$<rounds>$...）。"""
+    try:
+        return int(password_hash.split("$")[2]) != get_settings().bcrypt_rounds
+    except (IndexError, ValueError):
+        return False
+
+
+async def hash_password(password: str) -> str:
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_get_executor(), hash_password_sync, password)
+
+
+async def verify_password(password: str, password_hash: str) -> bool:
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_get_executor(), verify_password_sync, password, password_hash)
+
+
+def shutdown_executor() -> None:
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
@@ -0,0 +1,146 @@
+"""
+事件循环阻塞检测与采样分析器。
+
+- LoopBlockWatchdog：事件循环内的心跳协程定时刷新时间戳，独立线程发现心跳停滞超过阈值时，
+  通过 sys._current_frames() 抓取事件循环线程当前的调用栈并写日志（此时阻塞仍在进行，栈即为元凶）。
+- SamplingProfiler：按固定间隔采样线程调用栈，输出 flamegraph.pl / speedscope 可直接读取的折叠栈格式。
+"""
+import asyncio
+import logging
+import os
+import sys
+import threading
+import time
+import traceback
+from collections import Counter
+from types import FrameType
+
+from app.core.metrics import EVENT_LOOP_BLOCKS
+
+logger = logging.getLogger(__name__)
+
+_profile_lock = threading.Lock()
+
+
+class LoopBlockWatchdog:
+    """检测阻塞事件循环超过阈值的回调，并记录阻塞时的调用栈。"""
+
+    def __init__(self, threshold_ms: float, check_interval: float | None = None) -> None:
+        self.threshold = threshold_ms / 1000
+        self.check_interval = check_interval or min(self.threshold / 2, 0.1)
+        self._loop_thread_id: int | None = None
+        self._last_beat = time.monotonic()
+        self._reported_beat: float | None = None
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+        self._heartbeat_task: asyncio.Task | None = None
+
+    def start(self) -> None:
+        """启动检测（必须在事件循环线程中调用）。"""
+        self._loop_thread_id = threading.get_ident()
+        self._last_beat = time.monotonic()
+        self._stop.clear()
+        self._heartbeat_task = asyncio.get_running_loop().create_task(self._heartbeat())
+        self._thread = threading.Thread(target=self._watch, name="loop-block-watchdog", daemon=True)
+        self._thread.start()
+        logger.info(f"✅ 事件循环阻塞检测已启动，阈值 {self.threshold * 1000:.0f}ms")
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._heartbeat_task:
+            self._heartbeat_task.cancel()
+            self._heartbeat_task = None
+
+    async def _heartbeat(self) -> None:
+        while True:
+            self._last_beat = time.monotonic()
+            await asyncio.sleep(self.check_interval)
+
+    def _watch(self) -> None:
+        while not self._stop.wait(self.check_interval):
+            beat = self._last_beat
+            # 心跳本身每 check_interval 刷新一次，超出部分才算阻塞
+            blocked = time.monotonic() - beat - self.check_interval
+            if blocked < self.threshold or self._reported_beat == beat:
+                continue
+            self._reported_beat = beat
+            frame = sys._current_frames().get(self._loop_thread_id)
+            stack = "".join(traceback.format_stack(frame)) if frame else "<无法获取调用栈>"
+            EVENT_LOOP_BLOCKS.inc()
+            logger.warning(f"⚠️ 事件循环已阻塞 {blocked * 1000:.0f}ms，当前调用栈:\n{stack}")
+
+
+def _frame_label(frame: FrameType) -> str:
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)})"
+
+
+class SamplingProfiler:
+    """
+    基于 sys._current_frames() 的采样分析器。
+
+    Args:
+        interval: 采样间隔（秒）
+        thread_ids: 只采样这些线程；None 表示采样除分析器自身外的所有线程
+    """
+
+    def __init__(self, interval: float = 0.005, thread_ids: set[int] | None = None) -> None:
+        self.interval = interval
+        self.thread_ids = thread_ids
+        self.samples = 0
+        self._counts: Counter[str] = Counter()
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    def start(self) -> None:
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="sampling-profiler", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> str:
+        """停止采样并返回折叠栈文本（每行: 帧1;帧2;... 次数）。"""
+        self._stop.set()
+        if self._thread:
+            self._thread.join()
+        return self.collapsed()
+
+    def collapsed(self) -> str:
+        return "".join(f"{stack} {count}\n" for stack, count in self._counts.most_common())
+
+    def _run(self) -> None:
+        own_id = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            names = {t.ident: t.name for t in threading.enumerate()}
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_id or (self.thread_ids is not None and thread_id not in self.thread_ids):
+                    continue
+                stack: list[str] = []
+                while frame is not None:
+                    stack.append(_frame_label(frame))
+                    frame = frame.f_back
+                stack.append(names.get(thread_id, f"thread-{thread_id}"))
+                self._counts[";".join(reversed(stack))] += 1
+            self.samples += 1
+
+
+async def profile_for(seconds: float, interval: float = 0.005, all_threads: bool = False) -> str:
+    """
+    运行采样分析器 seconds 秒并返回折叠栈。默认只采样事件循环线程。
+
+    Raises:
+        RuntimeError: 已有分析任务在运行
+    """
+    if not _profile_lock.acquire(blocking=False):
+        raise RuntimeError("profiler already running")
+    try:
+        thread_ids = None if all_threads else {threading.get_ident()}
+        profiler = SamplingProfiler(interval=interval, thread_ids=thread_ids)
+        profiler.start()
+        try:
+            await asyncio.sleep(seconds)
+        finally:
+            result = await asyncio.to_thread(profiler.stop)
+        logger.info(f"采样分析完成: {seconds}s, {profiler.samples} 次采样")
+        return result
+    finally:
+        _profile_lock.release()
@@ -0,0 +1,77 @@
+"""
+基于 Redis pub/sub 的跨 worker 通知（用户缓存失效等）。
+
+每个 worker 在 lifespan 中启动一个监听任务，按频道把消息分发给本进程注册的处理函数。
+未配置 Redis 时 publish 只在本进程内分发，监听任务不启动。
+"""
+import asyncio
+import logging
+from collections import defaultdict
+from typing import Callable
+
+from app.core.redis_pool import get_redis_client
+
+logger = logging.getLogger(__name__)
+
+_handlers: dict[str, list[Callable[[str], None]]] = defaultdict(list)
+
+
+def subscribe(channel: str, handler: Callable[[str], None]) -> None:
+    """注册频道消息处理函数（同步函数，应快速返回）。"""
+    _handlers[channel].append(handler)
+
+
+def _dispatch(channel: str, message: str) -> None:
+    for handler in _handlers.get(channel, ()):
+        try:
+            handler(message)
+        except Exception as e:
+            logger.warning(f"⚠️ 处理 {channel} 消息失败: {e}")
+
+
+async def publish(channel: str, message: str) -> None:
+    """
+    向所有 worker 广播消息。
+
+    本进程立即处理（不依赖 Redis 往返）；发布失败时只记录警告，其他 worker 依赖各自的 TTL 兜底。
+    """
+    _dispatch(channel, message)
+    redis_client = get_redis_client()
+    if redis_client is None:
+        return
+    try:
+        await redis_client.publish(channel, message)
+    except Exception as e:
+        logger.warning(f"⚠️ 发布 {channel} 消息失败: {e}")
+
+
+async def run_listener(retry_interval: float = 5.0) -> None:
+    """监听所有已注册频道，连接断开后按间隔重连。"""
+    redis_client = get_redis_client()
+    if redis_client is None or not _handlers:
+        return
+    while True:
+        pubsub = redis_client.pubsub(ignore_subscribe_messages=True)
+        try:
+            await pubsub.subscribe(*_handlers)
+            logger.info(f"✅ 已订阅频道: {', '.join(_handlers)}")
+            while True:
+                message = await pubsub.get_message(timeout=1.0)
+                if message is None:
+                    continue
+                channel = message["channel"]
+                data = message["data"]
+                _dispatch(
+                    channel.decode() if isinstance(channel, bytes) else channel,
+                    data.decode() if isinstance(data, bytes) else str(data),
+                )
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.warning(f"⚠️ pub/sub 连接中断，{retry_interval}s 后重连: {e}")
+            await asyncio.sleep(retry_interval)
+        finally:
+            try:
+                await pubsub.aclose()
+            except Exception:
+                pass
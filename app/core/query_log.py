@@ -0,0 +1,117 @@
+"""
+查询日志：记录检索查询（规范化文本、文档库范围、top_k）及其出现频率，供缓存预热回放。
+
+- 配置了 Redis 时写入有序集合（ZINCRBY），多 worker 共享，超过 QUERY_LOG_MAX_ENTRIES 时淘汰低频查询
+- 未配置 Redis 时追加写入本地 JSONL 文件（QUERY_LOG_PATH，留空则不记录），读取时再统计频率
+- 记录在后台任务中完成，不增加请求延迟，失败只记录 debug 日志
+"""
+import asyncio
+import json
+import logging
+import random
+import re
+from collections import Counter
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any
+from uuid import UUID
+
+from app.core.config import Settings, get_settings
+from app.core.redis_pool import get_redis_client
+
+logger = logging.getLogger(__name__)
+
+QUERY_LOG_KEY = "querylog:queries"
+# 每记录约 N 次裁剪一次有序集合，摊薄 ZREMRANGEBYRANK 的开销
+_TRIM_EVERY = 100
+
+_WHITESPACE_RE = re.compile(r"\s+")
+_pending: set[asyncio.Task] = set()
+
+
+@dataclass
+class LoggedQuery:
+    query: str
+    library_ids: list[str] | None
+    top_k: int
+    count: int
+
+
+def normalize_query(query: str) -> str:
+    """
+    规范化查询文本：去除首尾空白并合并连续空白。
+
+    HybridRetriever.search / search_batch 在入口处做同样的规范化，线上请求与预热回放使用相同的缓存键；
+    不改变大小写：查询向量与重排序缓存以该文本为键，改写后回放将命中不到线上请求使用的缓存。
+    """
+    return _WHITESPACE_RE.sub(" ", query).strip()
+
+
+def _member(query: str, library_ids: list[Any] | None, top_k: int) -> str:
+    libs = sorted(str(lib) for lib in library_ids) if library_ids else None
+    return json.dumps({"q": normalize_query(query), "libs": libs, "k": top_k}, ensure_ascii=False, sort_keys=True)
+
+
+def _parse(member: str | bytes, count: float) -> LoggedQuery:
+    data = json.loads(member)
+    return LoggedQuery(query=data["q"], library_ids=data["libs"], top_k=data["k"], count=int(count))
+
+
+async def _record(member: str, settings: Settings) -> None:
+    redis_client = get_redis_client()
+    if redis_client is not None:
+        await redis_client.zincrby(QUERY_LOG_KEY, 1, member)
+        if random.random() < 1 / _TRIM_EVERY:
+            # 只保留频率最高的 max_entries 条
+            await redis_client.zremrangebyrank(QUERY_LOG_KEY, 0, -settings.query_log_max_entries - 1)
+        return
+    if settings.query_log_path:
+        await asyncio.to_thread(_append_line, Path(settings.query_log_path), member)
+
+
+def _append_line(path: Path, line: str) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with path.open("a", encoding="utf-8") as f:
+        f.write(line + "\n")
+
+
+def record_query(
+    query: str,
+    library_ids: list[str] | list[UUID] | None,
+    top_k: int,
+    settings: Settings | None = None,
+) -> None:
+    """
+    在后台记录一次检索查询（参数与传给 HybridRetriever.search 的一致）。
+    library_ids 为空列表（调用方没有可检索的库，检索器直接返回空结果）时不记录。
+    """
+    settings = settings or get_settings()
+    if not settings.query_log_enabled or not query.strip() or library_ids == []:
+        return
+
+    async def _run() -> None:
+        try:
+            await _record(_member(query, library_ids, top_k), settings)
+        except Exception as e:
+            logger.debug(f"记录查询日志失败: {e}")
+
+    task = asyncio.get_running_loop().create_task(_run())
+    _pending.add(task)
+    task.add_done_callback(_pending.discard)
+
+
+async def top_queries(limit: int, settings: Settings | None = None) -> list[LoggedQuery]:
+    """返回出现频率最高的 limit 条查询（按频率降序）。"""
+    settings = settings or get_settings()
+    redis_client = get_redis_client()
+    if redis_client is not None:
+        rows = await redis_client.zrevrange(QUERY_LOG_KEY, 0, limit - 1, withscores=True)
+        return [_parse(member, score) for member, score in rows]
+    if not settings.query_log_path:
+        return []
+    path = Path(settings.query_log_path)
+    if not path.exists():
+        return []
+    lines = await asyncio.to_thread(path.read_text, encoding="utf-8")
+    counts = Counter(line for line in lines.splitlines() if line.strip())
+    return [_parse(member, count) for member, count in counts.most_common(limit)]
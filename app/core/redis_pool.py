@@ -0,0 +1,91 @@
+"""
+进程级共享 Redis 客户端。
+
+应用启动时（lifespan）创建一个带连接池的异步客户端，关闭时释放；依赖注入、缓存、重排序等
+都复用这一个客户端，不再为每个请求新建/关闭连接。
+
+- 连接池大小、超时与健康检查间隔见 REDIS_MAX_CONNECTIONS 等配置
+- 连接池用满时等待空闲连接（最长 REDIS_POOL_TIMEOUT 秒），而不是直接报错
+- 未配置 REDIS_URL 时返回 None，调用方需按"无 Redis"降级处理
+"""
+import logging
+
+from app.core.config import Settings, get_settings
+
+try:
+    import redis.asyncio as redis
+except ImportError:
+    redis = None
+
+logger = logging.getLogger(__name__)
+
+_client = None
+
+
+def _create_client(settings: Settings):
+    pool = redis.BlockingConnectionPool.from_url(
+        settings.redis_url,
+        max_connections=settings.redis_max_connections,
+        timeout=settings.redis_pool_timeout,
+        socket_timeout=settings.redis_socket_timeout,
+        socket_connect_timeout=settings.redis_socket_connect_timeout,
+        health_check_interval=settings.redis_health_check_interval,
+        decode_responses=False,
+    )
+    return redis.Redis(connection_pool=pool)
+
+
+def get_redis_client():
+    """
+    获取共享 Redis 客户端；未配置 Redis 时返回 None。
+
+    lifespan 之外（脚本、测试）首次调用时按需创建。
+    """
+    global _client
+    if _client is None:
+        settings = get_settings()
+        if not settings.redis_url or redis is None:
+            return None
+        _client = _create_client(settings)
+    return _client
+
+
+async def init_redis(settings: Settings | None = None):
+    """应用启动时创建共享客户端并检查连通性（连接失败只记录警告，不阻止启动）。"""
+    global _client
+    settings = settings or get_settings()
+    if not settings.redis_url or redis is None:
+        logger.info("ℹ️ 未配置 REDIS_URL，缓存、令牌黑名单等功能以无 Redis 模式运行")
+        return None
+    if _client is None:
+        _client = _create_client(settings)
+    try:
+        await _client.ping()
+        logger.info(f"✅ Redis 连接池已就绪（最大连接数 {settings.redis_max_connections}）")
+    except Exception as e:
+        logger.warning(f"⚠️ Redis 暂不可用，将在请求时重试: {e}")
+    return _client
+
+
+async def close_redis() -> None:
+    """应用关闭时释放连接池。"""
+    global _client
+    if _client is None:
+        return
+    client, _client = _client, None
+    try:
+        await client.aclose()
+    except Exception as e:
+        logger.warning(f"⚠️ 关闭 Redis 连接池失败: {e}")
+
+
+def redis_pool_stats() -> dict[str, int] | None:
+    """返回连接池状态（in_use/idle/max），未创建客户端时返回 None。"""
+    if _client is None:
+        return None
+    pool = _client.connection_pool
+    return {
+        "in_use": len(getattr(pool, "_in_use_connections", ())),
+        "idle": len(getattr(pool, "_available_connections", ())),
+        "max": pool.max_connections,
+    }
@@ -20,6 +20,11 @@ class StandardResponse(BaseModel, Generic[T]):
         super().__init__(code=code, message=message, data=data, **kwargs)
 
 
+class PagedResponse(StandardResponse[list[T]], Generic[T]):
+    """分页列表响应：下一页游标同时在 next_cursor 与响应头 X-Next-Cursor 中返回，没有下一页时为 null"""
+    next_cursor: str | None = None
+
+
 class ErrorResponse(BaseModel):
     """错误响应格式"""
     code: int
@@ -0,0 +1,175 @@
+"""
+JWT 吊销列表的本地布隆过滤器镜像。
+
+每个 worker 在内存中维护已吊销 jti 的布隆过滤器，鉴权时先查过滤器：
+判定"未吊销"（绝大多数请求）直接放行，不访问 Redis；只有可能命中时才用 EXISTS 确认。
+
+同步方式：
+- 实时：revoke_token 通过 pub/sub 广播 jti，各 worker 立即加入过滤器
+- 兜底：每 REVOCATION_SYNC_INTERVAL 秒从 Redis 有序集合 jwt:revoked（score 为令牌过期时间）全量重建，
+  同时清理已过期的 jti。吊销记录最多保留到令牌过期，过滤器按"一个令牌有效期内的吊销数"定容
+
+过滤器尚未同步成功、或距上次同步超过 2 个周期（Redis 不可用）时不信任过滤器，退回逐次查询 Redis。
+"""
+import asyncio
+import hashlib
+import logging
+import math
+import time
+
+from app.core.config import Settings, get_settings
+from app.core.metrics import (
+    REVOCATION_FILTER_CHECKS,
+    REVOCATION_FILTER_ENTRIES,
+    REVOCATION_FILTER_SYNC_LAG,
+    REVOCATION_PROPAGATION_DELAY,
+)
+from app.core.pubsub import subscribe
+from app.core.redis_pool import get_redis_client
+
+logger = logging.getLogger(__name__)
+
+TOKEN_BLACKLIST_PREFIX = "jwt:blacklist:"
+REVOKED_INDEX_KEY = "jwt:revoked"
+TOKEN_REVOKED_CHANNEL = "auth:token:revoked"
+
+
+class BloomFilter:
+    """
+    定长布隆过滤器（双重哈希）。
+
+    Args:
+        capacity: 预期元素数
+        error_rate: 达到 capacity 时的目标误判率
+    """
+
+    def __init__(self, capacity: int, error_rate: float = 0.001) -> None:
+        capacity = max(capacity, 1)
+        self.size = max(int(-capacity * math.log(error_rate) / (math.log(2) ** 2)), 8)
+        self.hashes = max(int(round(self.size / capacity * math.log(2))), 1)
+        self.count = 0
+        self._bits = bytearray((self.size + 7) // 8)
+
+    def _positions(self, item: str):
+        digest = hashlib.blake2b(item.encode("utf-8"), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        for i in range(self.hashes):
+            yield (h1 + i * h2) % self.size
+
+    def add(self, item: str) -> None:
+        for pos in self._positions(item):
+            self._bits[pos >> 3] |= 1 << (pos & 7)
+        self.count += 1
+
+    def __contains__(self, item: str) -> bool:
+        return all(self._bits[pos >> 3] & (1 << (pos & 7)) for pos in self._positions(item))
+
+
+class RevocationFilter:
+    """已吊销 jti 的本地镜像（进程内单例见 revocation_filter）。"""
+
+    def __init__(self, capacity: int, error_rate: float, sync_interval: float) -> None:
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.sync_interval = sync_interval
+        self._bloom = BloomFilter(capacity, error_rate)
+        self._last_sync: float | None = None
+        # 全量重建期间经 pub/sub 收到的 jti，重建完成后补入新过滤器
+        self._added_during_sync: set[str] | None = None
+        self._backfilled = False
+
+    @property
+    def trusted(self) -> bool:
+        return self._last_sync is not None and time.monotonic() - self._last_sync < 2 * self.sync_interval
+
+    def add(self, jti: str) -> None:
+        self._bloom.add(jti)
+        if self._added_during_sync is not None:
+            self._added_during_sync.add(jti)
+        REVOCATION_FILTER_ENTRIES.set(self._bloom.count)
+
+    def might_be_revoked(self, jti: str) -> bool:
+        """False 表示确定未吊销（无需查询 Redis）；过滤器不可信时总是返回 True。"""
+        if not self.trusted:
+            return True
+        if jti in self._bloom:
+            return True
+        REVOCATION_FILTER_CHECKS.labels(result="negative").inc()
+        return False
+
+    def record_confirmation(self, revoked: bool) -> None:
+        """记录一次 Redis 确认结果（过滤器可信时的阳性才计入误判统计）。"""
+        if revoked:
+            REVOCATION_FILTER_CHECKS.labels(result="revoked").inc()
+        elif self.trusted:
+            REVOCATION_FILTER_CHECKS.labels(result="false_positive").inc()
+
+    def on_revoked_message(self, message: str) -> None:
+        """pub/sub 处理函数，消息格式为 "jti|发布时间戳"。"""
+        jti, _, published_at = message.partition("|")
+        self.add(jti)
+        if published_at:
+            REVOCATION_PROPAGATION_DELAY.observe(max(time.time() - float(published_at), 0.0))
+
+    async def _backfill_index(self, redis_client) -> None:
+        """把有序集合建立之前写入的黑名单键补进 jwt:revoked（每个进程只执行一次）。"""
+        now = time.time()
+        async for key in redis_client.scan_iter(match=f"{TOKEN_BLACKLIST_PREFIX}*", count=1000):
+            ttl = await redis_client.ttl(key)
+            if ttl > 0:
+                jti = key.decode()[len(TOKEN_BLACKLIST_PREFIX):] if isinstance(key, bytes) else key[len(TOKEN_BLACKLIST_PREFIX):]
+                await redis_client.zadd(REVOKED_INDEX_KEY, {jti: now + ttl})
+        self._backfilled = True
+
+    async def sync(self) -> int:
+        """从 Redis 全量重建过滤器，返回当前吊销数。"""
+        redis_client = get_redis_client()
+        if redis_client is None:
+            return 0
+        if not self._backfilled:
+            await self._backfill_index(redis_client)
+        self._added_during_sync = set()
+        try:
+            now = time.time()
+            await redis_client.zremrangebyscore(REVOKED_INDEX_KEY, "-inf", now)
+            members = await redis_client.zrangebyscore(REVOKED_INDEX_KEY, now, "+inf")
+            # 容量随吊销数增长，保证误判率不随吊销量上升
+            bloom = BloomFilter(max(self.capacity, len(members) * 2), self.error_rate)
+            for member in members:
+                bloom.add(member.decode() if isinstance(member, bytes) else member)
+            for jti in self._added_during_sync:
+                bloom.add(jti)
+            self._bloom = bloom
+        finally:
+            self._added_during_sync = None
+        self._last_sync = time.monotonic()
+        REVOCATION_FILTER_ENTRIES.set(self._bloom.count)
+        REVOCATION_FILTER_SYNC_LAG.set(0)
+        return len(members)
+
+    async def run_sync(self) -> None:
+        """后台任务：按 sync_interval 周期性全量同步。"""
+        while True:
+            try:
+                count = await self.sync()
+                logger.debug(f"吊销列表已同步: {count} 个 jti")
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"⚠️ 同步令牌吊销列表失败: {e}")
+            if self._last_sync is not None:
+                REVOCATION_FILTER_SYNC_LAG.set(time.monotonic() - self._last_sync)
+            await asyncio.sleep(self.sync_interval)
+
+
+def _create_filter(settings: Settings) -> RevocationFilter:
+    return RevocationFilter(
+        capacity=settings.revocation_bloom_capacity,
+        error_rate=settings.revocation_bloom_error_rate,
+        sync_interval=settings.revocation_sync_interval,
+    )
+
+
+revocation_filter = _create_filter(get_settings())
+subscribe(TOKEN_REVOKED_CHANNEL, revocation_filter.on_revoked_message)
@@ -1,6 +1,7 @@
 from __future__ import annotations
 
 import datetime as dt
+import time
 import uuid
 from typing import Any
 
@@ -12,12 +13,19 @@ from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.core.config import get_settings, Settings
+from app.core.pubsub import publish
+from app.core.revocation import (
+    REVOKED_INDEX_KEY,
+    TOKEN_BLACKLIST_PREFIX,
+    TOKEN_REVOKED_CHANNEL,
+    revocation_filter,
+)
+from app.core.user_cache import UserSnapshot, cache_user, get_cached_user
 from app.db.models import User
 from app.deps import get_db_session, get_redis
 
 api_key_header = APIKeyHeader(name="X-API-Key", auto_error=False)
 bearer_scheme = HTTPBearer(auto_error=False)
-TOKEN_BLACKLIST_PREFIX = "jwt:blacklist:"
 
 
 def get_api_key(
@@ -52,15 +60,26 @@ async def revoke_token(redis_client: redis.Redis, jti: str, exp_ts: int | None)
     """Add token jti to blacklist until its expiry."""
     ttl_seconds = max(exp_ts - int(dt.datetime.utcnow().timestamp()), 1) if exp_ts else 3600
     key = f"{TOKEN_BLACKLIST_PREFIX}{jti}"
-    await redis_client.set(key, "revoked", ex=ttl_seconds)
+    pipe = redis_client.pipeline(transaction=False)
+    pipe.set(key, "revoked", ex=ttl_seconds)
+    # 按过期时间索引，供各 worker 的布隆过滤器全量同步并清理过期项
+    pipe.zadd(REVOKED_INDEX_KEY, {jti: time.time() + ttl_seconds})
+    await pipe.execute()
+    await publish(TOKEN_REVOKED_CHANNEL, f"{jti}|{time.time()}")
 
 
-async def get_current_user(
+async def get_current_principal(
     credentials: HTTPAuthorizationCredentials | None = Security(bearer_scheme),
     session: AsyncSession = Depends(get_db_session),
-    redis_client: redis.Redis = Depends(get_redis),
+    redis_client: redis.Redis | None = Depends(get_redis),
     settings: Settings = Depends(get_settings),
-) -> User:
+) -> UserSnapshot:
+    """
+    解析令牌并返回当前用户快照（只含 id/角色/状态）。
+
+    快照按 (用户ID, jti) 缓存在进程内（USER_CACHE_TTL），命中时不查询数据库；
+    只需要用户 id 与角色的接口应依赖它，而不是 get_current_user。
+    """
     if not credentials:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Not authenticated")
 
@@ -76,34 +95,53 @@ async def get_current_user(
     except jwt.InvalidTokenError:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid token")
 
-    if jti:
+    # 本地布隆过滤器判定未吊销时跳过 Redis，只有可能命中时才确认
+    if jti and redis_client is not None and revocation_filter.might_be_revoked(jti):
         key = f"{TOKEN_BLACKLIST_PREFIX}{jti}"
         try:
-            exists = await redis_client.exists(key)
-            if exists:
-                raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Token revoked")
+            revoked = bool(await redis_client.exists(key))
+            revocation_filter.record_confirmation(revoked)
         except Exception:
             # On Redis error, fail safe by allowing; could be tightened if desired.
-            pass
-
-    result = await session.execute(select(User).where(User.id == user_id))
-    user = result.scalar_one_or_none()
-    if not user or not user.is_active:
-        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="User not found")
+            revoked = False
+        if revoked:
+            raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Token revoked")
+
+    snapshot = get_cached_user(user_id, jti)
+    if snapshot is None:
+        result = await session.execute(
+            select(User.id, User.role, User.is_active, User.is_verified).where(User.id == user_id)
+        )
+        row = result.one_or_none()
+        if not row or not row.is_active:
+            raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="User not found")
+        snapshot = UserSnapshot(id=row.id, role=row.role, is_active=row.is_active, is_verified=row.is_verified)
+        cache_user(user_id, jti, snapshot)
 
     # 如果配置了邮箱服务，则要求用户必须已验证邮箱
-    if settings.aliyun_smtp_password and not user.is_verified:
+    if settings.aliyun_smtp_password and not snapshot.is_verified:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Email verification required. Please verify your email before using this feature."
         )
 
+    return snapshot
+
+
+async def get_current_user(
+    principal: UserSnapshot = Depends(get_current_principal),
+    session: AsyncSession = Depends(get_db_session),
+) -> User:
+    """加载当前用户的 ORM 对象（需要修改用户或读取完整资料的接口使用）。"""
+    user = await session.get(User, principal.id)
+    if not user or not user.is_active:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="User not found")
     return user
 
 
 async def require_admin(
-    current_user: User = Depends(get_current_user),
-) -> User:
+    current_user: UserSnapshot = Depends(get_current_principal),
+) -> UserSnapshot:
     """Require the current user to be an admin."""
     if current_user.role != "admin":
         raise HTTPException(
@@ -111,4 +149,3 @@ async def require_admin(
             detail="Admin access required"
         )
     return current_user
-
@@ -0,0 +1,235 @@
+"""
+缓存值的序列化与压缩。
+
+Redis 中存储的格式（版本 1）:
+
+    magic(1B) | version(1B) | codec(1B) | compression(1B) | expires_at(f64) | delta(f64) | payload
+
+读取时按头部中的 codec/compression 解码，与当前配置的写入格式无关，因此切换序列化方式无需清空缓存：
+旧格式（无头部的 JSON 字符串）仍可读取，新写入使用新格式。
+
+可选依赖：msgpack、zstandard、lz4，未安装时回退到 JSON / 不压缩。
+"""
+import json
+import logging
+import struct
+from typing import Any, Protocol
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+try:
+    import lz4.frame as lz4_frame
+except ImportError:
+    lz4_frame = None
+
+FORMAT_MAGIC = 0xCA
+FORMAT_VERSION = 1
+_HEADER = struct.Struct("<BBBBdd")
+
+
+class Serializer(Protocol):
+    codec_id: int
+
+    def dumps(self, value: Any) -> bytes: ...
+
+    def loads(self, data: bytes) -> Any: ...
+
+
+class JsonSerializer:
+    """UTF-8 JSON（兼容性最好，体积与编解码开销最大）。"""
+
+    codec_id = 1
+
+    def dumps(self, value: Any) -> bytes:
+        return json.dumps(value, ensure_ascii=False, default=str).encode("utf-8")
+
+    def loads(self, data: bytes) -> Any:
+        return json.loads(data)
+
+
+class MsgpackSerializer:
+    """msgpack：适合搜索结果等结构化数据。"""
+
+    codec_id = 2
+
+    def __init__(self) -> None:
+        if msgpack is None:
+            raise ImportError("msgpack is not installed")
+
+    def dumps(self, value: Any) -> bytes:
+        return msgpack.packb(value, use_bin_type=True, default=str)
+
+    def loads(self, data: bytes) -> Any:
+        return msgpack.unpackb(data, raw=False)
+
+
+class Float32Serializer:
+    """浮点列表按小端 float32 紧凑存储（重排序分数、向量），精度损失可忽略。"""
+
+    codec_id = 3
+
+    def dumps(self, value: Any) -> bytes:
+        return np.asarray(value, dtype="<f4").tobytes()
+
+    def loads(self, data: bytes) -> Any:
+        return np.frombuffer(data, dtype="<f4").tolist()
+
+
+class Compressor(Protocol):
+    compression_id: int
+
+    def compress(self, data: bytes) -> bytes: ...
+
+    def decompress(self, data: bytes) -> bytes: ...
+
+
+class ZstdCompressor:
+    compression_id = 1
+
+    def __init__(self, level: int = 3) -> None:
+        if zstandard is None:
+            raise ImportError("zstandard is not installed")
+        self._compressor = zstandard.ZstdCompressor(level=level)
+        self._decompressor = zstandard.ZstdDecompressor()
+
+    def compress(self, data: bytes) -> bytes:
+        return self._compressor.compress(data)
+
+    def decompress(self, data: bytes) -> bytes:
+        return self._decompressor.decompress(data)
+
+
+class Lz4Compressor:
+    compression_id = 2
+
+    def __init__(self) -> None:
+        if lz4_frame is None:
+            raise ImportError("lz4 is not installed")
+
+    def compress(self, data: bytes) -> bytes:
+        return lz4_frame.compress(data)
+
+    def decompress(self, data: bytes) -> bytes:
+        return lz4_frame.decompress(data)
+
+
+_SERIALIZERS: dict[str, type] = {
+    "json": JsonSerializer,
+    "msgpack": MsgpackSerializer,
+    "float32": Float32Serializer,
+}
+_COMPRESSORS: dict[str, type] = {
+    "zstd": ZstdCompressor,
+    "lz4": Lz4Compressor,
+}
+_decoders: dict[int, Serializer] = {}
+_decompressors: dict[int, Compressor] = {}
+
+
+def get_serializer(name: str) -> Serializer:
+    """按名称创建序列化器，依赖未安装时回退到 JSON。"""
+    try:
+        return _SERIALIZERS[name]()
+    except KeyError:
+        raise ValueError(f"Unknown cache serializer: {name}") from None
+    except ImportError as e:
+        logger.warning(f"⚠️ 缓存序列化器 {name} 不可用（{e}），回退到 JSON")
+        return JsonSerializer()
+
+
+def get_compressor(name: str) -> Compressor | None:
+    """按名称创建压缩器（none 返回 None），依赖未安装时不压缩。"""
+    if not name or name == "none":
+        return None
+    try:
+        return _COMPRESSORS[name]()
+    except KeyError:
+        raise ValueError(f"Unknown cache compression: {name}") from None
+    except ImportError as e:
+        logger.warning(f"⚠️ 缓存压缩 {name} 不可用（{e}），不压缩")
+        return None
+
+
+def _decoder_for(codec_id: int) -> Serializer:
+    if codec_id not in _decoders:
+        name = next(n for n, cls in _SERIALIZERS.items() if cls.codec_id == codec_id)
+        _decoders[codec_id] = _SERIALIZERS[name]()
+    return _decoders[codec_id]
+
+
+def _decompressor_for(compression_id: int) -> Compressor:
+    if compression_id not in _decompressors:
+        name = next(n for n, cls in _COMPRESSORS.items() if cls.compression_id == compression_id)
+        _decompressors[compression_id] = _COMPRESSORS[name]()
+    return _decompressors[compression_id]
+
+
+class PayloadCodec:
+    """
+    带版本头的缓存值编解码器。
+
+    Args:
+        serializer: 写入使用的序列化器
+        compressor: 写入使用的压缩器，None 表示不压缩
+        compress_threshold: 序列化结果超过该字节数才压缩（压缩后更大则保留原文）
+    """
+
+    def __init__(
+        self,
+        serializer: Serializer | None = None,
+        compressor: Compressor | None = None,
+        compress_threshold: int = 1024,
+    ) -> None:
+        self.serializer: Serializer = serializer or JsonSerializer()
+        self.compressor = compressor
+        self.compress_threshold = compress_threshold
+
+    def encode(self, value: Any, expires_at: float, delta: float) -> bytes:
+        payload = self.serializer.dumps(value)
+        compression_id = 0
+        if self.compressor is not None and len(payload) > self.compress_threshold:
+            compressed = self.compressor.compress(payload)
+            if len(compressed) < len(payload):
+                payload = compressed
+                compression_id = self.compressor.compression_id
+        header = _HEADER.pack(
+            FORMAT_MAGIC, FORMAT_VERSION, self.serializer.codec_id, compression_id, expires_at, delta
+        )
+        return header + payload
+
+    def decode(self, data: bytes) -> tuple[Any, float | None, float]:
+        """
+        解码缓存值。
+
+        Returns:
+            (值, 过期时间戳, 计算耗时)；旧格式 JSON 没有过期时间，返回 None
+
+        Raises:
+            ValueError: 无法识别的格式或缺少对应的解码依赖
+        """
+        if len(data) >= _HEADER.size and data[0] == FORMAT_MAGIC and data[1] == FORMAT_VERSION:
+            _, _, codec_id, compression_id, expires_at, delta = _HEADER.unpack_from(data)
+            payload = data[_HEADER.size:]
+            try:
+                if compression_id:
+                    payload = _decompressor_for(compression_id).decompress(payload)
+                return _decoder_for(codec_id).loads(payload), expires_at, delta
+            except (StopIteration, ImportError) as e:
+                raise ValueError(f"Unsupported cache payload (codec={codec_id}, compression={compression_id})") from e
+        # 旧格式：无头部的 JSON 字符串
+        try:
+            return json.loads(data), None, 0.0
+        except (UnicodeDecodeError, json.JSONDecodeError) as e:
+            raise ValueError("Unrecognized cache payload") from e
@@ -0,0 +1,200 @@
+"""
+请求级耗时追踪：记录 RAG 各阶段（查询扩展、嵌入、向量检索、BM25、重排序、LLM）的耗时 span。
+
+当前请求的追踪对象保存在 ContextVar 中，检索器与重排序器无需改动函数签名即可记录 span。
+请求结束时输出一行结构化日志，并可选地导出到 OpenTelemetry Collector。
+"""
+import json
+import logging
+import random
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Any, Callable, Iterator
+
+from app.core.config import Settings, get_settings
+
+logger = logging.getLogger(__name__)
+trace_logger = logging.getLogger("app.trace")
+
+_current_trace: ContextVar["RequestTrace | None"] = ContextVar("current_trace", default=None)
+_otel_tracer = None
+_span_listeners: list[Callable[["Span"], None]] = []
+
+
+@dataclass
+class Span:
+    name: str
+    start_ms: float
+    duration_ms: float = 0.0
+    attributes: dict[str, Any] = field(default_factory=dict)
+
+    def set(self, **attributes: Any) -> None:
+        """补充 span 属性（如缓存命中、候选数量）。"""
+        self.attributes.update(attributes)
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            "name": self.name,
+            "start_ms": round(self.start_ms, 3),
+            "duration_ms": round(self.duration_ms, 3),
+            **({"attributes": self.attributes} if self.attributes else {}),
+        }
+
+
+class RequestTrace:
+    """单个请求的阶段耗时记录。"""
+
+    def __init__(self, name: str, **attributes: Any) -> None:
+        self.name = name
+        self.attributes: dict[str, Any] = dict(attributes)
+        self.spans: list[Span] = []
+        self.start_ns = time.time_ns()
+        self._start = time.perf_counter()
+        self.total_ms: float = 0.0
+
+    @contextmanager
+    def span(self, name: str, **attributes: Any) -> Iterator[Span]:
+        span = Span(name=name, start_ms=(time.perf_counter() - self._start) * 1000, attributes=dict(attributes))
+        try:
+            yield span
+        finally:
+            span.duration_ms = (time.perf_counter() - self._start) * 1000 - span.start_ms
+            self.spans.append(span)
+            _notify_span(span)
+
+    def finish(self) -> None:
+        self.total_ms = (time.perf_counter() - self._start) * 1000
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            "name": self.name,
+            "total_ms": round(self.total_ms, 3),
+            **({"attributes": self.attributes} if self.attributes else {}),
+            "spans": [s.to_dict() for s in sorted(self.spans, key=lambda s: s.start_ms)],
+        }
+
+
+def current_trace() -> RequestTrace | None:
+    return _current_trace.get()
+
+
+def add_span_listener(listener: Callable[[Span], None]) -> None:
+    """注册 span 结束回调（如 Prometheus 阶段耗时直方图），无论是否有活动追踪都会触发。"""
+    _span_listeners.append(listener)
+
+
+def _notify_span(span: Span) -> None:
+    for listener in _span_listeners:
+        try:
+            listener(span)
+        except Exception as e:
+            logger.debug(f"span 回调失败: {e}")
+
+
+@contextmanager
+def trace_span(name: str, **attributes: Any) -> Iterator[Span]:
+    """
+    在当前请求追踪中记录一个 span；没有活动追踪时仍会计时并通知回调，但不写入追踪。
+    """
+    trace = _current_trace.get()
+    if trace is None:
+        start = time.perf_counter()
+        span = Span(name=name, start_ms=0.0, attributes=dict(attributes))
+        try:
+            yield span
+        finally:
+            span.duration_ms = (time.perf_counter() - start) * 1000
+            _notify_span(span)
+        return
+    with trace.span(name, **attributes) as span:
+        yield span
+
+
+@contextmanager
+def request_trace(name: str, settings: Settings | None = None, **attributes: Any) -> Iterator[RequestTrace]:
+    """
+    开始一个请求级追踪。已有活动追踪时复用它（嵌套调用不会重复输出日志）。
+
+    结束时输出一行结构化日志，并按 telemetry_sample_rate 采样导出到 OpenTelemetry。
+    """
+    existing = _current_trace.get()
+    if existing is not None:
+        yield existing
+        return
+
+    trace = RequestTrace(name, **attributes)
+    token = _current_trace.set(trace)
+    try:
+        yield trace
+    finally:
+        _current_trace.reset(token)
+        trace.finish()
+        _emit(trace, settings or get_settings())
+
+
+def _emit(trace: RequestTrace, settings: Settings) -> None:
+    if settings.trace_log_enabled:
+        trace_logger.info(json.dumps(trace.to_dict(), ensure_ascii=False, default=str))
+    if _otel_tracer is not None and random.random() < settings.telemetry_sample_rate:
+        try:
+            _export_otel(trace)
+        except Exception as e:
+            logger.debug(f"OpenTelemetry 导出失败: {e}")
+
+
+def configure_otel_exporter(settings: Settings | None = None) -> bool:
+    """
+    配置 OpenTelemetry OTLP 导出（需要 opentelemetry-sdk 与 OTLP exporter，未安装时跳过）。
+
+    Returns:
+        是否启用了导出
+    """
+    global _otel_tracer
+    settings = settings or get_settings()
+    if not settings.otel_exporter_endpoint:
+        return False
+    try:
+        from opentelemetry.exporter.otlp.proto.grpc.trace_exporter import OTLPSpanExporter
+        from opentelemetry.sdk.resources import Resource
+        from opentelemetry.sdk.trace import TracerProvider
+        from opentelemetry.sdk.trace.export import BatchSpanProcessor
+    except ImportError:
+        logger.warning(
+            "⚠️ 未安装 opentelemetry-sdk / opentelemetry-exporter-otlp，跳过追踪导出。"
+            "请运行: pip install opentelemetry-sdk opentelemetry-exporter-otlp"
+        )
+        return False
+
+    provider = TracerProvider(resource=Resource.create({"service.name": settings.app_name}))
+    provider.add_span_processor(
+        BatchSpanProcessor(OTLPSpanExporter(endpoint=settings.otel_exporter_endpoint, insecure=True))
+    )
+    _otel_tracer = provider.get_tracer("industrial-qa.rag")
+    logger.info(f"✅ OpenTelemetry 追踪导出: {settings.otel_exporter_endpoint}")
+    return True
+
+
+def _export_otel(trace: RequestTrace) -> None:
+    from opentelemetry.trace import set_span_in_context
+
+    end_ns = trace.start_ns + int(trace.total_ms * 1_000_000)
+    root = _otel_tracer.start_span(trace.name, start_time=trace.start_ns, attributes=_otel_attrs(trace.attributes))
+    ctx = set_span_in_context(root)
+    for span in trace.spans:
+        span_start = trace.start_ns + int(span.start_ms * 1_000_000)
+        child = _otel_tracer.start_span(
+            span.name, context=ctx, start_time=span_start, attributes=_otel_attrs(span.attributes)
+        )
+        child.end(end_time=span_start + int(span.duration_ms * 1_000_000))
+    root.end(end_time=end_ns)
+
+
+def _otel_attrs(attributes: dict[str, Any]) -> dict[str, Any]:
+    """OpenTelemetry 属性只接受基本类型，其他值转为字符串。"""
+    return {
+        k: v if isinstance(v, (str, bool, int, float)) else str(v)
+        for k, v in attributes.items()
+        if v is not None
+    }
@@ -0,0 +1,283 @@
+"""
+上传文件流式落盘。
+
+按 UPLOAD_CHUNK_SIZE 分块读取上传内容，在线程中写入 storage_dir/.tmp 下的临时文件，同时增量计算 SHA-256。
+校验通过后由调用方 commit() 原子重命名到最终路径
+（临时目录与目标在同一文件系统，os.replace 不会出现写了一半的文件）；未提交的临时文件在退出时删除。
+
+MAX_UPLOAD_SIZE_MB 的限制：Starlette 在调用处理函数之前就已把 multipart 中的文件完整接收并缓存，
+staged_upload 中的检查只是兜底，无法节省带宽与磁盘；真正的限制由 UploadSizeLimitMiddleware 在解析请求体之前完成
+（Content-Length 超限直接 413，分块传输时边接收边计数）。分片续传的分片直接读取 request.stream()，边收边限。
+
+分片续传（app/api/v1/uploads.py）的分片保存在 storage_dir/.uploads/<会话 id>/<序号>.part，
+完成时由 staged_parts 按顺序流式合并为临时文件；过期会话由 run_upload_gc 定期清理。
+"""
+import asyncio
+import datetime as dt
+import hashlib
+import logging
+import os
+import shutil
+import time
+import uuid
+from collections.abc import AsyncIterator, Sequence
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from pathlib import Path
+
+from fastapi import HTTPException, UploadFile
+from fastapi.responses import JSONResponse
+from sqlalchemy import delete, select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.core.config import Settings
+from app.core.redis_pool import get_redis_client
+from app.db.models import UploadSession
+
+logger = logging.getLogger(__name__)
+
+TMP_DIR_NAME = ".tmp"
+PARTS_DIR_NAME = ".uploads"
+UPLOAD_GC_LOCK_KEY = "uploads:gc:lock"
+
+
+@dataclass
+class StagedUpload:
+    path: Path
+    filename: str
+    size: int
+    sha256: str
+    committed: bool = False
+
+    def commit(self, target: Path) -> Path:
+        os.replace(self.path, target)
+        self.path = target
+        self.committed = True
+        return target
+
+
+def safe_filename(filename: str | None) -> str:
+    """去掉客户端文件名中的目录部分，避免写到 storage_dir 之外。"""
+    name = Path((filename or "").replace("\\", "/")).name
+    return name or "upload"
+
+
+def max_upload_bytes(settings: Settings) -> int | None:
+    return settings.max_upload_size_mb * 1024 * 1024 if settings.max_upload_size_mb > 0 else None
+
+
+def too_large(limit_bytes: int) -> HTTPException:
+    # 常量名在新版 Starlette 中改为 HTTP_413_CONTENT_TOO_LARGE，直接用状态码兼容新旧版本
+    return HTTPException(status_code=413, detail=f"Upload exceeds the limit of {limit_bytes} bytes")
+
+
+def _unlink(path: Path) -> None:
+    try:
+        path.unlink(missing_ok=True)
+    except OSError as e:
+        logger.warning(f"⚠️ 删除临时上传文件失败 {path}: {e}")
+
+
+def _tmp_path(settings: Settings) -> Path:
+    tmp_dir = Path(settings.storage_dir) / TMP_DIR_NAME
+    tmp_dir.mkdir(parents=True, exist_ok=True)
+    return tmp_dir / f"{uuid.uuid4()}.part"
+
+
+async def write_stream(chunks: AsyncIterator[bytes], path: Path, max_bytes: int | None = None) -> tuple[int, str]:
+    """把字节流写入 path（在线程中写盘），返回 (大小, SHA-256)；超过 max_bytes 时中止并返回 413。"""
+    digest = hashlib.sha256()
+    size = 0
+    handle = await asyncio.to_thread(open, path, "wb")
+    try:
+        async for chunk in chunks:
+            size += len(chunk)
+            if max_bytes is not None and size > max_bytes:
+                raise too_large(max_bytes)
+            digest.update(chunk)
+            await asyncio.to_thread(handle.write, chunk)
+        await asyncio.to_thread(handle.flush)
+        await asyncio.to_thread(os.fsync, handle.fileno())
+    finally:
+        await asyncio.to_thread(handle.close)
+    return size, digest.hexdigest()
+
+
+async def _read_upload(file: UploadFile, chunk_size: int) -> AsyncIterator[bytes]:
+    while chunk := await file.read(chunk_size):
+        yield chunk
+
+
+@asynccontextmanager
+async def staged_upload(file: UploadFile, settings: Settings) -> AsyncIterator[StagedUpload]:
+    """
+    把上传内容流式写入临时文件；with 块内调用 commit() 保留文件，否则退出时删除。
+
+    file 已由 Starlette 完整接收，这里的大小检查只是兜底（请求体大小由 UploadSizeLimitMiddleware 限制）。
+    """
+    tmp_path = _tmp_path(settings)
+    staged: StagedUpload | None = None
+    try:
+        size, sha256 = await write_stream(
+            _read_upload(file, settings.upload_chunk_size), tmp_path, max_upload_bytes(settings)
+        )
+        staged = StagedUpload(path=tmp_path, filename=safe_filename(file.filename), size=size, sha256=sha256)
+        yield staged
+    finally:
+        if staged is None or not staged.committed:
+            await asyncio.to_thread(_unlink, tmp_path)
+
+
+class _BodyTooLarge(Exception):
+    pass
+
+
+class UploadSizeLimitMiddleware:
+    """
+    在解析请求体之前限制上传接口的请求体大小（ASGI 中间件）。
+
+    Content-Length 超过限制时直接返回 413，不接收请求体；没有 Content-Length（分块传输）时边接收边计数，
+    超限即中止接收并返回 413。限制值在文件大小上限之外留出 multipart 边界与表单字段的余量。
+    """
+
+    MULTIPART_OVERHEAD = 64 * 1024
+
+    def __init__(self, app: ASGIApp, paths: Sequence[str], max_file_bytes: int) -> None:
+        self.app = app
+        self.paths = frozenset(paths)
+        self.max_file_bytes = max_file_bytes
+        self.max_bytes = max_file_bytes + self.MULTIPART_OVERHEAD
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or scope["path"] not in self.paths:
+            await self.app(scope, receive, send)
+            return
+        content_length = dict(scope["headers"]).get(b"content-length", b"")
+        if content_length.isdigit() and int(content_length) > self.max_bytes:
+            await self._reject(scope, receive, send)
+            return
+
+        received = 0
+        exceeded = False
+        response_started = False
+
+        async def limited_receive() -> Message:
+            nonlocal received, exceeded
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > self.max_bytes:
+                    exceeded = True
+                    raise _BodyTooLarge()
+            return message
+
+        async def guarded_send(message: Message) -> None:
+            nonlocal response_started
+            # 超限后应用返回的（解析失败）响应替换为 413
+            if exceeded:
+                return
+            response_started = True
+            await send(message)
+
+        try:
+            await self.app(scope, limited_receive, guarded_send)
+        except _BodyTooLarge:
+            pass
+        if exceeded and not response_started:
+            await self._reject(scope, receive, send)
+
+    async def _reject(self, scope: Scope, receive: Receive, send: Send) -> None:
+        response = JSONResponse(
+            status_code=413, content={"detail": f"Upload exceeds the limit of {self.max_file_bytes} bytes"}
+        )
+        await response(scope, receive, send)
+
+
+def _concatenate(part_paths: Sequence[Path], target: Path, chunk_size: int) -> tuple[int, str]:
+    """按顺序把分片流式拷贝到 target（每次 chunk_size 字节，不整体读入内存），返回 (大小, SHA-256)。"""
+    digest = hashlib.sha256()
+    size = 0
+    with open(target, "wb") as out:
+        for part_path in part_paths:
+            with open(part_path, "rb") as part:
+                while block := part.read(chunk_size):
+                    digest.update(block)
+                    out.write(block)
+                    size += len(block)
+        out.flush()
+        os.fsync(out.fileno())
+    return size, digest.hexdigest()
+
+
+@asynccontextmanager
+async def staged_parts(part_paths: Sequence[Path], filename: str, settings: Settings) -> AsyncIterator[StagedUpload]:
+    """把分片合并为临时文件，用法与 staged_upload 相同。"""
+    tmp_path = _tmp_path(settings)
+    staged: StagedUpload | None = None
+    try:
+        size, sha256 = await asyncio.to_thread(_concatenate, part_paths, tmp_path, settings.upload_chunk_size)
+        staged = StagedUpload(path=tmp_path, filename=safe_filename(filename), size=size, sha256=sha256)
+        yield staged
+    finally:
+        if staged is None or not staged.committed:
+            await asyncio.to_thread(_unlink, tmp_path)
+
+
+def parts_dir(settings: Settings, upload_id: uuid.UUID) -> Path:
+    return Path(settings.storage_dir) / PARTS_DIR_NAME / str(upload_id)
+
+
+def remove_parts(settings: Settings, upload_id: uuid.UUID) -> None:
+    shutil.rmtree(parts_dir(settings, upload_id), ignore_errors=True)
+
+
+async def gc_upload_sessions(session: AsyncSession, settings: Settings, now: dt.datetime | None = None) -> int:
+    """删除过期的上传会话、没有对应会话的分片目录与遗留的临时文件；返回删除的分片目录数。"""
+    now = now or dt.datetime.utcnow()
+    await session.execute(delete(UploadSession).where(UploadSession.expires_at < now))
+    await session.commit()
+    snapshot_at = time.time()
+    active = {str(upload_id) for upload_id in (await session.execute(select(UploadSession.id))).scalars().all()}
+
+    def _remove_orphans() -> int:
+        # 进程崩溃时遗留的临时文件
+        tmp_dir = Path(settings.storage_dir) / TMP_DIR_NAME
+        stale_before = snapshot_at - settings.upload_session_ttl_hours * 3600
+        if tmp_dir.exists():
+            for path in tmp_dir.iterdir():
+                if path.is_file() and path.stat().st_mtime < stale_before:
+                    _unlink(path)
+        root = Path(settings.storage_dir) / PARTS_DIR_NAME
+        if not root.exists():
+            return 0
+        removed = 0
+        for path in root.iterdir():
+            # 会话已过期或已被删除（如账号删除时级联删除）；跳过读取会话列表之后新建的目录
+            if path.is_dir() and path.name not in active and path.stat().st_mtime < snapshot_at:
+                shutil.rmtree(path, ignore_errors=True)
+                removed += 1
+        return removed
+
+    return await asyncio.to_thread(_remove_orphans)
+
+
+async def run_upload_gc(session_factory: async_sessionmaker, settings: Settings) -> None:
+    """周期清理任务；多 worker 部署时通过 Redis 锁每个周期只由一个 worker 执行。"""
+    interval = settings.upload_gc_interval
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            redis_client = get_redis_client()
+            if redis_client is not None:
+                acquired = await redis_client.set(UPLOAD_GC_LOCK_KEY, "1", nx=True, ex=max(int(interval) - 1, 1))
+                if not acquired:
+                    continue
+            async with session_factory() as session:
+                removed = await gc_upload_sessions(session, settings)
+            if removed:
+                logger.info(f"🗑️ 已清理 {removed} 个过期的分片上传会话")
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.warning(f"⚠️ 清理分片上传会话失败: {e}")
@@ -0,0 +1,70 @@
+"""
+已认证用户的进程内缓存。
+
+get_current_principal 解析令牌后按 (用户ID, jti) 查找用户快照，命中时不再查询数据库。
+快照只包含鉴权所需的字段且不可变，不绑定任何数据库会话。
+
+失效：管理员修改角色/状态、删除用户、用户注销账号时调用 invalidate_user，
+通过 Redis pub/sub 通知所有 worker；消息丢失时由较短的 USER_CACHE_TTL 兜底。
+"""
+import time
+import uuid
+from collections import OrderedDict
+from dataclasses import dataclass
+
+from app.core.config import get_settings
+from app.core.pubsub import publish, subscribe
+
+USER_INVALIDATE_CHANNEL = "auth:user:invalidate"
+
+
+@dataclass(frozen=True, slots=True)
+class UserSnapshot:
+    """当前用户的只读快照（只需要 id 与角色的接口使用它，避免加载 ORM 对象）。"""
+
+    id: uuid.UUID
+    role: str
+    is_active: bool
+    is_verified: bool
+
+
+_cache: OrderedDict[tuple[str, str], tuple[UserSnapshot, float]] = OrderedDict()
+
+
+def get_cached_user(user_id: str, jti: str | None) -> UserSnapshot | None:
+    key = (str(user_id), jti or "")
+    entry = _cache.get(key)
+    if entry is None:
+        return None
+    snapshot, expires_at = entry
+    if expires_at <= time.monotonic():
+        _cache.pop(key, None)
+        return None
+    _cache.move_to_end(key)
+    return snapshot
+
+
+def cache_user(user_id: str, jti: str | None, snapshot: UserSnapshot) -> None:
+    settings = get_settings()
+    if settings.user_cache_ttl <= 0:
+        return
+    key = (str(user_id), jti or "")
+    _cache[key] = (snapshot, time.monotonic() + settings.user_cache_ttl)
+    _cache.move_to_end(key)
+    while len(_cache) > settings.user_cache_maxsize:
+        _cache.popitem(last=False)
+
+
+def evict_user(user_id: str) -> None:
+    """删除本进程中该用户的所有快照（不同令牌各有一条）。"""
+    user_id = str(user_id)
+    for key in [key for key in _cache if key[0] == user_id]:
+        _cache.pop(key, None)
+
+
+async def invalidate_user(user_id: uuid.UUID | str) -> None:
+    """用户角色、状态变更或删除后调用：清除所有 worker 中的缓存快照。"""
+    await publish(USER_INVALIDATE_CHANNEL, str(user_id))
+
+
+subscribe(USER_INVALIDATE_CHANNEL, evict_user)
@@ -0,0 +1,49 @@
+"""
+从 documents.metadata JSON 回填提升为列的字段（vectorized、file_type、file_size、chunk_size）。
+
+004 迁移之前入库的文档这些列为默认值；按主键分批读取，只更新与 metadata 不一致的行，可重复执行。
+"""
+import uuid
+from typing import Any
+
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.db.models import Document
+
+
+def columns_from_meta(meta: dict | None) -> dict[str, Any]:
+    meta = meta or {}
+    file_type = meta.get("file_type")
+    chunk_size = meta.get("chunk_size")
+    return {
+        "vectorized": bool(meta.get("vectorized", False)),
+        "file_type": str(file_type)[:32] if file_type else None,
+        "file_size": int(meta.get("file_size") or 0),
+        "chunk_size": int(chunk_size) if chunk_size else None,
+    }
+
+
+async def backfill_document_columns(session: AsyncSession, batch_size: int = 500) -> int:
+    """返回更新的文档数；每批单独提交。"""
+    columns = (Document.vectorized, Document.file_type, Document.file_size, Document.chunk_size)
+    last_id: uuid.UUID | None = None
+    updated = 0
+    while True:
+        query = select(Document.id, Document.meta, *columns).order_by(Document.id).limit(batch_size)
+        if last_id is not None:
+            query = query.where(Document.id > last_id)
+        rows = (await session.execute(query)).all()
+        if not rows:
+            return updated
+        changes = []
+        for row in rows:
+            values = columns_from_meta(row.meta)
+            if any(getattr(row, name) != value for name, value in values.items()):
+                changes.append({"id": row.id, **values})
+        if changes:
+            # 按主键批量 UPDATE（executemany）
+            await session.execute(update(Document), changes)
+            updated += len(changes)
+        await session.commit()
+        last_id = rows[-1].id
@@ -0,0 +1,57 @@
+"""
+按集合批量删除文档与 chunk。
+
+逐个 session.delete(obj) 需要先把每个 ORM 对象加载到内存再逐行删除；这里直接发出
+DELETE ... WHERE document_id IN (...)，每条语句最多包含 BULK_DELETE_BATCH_SIZE 个 ID，
+避免超长 IN 列表触发数据库参数上限。调用方负责提交事务。
+"""
+import uuid
+from collections.abc import Iterable, Iterator, Sequence
+from typing import TypeVar
+
+from sqlalchemy import delete
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import get_settings
+from app.db.models import Chunk, Document
+
+T = TypeVar("T")
+
+
+def batched(items: Iterable[T], size: int | None = None) -> Iterator[list[T]]:
+    size = size or get_settings().bulk_delete_batch_size
+    batch: list[T] = []
+    for item in items:
+        batch.append(item)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+async def delete_chunks_for_documents(
+    session: AsyncSession, document_ids: Sequence[uuid.UUID], batch_size: int | None = None
+) -> int:
+    """删除这些文档的全部 chunk，返回删除行数。"""
+    deleted = 0
+    for batch in batched(document_ids, batch_size):
+        result = await session.execute(
+            delete(Chunk).where(Chunk.document_id.in_(batch)).execution_options(synchronize_session=False)
+        )
+        deleted += result.rowcount or 0
+    return deleted
+
+
+async def delete_documents(
+    session: AsyncSession, document_ids: Sequence[uuid.UUID], batch_size: int | None = None
+) -> int:
+    """删除文档及其 chunk（不含向量库与文件），返回删除的文档数。"""
+    await delete_chunks_for_documents(session, document_ids, batch_size)
+    deleted = 0
+    for batch in batched(document_ids, batch_size):
+        result = await session.execute(
+            delete(Document).where(Document.id.in_(batch)).execution_options(synchronize_session=False)
+        )
+        deleted += result.rowcount or 0
+    return deleted
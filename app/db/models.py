@@ -1,7 +1,7 @@
 import datetime as dt
 import uuid
 
-from sqlalchemy import DateTime, ForeignKey, JSON, String, Text, TypeDecorator, and_
+from sqlalchemy import BigInteger, Boolean, DateTime, ForeignKey, Index, Integer, JSON, String, Text, TypeDecorator, and_, false
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from app.db.base import Base
@@ -49,12 +49,29 @@ UUIDType = GUID
 
 class Document(Base):
     __tablename__ = "documents"
+    __table_args__ = (
+        # 按库列出文档（WHERE library_id = ? ORDER BY created_at DESC）、库统计
+        Index("ix_documents_library_id_created_at", "library_id", "created_at"),
+        # 跨库列出全部可访问文档（ORDER BY created_at DESC）
+        Index("ix_documents_created_at", "created_at"),
+        # 按向量化状态筛选库内文档（WHERE library_id = ? AND vectorized = ?）
+        Index("ix_documents_library_id_vectorized", "library_id", "vectorized"),
+        # 按内容哈希查找可复用 chunk 与向量的同内容文档
+        Index("ix_documents_content_hash", "content_hash"),
+    )
 
     id: Mapped[uuid.UUID] = mapped_column(UUIDType, primary_key=True, default=uuid.uuid4)
     title: Mapped[str] = mapped_column(String(255))
     source_path: Mapped[str] = mapped_column(String(512))
     library_id: Mapped[uuid.UUID | None] = mapped_column(UUIDType, ForeignKey("document_libraries.id"), nullable=True)
     meta: Mapped[dict] = mapped_column("metadata", JSON, default=dict)  # Column name is "metadata" in DB
+    # 常用于筛选与统计的元数据字段（同时保留在 meta 中以兼容旧客户端），由入库与向量化流程同步维护
+    vectorized: Mapped[bool] = mapped_column(Boolean, default=False, server_default=false(), nullable=False)
+    file_type: Mapped[str | None] = mapped_column(String(32), nullable=True)
+    file_size: Mapped[int] = mapped_column(BigInteger, default=0, server_default="0", nullable=False)
+    chunk_size: Mapped[int | None] = mapped_column(Integer, nullable=True)
+    # 上传文件内容的 SHA-256（对应 stored_blobs.sha256）；内容寻址存储之前入库的文档为空
+    content_hash: Mapped[str | None] = mapped_column(String(64), nullable=True)
     created_at: Mapped[dt.datetime] = mapped_column(DateTime, default=dt.datetime.utcnow)
 
     chunks: Mapped[list["Chunk"]] = relationship(back_populates="document")
@@ -63,6 +80,10 @@ class Document(Base):
 
 class Chunk(Base):
     __tablename__ = "chunks"
+    __table_args__ = (
+        # 向量化、删除文档、预览回退（WHERE document_id = ? ORDER BY id）、库统计的 chunk 计数
+        Index("ix_chunks_document_id_id", "document_id", "id"),
+    )
 
     id: Mapped[uuid.UUID] = mapped_column(UUIDType, primary_key=True, default=uuid.uuid4)
     document_id: Mapped[uuid.UUID] = mapped_column(UUIDType, ForeignKey("documents.id"))
@@ -89,6 +110,50 @@ class DocumentLibrary(Base):
     group: Mapped["Group"] = relationship(back_populates="libraries", foreign_keys=[owner_id], primaryjoin="DocumentLibrary.owner_id==Group.id")
 
 
+class LibraryStats(Base):
+    """文档库统计计数器，由入库、向量化、删除在同一事务内增减（app/core/library_stats.py），定期对账修正。"""
+
+    __tablename__ = "library_stats"
+
+    library_id: Mapped[uuid.UUID] = mapped_column(
+        UUIDType, ForeignKey("document_libraries.id", ondelete="CASCADE"), primary_key=True
+    )
+    document_count: Mapped[int] = mapped_column(BigInteger, default=0, nullable=False)
+    chunk_count: Mapped[int] = mapped_column(BigInteger, default=0, nullable=False)
+    total_size_bytes: Mapped[int] = mapped_column(BigInteger, default=0, nullable=False)
+    vectorized_count: Mapped[int] = mapped_column(BigInteger, default=0, nullable=False)
+    updated_at: Mapped[dt.datetime] = mapped_column(DateTime, default=dt.datetime.utcnow, onupdate=dt.datetime.utcnow)
+
+
+class StoredBlob(Base):
+    """按内容 SHA-256 存储的上传文件（app/core/blobs.py），ref_count 为引用它的文档数，归零时删除文件。"""
+
+    __tablename__ = "stored_blobs"
+
+    sha256: Mapped[str] = mapped_column(String(64), primary_key=True)
+    path: Mapped[str] = mapped_column(String(512), nullable=False)
+    size: Mapped[int] = mapped_column(BigInteger, default=0, nullable=False)
+    ref_count: Mapped[int] = mapped_column(Integer, default=0, nullable=False)
+    created_at: Mapped[dt.datetime] = mapped_column(DateTime, default=dt.datetime.utcnow)
+
+
+class UploadSession(Base):
+    """分片续传会话（app/api/v1/uploads.py），已接收的分片保存在 storage_dir/.uploads/<id>/ 下，过期后由后台任务清理。"""
+
+    __tablename__ = "upload_sessions"
+
+    id: Mapped[uuid.UUID] = mapped_column(UUIDType, primary_key=True, default=uuid.uuid4)
+    user_id: Mapped[uuid.UUID] = mapped_column(UUIDType, ForeignKey("users.id", ondelete="CASCADE"), index=True)
+    library_id: Mapped[uuid.UUID | None] = mapped_column(UUIDType, nullable=True)
+    filename: Mapped[str] = mapped_column(String(255), nullable=False)
+    total_size: Mapped[int] = mapped_column(BigInteger, nullable=False)
+    part_size: Mapped[int] = mapped_column(Integer, nullable=False)
+    # 客户端声明的整个文件的 SHA-256（可选），合并后校验
+    sha256: Mapped[str | None] = mapped_column(String(64), nullable=True)
+    created_at: Mapped[dt.datetime] = mapped_column(DateTime, default=dt.datetime.utcnow)
+    expires_at: Mapped[dt.datetime] = mapped_column(DateTime, nullable=False, index=True)
+
+
 class User(Base):
     __tablename__ = "users"
 
@@ -1,12 +1,117 @@
-from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+"""
+数据库引擎与会话。
 
-from app.core.config import settings
+- engine / async_session：主库，所有写入与需要读到最新数据的请求使用
+- replica_engine / read_router：可选的只读副本（DATABASE_REPLICA_URL），列表、统计、预览等只读接口使用；
+  副本存在复制延迟，刚写入的数据可能短暂不可见，写后立即读取的流程应使用主库会话
 
-engine = create_async_engine(settings.database_url, echo=False, future=True)
+连接池参数见 DB_POOL_*；连接获取耗时记录在 db_pool_wait_seconds 指标中（按 role 区分主库/副本）。
+"""
+import logging
+import time
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
+from typing import Any
+
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+
+from app.core.config import Settings, settings
+from app.core.metrics import DB_POOL_WAIT, DB_READ_ROUTE
+
+logger = logging.getLogger(__name__)
+
+
+def _timed_pool_class(role: str) -> type[AsyncAdaptedQueuePool]:
+    class TimedQueuePool(AsyncAdaptedQueuePool):
+        """记录每次取连接的耗时（包括池满时的排队与新建连接）。"""
+
+        def _do_get(self):
+            start = time.perf_counter()
+            try:
+                return super()._do_get()
+            finally:
+                DB_POOL_WAIT.labels(role=role).observe(time.perf_counter() - start)
+
+    return TimedQueuePool
+
+
+def engine_options(url: str, settings: Settings, role: str = "primary") -> dict[str, Any]:
+    """按配置生成连接池参数；内存 SQLite（测试用）只能使用单连接的 StaticPool，保持默认。"""
+    parsed = make_url(url)
+    if parsed.get_backend_name() == "sqlite" and parsed.database in (None, "", ":memory:"):
+        return {}
+    return {
+        "poolclass": _timed_pool_class(role),
+        "pool_size": settings.db_pool_size,
+        "max_overflow": settings.db_max_overflow,
+        "pool_timeout": settings.db_pool_timeout,
+        "pool_recycle": settings.db_pool_recycle,
+        "pool_pre_ping": settings.db_pool_pre_ping,
+    }
+
+
+def create_engine(url: str, settings: Settings, role: str = "primary") -> AsyncEngine:
+    return create_async_engine(url, echo=False, future=True, **engine_options(url, settings, role))
+
+
+class ReadSessionRouter:
+    """
+    只读会话路由：优先使用副本，副本连接失败时回退主库，并在 retry_interval 秒内不再尝试副本。
+
+    未配置副本时始终返回主库会话。
+    """
+
+    def __init__(
+        self,
+        primary: async_sessionmaker,
+        replica: async_sessionmaker | None = None,
+        retry_interval: float = 30.0,
+    ) -> None:
+        self._primary = primary
+        self._replica = replica
+        self._retry_interval = retry_interval
+        self._replica_down_until = 0.0
+
+    async def _open_replica(self) -> AsyncSession | None:
+        if self._replica is None or time.monotonic() < self._replica_down_until:
+            return None
+        session = self._replica()
+        try:
+            # 提前取连接，让连接错误在这里暴露，而不是在接口的第一条查询里
+            await session.connection()
+        except Exception as e:
+            await session.close()
+            self._replica_down_until = time.monotonic() + self._retry_interval
+            DB_READ_ROUTE.labels(target="fallback").inc()
+            logger.warning(f"⚠️ 只读副本不可用，{self._retry_interval:.0f} 秒内回退主库: {e}")
+            return None
+        DB_READ_ROUTE.labels(target="replica").inc()
+        return session
+
+    @asynccontextmanager
+    async def session(self) -> AsyncIterator[AsyncSession]:
+        session = await self._open_replica()
+        if session is None:
+            session = self._primary()
+        async with session:
+            yield session
+
+
+engine = create_engine(settings.database_url, settings)
 async_session = async_sessionmaker(bind=engine, expire_on_commit=False, class_=AsyncSession)
 
+replica_engine: AsyncEngine | None = (
+    create_engine(settings.database_replica_url, settings, role="replica") if settings.database_replica_url else None
+)
+read_router = ReadSessionRouter(
+    async_session,
+    async_sessionmaker(bind=replica_engine, expire_on_commit=False, class_=AsyncSession) if replica_engine else None,
+    retry_interval=settings.db_replica_retry_interval,
+)
+
 
 async def get_db() -> AsyncSession:
     async with async_session() as session:
         yield session
-
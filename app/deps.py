@@ -2,11 +2,13 @@ from collections.abc import AsyncGenerator
 from functools import lru_cache
 
 import redis.asyncio as redis
+from fastapi import HTTPException, status
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.core.config import get_settings, Settings
 from app.core.email import EmailService
-from app.db.session import async_session
+from app.core.redis_pool import get_redis_client
+from app.db.session import async_session, read_router
 from app.rag.pipeline import RAGPipeline
 from app.rag.retriever import LangchainRetriever, HybridRetriever
 
@@ -21,6 +23,16 @@ async def get_db_session() -> AsyncGenerator[AsyncSession, None]:
         yield session
 
 
+async def get_read_db_session() -> AsyncGenerator[AsyncSession, None]:
+    """
+    Read-only database session: served by the replica when DATABASE_REPLICA_URL is configured.
+
+    副本不可用时回退主库；副本有复制延迟，需要读到刚提交数据的接口请使用 get_db_session。
+    """
+    async with read_router.session() as session:
+        yield session
+
+
 # 全局检索器实例（单例模式，用于缓存 BM25 索引）
 _global_retriever: HybridRetriever | None = None
 
@@ -67,12 +79,18 @@ def get_email_service(settings: Settings | None = None) -> EmailService:
     return EmailService(settings)
 
 
-async def get_redis(settings: Settings | None = None) -> AsyncGenerator[redis.Redis, None]:
-    """Get Redis client as a dependency."""
-    settings = settings or get_settings()
-    client = redis.from_url(settings.redis_url, decode_responses=False)
-    try:
-        yield client
-    finally:
-        await client.aclose()
+async def get_redis() -> AsyncGenerator[redis.Redis | None, None]:
+    """
+    Get the shared Redis client as a dependency.
+
+    客户端由 lifespan 创建并在进程内复用（自带连接池），这里不负责关闭；未配置 Redis 时为 None。
+    """
+    yield get_redis_client()
+
 
+async def require_redis() -> AsyncGenerator[redis.Redis, None]:
+    """Like get_redis, but responds 503 when Redis is not configured (for features that cannot degrade)."""
+    client = get_redis_client()
+    if client is None:
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail="Redis is not configured")
+    yield client
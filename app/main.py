@@ -12,20 +12,78 @@ if _settings.hf_endpoint:
 if "TOKENIZERS_PARALLELISM" not in os.environ:
     os.environ["TOKENIZERS_PARALLELISM"] = "false"
 
-from fastapi import FastAPI
+import asyncio
+from contextlib import asynccontextmanager
+
+from fastapi import FastAPI, Response
 from fastapi.middleware.cors import CORSMiddleware
 
 from app.api.v1 import admin, docs, qa, groups
-from app.api.v1 import auth
+from app.api.v1 import auth, uploads
 from app.core.config import settings
+from app.core.library_stats import run_stats_reconciler
 from app.core.logging import configure_logging
+from app.core.metrics import metrics_middleware, monitor_runtime, render_metrics
+from app.core.pagination import NEXT_CURSOR_HEADER
+from app.core.passwords import shutdown_executor
+from app.core.profiling import LoopBlockWatchdog
+from app.core.pubsub import run_listener
+from app.core.redis_pool import close_redis, init_redis
+from app.core.revocation import revocation_filter
+from app.core.tracing import configure_otel_exporter
+from app.core.uploads import UploadSizeLimitMiddleware, max_upload_bytes, run_upload_gc
+from app.db.session import async_session
+from app.deps import get_retriever
+from app.rag.warmup import warm_from_query_log
 
 configure_logging()
+configure_otel_exporter(settings)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    redis_client = await init_redis(settings)
+    # 跨 worker 通知（用户缓存失效等）
+    listener_task = asyncio.create_task(run_listener()) if redis_client is not None else None
+    # 令牌吊销列表的本地布隆过滤器
+    revocation_task = asyncio.create_task(revocation_filter.run_sync()) if redis_client is not None else None
+    monitor_task = None
+    if settings.metrics_enabled:
+        monitor_task = asyncio.create_task(monitor_runtime(settings.metrics_sample_interval))
+    watchdog = None
+    if settings.loop_block_threshold_ms > 0:
+        watchdog = LoopBlockWatchdog(settings.loop_block_threshold_ms)
+        watchdog.start()
+    warmup_task = None
+    if settings.cache_warmup_on_startup:
+        warmup_task = asyncio.create_task(warm_from_query_log(get_retriever(), settings))
+    # 文档库统计计数的周期对账
+    stats_task = None
+    if settings.library_stats_reconcile_interval > 0:
+        stats_task = asyncio.create_task(run_stats_reconciler(async_session, settings))
+    # 过期分片上传会话的清理
+    upload_gc_task = None
+    if settings.upload_gc_interval > 0:
+        upload_gc_task = asyncio.create_task(run_upload_gc(async_session, settings))
+    yield
+    if warmup_task and not warmup_task.done():
+        warmup_task.cancel()
+    if watchdog:
+        watchdog.stop()
+    if monitor_task:
+        monitor_task.cancel()
+    for task in (listener_task, revocation_task, stats_task, upload_gc_task):
+        if task:
+            task.cancel()
+    shutdown_executor()
+    await close_redis()
+
 
 app = FastAPI(
     title=settings.app_name,
     version="0.1.0",
     description="Industrial QA agent backend built on FastAPI + RAG",
+    lifespan=lifespan,
 )
 
 app.add_middleware(
@@ -34,16 +92,33 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[NEXT_CURSOR_HEADER],
 )
 
 app.include_router(admin.router, prefix="/api/v1")
+app.include_router(uploads.router, prefix="/api/v1")
 app.include_router(docs.router, prefix="/api/v1")
 app.include_router(qa.router, prefix="/api/v1/qa")
 app.include_router(auth.router, prefix="/api/v1")
 app.include_router(groups.router, prefix="/api/v1")
 
 
+if settings.metrics_enabled:
+    app.middleware("http")(metrics_middleware)
+
+# 在 Starlette 接收并缓存 multipart 文件之前限制 /docs/ingest 的请求体大小
+if (upload_limit := max_upload_bytes(settings)) is not None:
+    app.add_middleware(UploadSizeLimitMiddleware, paths=("/api/v1/docs/ingest",), max_file_bytes=upload_limit)
+
+
 @app.get("/")
 async def readiness_probe() -> dict[str, str]:
     return {"status": "ok", "service": settings.app_name}
 
+
+@app.get("/metrics", include_in_schema=False)
+async def prometheus_metrics() -> Response:
+    if not settings.metrics_enabled:
+        return Response(status_code=404)
+    return render_metrics()
+
@@ -1,3 +1,4 @@
+import logging
 import re
 import uuid
 from dataclasses import dataclass
@@ -6,12 +7,16 @@ from typing import Any, Tuple
 
 import chromadb
 from chromadb.utils import embedding_functions
-from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.core.config import Settings, get_settings
+from app.core.library_stats import adjust_library_stats, document_vectorized, ensure_library_stats
+from app.db.bulk import batched, delete_chunks_for_documents
 from app.db.models import Chunk, Document
 
+logger = logging.getLogger(__name__)
+
 
 def _extract_text_with_chapters(path: Path) -> list[Tuple[str, dict[str, Any]]]:
     """
@@ -404,6 +409,33 @@ class IngestionReport:
     error: str | None = None
 
 
+def _mark_vectorized(document: Document, vectorized: bool, chunk_size: int | None = None) -> None:
+    """更新向量化状态列，并同步 meta 中的同名字段（兼容读取 meta 的旧客户端）。"""
+    document.vectorized = vectorized
+    meta = dict(document.meta or {})
+    meta["vectorized"] = vectorized
+    if chunk_size is not None:
+        document.chunk_size = chunk_size
+        meta["chunk_size"] = chunk_size
+    document.meta = meta
+
+
+def _vector_metadata(document: Document, chunk: Chunk) -> dict[str, Any]:
+    meta = {
+        "document_id": str(document.id),
+        "offset": chunk.meta.get("offset"),
+        "length": chunk.meta.get("length"),
+    }
+    # 添加章节信息到元数据
+    for key in ("chapter", "chunk_idx", "page", "file_name", "file_type"):
+        if key in chunk.meta:
+            meta[key] = chunk.meta[key]
+    if document.library_id:
+        meta["library_id"] = str(document.library_id)
+    # Chroma 元数据不接受 None
+    return {key: value for key, value in meta.items() if value is not None}
+
+
 def _resolve_chroma_path(vector_uri: str) -> str:
     """Accept formats like chroma://./chroma_store and return filesystem path."""
     prefix = "chroma://"
@@ -414,7 +446,10 @@ def _resolve_chroma_path(vector_uri: str) -> str:
 
 def _build_embedding_fn(settings: Settings):
     # Prefer configured embedding provider; fallback to default.
-    if settings.llm_provider == "dashscope" and settings.dashscope_api_key:
+    # 入库与检索共用此函数，保证写入和查询的向量来自同一个模型
+    if settings.llm_provider == "dashscope" and (
+        settings.dashscope_embedding_api_key or settings.dashscope_api_key
+    ):
         # DashScope provides an OpenAI-compatible endpoint; use api_base to direct traffic.
         return embedding_functions.OpenAIEmbeddingFunction(
             api_key=settings.dashscope_embedding_api_key or settings.dashscope_api_key,
@@ -438,6 +473,57 @@ class DocumentIngestor:
         self._client = chromadb.PersistentClient(path=chroma_path)
         self._embedding_fn = _build_embedding_fn(self.settings)
 
+    async def _clone_from_twin(self, document: Document, session: AsyncSession, chunk_size: int) -> list[Chunk] | None:
+        """
+        从已向量化、内容相同（content_hash）且切分大小相同的文档复制 chunk 与向量：不重新解析文件，
+        向量直接写入目标集合，不调用嵌入模型。没有可复用的文档或其向量不完整时返回 None。
+        """
+        if not document.content_hash:
+            return None
+        twin = (
+            await session.execute(
+                select(Document)
+                .where(
+                    Document.content_hash == document.content_hash,
+                    Document.id != document.id,
+                    Document.vectorized.is_(True),
+                    Document.chunk_size == chunk_size,
+                )
+                .limit(1)
+            )
+        ).scalar_one_or_none()
+        if twin is None:
+            return None
+        twin_chunks = (
+            await session.execute(select(Chunk).where(Chunk.document_id == twin.id).order_by(Chunk.id))
+        ).scalars().all()
+        if not twin_chunks:
+            return None
+
+        try:
+            source = self._client.get_collection(name=f"library_{twin.library_id}" if twin.library_id else "library_default")
+            stored = source.get(ids=[str(chunk.id) for chunk in twin_chunks], include=["embeddings"])
+            embeddings = dict(zip(stored["ids"], stored["embeddings"]))
+            if len(embeddings) != len(twin_chunks):
+                logger.info(f"ℹ️ 同内容文档 {twin.id} 的向量不完整，重新向量化文档 {document.id}")
+                return None
+            clones = [
+                Chunk(id=uuid.uuid4(), document_id=document.id, content=chunk.content, meta=dict(chunk.meta or {}))
+                for chunk in twin_chunks
+            ]
+            self._get_collection(document.library_id).add(
+                ids=[str(clone.id) for clone in clones],
+                documents=[clone.content for clone in clones],
+                metadatas=[_vector_metadata(document, clone) for clone in clones],
+                embeddings=[embeddings[str(chunk.id)] for chunk in twin_chunks],
+            )
+        except Exception as exc:
+            logger.warning(f"⚠️ 复用同内容文档 {twin.id} 的向量失败，重新向量化: {exc}")
+            return None
+        session.add_all(clones)
+        logger.info(f"✅ 文档 {document.id} 复用同内容文档 {twin.id} 的 {len(clones)} 个 chunk 与向量")
+        return clones
+
     def _get_collection(self, library_id: uuid.UUID | None):
         name = f"library_{library_id}" if library_id else "library_default"
         return self._client.get_or_create_collection(
@@ -446,6 +532,21 @@ class DocumentIngestor:
             metadata={"library_id": str(library_id) if library_id else None},
         )
 
+    def delete_document_vectors(self, library_id: uuid.UUID | None, document_ids: list[uuid.UUID]) -> None:
+        """
+        按 document_id 批量删除向量（where={"document_id": {"$in": [...]}}），集合不存在时跳过。
+        每次最多 BULK_DELETE_BATCH_SIZE 个文档。
+        """
+        import chromadb.errors
+
+        name = f"library_{library_id}" if library_id else "library_default"
+        try:
+            collection = self._client.get_collection(name=name)
+        except chromadb.errors.NotFoundError:
+            return
+        for batch in batched(document_ids, self.settings.bulk_delete_batch_size):
+            collection.delete(where={"document_id": {"$in": [str(doc_id) for doc_id in batch]}})
+
     def _smart_chunk_with_chapters(
         self, path: Path, document_id: uuid.UUID, chunk_size: int
     ) -> list[Chunk]:
@@ -540,20 +641,42 @@ class DocumentIngestor:
         chunk_size: int = 800,
     ) -> IngestionReport:
         """Chunk an existing document file and write embeddings."""
+        # 文档库统计：按本次前后的 chunk 数与向量化状态之差增减计数，与本次修改同一事务提交
+        await ensure_library_stats(session, document.library_id)
+        was_vectorized = document_vectorized(document)
+        removed_chunks = 0
+
+        async def _record_stats(vectorized: bool, chunk_count: int) -> None:
+            await adjust_library_stats(
+                session,
+                document.library_id,
+                chunks=chunk_count - removed_chunks,
+                vectorized=int(vectorized) - int(was_vectorized),
+            )
+
         path = Path(document.source_path)
         if not path.exists():
             error_msg = f"Document file not found on disk: {path}"
-            meta = dict(document.meta or {})
-            meta["vectorized"] = False
-            document.meta = meta
+            _mark_vectorized(document, False)
+            await _record_stats(False, 0)
             await session.commit()
             return IngestionReport(document_id=document.id, chunk_count=0, vectorized=False, error=error_msg)
 
-        # Clear existing chunks to avoid duplication on re-run
-        existing_chunks = await session.execute(select(Chunk).where(Chunk.document_id == document.id))
-        for ch in existing_chunks.scalars().all():
-            await session.delete(ch)
-        await session.flush()
+        # Clear existing chunks (and their vectors) to avoid duplication on re-run
+        removed_chunks = await delete_chunks_for_documents(session, [document.id])
+        try:
+            self.delete_document_vectors(document.library_id, [document.id])
+        except Exception as exc:
+            logger.warning(f"⚠️ 删除文档 {document.id} 的旧向量失败: {exc}")
+
+        # 相同内容已在其它文档中向量化过：直接复制 chunk 与向量
+        cloned = await self._clone_from_twin(document, session, chunk_size)
+        if cloned is not None:
+            _mark_vectorized(document, True, chunk_size)
+            await _record_stats(True, len(cloned))
+            await session.commit()
+            await session.refresh(document)
+            return IngestionReport(document_id=document.id, chunk_count=len(cloned), vectorized=True)
 
         # 使用增强的章节感知切分
         try:
@@ -561,24 +684,21 @@ class DocumentIngestor:
         except ValueError as e:
             # PDF text extraction errors (e.g., scanned PDFs)
             error_msg = str(e)
-            meta = dict(document.meta or {})
-            meta["vectorized"] = False
-            document.meta = meta
+            _mark_vectorized(document, False)
+            await _record_stats(False, 0)
             await session.commit()
             return IngestionReport(document_id=document.id, chunk_count=0, vectorized=False, error=error_msg)
         except Exception as e:
             error_msg = f"Failed to process document: {str(e)}"
-            meta = dict(document.meta or {})
-            meta["vectorized"] = False
-            document.meta = meta
+            _mark_vectorized(document, False)
+            await _record_stats(False, 0)
             await session.commit()
             return IngestionReport(document_id=document.id, chunk_count=0, vectorized=False, error=error_msg)
         
         if not chunks:
             error_msg = f"Could not extract any content from file: {path}"
-            meta = dict(document.meta or {})
-            meta["vectorized"] = False
-            document.meta = meta
+            _mark_vectorized(document, False)
+            await _record_stats(False, 0)
             await session.commit()
             return IngestionReport(document_id=document.id, chunk_count=0, vectorized=False, error=error_msg)
 
@@ -594,38 +714,15 @@ class DocumentIngestor:
             if None in ids:
                 raise ValueError("Some chunk IDs are None after flush")
             documents = [chunk.content for chunk in chunks]
-            metadatas: list[dict[str, Any]] = []
-            for chunk in chunks:
-                meta = {
-                    "document_id": str(document.id),
-                    "offset": chunk.meta.get("offset"),
-                    "length": chunk.meta.get("length"),
-                }
-                # 添加章节信息到元数据
-                if "chapter" in chunk.meta:
-                    meta["chapter"] = chunk.meta["chapter"]
-                if "chunk_idx" in chunk.meta:
-                    meta["chunk_idx"] = chunk.meta["chunk_idx"]
-                if "page" in chunk.meta:
-                    meta["page"] = chunk.meta["page"]
-                if "file_name" in chunk.meta:
-                    meta["file_name"] = chunk.meta["file_name"]
-                if "file_type" in chunk.meta:
-                    meta["file_type"] = chunk.meta["file_type"]
-                if document.library_id:
-                    meta["library_id"] = str(document.library_id)
-                metadatas.append(meta)
+            metadatas = [_vector_metadata(document, chunk) for chunk in chunks]
             collection.add(ids=ids, documents=documents, metadatas=metadatas)
             vectorized = True
         except Exception as exc:
             vectorized = False
             error = str(exc)
 
-        # mark vectorized flag in meta
-        meta = dict(document.meta or {})
-        meta["chunk_size"] = chunk_size
-        meta["vectorized"] = vectorized
-        document.meta = meta
+        _mark_vectorized(document, vectorized, chunk_size)
+        await _record_stats(vectorized, len(chunks))
         await session.commit()
         await session.refresh(document)
 
@@ -1,4 +1,6 @@
+import asyncio
 import time
+from collections.abc import AsyncIterator
 from dataclasses import dataclass
 from uuid import UUID
 
@@ -8,6 +10,8 @@ from langchain_core.runnables import Runnable
 from langchain_openai import ChatOpenAI
 
 from app.core.config import Settings, get_settings
+from app.core.metrics import BATCH_QUEUE_DEPTH
+from app.core.tracing import request_trace, trace_span
 from app.rag.prompts import get_prompt
 from app.rag.retriever import LangchainRetriever
 
@@ -17,6 +21,7 @@ class PipelineResult:
     answer: str
     references: list[dict]
     latency_ms: int
+    trace: dict | None = None
 
 
 class RAGPipeline:
@@ -51,21 +56,80 @@ class RAGPipeline:
         role: str | None = None,
     ) -> PipelineResult:
         start = time.perf_counter()
-        chunks = await self.retriever.search(query, top_k=top_k, library_ids=library_ids)
-        
-        if not chunks:
-            # No chunks retrieved, return informative message
-            answer = "抱歉，未找到相关文档内容。请确保：\n1. 文档已成功向量化\n2. 文档库ID正确\n3. 文档库中有相关内容"
-        else:
-            context = "\n\n".join(chunk.text for chunk in chunks)
-            answer = await self._generate(context=context, question=query, role=role)
+        with request_trace("qa.ask", self.settings, top_k=top_k) as trace:
+            with trace_span("retrieve") as span:
+                chunks = await self.retriever.search(query, top_k=top_k, library_ids=library_ids)
+                span.set(chunks=len(chunks))
+            
+            if not chunks:
+                # No chunks retrieved, return informative message
+                answer = "抱歉，未找到相关文档内容。请确保：\n1. 文档已成功向量化\n2. 文档库ID正确\n3. 文档库中有相关内容"
+            else:
+                context = "\n\n".join(chunk.text for chunk in chunks)
+                with trace_span("llm", context_chars=len(context)):
+                    answer = await self._generate(context=context, question=query, role=role)
 
         latency_ms = int((time.perf_counter() - start) * 1000)
         references = [
             {"document_id": c.document_id, "score": c.score, "metadata": c.metadata} for c in chunks
         ]
 
-        return PipelineResult(answer=answer, references=references, latency_ms=latency_ms)
+        return PipelineResult(
+            answer=answer, references=references, latency_ms=latency_ms, trace=trace.to_dict()
+        )
+
+    async def run_batch(
+        self,
+        queries: list[str],
+        top_k: int = 5,
+        library_ids: list[UUID] | None = None,
+        role: str | None = None,
+        concurrency: int | None = None,
+    ) -> AsyncIterator[tuple[int, PipelineResult]]:
+        """
+        批量问答：检索阶段一次性处理所有问题，生成阶段以有限并发调用 LLM。
+
+        按完成顺序产出 (问题下标, 结果)；latency_ms 为从批次开始到该问题完成的耗时。
+        """
+        start = time.perf_counter()
+        # 批量检索共享一个追踪；各问题的 LLM 生成不计入（并发执行，单独记录意义不大）
+        with request_trace("qa.ask_batch", self.settings, queries=len(queries), top_k=top_k):
+            with trace_span("retrieve", queries=len(queries)):
+                if hasattr(self.retriever, "search_batch"):
+                    all_chunks = await self.retriever.search_batch(queries, top_k=top_k, library_ids=library_ids)
+                else:
+                    all_chunks = await asyncio.gather(
+                        *[self.retriever.search(q, top_k=top_k, library_ids=library_ids) for q in queries]
+                    )
+
+        semaphore = asyncio.Semaphore(concurrency or self.settings.qa_batch_llm_concurrency)
+
+        async def _answer(index: int) -> tuple[int, PipelineResult]:
+            chunks = all_chunks[index]
+            if not chunks:
+                answer = "抱歉，未找到相关文档内容。请确保：\n1. 文档已成功向量化\n2. 文档库ID正确\n3. 文档库中有相关内容"
+            else:
+                context = "\n\n".join(chunk.text for chunk in chunks)
+                BATCH_QUEUE_DEPTH.inc()
+                try:
+                    async with semaphore:
+                        answer = await self._generate(context=context, question=queries[index], role=role)
+                finally:
+                    BATCH_QUEUE_DEPTH.dec()
+            references = [
+                {"document_id": c.document_id, "score": c.score, "metadata": c.metadata} for c in chunks
+            ]
+            latency_ms = int((time.perf_counter() - start) * 1000)
+            return index, PipelineResult(answer=answer, references=references, latency_ms=latency_ms)
+
+        tasks = [asyncio.create_task(_answer(i)) for i in range(len(queries))]
+        try:
+            for task in asyncio.as_completed(tasks):
+                yield await task
+        finally:
+            # 客户端提前断开时取消尚未完成的生成任务
+            for task in tasks:
+                task.cancel()
 
     async def _generate(self, *, context: str, question: str, role: str | None) -> str:
         """Generate answer using LangChain LLM chain; fallback to demo."""
@@ -0,0 +1,155 @@
+"""
+向量库与数据库对账：清理没有对应数据库记录的向量与集合。
+
+历史上删除文档、重新向量化时不会删除 Chroma 中的旧向量，这些孤儿向量会被检索命中后丢弃，
+并拖慢 BM25 索引重建。对账规则：
+- 集合 library_<id> 对应的文档库已不存在 → 删除整个集合
+- 向量 ID 在 chunks 表中不存在（文档已删除或已重新切分）→ 删除该向量
+- chunks 表中 document_id 指向不存在文档的行 → 删除
+
+dry_run=True 时只统计不删除。
+
+向量化先写 Chroma、后提交 chunk 行，与入库并发运行时，扫描时刚写入、尚未提交的向量会被误判为孤儿。
+因此执行删除前先等待一个宽限期，再在新事务中复查，只删除仍然是孤儿的向量与集合。
+"""
+import asyncio
+import logging
+import uuid
+from dataclasses import dataclass, field
+
+from sqlalchemy import delete, exists, func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.db.bulk import batched
+from app.db.models import Chunk, Document, DocumentLibrary
+
+logger = logging.getLogger(__name__)
+
+COLLECTION_PREFIX = "library_"
+DEFAULT_COLLECTION = "library_default"
+
+
+@dataclass
+class ReconcileReport:
+    dry_run: bool = True
+    collections_scanned: int = 0
+    vectors_scanned: int = 0
+    orphan_vectors: int = 0
+    orphan_collections: list[str] = field(default_factory=list)
+    orphan_chunk_rows: int = 0
+
+
+async def _known_collections(session: AsyncSession) -> set[str]:
+    rows = (await session.execute(select(DocumentLibrary.id, DocumentLibrary.vector_collection_name))).all()
+    names = {DEFAULT_COLLECTION}
+    for library_id, collection_name in rows:
+        names.add(f"{COLLECTION_PREFIX}{library_id}")
+        if collection_name:
+            names.add(collection_name)
+    return names
+
+
+async def _missing_chunk_ids(session: AsyncSession, vector_ids: list[str]) -> list[str]:
+    """
+    返回没有有效 chunk 行的向量 ID：chunk 不存在，或其文档已不存在（dry run 时孤儿 chunk 行尚未删除）。
+    非 UUID 格式的 ID 不是本系统写入的，跳过。
+    """
+    parsed: dict[uuid.UUID, str] = {}
+    for vector_id in vector_ids:
+        try:
+            parsed[uuid.UUID(vector_id)] = vector_id
+        except ValueError:
+            continue
+    if not parsed:
+        return []
+    existing = set(
+        (
+            await session.execute(
+                select(Chunk.id).join(Document, Document.id == Chunk.document_id).where(Chunk.id.in_(list(parsed)))
+            )
+        ).scalars().all()
+    )
+    return [vector_id for chunk_id, vector_id in parsed.items() if chunk_id not in existing]
+
+
+async def reconcile_vectors(
+    session: AsyncSession,
+    client,
+    *,
+    dry_run: bool = True,
+    page_size: int = 1000,
+    grace_seconds: float = 5.0,
+) -> ReconcileReport:
+    """
+    Args:
+        session: 数据库会话（dry_run=False 时会提交删除的孤儿 chunk 行）
+        client: chromadb 客户端（如 DocumentIngestor()._client）
+        dry_run: 只统计不删除
+        page_size: 每次从集合读取的向量数，也是每条 SQL 的 IN 列表长度
+        grace_seconds: 删除前等待的秒数，需大于向量化从写入向量到提交 chunk 行的耗时
+    """
+    report = ReconcileReport(dry_run=dry_run)
+
+    # chunks 表中的孤儿行（先处理，随后对应的向量也会被判定为孤儿）
+    orphan_rows = ~exists().where(Document.id == Chunk.document_id)
+    report.orphan_chunk_rows = (await session.execute(select(func.count(Chunk.id)).where(orphan_rows))).scalar() or 0
+    if report.orphan_chunk_rows and not dry_run:
+        await session.execute(delete(Chunk).where(orphan_rows).execution_options(synchronize_session=False))
+        await session.commit()
+
+    known = await _known_collections(session)
+    orphan_collections: list[str] = []
+    candidates: dict[str, list[str]] = {}
+    for entry in client.list_collections():
+        name = entry if isinstance(entry, str) else entry.name
+        if not name.startswith(COLLECTION_PREFIX):
+            continue
+        report.collections_scanned += 1
+        if name not in known:
+            orphan_collections.append(name)
+            continue
+
+        collection = client.get_collection(name=name)
+        orphan_ids: list[str] = []
+        offset = 0
+        while True:
+            page = collection.get(include=[], limit=page_size, offset=offset)
+            ids = page["ids"]
+            if not ids:
+                break
+            report.vectors_scanned += len(ids)
+            orphan_ids.extend(await _missing_chunk_ids(session, ids))
+            offset += len(ids)
+        if orphan_ids:
+            candidates[name] = orphan_ids
+
+    if dry_run or not (orphan_collections or candidates):
+        report.orphan_collections = orphan_collections
+        report.orphan_vectors = sum(len(ids) for ids in candidates.values())
+        return report
+
+    # 结束扫描所用的事务，宽限期后在新事务中复查：期间提交的文档库与 chunk 行不再视为孤儿
+    await session.commit()
+    await asyncio.sleep(grace_seconds)
+
+    known = await _known_collections(session)
+    for name in orphan_collections:
+        if name in known:
+            continue
+        report.orphan_collections.append(name)
+        client.delete_collection(name=name)
+        logger.info(f"🗑️ 删除孤儿向量集合 {name}")
+
+    # 扫描完成后再删除，避免删除过程中分页偏移错位
+    for name, orphan_ids in candidates.items():
+        confirmed: list[str] = []
+        for batch in batched(orphan_ids, page_size):
+            confirmed.extend(await _missing_chunk_ids(session, batch))
+        report.orphan_vectors += len(confirmed)
+        if confirmed:
+            collection = client.get_collection(name=name)
+            for batch in batched(confirmed, page_size):
+                collection.delete(ids=batch)
+            logger.info(f"🗑️ 集合 {name} 删除 {len(confirmed)} 个孤儿向量")
+
+    return report
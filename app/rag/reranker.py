@@ -2,12 +2,16 @@
 重排序模块：使用 Cross-Encoder 对检索结果进行重新排序，提升检索质量。
 支持缓存机制以提升重复查询的性能。
 """
+import asyncio
 import hashlib
-import json
 import logging
 from dataclasses import replace
 from typing import Any
 
+from app.core.cache import TieredCache
+from app.core.serialization import Float32Serializer
+from app.core.tracing import trace_span
+
 logger = logging.getLogger(__name__)
 
 
@@ -32,8 +36,8 @@ class Reranker:
         self.model = None
         self.model_name = model_name or "BAAI/bge-reranker-base"
         self.cache_ttl = 7200  # 默认2小时
-        self._redis_client = None
-        self._memory_cache = {}  # 内存缓存作为后备
+        self.batch_size = 32
+        self._cache: TieredCache | None = None
         
         if self.enable:
             try:
@@ -43,6 +47,7 @@ class Reranker:
                 # 优先使用 Settings 中的配置，其次使用环境变量
                 from app.core.config import get_settings
                 settings = get_settings()
+                self.batch_size = settings.rerank_batch_size
                 hf_mirror = settings.hf_endpoint or os.getenv("HF_ENDPOINT", "")
                 if hf_mirror:
                     # 设置多个可能的环境变量，确保镜像生效
@@ -50,20 +55,16 @@ class Reranker:
                     os.environ["HUGGINGFACE_HUB_CACHE"] = os.getenv("HUGGINGFACE_HUB_CACHE", "")
                     logger.info(f"使用 Hugging Face 镜像: {hf_mirror}")
                 
-                # 初始化缓存
+                # 初始化缓存（进程内 + Redis 两级，Redis 未配置时只使用进程内缓存）
                 if self.enable_cache:
                     self.cache_ttl = settings.rerank_cache_ttl
-                    # 尝试连接 Redis（如果可用）
-                    if settings.redis_url:
-                        try:
-                            import redis.asyncio as redis
-                            self._redis_client = redis.from_url(settings.redis_url, decode_responses=True)
-                            logger.info("✅ 重排序缓存：使用 Redis")
-                        except Exception as e:
-                            logger.warning(f"⚠️ Redis 连接失败，使用内存缓存: {e}")
-                            self._redis_client = None
-                    else:
-                        logger.info("ℹ️ 重排序缓存：使用内存缓存（Redis 未配置）")
+                    self._cache = TieredCache.from_settings(
+                        "rerank", ttl=self.cache_ttl, serializer=Float32Serializer()
+                    )
+                    logger.info(
+                        "✅ 重排序缓存：进程内 + Redis" if settings.redis_url
+                        else "ℹ️ 重排序缓存：使用内存缓存（Redis 未配置）"
+                    )
                 
                 # 在设置环境变量后再导入
                 from sentence_transformers import CrossEncoder
@@ -100,72 +101,15 @@ class Reranker:
     
     async def _get_cached_scores(self, cache_key: str) -> list[float] | None:
         """从缓存获取重排序分数"""
-        if not self.enable_cache:
+        if self._cache is None:
             return None
-        
-        try:
-            # 优先使用 Redis
-            if self._redis_client:
-                try:
-                    cached = await self._redis_client.get(cache_key)
-                    if cached:
-                        scores = json.loads(cached)
-                        logger.debug(f"重排序缓存命中（Redis）: {cache_key}")
-                        return scores
-                except Exception as e:
-                    logger.debug(f"Redis 缓存读取失败: {e}")
-            
-            # 后备：使用内存缓存
-            if cache_key in self._memory_cache:
-                cached_data = self._memory_cache[cache_key]
-                scores = cached_data.get("scores")
-                logger.debug(f"重排序缓存命中（内存）: {cache_key}")
-                return scores
-        except Exception as e:
-            logger.debug(f"缓存读取失败: {e}")
-        
-        return None
+        return await self._cache.get(cache_key)
     
     async def _set_cached_scores(self, cache_key: str, scores: list[float]) -> None:
         """缓存重排序分数"""
-        if not self.enable_cache:
+        if self._cache is None:
             return
-        
-        try:
-            # 优先使用 Redis
-            if self._redis_client:
-                try:
-                    await self._redis_client.setex(
-                        cache_key,
-                        self.cache_ttl,
-                        json.dumps(scores)
-                    )
-                    logger.debug(f"重排序缓存写入（Redis）: {cache_key}, TTL: {self.cache_ttl}s")
-                    return
-                except Exception as e:
-                    logger.debug(f"Redis 缓存写入失败: {e}")
-            
-            # 后备：使用内存缓存（限制大小，避免内存溢出）
-            if len(self._memory_cache) < 1000:  # 最多缓存1000条
-                self._memory_cache[cache_key] = {
-                    "scores": scores,
-                    "timestamp": __import__("time").time()
-                }
-                logger.debug(f"重排序缓存写入（内存）: {cache_key}")
-            else:
-                # 简单的 LRU：删除最旧的条目
-                if self._memory_cache:
-                    oldest_key = min(
-                        self._memory_cache.keys(),
-                        key=lambda k: self._memory_cache[k].get("timestamp", 0)
-                    )
-                    del self._memory_cache[oldest_key]
-                    self._memory_cache[cache_key] = {
-                        "scores": scores,
-                        "timestamp": __import__("time").time()
-                    }
-        except Exception as e:
-            logger.debug(f"缓存写入失败: {e}")
+        await self._cache.set(cache_key, scores)
     
     async def rerank_async(
         self,
@@ -190,54 +134,137 @@ class Reranker:
         if len(chunks) <= 1:
             return chunks
         
-        try:
-            # 构建查询-文档对
-            chunk_texts = [chunk.text for chunk in chunks]
-            pairs = [[query, text] for text in chunk_texts]
+        with trace_span("rerank", candidates=len(chunks)) as span:
+            try:
+                # 构建查询-文档对
+                chunk_texts = [chunk.text for chunk in chunks]
+                pairs = [[query, text] for text in chunk_texts]
             
-            # 尝试从缓存获取
-            cache_key = self._generate_cache_key(query, chunk_texts)
-            cached_scores = await self._get_cached_scores(cache_key)
+                # 尝试从缓存获取
+                cache_key = self._generate_cache_key(query, chunk_texts)
+                cached_scores = await self._get_cached_scores(cache_key)
             
-            if cached_scores is not None:
-                # 使用缓存的分数
-                scores = cached_scores
-                logger.debug(f"使用缓存的重排序分数: {len(scores)} 条")
-            else:
-                # 计算相关性分数（Cross-Encoder 会同时编码查询和文档）
-                scores = self.model.predict(pairs)
-                # 缓存分数
-                await self._set_cached_scores(cache_key, scores.tolist() if hasattr(scores, 'tolist') else list(scores))
+                span.set(cache_hit=cached_scores is not None)
+                if cached_scores is not None:
+                    # 使用缓存的分数
+                    scores = cached_scores
+                    logger.debug(f"使用缓存的重排序分数: {len(scores)} 条")
+                else:
+                    # 计算相关性分数（Cross-Encoder 会同时编码查询和文档）
+                    scores = self.model.predict(pairs)
+                    # 缓存分数
+                    await self._set_cached_scores(cache_key, scores.tolist() if hasattr(scores, 'tolist') else list(scores))
             
-            # 将分数添加到 chunks 并重新排序
-            reranked_chunks = []
-            for chunk, score in zip(chunks, scores):
-                # 更新分数为重排序分数
-                reranked_chunk = replace(
-                    chunk,
-                    score=float(score),
-                    source_type="reranked"
-                )
-                reranked_chunks.append(reranked_chunk)
+                # 将分数添加到 chunks 并重新排序
+                reranked_chunks = []
+                for chunk, score in zip(chunks, scores):
+                    # 更新分数为重排序分数
+                    reranked_chunk = replace(
+                        chunk,
+                        score=float(score),
+                        source_type="reranked"
+                    )
+                    reranked_chunks.append(reranked_chunk)
             
-            # 按重排序分数降序排列
-            reranked_chunks.sort(key=lambda c: c.score, reverse=True)
+                # 按重排序分数降序排列
+                reranked_chunks.sort(key=lambda c: c.score, reverse=True)
             
-            logger.debug(
-                f"重排序完成: {len(chunks)} 条结果，"
-                f"分数范围: {min(scores):.4f} - {max(scores):.4f}"
-            )
+                logger.debug(
+                    f"重排序完成: {len(chunks)} 条结果，"
+                    f"分数范围: {min(scores):.4f} - {max(scores):.4f}"
+                )
             
-            # 返回 Top-K
-            if top_k is not None:
-                return reranked_chunks[:top_k]
-            return reranked_chunks
+                # 返回 Top-K
+                if top_k is not None:
+                    return reranked_chunks[:top_k]
+                return reranked_chunks
             
+            except Exception as e:
+                logger.error(f"重排序失败: {e}", exc_info=True)
+                # 失败时返回原始结果
+                return chunks
+
+    async def rerank_batch_async(
+        self,
+        items: list[tuple[str, list[Any]]],
+        top_k: int | None = None
+    ) -> list[list[Any]]:
+        """
+        批量重排序（支持缓存）：把多个查询的 query-文档对打包进同一次模型推理。
+
+        Args:
+            items: [(查询文本, 候选结果列表), ...]
+            top_k: 每个查询返回的结果数量，None 表示返回所有结果
+
+        Returns:
+            与 items 顺序一致的重排序结果列表
+        """
+        if not self.enable or not self.model:
+            return [chunks for _, chunks in items]
+
+        results: list[list[Any] | None] = [None] * len(items)
+        scores_by_item: dict[int, list[float]] = {}
+        cache_keys: dict[int, str] = {}
+        pending_pairs: list[list[str]] = []
+        pending_spans: list[tuple[int, int, int]] = []  # (item_idx, start, end)
+
+        for idx, (query, chunks) in enumerate(items):
+            if len(chunks) <= 1:
+                results[idx] = chunks
+                continue
+            cache_keys[idx] = self._generate_cache_key(query, [chunk.text for chunk in chunks])
+
+        # 一次批量读取所有缓存
+        cached = await self._cache.get_many(list(cache_keys.values())) if self._cache else [None] * len(cache_keys)
+        for (idx, _), cached_scores in zip(cache_keys.items(), cached):
+            if cached_scores is not None:
+                scores_by_item[idx] = cached_scores
+                continue
+            query, chunks = items[idx]
+            start = len(pending_pairs)
+            pending_pairs.extend([query, chunk.text] for chunk in chunks)
+            pending_spans.append((idx, start, len(pending_pairs)))
+
+        if pending_pairs:
+            with trace_span(
+                "rerank", queries=len(items), pairs=len(pending_pairs), cache_hits=len(scores_by_item)
+            ):
+                scores = await self._predict_batch(pending_pairs)
+
+            fresh: list[tuple[str, list[float]]] = []
+            for idx, start, end in pending_spans:
+                if scores is None:
+                    # 失败时返回原始结果
+                    results[idx] = items[idx][1]
+                    continue
+                item_scores = scores[start:end]
+                scores_by_item[idx] = item_scores
+                fresh.append((cache_keys[idx], item_scores))
+            if fresh and self._cache:
+                await self._cache.set_many(fresh)
+
+        for idx, item_scores in scores_by_item.items():
+            reranked_chunks = [
+                replace(chunk, score=float(score), source_type="reranked")
+                for chunk, score in zip(items[idx][1], item_scores)
+            ]
+            reranked_chunks.sort(key=lambda c: c.score, reverse=True)
+            results[idx] = reranked_chunks[:top_k] if top_k is not None else reranked_chunks
+
+        logger.debug(
+            f"批量重排序完成: {len(items)} 个查询，{len(pending_pairs)} 个 pair 参与推理"
+        )
+        return [r if r is not None else items[i][1] for i, r in enumerate(results)]
+
+    async def _predict_batch(self, pairs: list[list[str]]) -> list[float] | None:
+        """所有未命中缓存的 pair 共享同一次推理，由模型按 batch_size 分批；失败返回 None。"""
+        try:
+            scores = await asyncio.to_thread(self.model.predict, pairs, batch_size=self.batch_size)
+            return scores.tolist() if hasattr(scores, 'tolist') else list(scores)
         except Exception as e:
-            logger.error(f"重排序失败: {e}", exc_info=True)
-            # 失败时返回原始结果
-            return chunks
-    
+            logger.error(f"批量重排序失败: {e}", exc_info=True)
+            return None
+
     def rerank(
         self,
         query: str,
@@ -2,17 +2,22 @@ from dataclasses import dataclass
 from typing import Any
 from uuid import UUID
 import asyncio
+import hashlib
 import logging
 
 from langchain_community.vectorstores import Chroma
 from langchain_community.retrievers import BM25Retriever
 from langchain_core.documents import Document
-from chromadb.utils import embedding_functions
 import chromadb
 import numpy as np
 
+from app.core.cache import TieredCache
 from app.core.config import get_settings, Settings
-from app.rag.ingestion import _resolve_chroma_path
+from app.core.serialization import Float32Serializer
+from app.core.metrics import BM25_INDEX_DOCUMENTS
+from app.core.query_log import normalize_query
+from app.core.tracing import trace_span
+from app.rag.ingestion import _build_embedding_fn, _resolve_chroma_path
 from app.rag.reranker import Reranker
 from app.rag.synonyms import QueryExpander, SynonymDict
 
@@ -28,23 +33,11 @@ class RetrievedChunk:
     source_type: str = "vector"  # "vector", "bm25", or "hybrid"
 
 
-def _build_embedding_fn(settings: Settings):
-    # Prefer configured embedding provider; fallback to default.
-    if settings.llm_provider == "dashscope" and (
-        settings.dashscope_embedding_api_key or settings.dashscope_api_key
-    ):
-        # DashScope provides an OpenAI-compatible endpoint; use api_base to direct traffic.
-        return embedding_functions.OpenAIEmbeddingFunction(
-            api_key=settings.dashscope_embedding_api_key or settings.dashscope_api_key,
-            model_name=settings.embedding_model,
-            api_base=settings.dashscope_embedding_base_url or settings.dashscope_base_url,
-        )
-    if settings.llm_provider == "openai" and settings.openai_api_key:
-        return embedding_functions.OpenAIEmbeddingFunction(
-            api_key=settings.openai_api_key,
-            model_name=settings.embedding_model,
-        )
-    return embedding_functions.DefaultEmbeddingFunction()
+def _embedding_fn_id(embedding_fn) -> str:
+    """实际使用的嵌入函数的标识（类名 + 模型 + 端点）：未配置 API Key 时会回退到默认模型，不能只看配置项。"""
+    model_name = getattr(embedding_fn, "model_name", None) or ""
+    api_base = getattr(embedding_fn, "api_base", None) or ""
+    return f"{type(embedding_fn).__name__}|{model_name}|{api_base}"
 
 
 class LangchainRetriever:
@@ -97,7 +90,10 @@ class LangchainRetriever:
         top_k: int = 5,
         library_ids: list[UUID] | None = None
     ) -> list[RetrievedChunk]:
-        library_ids_to_search = library_ids if library_ids else [None]
+        # None 表示默认库；空列表表示调用方没有可检索的库，直接返回空结果
+        library_ids_to_search = library_ids if library_ids is not None else [None]
+        if not library_ids_to_search:
+            return []
         results: list[RetrievedChunk] = []
 
         async def _search_collection(lib_id: UUID | None):
@@ -223,6 +219,19 @@ def _weighted_reciprocal_rank(
     return final_chunks
 
 
+def _dedupe_and_sort(chunks: list[RetrievedChunk]) -> list[RetrievedChunk]:
+    """去重并按分数降序排列（使用 document_id + text 前50字符作为去重键）。"""
+    seen = set()
+    unique_results = []
+    for chunk in chunks:
+        chunk_key = f"{chunk.document_id}:{chunk.text[:50]}"
+        if chunk_key not in seen:
+            seen.add(chunk_key)
+            unique_results.append(chunk)
+    unique_results.sort(key=lambda c: c.score, reverse=True)
+    return unique_results
+
+
 class HybridRetriever(LangchainRetriever):
     """
     混合检索器：结合向量检索（ChromaDB）和关键词检索（BM25）
@@ -256,6 +265,13 @@ class HybridRetriever(LangchainRetriever):
             synonym_dict=synonym_dict,
             enable=enable_expansion
         )
+        # 查询向量缓存（进程内 + Redis 两级）
+        self._embedding_cache: TieredCache | None = (
+            TieredCache.from_settings(
+                "embedding", ttl=self.settings.embedding_cache_ttl, serializer=Float32Serializer()
+            )
+            if self.settings.embedding_cache_enable else None
+        )
         logger.info("🔄 初始化混合检索器（向量 + BM25 + 重排序 + 查询扩展，支持增量更新）")
     
     def _reload_bm25_index(self, library_id: UUID | None, force: bool = False) -> BM25Retriever | None:
@@ -315,9 +331,11 @@ class HybridRetriever(LangchainRetriever):
                 docs.append(Document(page_content=text, metadata=meta))
             
             # 构建 BM25 检索器
-            bm25_retriever = BM25Retriever.from_documents(docs)
+            with trace_span("bm25_rebuild", library_id=lib_key, documents=len(docs)):
+                bm25_retriever = BM25Retriever.from_documents(docs)
             # 设置返回数量（稍大于 top_k，以便后续融合时有更多候选）
             bm25_retriever.k = 20
+            BM25_INDEX_DOCUMENTS.labels(library_id=lib_key).set(len(docs))
             
             # 更新缓存
             self._document_counts[lib_key] = current_count
@@ -366,9 +384,22 @@ class HybridRetriever(LangchainRetriever):
         self,
         query: str,
         library_id: UUID | None,
-        top_k: int
+        top_k: int,
+        query_embedding: list[float] | None = None
+    ) -> list[RetrievedChunk]:
+        """执行向量检索（复用父类逻辑）；提供 query_embedding 时跳过嵌入计算。"""
+        with trace_span("vector_search", library_id=str(library_id) if library_id else None) as span:
+            results = await self._vector_search_impl(query, library_id, top_k, query_embedding)
+            span.set(candidates=len(results))
+        return results
+
+    async def _vector_search_impl(
+        self,
+        query: str,
+        library_id: UUID | None,
+        top_k: int,
+        query_embedding: list[float] | None
     ) -> list[RetrievedChunk]:
-        """执行向量检索（复用父类逻辑）"""
         results: list[RetrievedChunk] = []
         
         try:
@@ -379,11 +410,23 @@ class HybridRetriever(LangchainRetriever):
                 logger.debug(f"Collection for library {library_id} does not exist, returning empty results")
                 return results
             
-            query_results = await asyncio.to_thread(
-                collection.query,
-                query_texts=[query],
-                n_results=top_k
-            )
+            query_results = None
+            if query_embedding is not None:
+                try:
+                    query_results = await asyncio.to_thread(
+                        collection.query,
+                        query_embeddings=[query_embedding],
+                        n_results=top_k
+                    )
+                except Exception as e:
+                    # 集合可能由其他嵌入模型写入（如向量维度不一致），改用集合自身的嵌入函数
+                    logger.warning(f"按查询向量检索失败，回退到 Chroma 内置嵌入 (library_id: {library_id}): {e}")
+            if query_results is None:
+                query_results = await asyncio.to_thread(
+                    collection.query,
+                    query_texts=[query],
+                    n_results=top_k
+                )
             
             if not query_results or not query_results.get('ids') or not query_results['ids'][0]:
                 return results
@@ -416,6 +459,17 @@ class HybridRetriever(LangchainRetriever):
         top_k: int
     ) -> list[RetrievedChunk]:
         """执行 BM25 关键词检索"""
+        with trace_span("bm25_search", library_id=str(library_id) if library_id else None) as span:
+            results = await self._bm25_search_impl(query, library_id, top_k)
+            span.set(candidates=len(results))
+        return results
+
+    async def _bm25_search_impl(
+        self,
+        query: str,
+        library_id: UUID | None,
+        top_k: int
+    ) -> list[RetrievedChunk]:
         results: list[RetrievedChunk] = []
         
         try:
@@ -459,30 +513,45 @@ class HybridRetriever(LangchainRetriever):
         Args:
             query: 查询文本
             top_k: 返回结果数量
-            library_ids: 要搜索的文档库ID列表，None 表示搜索所有库
+            library_ids: 要搜索的文档库ID列表，None 表示搜索默认库，空列表返回空结果
             use_hybrid: 是否使用混合检索（默认 True），False 则仅使用向量检索
         
         Returns:
             检索结果列表，按 RRF 分数降序排列
         """
-        library_ids_to_search = library_ids if library_ids else [None]
+        # None 表示默认库；空列表表示调用方没有可检索的库，直接返回空结果
+        library_ids_to_search = library_ids if library_ids is not None else [None]
+        if not library_ids_to_search:
+            return []
         all_results: list[RetrievedChunk] = []
+        # 与查询日志记录的文本一致，预热回放才能命中线上请求使用的缓存键
+        query = normalize_query(query)
         
         # 查询扩展（如果启用）
-        expanded_query = await self.query_expander.expand_async(
-            query,
-            use_llm=self.settings.use_llm_expansion if hasattr(self, 'settings') and self.settings else False
-        )
+        with trace_span("expand") as span:
+            expanded_query = await self.query_expander.expand_async(
+                query,
+                use_llm=self.settings.use_llm_expansion if hasattr(self, 'settings') and self.settings else False
+            )
+            span.set(expanded=expanded_query != query)
         if expanded_query != query:
             logger.debug(f"查询扩展: '{query}' → '{expanded_query}'")
             query = expanded_query  # 使用扩展后的查询
+
+        # 查询向量只计算一次，在所有库之间复用
+        query_embedding: list[float] | None = None
+        with trace_span("embed", queries=1):
+            try:
+                query_embedding = (await self._embed_queries([query]))[0]
+            except Exception as e:
+                logger.warning(f"查询嵌入失败，回退到 Chroma 内置嵌入: {e}")
         
         # 对每个库执行检索
         for lib_id in library_ids_to_search:
             if use_hybrid:
                 # 混合检索：并行执行向量检索和 BM25 检索
                 vector_results, bm25_results = await asyncio.gather(
-                    self._vector_search(query, lib_id, top_k),
+                    self._vector_search(query, lib_id, top_k, query_embedding=query_embedding),
                     self._bm25_search(query, lib_id, top_k)
                 )
                 
@@ -497,47 +566,180 @@ class HybridRetriever(LangchainRetriever):
                     all_results.extend(merged)
             else:
                 # 仅向量检索（回退到父类行为）
-                vector_results = await self._vector_search(query, lib_id, top_k)
+                vector_results = await self._vector_search(query, lib_id, top_k, query_embedding=query_embedding)
                 all_results.extend(vector_results)
         
         if not all_results:
             logger.warning(f"未找到任何结果: query={query}, library_ids={library_ids}")
             return []
-        
-        # 去重并排序（按 RRF 分数或相似度分数）
-        # 使用 document_id + text 前50字符作为去重键
-        seen = set()
-        unique_results = []
-        for chunk in all_results:
-            chunk_key = f"{chunk.document_id}:{chunk.text[:50]}"
-            if chunk_key not in seen:
-                seen.add(chunk_key)
-                unique_results.append(chunk)
-        
-        # 按分数降序排列
-        unique_results.sort(key=lambda c: c.score, reverse=True)
-        
+
+        with trace_span("fuse", candidates=len(all_results)) as span:
+            unique_results = _dedupe_and_sort(all_results)
+            span.set(unique=len(unique_results))
+
         # 重排序：使用 Cross-Encoder 对筛选后的候选结果重新排序
         # 这样可以先通过 RRF 融合筛选出候选，再用重排序精排
         if self.reranker.is_enabled() and len(unique_results) > 1:
-            # 计算重排序候选数量
-            # 如果配置了固定数量，使用配置值；否则使用 top_k + 3（适度减少）
-            if self.settings.rerank_candidate_count > 0:
-                candidate_count = min(self.settings.rerank_candidate_count, len(unique_results))
-            else:
-                # 默认使用 top_k + 3，比原来的 top_k * 2 更少，提升速度
-                candidate_count = min(top_k + 3, len(unique_results))
-            
-            rerank_candidates = unique_results[:candidate_count]
+            rerank_candidates = unique_results[:self._rerank_candidate_count(top_k, len(unique_results))]
             # 使用异步重排序（支持缓存）
             reranked = await self.reranker.rerank_async(query, rerank_candidates, top_k=top_k)
             logger.debug(
                 f"重排序: {len(rerank_candidates)} 条候选 → {len(reranked)} 条结果"
             )
             return reranked
-        
+
         return unique_results[:top_k]
-    
+
+    def _rerank_candidate_count(self, top_k: int, available: int) -> int:
+        """计算重排序候选数量：配置了固定数量则使用配置值，否则使用 top_k + 3。"""
+        if self.settings.rerank_candidate_count > 0:
+            return min(self.settings.rerank_candidate_count, available)
+        # 默认使用 top_k + 3，比原来的 top_k * 2 更少，提升速度
+        return min(top_k + 3, available)
+
+    def _embedding_cache_key(self, text: str) -> str:
+        # 向量与实际使用的嵌入模型绑定：模型或提供方变化时自然换键
+        content = f"{_embedding_fn_id(self.embedding_fn)}|{text}"
+        return f"emb:{hashlib.md5(content.encode('utf-8')).hexdigest()}"
+
+    async def _embed_queries(self, queries: list[str]) -> list[list[float]]:
+        """为所有查询生成向量：先查嵌入缓存，未命中的查询一次调用嵌入模型。"""
+        keys = [self._embedding_cache_key(q) for q in queries]
+        cached = (
+            await self._embedding_cache.get_many(keys) if self._embedding_cache else [None] * len(queries)
+        )
+        missing = [i for i, vector in enumerate(cached) if vector is None]
+        if missing:
+            embeddings = await asyncio.to_thread(self.embedding_fn, [queries[i] for i in missing])
+            fresh = [e.tolist() if hasattr(e, 'tolist') else list(e) for e in embeddings]
+            for i, vector in zip(missing, fresh):
+                cached[i] = vector
+            if self._embedding_cache:
+                await self._embedding_cache.set_many([(keys[i], cached[i]) for i in missing])
+        return cached
+
+    async def _vector_search_batch(
+        self,
+        queries: list[str],
+        query_embeddings: list[list[float]] | None,
+        library_id: UUID | None,
+        top_k: int
+    ) -> list[list[RetrievedChunk]]:
+        """在一次 Chroma 查询中检索所有查询；优先使用预先计算的查询向量，失败时回退到 query_texts。"""
+        results: list[list[RetrievedChunk]] = [[] for _ in queries]
+
+        try:
+            collection = self._get_chroma_collection(library_id)
+            if collection is None:
+                logger.debug(f"Collection for library {library_id} does not exist, returning empty results")
+                return results
+
+            query_results = None
+            if query_embeddings is not None:
+                try:
+                    query_results = await asyncio.to_thread(
+                        collection.query,
+                        query_embeddings=query_embeddings,
+                        n_results=top_k
+                    )
+                except Exception as e:
+                    logger.warning(f"按查询向量批量检索失败，回退到 Chroma 内置嵌入 (library_id: {library_id}): {e}")
+            if query_results is None:
+                query_results = await asyncio.to_thread(
+                    collection.query,
+                    query_texts=queries,
+                    n_results=top_k
+                )
+            if not query_results or not query_results.get('ids'):
+                return results
+
+            for q_idx, ids in enumerate(query_results['ids']):
+                documents = query_results['documents'][q_idx]
+                metadatas = query_results['metadatas'][q_idx] if query_results.get('metadatas') else [{}] * len(ids)
+                distances = query_results['distances'][q_idx] if query_results.get('distances') else [0.0] * len(ids)
+                for doc_id, doc_text, meta, distance in zip(ids, documents, metadatas, distances):
+                    similarity = 1.0 / (1.0 + abs(distance)) if distance != 0 else 1.0
+                    results[q_idx].append(
+                        RetrievedChunk(
+                            document_id=str(meta.get("document_id", doc_id)),
+                            text=doc_text,
+                            score=similarity,
+                            metadata=meta,
+                            source_type="vector"
+                        )
+                    )
+        except Exception as e:
+            logger.error(f"批量向量检索失败 (library_id: {library_id}): {e}", exc_info=True)
+
+        return results
+
+    async def search_batch(
+        self,
+        queries: list[str],
+        top_k: int = 5,
+        library_ids: list[UUID] | None = None,
+        use_hybrid: bool = True
+    ) -> list[list[RetrievedChunk]]:
+        """
+        批量检索：所有查询共享一次嵌入调用、每个库一次向量查询、一次批量重排序。
+
+        Args:
+            queries: 查询文本列表
+            top_k: 每个查询返回的结果数量
+            library_ids: 要搜索的文档库ID列表，None 表示搜索默认库，空列表返回空结果
+            use_hybrid: 是否使用混合检索（默认 True）
+
+        Returns:
+            与 queries 顺序一致的检索结果列表
+        """
+        if not queries:
+            return []
+        library_ids_to_search = library_ids if library_ids is not None else [None]
+        if not library_ids_to_search:
+            return [[] for _ in queries]
+        use_llm = self.settings.use_llm_expansion if self.settings else False
+        with trace_span("expand", queries=len(queries)):
+            expanded = await asyncio.gather(
+                *[self.query_expander.expand_async(normalize_query(q), use_llm=use_llm) for q in queries]
+            )
+        expanded_queries = list(expanded)
+
+        # 与单条 search 一致：嵌入服务不可用时回退到 Chroma 内置嵌入，而不是让整批（已开始流式输出的）请求失败
+        query_embeddings: list[list[float]] | None = None
+        with trace_span("embed", queries=len(queries)):
+            try:
+                query_embeddings = await self._embed_queries(expanded_queries)
+            except Exception as e:
+                logger.warning(f"批量查询嵌入失败，回退到 Chroma 内置嵌入: {e}")
+        per_query: list[list[RetrievedChunk]] = [[] for _ in queries]
+
+        for lib_id in library_ids_to_search:
+            with trace_span("vector_search", library_id=str(lib_id) if lib_id else None, queries=len(queries)) as span:
+                vector_batches = await self._vector_search_batch(expanded_queries, query_embeddings, lib_id, top_k)
+                span.set(candidates=sum(len(b) for b in vector_batches))
+            if use_hybrid:
+                bm25_batches = await asyncio.gather(
+                    *[self._bm25_search(q, lib_id, top_k) for q in expanded_queries]
+                )
+            else:
+                bm25_batches = [[] for _ in queries]
+            for idx, (vector_results, bm25_results) in enumerate(zip(vector_batches, bm25_batches)):
+                if use_hybrid and (vector_results or bm25_results):
+                    per_query[idx].extend(_weighted_reciprocal_rank(vector_results, bm25_results))
+                else:
+                    per_query[idx].extend(vector_results)
+
+        with trace_span("fuse", candidates=sum(len(r) for r in per_query)):
+            ranked = [_dedupe_and_sort(results) for results in per_query]
+        if not self.reranker.is_enabled():
+            return [results[:top_k] for results in ranked]
+
+        rerank_items = [
+            (q, results[:self._rerank_candidate_count(top_k, len(results))])
+            for q, results in zip(expanded_queries, ranked)
+        ]
+        return await self.reranker.rerank_batch_async(rerank_items, top_k=top_k)
+
     def invalidate_bm25_cache(self, library_id: UUID | None = None, chunk_ids: list[str] | None = None):
         """
         标记指定库的 BM25 索引需要更新（增量更新标记）。
@@ -0,0 +1,130 @@
+"""
+缓存预热：按频率回放查询日志中的高频查询，预先填充查询向量与重排序缓存。
+
+搜索结果缓存按用户隔离（缓存键包含用户ID，结果经过权限过滤），无法脱离用户上下文预热；
+但它未命中时的主要开销（查询向量、BM25/向量检索后的重排序）来自这里预热的共享缓存。
+"""
+import asyncio
+import logging
+import time
+import uuid
+from dataclasses import dataclass, field
+
+from prometheus_client import REGISTRY
+
+from app.core.config import Settings
+from app.core.query_log import LoggedQuery, top_queries
+from app.core.redis_pool import get_redis_client
+from app.rag.retriever import HybridRetriever
+
+logger = logging.getLogger(__name__)
+
+WARMUP_LOCK_KEY = "querylog:warmup:lock"
+WARMED_CACHES = ("embedding", "rerank")
+
+
+@dataclass
+class WarmupReport:
+    queries: int = 0
+    errors: int = 0
+    seconds: float = 0.0
+    # 各缓存在预热回放期间的命中率（首次预热时接近 0，说明缓存确实被填充）
+    hit_ratio: dict[str, float | None] = field(default_factory=dict)
+    # verify=True 时第二遍回放的命中率（预热效果）
+    verify_hit_ratio: dict[str, float | None] = field(default_factory=dict)
+
+
+def _cache_counts() -> dict[str, tuple[float, float]]:
+    counts = {}
+    for cache in WARMED_CACHES:
+        hits = REGISTRY.get_sample_value("cache_requests_total", {"cache": cache, "result": "hit"}) or 0.0
+        misses = REGISTRY.get_sample_value("cache_requests_total", {"cache": cache, "result": "miss"}) or 0.0
+        counts[cache] = (hits, misses)
+    return counts
+
+
+def _hit_ratio(before: dict[str, tuple[float, float]], after: dict[str, tuple[float, float]]) -> dict[str, float | None]:
+    ratios = {}
+    for cache in WARMED_CACHES:
+        hits = after[cache][0] - before[cache][0]
+        total = hits + after[cache][1] - before[cache][1]
+        # 该缓存未启用（如未开启重排序）时没有任何查询
+        ratios[cache] = round(hits / total, 4) if total else None
+    return ratios
+
+
+async def _replay(
+    retriever: HybridRetriever,
+    queries: list[LoggedQuery],
+    rate: float,
+) -> tuple[int, dict[str, float | None]]:
+    errors = 0
+    interval = 1 / rate if rate > 0 else 0.0
+    before = _cache_counts()
+    for item in queries:
+        started = time.perf_counter()
+        try:
+            library_ids = [uuid.UUID(lib) for lib in item.library_ids] if item.library_ids else None
+            await retriever.search(item.query, top_k=item.top_k, library_ids=library_ids)
+        except Exception as e:
+            errors += 1
+            logger.debug(f"预热查询失败: {item.query!r}: {e}")
+        # 限速：保证相邻两次查询的开始时间间隔不小于 1/rate 秒
+        remaining = interval - (time.perf_counter() - started)
+        if remaining > 0:
+            await asyncio.sleep(remaining)
+    return errors, _hit_ratio(before, _cache_counts())
+
+
+async def warm_caches(
+    retriever: HybridRetriever,
+    queries: list[LoggedQuery],
+    rate: float = 5.0,
+    verify: bool = False,
+) -> WarmupReport:
+    """
+    依次回放查询（最多 rate 条/秒），返回预热报告。
+
+    Args:
+        retriever: 检索器（使用与线上相同的实例，进程内缓存也会被填充）
+        queries: 要回放的查询（通常来自 top_queries）
+        rate: 每秒最多回放的查询数，<= 0 表示不限速
+        verify: 预热后再回放一遍并统计命中率
+    """
+    start = time.perf_counter()
+    report = WarmupReport(queries=len(queries))
+    report.errors, report.hit_ratio = await _replay(retriever, queries, rate)
+    report.seconds = round(time.perf_counter() - start, 3)
+    if verify:
+        _, report.verify_hit_ratio = await _replay(retriever, queries, 0.0)
+    return report
+
+
+async def warm_from_query_log(retriever: HybridRetriever, settings: Settings) -> WarmupReport | None:
+    """
+    启动时的预热任务：回放查询日志中频率最高的 CACHE_WARMUP_TOP_N 条查询。
+
+    多 worker 部署时通过 Redis 锁只由一个 worker 回放（Redis 缓存为共享缓存）。
+    """
+    redis_client = get_redis_client()
+    try:
+        if redis_client is not None:
+            acquired = await redis_client.set(WARMUP_LOCK_KEY, "1", nx=True, ex=settings.cache_warmup_lock_ttl)
+            if not acquired:
+                logger.info("ℹ️ 其他 worker 正在或刚完成缓存预热，跳过")
+                return None
+        queries = await top_queries(settings.cache_warmup_top_n, settings)
+    except Exception as e:
+        logger.warning(f"⚠️ 读取查询日志失败，跳过缓存预热: {e}")
+        return None
+    if not queries:
+        logger.info("ℹ️ 查询日志为空，跳过缓存预热")
+        return None
+
+    logger.info(f"🔄 开始缓存预热: {len(queries)} 条高频查询，限速 {settings.cache_warmup_rate}/s")
+    report = await warm_caches(retriever, queries, rate=settings.cache_warmup_rate)
+    logger.info(
+        f"✅ 缓存预热完成: {report.queries} 条查询，失败 {report.errors} 条，"
+        f"耗时 {report.seconds}s，回放期间命中率 {report.hit_ratio}"
+    )
+    return report
@@ -0,0 +1,22 @@
+"""
+gunicorn 配置：Prometheus 多进程模式所需的钩子。
+
+启动前清空 PROMETHEUS_MULTIPROC_DIR（避免重启后沿用旧 worker 的计数），
+worker 退出时标记其指标文件为失效，使 live* 模式的 Gauge 不再计入该进程。
+"""
+import os
+import shutil
+
+
+def on_starting(server):
+    metrics_dir = os.environ.get("PROMETHEUS_MULTIPROC_DIR")
+    if metrics_dir:
+        shutil.rmtree(metrics_dir, ignore_errors=True)
+        os.makedirs(metrics_dir, exist_ok=True)
+
+
+def child_exit(server, worker):
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        from prometheus_client import multiprocess
+
+        multiprocess.mark_process_dead(worker.pid)
@@ -0,0 +1,35 @@
+"""
+回填 documents 表的 vectorized / file_type / file_size / chunk_size 列（来自 metadata JSON），
+并按回填后的数据修正文档库统计计数。执行 004 迁移后运行一次；可重复执行。
+
+用法（在仓库根目录执行）:
+    python -m scripts.backfill_document_columns
+"""
+import asyncio
+
+import typer
+
+from app.core.library_stats import reconcile_library_stats
+from app.db.backfill import backfill_document_columns
+from app.db.session import async_session, engine
+
+cli = typer.Typer(help="Backfill promoted document columns from metadata")
+
+
+@cli.command()
+def run(batch_size: int = typer.Option(500, help="每批回填的文档数")) -> None:
+    async def _run() -> tuple[int, int]:
+        try:
+            async with async_session() as session:
+                updated = await backfill_document_columns(session, batch_size=batch_size)
+                corrected = await reconcile_library_stats(session)
+            return updated, corrected
+        finally:
+            await engine.dispose()
+
+    updated, corrected = asyncio.run(_run())
+    typer.echo(f"✅ 回填完成：更新 {updated} 个文档，修正 {corrected} 个文档库的统计计数")
+
+
+if __name__ == "__main__":
+    cli()
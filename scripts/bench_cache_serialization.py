@@ -0,0 +1,153 @@
+"""
+缓存序列化基准：对比各序列化/压缩组合的存储字节数与每次 get/set 的耗时（微秒）。
+
+载荷：
+- search: 搜索结果（中文标题与 200 字摘要）
+- rerank: 重排序分数（float 列表）
+- embedding: 查询向量（1024 维 float 列表）
+
+默认只测编解码；指定 --redis-url 时同时测量真实 Redis 的 SET/GET 往返。
+
+用法（在仓库根目录执行）:
+    python -m scripts.bench_cache_serialization
+    python -m scripts.bench_cache_serialization --redis-url redis://localhost:6379/15 --output bench_results/cache.json
+"""
+import asyncio
+import json
+import random
+import time
+from pathlib import Path
+
+import typer
+
+from app.core.serialization import (
+    Float32Serializer,
+    PayloadCodec,
+    get_compressor,
+    get_serializer,
+)
+
+cli = typer.Typer(help="Cache serialization benchmark")
+
+
+def _payloads(seed: int) -> dict[str, object]:
+    rng = random.Random(seed)
+    words = "离心泵 压缩机 换热器 轴承 密封 润滑油 振动 温度 压力 阀门 维护 检修 故障 电机 pump bearing seal".split()
+    search = [
+        {
+            "document_id": f"{rng.getrandbits(128):032x}",
+            "title": f"{rng.choice(words)}维护手册 第{i}版",
+            "snippet": "".join(rng.choice(words) for _ in range(60))[:200],
+            "score": round(rng.random(), 4),
+            "library_id": f"{rng.getrandbits(128):032x}",
+        }
+        for i in range(10)
+    ]
+    return {
+        "search": search,
+        "rerank": [rng.uniform(-10, 10) for _ in range(20)],
+        "embedding": [rng.uniform(-1, 1) for _ in range(1024)],
+    }
+
+
+def _codecs(name: str) -> dict[str, PayloadCodec]:
+    structured = ["json", "msgpack"] if name == "search" else ["json", "msgpack", "float32"]
+    codecs = {"legacy-json": None}
+    for serializer_name in structured:
+        serializer = Float32Serializer() if serializer_name == "float32" else get_serializer(serializer_name)
+        for compression in ("none", "zstd", "lz4"):
+            codecs[f"{serializer_name}+{compression}"] = PayloadCodec(
+                serializer, get_compressor(compression), compress_threshold=512
+            )
+    return codecs
+
+
+def _time_us(fn, iterations: int) -> float:
+    start = time.perf_counter()
+    for _ in range(iterations):
+        fn()
+    return (time.perf_counter() - start) / iterations * 1_000_000
+
+
+async def _redis_roundtrip(client, key: str, data: bytes, codec: PayloadCodec | None, iterations: int) -> dict:
+    set_start = time.perf_counter()
+    for _ in range(iterations):
+        await client.setex(key, 60, data)
+    set_us = (time.perf_counter() - set_start) / iterations * 1_000_000
+    get_start = time.perf_counter()
+    for _ in range(iterations):
+        raw = await client.get(key)
+        json.loads(raw) if codec is None else codec.decode(raw)
+    get_us = (time.perf_counter() - get_start) / iterations * 1_000_000
+    memory = await client.memory_usage(key)
+    await client.delete(key)
+    return {"redis_set_us": round(set_us, 2), "redis_get_us": round(get_us, 2), "redis_memory_bytes": memory}
+
+
+@cli.command()
+def run(
+    iterations: int = typer.Option(2000, help="每个组合的编解码次数"),
+    redis_url: str = typer.Option("", help="Redis 地址（可选，用于测量真实往返与内存占用）"),
+    redis_iterations: int = typer.Option(200, help="每个组合的 Redis 往返次数"),
+    seed: int = typer.Option(7, help="载荷随机种子"),
+    output: Path | None = typer.Option(None, help="结果 JSON 路径"),
+) -> None:
+    payloads = _payloads(seed)
+    results: dict[str, dict[str, dict]] = {}
+
+    for name, value in payloads.items():
+        results[name] = {}
+        for label, codec in _codecs(name).items():
+            if codec is None:
+                # 旧方式：json.dumps 字符串，无头部
+                encode = lambda value=value: json.dumps(value, ensure_ascii=False).encode("utf-8")  # noqa: E731
+                data = encode()
+                decode = lambda data=data: json.loads(data)  # noqa: E731
+            else:
+                encode = lambda value=value, codec=codec: codec.encode(value, 0.0, 0.0)  # noqa: E731
+                data = encode()
+                decode = lambda data=data, codec=codec: codec.decode(data)  # noqa: E731
+            results[name][label] = {
+                "bytes": len(data),
+                "set_encode_us": round(_time_us(encode, iterations), 2),
+                "get_decode_us": round(_time_us(decode, iterations), 2),
+            }
+
+    if redis_url:
+        import redis.asyncio as redis
+
+        async def _measure() -> None:
+            client = redis.from_url(redis_url, decode_responses=False)
+            try:
+                for name, value in payloads.items():
+                    for label, codec in _codecs(name).items():
+                        data = (
+                            json.dumps(value, ensure_ascii=False).encode("utf-8")
+                            if codec is None else codec.encode(value, 0.0, 0.0)
+                        )
+                        results[name][label].update(
+                            await _redis_roundtrip(client, f"bench:ser:{name}:{label}", data, codec, redis_iterations)
+                        )
+            finally:
+                await client.aclose()
+
+        asyncio.run(_measure())
+
+    for name, rows in results.items():
+        baseline = rows["legacy-json"]["bytes"]
+        typer.echo(f"\n[{name}]")
+        typer.echo(f"  {'format':<18}{'bytes':>8}{'ratio':>8}{'set µs':>10}{'get µs':>10}")
+        for label, row in rows.items():
+            typer.echo(
+                f"  {label:<18}{row['bytes']:>8}{row['bytes'] / baseline:>8.2f}"
+                f"{row['set_encode_us']:>10.2f}{row['get_decode_us']:>10.2f}"
+            )
+
+    if output:
+        output.parent.mkdir(parents=True, exist_ok=True)
+        output.write_text(json.dumps(results, ensure_ascii=False, indent=2), encoding="utf-8")
+        typer.echo(f"\n✅ 结果已写入 {output}")
+
+
+if __name__ == "__main__":
+    cli()
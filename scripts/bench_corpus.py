@@ -0,0 +1,160 @@
+"""
+基准测试用的合成工业语料与确定性嵌入函数。
+
+- generate_corpus: 按种子生成设备手册（Markdown，中英混排，按章节组织），
+  每本手册中埋入一条带唯一设备编号的"答案"句子，并生成对应的查询，用于计算 recall@k。
+- HashEmbeddingFunction: 基于特征哈希的本地嵌入（英文单词 + 中文二元组），
+  无需网络与模型下载，同一文本在任何机器上得到相同向量。
+"""
+import hashlib
+import math
+import random
+import re
+from dataclasses import dataclass
+from pathlib import Path
+
+import numpy as np
+from chromadb.api.types import Documents, EmbeddingFunction, Embeddings
+from chromadb.utils.embedding_functions import register_embedding_function
+
+EQUIPMENT = [
+    ("离心泵", "centrifugal pump"),
+    ("往复式压缩机", "reciprocating compressor"),
+    ("板式换热器", "plate heat exchanger"),
+    ("变频器", "frequency inverter"),
+    ("减速机", "gear reducer"),
+    ("螺杆空压机", "screw air compressor"),
+    ("冷却塔", "cooling tower"),
+    ("电动执行器", "electric actuator"),
+]
+
+CHAPTERS = [
+    ("安装说明", "Installation"),
+    ("日常维护", "Routine Maintenance"),
+    ("故障排除", "Troubleshooting"),
+    ("技术参数", "Specifications"),
+    ("安全注意事项", "Safety Notes"),
+]
+
+ZH_SENTENCES = [
+    "运行前请检查{eq}的润滑油位是否在规定范围内。",
+    "{eq}出现异常振动时应立即停机并检查地脚螺栓。",
+    "每运行两千小时需更换{eq}的密封件和过滤器。",
+    "{eq}的进口阀门必须在启动前完全打开。",
+    "如果{eq}温度过高，请检查冷却水流量和散热通道。",
+    "检修{eq}之前必须断开电源并挂牌上锁。",
+    "{eq}的轴承温升不得超过四十摄氏度。",
+    "定期记录{eq}的电流、电压和运行时间。",
+]
+
+EN_SENTENCES = [
+    "Inspect the {eq} coupling alignment after every major overhaul.",
+    "The {eq} must be grounded according to local electrical codes.",
+    "Replace worn gaskets on the {eq} to prevent leakage.",
+    "Do not operate the {eq} beyond the rated speed shown on the nameplate.",
+    "Record vibration readings of the {eq} weekly.",
+    "Clean the {eq} intake screen when the pressure drop exceeds the limit.",
+    "Use only approved lubricants for the {eq} bearings.",
+    "Verify the {eq} rotation direction before connecting the load.",
+]
+
+
+@dataclass
+class BenchQuery:
+    query: str
+    needle: str  # 正确答案所在 chunk 必须包含的文本
+    file_name: str
+
+
+@dataclass
+class BenchCorpus:
+    files: list[Path]
+    queries: list[BenchQuery]
+
+
+def generate_corpus(
+    out_dir: Path,
+    num_docs: int = 50,
+    chapters_per_doc: int = 5,
+    paragraphs_per_chapter: int = 6,
+    seed: int = 42,
+) -> BenchCorpus:
+    """生成确定性的手册语料，返回文件列表与带标准答案的查询。"""
+    rng = random.Random(seed)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    files: list[Path] = []
+    queries: list[BenchQuery] = []
+
+    for doc_idx in range(num_docs):
+        eq_zh, eq_en = EQUIPMENT[doc_idx % len(EQUIPMENT)]
+        code = f"{rng.choice('ABCDEFGHJKLMNPQRSTUVWXYZ')}{rng.choice('ABCDEFGHJKLMNPQRSTUVWXYZ')}-{1000 + doc_idx:04d}"
+        pressure = round(rng.uniform(0.4, 6.4), 1)
+        answer_chapter = rng.randrange(chapters_per_doc)
+        answer_paragraph = rng.randrange(paragraphs_per_chapter)
+        needle = f"型号 {code} 的额定工作压力为 {pressure} MPa"
+
+        lines = [f"# {eq_zh} {code} 使用手册 / {eq_en.title()} Manual", ""]
+        for ch_idx in range(chapters_per_doc):
+            zh_title, en_title = CHAPTERS[ch_idx % len(CHAPTERS)]
+            lines.append(f"## 第{ch_idx + 1}章 {zh_title} {en_title}")
+            lines.append("")
+            for p_idx in range(paragraphs_per_chapter):
+                zh = "".join(rng.choice(ZH_SENTENCES).format(eq=eq_zh) for _ in range(3))
+                en = " ".join(rng.choice(EN_SENTENCES).format(eq=eq_en) for _ in range(2))
+                if ch_idx == answer_chapter and p_idx == answer_paragraph:
+                    zh = f"{needle}，最高不得超过 {round(pressure * 1.25, 1)} MPa。{zh}"
+                lines.append(f"{zh} {en}")
+                lines.append("")
+
+        path = out_dir / f"manual_{doc_idx:04d}.md"
+        path.write_text("\n".join(lines), encoding="utf-8")
+        files.append(path)
+
+        query = f"{code} 的额定工作压力是多少" if doc_idx % 2 == 0 else f"What is the rated pressure of {code}? 额定工作压力"
+        queries.append(BenchQuery(query=query, needle=needle, file_name=path.name))
+
+    return BenchCorpus(files=files, queries=queries)
+
+
+_TOKEN_RE = re.compile(r"[A-Za-z0-9][A-Za-z0-9\-\.]*|[一-鿿]+")
+
+
+def _features(text: str) -> list[str]:
+    features: list[str] = []
+    for token in _TOKEN_RE.findall(text):
+        if "一" <= token[0] <= "鿿":
+            features.extend(token[i:i + 2] for i in range(max(len(token) - 1, 1)))
+        else:
+            features.append(token.lower())
+    return features
+
+
+@register_embedding_function
+class HashEmbeddingFunction(EmbeddingFunction[Documents]):
+    """确定性特征哈希嵌入（L2 归一化），只用于基准测试。"""
+
+    def __init__(self, dim: int = 256) -> None:
+        self.dim = dim
+
+    def __call__(self, input: Documents) -> Embeddings:
+        vectors = []
+        for text in input:
+            vec = np.zeros(self.dim, dtype=np.float32)
+            for feature in _features(text):
+                digest = hashlib.blake2b(feature.encode("utf-8"), digest_size=8).digest()
+                bucket = int.from_bytes(digest[:4], "little") % self.dim
+                vec[bucket] += 1.0 if digest[4] & 1 else -1.0
+            norm = math.sqrt(float(np.dot(vec, vec))) or 1.0
+            vectors.append(vec / norm)
+        return vectors
+
+    @staticmethod
+    def name() -> str:
+        return "bench_hash"
+
+    @staticmethod
+    def build_from_config(config: dict) -> "HashEmbeddingFunction":
+        return HashEmbeddingFunction(dim=config.get("dim", 256))
+
+    def get_config(self) -> dict:
+        return {"dim": self.dim}
@@ -0,0 +1,87 @@
+"""
+登录风暴下的事件循环延迟基准：对比 bcrypt 在事件循环内同步执行与在线程池中执行。
+
+模拟 N 个并发登录（每个执行一次 bcrypt 校验），同时运行一个探测协程每 10ms 唤醒一次，
+记录实际唤醒时间与预期的差值（即其他请求此时会额外等待的时间）。
+
+用法（在仓库根目录执行）:
+    python -m scripts.bench_login_loop_lag --logins 100 --rounds 12
+"""
+import asyncio
+import json
+import statistics
+import time
+
+import bcrypt
+import typer
+
+from app.core import passwords
+from app.core.config import get_settings
+
+cli = typer.Typer(help="Event-loop lag under concurrent logins")
+
+PROBE_INTERVAL = 0.01
+
+
+async def _probe(lags: list[float], stop: asyncio.Event) -> None:
+    while not stop.is_set():
+        start = time.perf_counter()
+        await asyncio.sleep(PROBE_INTERVAL)
+        lags.append((time.perf_counter() - start - PROBE_INTERVAL) * 1000)
+
+
+async def _storm(mode: str, logins: int, password: str, password_hash: str) -> dict:
+    async def inline_login() -> bool:
+        await asyncio.sleep(0)  # 模拟查询用户等异步步骤
+        return bcrypt.checkpw(password.encode("utf-8"), password_hash.encode("utf-8"))
+
+    async def executor_login() -> bool:
+        await asyncio.sleep(0)
+        return await passwords.verify_password(password, password_hash)
+
+    login = inline_login if mode == "inline" else executor_login
+    lags: list[float] = []
+    stop = asyncio.Event()
+    probe = asyncio.create_task(_probe(lags, stop))
+    await asyncio.sleep(PROBE_INTERVAL * 2)
+
+    start = time.perf_counter()
+    results = await asyncio.gather(*[login() for _ in range(logins)])
+    elapsed = time.perf_counter() - start
+    stop.set()
+    await probe
+    assert all(results)
+
+    ordered = sorted(lags)
+    return {
+        "mode": mode,
+        "logins": logins,
+        "seconds": round(elapsed, 3),
+        "logins_per_second": round(logins / elapsed, 1),
+        "loop_lag_p50_ms": round(statistics.median(ordered), 2),
+        "loop_lag_p99_ms": round(ordered[min(int(len(ordered) * 0.99), len(ordered) - 1)], 2),
+        "loop_lag_max_ms": round(ordered[-1], 2),
+    }
+
+
+@cli.command()
+def run(
+    logins: int = typer.Option(100, help="并发登录数"),
+    rounds: int = typer.Option(0, help="bcrypt 成本因子（0 表示使用 BCRYPT_ROUNDS）"),
+) -> None:
+    settings = get_settings()
+    rounds = rounds or settings.bcrypt_rounds
+    password = "correct horse battery staple"
+    password_hash = passwords.hash_password_sync(password, rounds=rounds)
+    typer.echo(f"bcrypt rounds={rounds}, 线程池={settings.password_hash_workers}, 并发登录={logins}")
+
+    async def _run() -> list[dict]:
+        return [await _storm(mode, logins, password, password_hash) for mode in ("inline", "executor")]
+
+    results = asyncio.run(_run())
+    passwords.shutdown_executor()
+    typer.echo(json.dumps(results, ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    cli()
@@ -0,0 +1,100 @@
+"""
+文档列表分页基准：对比 LIMIT/OFFSET 与游标（keyset）分页在第 1 页和深翻页时的延迟。
+
+在临时 SQLite 文件中生成一个包含大量文档的文档库（含 002 迁移中的索引），
+用与 list_documents 相同的 app.core.pagination.fetch_page 查询指定页。
+
+用法（在仓库根目录执行）:
+    python -m scripts.bench_pagination --documents 100000 --pages 1,100,1000
+"""
+import asyncio
+import datetime as dt
+import json
+import statistics
+import tempfile
+import time
+import uuid
+
+import typer
+from sqlalchemy import insert, select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+from app.core.pagination import encode_cursor, fetch_page
+from app.db.models import Base, Document, DocumentLibrary
+from scripts.bench_db_indexes import insert_batches
+
+cli = typer.Typer(help="OFFSET vs cursor pagination latency")
+
+
+async def _run(documents: int, page_size: int, pages: list[int], repeats: int, database_url: str) -> dict:
+    engine = create_async_engine(database_url)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    library_id = uuid.uuid4()
+    start_time = dt.datetime(2024, 1, 1)
+    async with engine.begin() as conn:
+        await conn.execute(
+            insert(DocumentLibrary.__table__),
+            [{"id": library_id, "name": "bench", "owner_id": uuid.uuid4(), "owner_type": "user",
+              "is_default": False, "metadata": {}, "created_at": start_time}],
+        )
+    await insert_batches(engine, Document.__table__, (
+        {"id": uuid.uuid4(), "title": f"doc-{i}", "source_path": f"/bench/doc-{i}.txt",
+         "library_id": library_id, "metadata": {}, "created_at": start_time + dt.timedelta(seconds=i)}
+        for i in range(documents)
+    ))
+
+    session_factory = async_sessionmaker(bind=engine, expire_on_commit=False, class_=AsyncSession)
+    query = select(Document).where(Document.library_id == library_id)
+    page_args = dict(created_at_column=Document.created_at, id_column=Document.id, limit=page_size)
+
+    async def _time(**kwargs) -> float:
+        latencies: list[float] = []
+        async with session_factory() as session:
+            for _ in range(repeats + 1):
+                start = time.perf_counter()
+                await fetch_page(session, query, **page_args, **kwargs)
+                latencies.append((time.perf_counter() - start) * 1000)
+        return round(statistics.median(latencies[1:]), 3)  # 第一次为预热
+
+    results: dict[str, dict] = {}
+    async with session_factory() as session:
+        ordered = select(Document.created_at, Document.id).where(Document.library_id == library_id)
+        ordered = ordered.order_by(Document.created_at.desc(), Document.id.desc())
+        for page in pages:
+            offset = (page - 1) * page_size
+            cursor = None
+            if offset:
+                # 上一页最后一行，即客户端翻到该页时持有的游标
+                row = (await session.execute(ordered.offset(offset - 1).limit(1))).one_or_none()
+                if row is None:
+                    continue
+                cursor = encode_cursor(row.created_at, row.id)
+            results[f"page_{page}"] = {
+                "offset_ms": await _time(offset=offset),
+                "cursor_ms": await _time(cursor=cursor),
+            }
+
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.drop_all)
+    await engine.dispose()
+    return {"documents": documents, "page_size": page_size, "pages": results}
+
+
+@cli.command()
+def run(
+    documents: int = typer.Option(100_000, help="文档库中的文档数"),
+    page_size: int = typer.Option(50, help="每页数量"),
+    pages: str = typer.Option("1,1000", help="要测量的页码（逗号分隔）"),
+    repeats: int = typer.Option(20, help="每页重复次数"),
+    database_url: str = typer.Option("", help="测试库 URL（默认临时 SQLite 文件；必须是空的测试库）"),
+) -> None:
+    page_numbers = [int(p) for p in pages.split(",") if p.strip()]
+    with tempfile.TemporaryDirectory() as tmp:
+        url = database_url or f"sqlite+aiosqlite:///{tmp}/bench.db"
+        result = asyncio.run(_run(documents, page_size, page_numbers, repeats, url))
+    typer.echo(json.dumps(result, ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    cli()
@@ -0,0 +1,230 @@
+"""
+检索基准测试：合成语料 → DocumentIngestor 入库 → HybridRetriever.search 压测。
+
+输出指标：入库耗时、BM25 构建耗时、QPS、p50/p95/p99 延迟、内存峰值、recall@k，
+结果写入 JSON，便于跨提交对比（--compare 指定基线文件时打印差异）。
+
+用法（在仓库根目录执行）:
+    python -m scripts.bench_retrieval --docs 200 --queries 200 --concurrency 8
+    python -m scripts.bench_retrieval --compare bench_results/retrieval-<commit>.json
+"""
+import asyncio
+import json
+import resource
+import statistics
+import subprocess
+import tempfile
+import time
+import tracemalloc
+import uuid
+from pathlib import Path
+
+import typer
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.pool import StaticPool
+
+from app.core.config import Settings
+from app.db.models import Base, Document, DocumentLibrary
+from app.rag.ingestion import DocumentIngestor
+from app.rag.retriever import HybridRetriever
+from scripts.bench_corpus import BenchQuery, HashEmbeddingFunction, generate_corpus
+
+cli = typer.Typer(help="Retrieval benchmark with a synthetic industrial corpus")
+
+
+def _percentile(values: list[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    idx = min(int(round(pct / 100 * (len(ordered) - 1))), len(ordered) - 1)
+    return ordered[idx]
+
+
+def _latency_summary(latencies_ms: list[float]) -> dict[str, float]:
+    return {
+        "count": len(latencies_ms),
+        "mean_ms": round(statistics.fmean(latencies_ms), 3) if latencies_ms else 0.0,
+        "p50_ms": round(_percentile(latencies_ms, 50), 3),
+        "p95_ms": round(_percentile(latencies_ms, 95), 3),
+        "p99_ms": round(_percentile(latencies_ms, 99), 3),
+    }
+
+
+def _git_commit() -> str:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], text=True).strip()
+    except Exception:
+        return "unknown"
+
+
+def _rss_mb() -> float:
+    # Linux 上 ru_maxrss 单位为 KB
+    return round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+
+
+async def _ingest(corpus_files: list[Path], settings: Settings) -> tuple[uuid.UUID, dict]:
+    engine = create_async_engine("sqlite+aiosqlite://", poolclass=StaticPool)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    session_factory = async_sessionmaker(bind=engine, expire_on_commit=False, class_=AsyncSession)
+
+    ingestor = DocumentIngestor(settings=settings)
+    ingestor._embedding_fn = HashEmbeddingFunction()
+
+    library_id = uuid.uuid4()
+    chunk_count = 0
+    start = time.perf_counter()
+    async with session_factory() as session:
+        session.add(DocumentLibrary(id=library_id, name="bench", owner_id=uuid.uuid4(), owner_type="user"))
+        await session.commit()
+        for path in corpus_files:
+            document = Document(title=path.stem, source_path=str(path), library_id=library_id, meta={})
+            session.add(document)
+            await session.commit()
+            report = await ingestor.vectorize_document(document, session)
+            if not report.vectorized:
+                raise RuntimeError(f"向量化失败: {path}: {report.error}")
+            chunk_count += report.chunk_count
+    elapsed = time.perf_counter() - start
+    await engine.dispose()
+    return library_id, {
+        "documents": len(corpus_files),
+        "chunks": chunk_count,
+        "seconds": round(elapsed, 3),
+        "chunks_per_second": round(chunk_count / elapsed, 1) if elapsed else 0.0,
+    }
+
+
+def _bm25_build(retriever: HybridRetriever, library_id: uuid.UUID, repeats: int) -> dict:
+    timings = []
+    tracemalloc.start()
+    for _ in range(repeats):
+        start = time.perf_counter()
+        retriever._bm25_retrievers[str(library_id)] = retriever._reload_bm25_index(library_id, force=True)
+        timings.append((time.perf_counter() - start) * 1000)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {**_latency_summary(timings), "peak_alloc_mb": round(peak / 1024 / 1024, 1)}
+
+
+async def _run_queries(
+    retriever: HybridRetriever,
+    queries: list[BenchQuery],
+    library_id: uuid.UUID,
+    top_k: int,
+    concurrency: int,
+) -> tuple[list[float], list[list[str]], float]:
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies: list[float] = [0.0] * len(queries)
+    texts: list[list[str]] = [[] for _ in queries]
+
+    async def _one(i: int) -> None:
+        async with semaphore:
+            start = time.perf_counter()
+            chunks = await retriever.search(queries[i].query, top_k=top_k, library_ids=[library_id])
+            latencies[i] = (time.perf_counter() - start) * 1000
+            texts[i] = [c.text for c in chunks]
+
+    start = time.perf_counter()
+    await asyncio.gather(*[_one(i) for i in range(len(queries))])
+    return latencies, texts, time.perf_counter() - start
+
+
+def _recall(queries: list[BenchQuery], texts: list[list[str]], ks: list[int]) -> dict[str, float]:
+    recall = {}
+    for k in ks:
+        hits = sum(1 for q, t in zip(queries, texts) if any(q.needle in text for text in t[:k]))
+        recall[f"recall@{k}"] = round(hits / len(queries), 4) if queries else 0.0
+    return recall
+
+
+def _print_comparison(current: dict, baseline_path: Path) -> None:
+    baseline = json.loads(baseline_path.read_text(encoding="utf-8"))
+    typer.echo(f"\n对比基线 {baseline_path} (commit {baseline.get('commit')}):")
+    for section in ("search_sequential", "search_concurrent", "bm25_build", "recall"):
+        for key, value in current["results"].get(section, {}).items():
+            old = baseline.get("results", {}).get(section, {}).get(key)
+            if isinstance(value, (int, float)) and isinstance(old, (int, float)) and old:
+                typer.echo(f"  {section}.{key}: {old} → {value} ({(value - old) / old * 100:+.1f}%)")
+
+
+@cli.command()
+def run(
+    docs: int = typer.Option(50, help="手册数量"),
+    chapters: int = typer.Option(5, help="每本手册章节数"),
+    paragraphs: int = typer.Option(6, help="每章段落数"),
+    queries: int = typer.Option(0, help="查询数量（0 表示每本手册一个查询）"),
+    top_k: int = typer.Option(5, help="检索返回数量"),
+    concurrency: int = typer.Option(8, help="并发压测的并发数"),
+    bm25_repeats: int = typer.Option(3, help="BM25 构建重复次数"),
+    rerank: bool = typer.Option(False, help="是否启用重排序（需要 sentence-transformers 与模型）"),
+    seed: int = typer.Option(42, help="语料随机种子"),
+    output: Path | None = typer.Option(None, help="结果 JSON 路径，默认 bench_results/retrieval-<commit>.json"),
+    compare: Path | None = typer.Option(None, help="基线结果 JSON，用于打印差异"),
+) -> None:
+    async def _run() -> dict:
+        with tempfile.TemporaryDirectory(prefix="bench_retrieval_") as tmp:
+            tmp_path = Path(tmp)
+            corpus = generate_corpus(tmp_path / "corpus", docs, chapters, paragraphs, seed)
+            bench_queries = corpus.queries[:queries] if queries else corpus.queries
+            settings = Settings(
+                vector_db_uri=f"chroma://{tmp_path / 'chroma'}",
+                enable_rerank=rerank,
+                rerank_cache_enable=False,
+                redis_url="",
+                use_llm_expansion=False,
+                trace_log_enabled=False,
+            )
+
+            typer.echo(f"生成语料: {docs} 本手册，{len(bench_queries)} 个查询，开始入库...")
+            library_id, ingest_stats = await _ingest(corpus.files, settings)
+
+            retriever = HybridRetriever(settings.vector_db_uri, settings=settings, enable_rerank=rerank)
+            retriever.embedding_fn = HashEmbeddingFunction()
+            bm25_stats = _bm25_build(retriever, library_id, bm25_repeats)
+
+            # 预热（导入、模型加载等一次性开销不计入）
+            await retriever.search(bench_queries[0].query, top_k=top_k, library_ids=[library_id])
+
+            seq_latencies, seq_texts, _ = await _run_queries(retriever, bench_queries, library_id, top_k, 1)
+            con_latencies, _, wall = await _run_queries(
+                retriever, bench_queries, library_id, top_k, concurrency
+            )
+
+            ks = sorted({1, 3, top_k})
+            return {
+                "commit": _git_commit(),
+                "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+                "params": {
+                    "docs": docs, "chapters": chapters, "paragraphs": paragraphs,
+                    "queries": len(bench_queries), "top_k": top_k, "concurrency": concurrency,
+                    "rerank": rerank, "seed": seed,
+                },
+                "results": {
+                    "ingest": ingest_stats,
+                    "bm25_build": bm25_stats,
+                    "search_sequential": {
+                        **_latency_summary(seq_latencies),
+                        "qps": round(len(seq_latencies) / (sum(seq_latencies) / 1000), 2) if seq_latencies else 0.0,
+                    },
+                    "search_concurrent": {
+                        **_latency_summary(con_latencies),
+                        "qps": round(len(con_latencies) / wall, 2) if wall else 0.0,
+                    },
+                    "recall": _recall(bench_queries, seq_texts, ks),
+                    "memory": {"max_rss_mb": _rss_mb()},
+                },
+            }
+
+    result = asyncio.run(_run())
+    output_path = output or Path("bench_results") / f"retrieval-{result['commit']}.json"
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    output_path.write_text(json.dumps(result, ensure_ascii=False, indent=2), encoding="utf-8")
+    typer.echo(json.dumps(result["results"], ensure_ascii=False, indent=2))
+    typer.echo(f"✅ 结果已写入 {output_path}")
+    if compare:
+        _print_comparison(result, compare)
+
+
+if __name__ == "__main__":
+    cli()
@@ -13,21 +13,16 @@ Usage:
 """
 
 import asyncio
-import bcrypt
 import sys
 
 from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.core.passwords import hash_password_sync
 from app.db.session import async_session, engine
 from app.db.models import User, DocumentLibrary
 
 
-def _hash_password(password: str) -> str:
-    """Hash password using bcrypt."""
-    return bcrypt.hashpw(password.encode("utf-8"), bcrypt.gensalt()).decode("utf-8")
-
-
 async def create_admin(
     email: str,
     password: str,
@@ -58,7 +53,7 @@ async def create_admin(
             email=email,
             username=username,
             full_name=full_name,
-            password_hash=_hash_password(password),
+            password_hash=hash_password_sync(password),
             role="admin",
             is_verified=True,
         )
@@ -0,0 +1,146 @@
+"""
+检查高频查询的执行计划是否命中索引（alembic/versions/002_add_hot_query_indexes.py、004_promote_document_columns.py）。
+
+对 DATABASE_URL 指向的数据库执行 EXPLAIN（MySQL / PostgreSQL）或 EXPLAIN QUERY PLAN（SQLite），
+取数据最多的文档库与 chunk 最多的文档作为参数，打印每条查询的执行计划与是否使用了预期索引。
+数据量很小时优化器可能选择全表扫描，请在接近生产规模的数据上检查。
+
+用法（在仓库根目录执行）:
+    python -m scripts.explain_hot_queries
+    python -m scripts.explain_hot_queries --verbose
+"""
+import asyncio
+import uuid
+from dataclasses import dataclass
+
+import typer
+from sqlalchemy import func, select, text
+from sqlalchemy.ext.asyncio import AsyncConnection
+from sqlalchemy.sql import Select
+
+from app.db.models import Chunk, Document
+
+cli = typer.Typer(help="EXPLAIN the hot document/chunk queries")
+
+
+@dataclass
+class HotQuery:
+    name: str
+    statement: Select
+    expected_indexes: tuple[str, ...]
+
+
+def hot_queries(library_id: uuid.UUID, document_id: uuid.UUID) -> list[HotQuery]:
+    """与 docs 接口中的查询保持一致。"""
+    return [
+        HotQuery(
+            "list_documents",
+            select(Document)
+            .where(Document.library_id == library_id)
+            .order_by(Document.created_at.desc())
+            .limit(50),
+            ("ix_documents_library_id_created_at",),
+        ),
+        HotQuery(
+            "list_all_documents",
+            select(Document)
+            .where(Document.library_id.in_([library_id, uuid.uuid4()]))
+            .order_by(Document.created_at.desc())
+            .limit(50),
+            ("ix_documents_library_id_created_at", "ix_documents_created_at"),
+        ),
+        HotQuery(
+            "list_documents.vectorized",
+            select(Document)
+            .where(Document.library_id == library_id, Document.vectorized.is_(False))
+            .order_by(Document.created_at.desc())
+            .limit(50),
+            ("ix_documents_library_id_vectorized", "ix_documents_library_id_created_at"),
+        ),
+        HotQuery(
+            "library_stats.documents",
+            select(func.count(Document.id), func.sum(Document.file_size)).where(Document.library_id == library_id),
+            ("ix_documents_library_id_created_at", "ix_documents_library_id_vectorized"),
+        ),
+        HotQuery(
+            "library_stats.chunks",
+            select(func.count(Chunk.id)).join(Document).where(Document.library_id == library_id),
+            ("ix_chunks_document_id_id",),
+        ),
+        HotQuery(
+            "chunks_by_document",
+            select(Chunk).where(Chunk.document_id == document_id).order_by(Chunk.id),
+            ("ix_chunks_document_id_id",),
+        ),
+    ]
+
+
+async def _sample_ids(conn: AsyncConnection) -> tuple[uuid.UUID, uuid.UUID]:
+    library_id = (
+        await conn.execute(
+            select(Document.library_id)
+            .where(Document.library_id.is_not(None))
+            .group_by(Document.library_id)
+            .order_by(func.count().desc())
+            .limit(1)
+        )
+    ).scalar()
+    document_id = (
+        await conn.execute(
+            select(Chunk.document_id).group_by(Chunk.document_id).order_by(func.count().desc()).limit(1)
+        )
+    ).scalar()
+    return library_id or uuid.uuid4(), document_id or uuid.uuid4()
+
+
+async def explain(conn: AsyncConnection, statement: Select) -> list[str]:
+    """返回执行计划（每行一条文本）。"""
+    dialect = conn.dialect
+    sql = str(statement.compile(dialect=dialect, compile_kwargs={"literal_binds": True}))
+    prefix = "EXPLAIN QUERY PLAN " if dialect.name == "sqlite" else "EXPLAIN "
+    result = await conn.execute(text(prefix + sql))
+    lines: list[str] = []
+    for row in result.mappings():
+        if dialect.name == "sqlite":
+            lines.append(str(row["detail"]))
+        elif dialect.name == "postgresql":
+            lines.append(str(row["QUERY PLAN"]))
+        else:
+            lines.append(", ".join(f"{key}={value}" for key, value in row.items() if value is not None))
+    return lines
+
+
+async def _run(verbose: bool) -> int:
+    # 延迟导入：bench_db_indexes 复用 hot_queries 时不需要配置 DATABASE_URL
+    from app.db.session import engine
+
+    missing = 0
+    async with engine.connect() as conn:
+        typer.echo(f"数据库: {conn.dialect.name}")
+        library_id, document_id = await _sample_ids(conn)
+        for query in hot_queries(library_id, document_id):
+            plan = await explain(conn, query.statement)
+            plan_text = "\n".join(plan)
+            used = [name for name in query.expected_indexes if name in plan_text]
+            if used:
+                typer.echo(f"✅ {query.name}: 使用索引 {', '.join(used)}")
+            else:
+                missing += 1
+                typer.echo(f"⚠️  {query.name}: 未使用预期索引 {', '.join(query.expected_indexes)}")
+            if verbose or not used:
+                for line in plan:
+                    typer.echo(f"    {line}")
+    await engine.dispose()
+    return missing
+
+
+@cli.command()
+def run(verbose: bool = typer.Option(False, help="打印所有查询的执行计划")) -> None:
+    missing = asyncio.run(_run(verbose))
+    if missing:
+        typer.echo(f"❌ {missing} 条查询未使用预期索引（确认已执行 alembic upgrade head）")
+        raise typer.Exit(code=1)
+
+
+if __name__ == "__main__":
+    cli()
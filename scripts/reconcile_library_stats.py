@@ -0,0 +1,33 @@
+"""
+文档库统计对账：按实际数据重新计算 library_stats 计数并修正偏差（缺失的计数行会被创建）。
+
+服务运行时每 LIBRARY_STATS_RECONCILE_INTERVAL 秒自动对账一次；执行 003 迁移后或怀疑计数异常时可手动执行。
+
+用法（在仓库根目录执行）:
+    python -m scripts.reconcile_library_stats
+"""
+import asyncio
+
+import typer
+
+from app.core.library_stats import reconcile_library_stats
+from app.db.session import async_session, engine
+
+cli = typer.Typer(help="Recompute per-library counters")
+
+
+@cli.command()
+def run(batch_size: int = typer.Option(200, help="每批对账的文档库数量")) -> None:
+    async def _run() -> int:
+        try:
+            async with async_session() as session:
+                return await reconcile_library_stats(session, batch_size=batch_size)
+        finally:
+            await engine.dispose()
+
+    corrected = asyncio.run(_run())
+    typer.echo(f"✅ 对账完成，修正 {corrected} 个文档库的计数")
+
+
+if __name__ == "__main__":
+    cli()
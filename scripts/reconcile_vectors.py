@@ -0,0 +1,54 @@
+"""
+向量库对账：删除没有对应数据库记录的 Chroma 向量与集合，以及指向不存在文档的 chunk 行。
+
+默认只统计（dry run），确认后加 --apply 执行删除。删除后各 worker 的 BM25 索引在下次
+文档变更或重启时重建；如需立即生效可重启服务。
+
+向量化先写 Chroma、后提交 chunk 行。--apply 删除前会等待 --grace-seconds 秒并复查，
+避免误删与本次对账并发写入的向量；若向量化的提交可能更慢（如数据库繁忙），请调大该值，
+或在没有入库/向量化任务运行时执行。
+
+用法（在仓库根目录执行）:
+    python -m scripts.reconcile_vectors
+    python -m scripts.reconcile_vectors --apply
+"""
+import asyncio
+import json
+from dataclasses import asdict
+
+import typer
+
+from app.core.config import get_settings
+from app.db.session import async_session, engine
+from app.rag.ingestion import DocumentIngestor
+from app.rag.reconcile import reconcile_vectors
+
+cli = typer.Typer(help="Remove orphaned vectors and chunk rows")
+
+
+@cli.command()
+def run(
+    apply: bool = typer.Option(False, help="执行删除（默认只统计）"),
+    page_size: int = typer.Option(1000, help="每次读取的向量数"),
+    grace_seconds: float = typer.Option(5.0, help="删除前等待并复查的秒数（防止误删正在向量化的文档的向量）"),
+) -> None:
+    settings = get_settings()
+
+    async def _run() -> None:
+        try:
+            client = DocumentIngestor(settings=settings)._client
+            async with async_session() as session:
+                report = await reconcile_vectors(
+                    session, client, dry_run=not apply, page_size=page_size, grace_seconds=grace_seconds
+                )
+            typer.echo(json.dumps(asdict(report), ensure_ascii=False, indent=2))
+            if not apply and (report.orphan_vectors or report.orphan_collections or report.orphan_chunk_rows):
+                typer.echo("ℹ️ 以上为统计结果，加 --apply 执行删除")
+        finally:
+            await engine.dispose()
+
+    asyncio.run(_run())
+
+
+if __name__ == "__main__":
+    cli()
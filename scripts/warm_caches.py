@@ -0,0 +1,57 @@
+"""
+缓存预热：回放查询日志中的高频查询，填充查询向量与重排序缓存（Redis 共享缓存）。
+
+适用于部署或清空 Redis 之后、流量到来之前手动执行；也可设置 CACHE_WARMUP_ON_STARTUP=true 在启动时自动预热。
+
+用法（在仓库根目录执行）:
+    python -m scripts.warm_caches --top-n 200 --rate 5
+    python -m scripts.warm_caches --list            # 只查看高频查询，不回放
+    python -m scripts.warm_caches --verify          # 预热后再回放一遍，报告命中率
+"""
+import asyncio
+import json
+from dataclasses import asdict
+
+import typer
+
+from app.core.config import get_settings
+from app.core.query_log import top_queries
+from app.core.redis_pool import close_redis
+from app.rag.retriever import HybridRetriever
+from app.rag.warmup import warm_caches
+
+cli = typer.Typer(help="Warm retrieval caches from the query log")
+
+
+@cli.command()
+def run(
+    top_n: int = typer.Option(200, help="回放频率最高的查询数量"),
+    rate: float = typer.Option(5.0, help="回放速率（条/秒），0 表示不限速"),
+    verify: bool = typer.Option(False, help="预热后再回放一遍并报告命中率"),
+    list_only: bool = typer.Option(False, "--list", help="只列出高频查询"),
+) -> None:
+    settings = get_settings()
+
+    async def _run() -> None:
+        try:
+            queries = await top_queries(top_n, settings)
+            if not queries:
+                typer.echo("查询日志为空（检查 REDIS_URL / QUERY_LOG_PATH 与 QUERY_LOG_ENABLED）")
+                return
+            if list_only:
+                for item in queries:
+                    typer.echo(f"{item.count:>6}  k={item.top_k:<3} libs={item.library_ids}  {item.query}")
+                return
+
+            typer.echo(f"回放 {len(queries)} 条查询，限速 {rate}/s ...")
+            retriever = HybridRetriever(settings.vector_db_uri, settings=settings, enable_rerank=settings.enable_rerank)
+            report = await warm_caches(retriever, queries, rate=rate, verify=verify)
+            typer.echo(json.dumps(asdict(report), ensure_ascii=False, indent=2))
+        finally:
+            await close_redis()
+
+    asyncio.run(_run())
+
+
+if __name__ == "__main__":
+    cli()
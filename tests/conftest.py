@@ -0,0 +1,54 @@
+"""共享的测试夹具：建好全部表的内存 SQLite 数据库。"""
+import pytest
+import pytest_asyncio
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.pool import StaticPool
+
+from app.db.models import Base
+
+
+async def _memory_engine():
+    # StaticPool：所有会话共用同一个连接，才能看到同一个内存库
+    engine = create_async_engine("sqlite+aiosqlite://", poolclass=StaticPool)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    yield engine
+    await engine.dispose()
+
+
+def _sessionmaker(engine) -> async_sessionmaker[AsyncSession]:
+    return async_sessionmaker(bind=engine, expire_on_commit=False, class_=AsyncSession)
+
+
+@pytest_asyncio.fixture
+async def db_engine():
+    """内存 SQLite 引擎（主库）。"""
+    async for engine in _memory_engine():
+        yield engine
+
+
+@pytest.fixture
+def session_factory(db_engine) -> async_sessionmaker[AsyncSession]:
+    return _sessionmaker(db_engine)
+
+
+@pytest_asyncio.fixture
+async def replica_session_factory():
+    """与主库相互独立的另一个内存库，用来模拟同步滞后的只读副本。"""
+    async for engine in _memory_engine():
+        yield _sessionmaker(engine)
+
+
+@pytest_asyncio.fixture
+async def db_session(session_factory):
+    async with session_factory() as session:
+        yield session
+
+
+@pytest.fixture
+def sql_statements(db_engine) -> list[str]:
+    """db_engine 执行过的 SQL（用于断言查询次数，测量前先 clear()）。"""
+    statements: list[str] = []
+    event.listen(db_engine.sync_engine, "before_cursor_execute", lambda *args: statements.append(args[2]))
+    return statements
@@ -268,6 +268,8 @@ async def create_test_documents(session: AsyncSession, libraries: dict) -> list[
                 title=doc_title,
                 source_path=f"/tmp/{doc_title}",  # Placeholder path
                 library_id=library.id,
+                file_type=".txt",
+                file_size=len(text.encode("utf-8")),
                 meta={"file_type": ".txt", "file_size": len(text.encode("utf-8"))},
             )
             session.add(document)
@@ -0,0 +1,130 @@
+import uuid
+
+import pytest
+from fastapi import HTTPException
+
+from app.api.v1 import docs
+from app.core import access, pubsub
+from app.core.config import Settings
+from app.core.user_cache import UserSnapshot
+from app.db.models import Document, DocumentLibrary, Group, GroupMember, User
+
+
+@pytest.mark.asyncio
+async def test_library_access_is_resolved_in_one_query_and_invalidated(monkeypatch, session_factory, sql_statements):
+    monkeypatch.setattr(pubsub, "get_redis_client", lambda: None)
+    access._cache.clear()
+
+    user = User(email="op@example.com", password_hash="x")
+    other = User(email="other@example.com", password_hash="x")
+    member_group, foreign_group = Group(name="maint"), Group(name="secret")
+    async with session_factory() as session:
+        session.add_all([user, other, member_group, foreign_group])
+        await session.flush()
+        session.add(GroupMember(group_id=member_group.id, user_id=user.id, role="member"))
+        personal = DocumentLibrary(name="mine", owner_id=user.id, owner_type="user")
+        shared = DocumentLibrary(name="shared", owner_id=member_group.id, owner_type="group")
+        hidden = DocumentLibrary(name="hidden", owner_id=foreign_group.id, owner_type="group")
+        someone_else = DocumentLibrary(name="theirs", owner_id=other.id, owner_type="user")
+        session.add_all([personal, shared, hidden, someone_else])
+        await session.commit()
+
+    sql_statements.clear()
+    async with session_factory() as session:
+        first = await access.get_library_access(session, user.id)
+        second = await access.get_library_access(session, user.id)
+    assert len(sql_statements) == 1 and first is second
+    assert first.roles == {personal.id: "owner", shared.id: "member"}
+    assert first.can(shared.id) and not first.can(shared.id, access.MANAGE_ROLES)
+    assert not first.can(hidden.id) and first.can(None)
+
+    async with session_factory() as session:
+        session.add(GroupMember(group_id=foreign_group.id, user_id=user.id, role="admin"))
+        await session.commit()
+        await access.invalidate_access(user.id)
+        refreshed = await access.get_library_access(session, user.id)
+    assert refreshed.can(hidden.id, access.MANAGE_ROLES)
+
+
+@pytest.mark.asyncio
+async def test_load_racing_an_invalidation_is_not_cached(monkeypatch):
+    monkeypatch.setattr(pubsub, "get_redis_client", lambda: None)
+    access._cache.clear()
+    user_id = uuid.uuid4()
+    loads = []
+
+    async def load_then_invalidate(session, user_id):
+        # 查询读到旧成员关系后、写入缓存前，成员变更提交并失效
+        loads.append(user_id)
+        if len(loads) == 1:
+            await access.invalidate_access(user_id)
+        return access.LibraryAccess(user_id=user_id, roles={})
+
+    monkeypatch.setattr(access, "_load_access", load_then_invalidate)
+    await access.get_library_access(None, user_id)
+    await access.get_library_access(None, user_id)
+    await access.get_library_access(None, user_id)
+    assert len(loads) == 2
+
+
+@pytest.mark.asyncio
+async def test_access_cache_evicts_least_recently_used_users(monkeypatch):
+    settings = Settings(access_cache_maxsize=2)
+    monkeypatch.setattr(access, "get_settings", lambda: settings)
+    access._cache.clear()
+
+    async def load(session, user_id):
+        return access.LibraryAccess(user_id=user_id, roles={})
+
+    monkeypatch.setattr(access, "_load_access", load)
+    first, second, third = (uuid.uuid4() for _ in range(3))
+    for user_id in (first, second, first, third):
+        await access.get_library_access(None, user_id)
+    assert list(access._cache) == [str(first), str(third)]
+
+
+def test_search_scope_limits_retrieval_to_accessible_libraries():
+    mine, shared, forbidden = uuid.uuid4(), uuid.uuid4(), uuid.uuid4()
+    library_access = access.LibraryAccess(user_id=uuid.uuid4(), roles={mine: "owner", shared: "member"})
+
+    assert library_access.search_scope(None) == [mine, shared]
+    assert library_access.search_scope([shared, shared]) == [shared]
+    try:
+        library_access.search_scope([mine, forbidden])
+    except HTTPException as e:
+        assert e.status_code == 403
+    else:
+        raise AssertionError("expected 403 for a library outside the caller's access")
+    assert access.LibraryAccess(user_id=uuid.uuid4(), roles={}).search_scope(None) == []
+
+
+@pytest.mark.asyncio
+async def test_document_reads_check_access_on_primary_not_on_lagging_replica(
+    monkeypatch, session_factory, replica_session_factory
+):
+    monkeypatch.setattr(pubsub, "get_redis_client", lambda: None)
+    access._cache.clear()
+    user_id, group_id, library_id, document_id = (uuid.uuid4() for _ in range(4))
+
+    # 主库：已被移出群组；副本：尚未同步
+    for factory, still_member in ((session_factory, False), (replica_session_factory, True)):
+        async with factory() as session:
+            session.add_all([
+                User(id=user_id, email="op@example.com", password_hash="x"),
+                Group(id=group_id, name="maint"),
+                DocumentLibrary(id=library_id, name="shared", owner_id=group_id, owner_type="group"),
+                Document(id=document_id, title="manual", source_path="/missing", library_id=library_id),
+            ])
+            if still_member:
+                session.add(GroupMember(group_id=group_id, user_id=user_id, role="member"))
+            await session.commit()
+
+    me = UserSnapshot(id=user_id, role="operator", is_active=True, is_verified=True)
+    async with session_factory() as session, replica_session_factory() as read_session:
+        for call in (
+            docs.get_document(document_id, session=session, read_session=read_session, current_user=me),
+            docs.get_library(library_id, session=session, read_session=read_session, current_user=me),
+        ):
+            with pytest.raises(HTTPException) as forbidden:
+                await call
+            assert forbidden.value.status_code == 403
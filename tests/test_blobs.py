@@ -0,0 +1,133 @@
+import io
+import uuid
+
+import chromadb
+import pytest
+from chromadb import Documents, EmbeddingFunction, Embeddings
+from fastapi import UploadFile
+from sqlalchemy import func, select
+
+from app.core.blobs import BLOB_DIR_NAME, acquire_blob, release_document_blobs, remove_blob_files
+from app.core.config import Settings, get_settings
+from app.core.uploads import TMP_DIR_NAME, staged_upload
+from app.db.models import Chunk, Document, DocumentLibrary, StoredBlob
+from app.rag.ingestion import DocumentIngestor
+
+
+class _NoEmbedding(EmbeddingFunction[Documents]):
+    """复用向量时不应调用嵌入模型。"""
+
+    def __init__(self) -> None:
+        pass
+
+    def __call__(self, input: Documents) -> Embeddings:
+        raise AssertionError("embedding model must not be called")
+
+    @staticmethod
+    def name() -> str:
+        return "no-embedding"
+
+    def get_config(self) -> dict:
+        return {}
+
+
+@pytest.mark.asyncio
+async def test_identical_uploads_share_one_file_until_last_reference(tmp_path, session_factory):
+    settings = get_settings().model_copy(update={"storage_dir": str(tmp_path)})
+
+    document_ids = []
+    async with session_factory() as session:
+        for name in ("a.PDF", "b.pdf"):
+            upload_file = UploadFile(file=io.BytesIO(b"same manual"), filename=name)
+            async with staged_upload(upload_file, settings) as upload:
+                blob, created = await acquire_blob(session, upload, tmp_path)
+                assert created == (name == "a.PDF")
+                document = Document(title=name, source_path=blob.path, content_hash=upload.sha256)
+                session.add(document)
+                await session.commit()
+                document_ids.append(document.id)
+
+        files = list((tmp_path / BLOB_DIR_NAME).rglob("*"))
+        assert [path.suffix for path in files if path.is_file()] == [".pdf"]
+        assert not any((tmp_path / TMP_DIR_NAME).iterdir())
+        assert (await session.get(StoredBlob, upload.sha256)).ref_count == 2
+
+        assert await release_document_blobs(session, document_ids[:1]) == []
+        await session.commit()
+        orphaned = await release_document_blobs(session, document_ids)
+        await session.commit()
+        assert remove_blob_files(orphaned) == 1
+        assert not orphaned[0].exists()
+        assert (await session.execute(select(func.count()).select_from(StoredBlob))).scalar() == 0
+
+
+@pytest.mark.asyncio
+async def test_release_does_not_remove_file_of_concurrent_identical_upload(tmp_path, session_factory):
+    settings = get_settings().model_copy(update={"storage_dir": str(tmp_path)})
+
+    async def acquire(session):
+        upload_file = UploadFile(file=io.BytesIO(b"same manual"), filename="a.pdf")
+        async with staged_upload(upload_file, settings) as upload:
+            blob, _ = await acquire_blob(session, upload, tmp_path)
+            document = Document(title="a.pdf", source_path=blob.path, content_hash=upload.sha256)
+            session.add(document)
+            await session.commit()
+        return document
+
+    async with session_factory() as session:
+        first = await acquire(session)
+        orphaned = await release_document_blobs(session, [first.id])
+        await session.commit()
+        # 释放方提交后、删除文件前，相同内容再次上传
+        second = await acquire(session)
+        remove_blob_files(orphaned)
+        assert second.source_path != first.source_path
+        with open(second.source_path, "rb") as stored:
+            assert stored.read() == b"same manual"
+
+
+@pytest.mark.asyncio
+async def test_vectorize_reuses_chunks_and_vectors_of_identical_document(tmp_path, session_factory):
+    source = tmp_path / "manual.txt"
+    source.write_text("manual text", encoding="utf-8")
+    libraries = [DocumentLibrary(name=name, owner_id=uuid.uuid4(), owner_type="user") for name in ("a", "b")]
+    async with session_factory() as session:
+        session.add_all(libraries)
+        await session.flush()
+        original = Document(
+            title="m", source_path=str(source), library_id=libraries[0].id,
+            content_hash="h" * 64, vectorized=True, chunk_size=800,
+        )
+        copy = Document(title="m", source_path=str(source), library_id=libraries[1].id, content_hash="h" * 64)
+        session.add_all([original, copy])
+        await session.flush()
+        chunks = [Chunk(document_id=original.id, content=f"part {i}", meta={"chunk_idx": i}) for i in range(3)]
+        session.add_all(chunks)
+        await session.commit()
+
+    client = chromadb.EphemeralClient()
+    client.get_or_create_collection(f"library_{libraries[0].id}").add(
+        ids=[str(chunk.id) for chunk in chunks],
+        embeddings=[[float(i), 1.0] for i in range(3)],
+        documents=[chunk.content for chunk in chunks],
+        metadatas=[{"document_id": str(original.id)} for _ in chunks],
+    )
+    ingestor = DocumentIngestor.__new__(DocumentIngestor)
+    ingestor.settings = Settings()
+    ingestor._client = client
+    ingestor._embedding_fn = _NoEmbedding()
+
+    async with session_factory() as session:
+        copy = await session.get(Document, copy.id)
+        report = await ingestor.vectorize_document(copy, session, chunk_size=800)
+        assert report.vectorized and report.chunk_count == 3 and copy.vectorized
+        cloned = (await session.execute(select(Chunk).where(Chunk.document_id == copy.id))).scalars().all()
+        assert sorted(chunk.content for chunk in cloned) == ["part 0", "part 1", "part 2"]
+
+    target = client.get_collection(f"library_{libraries[1].id}")
+    stored = target.get(include=["embeddings", "metadatas"])
+    assert {meta["document_id"] for meta in stored["metadatas"]} == {str(copy.id)}
+    assert sorted(float(vector[0]) for vector in stored["embeddings"]) == [0.0, 1.0, 2.0]
+
+    for library in libraries:
+        client.delete_collection(f"library_{library.id}")
@@ -0,0 +1,122 @@
+import uuid
+
+import chromadb
+import pytest
+from sqlalchemy import func, select
+
+from app.core.config import Settings
+from app.db.bulk import delete_documents
+from app.db.models import Chunk, Document, DocumentLibrary
+from app.rag.ingestion import DocumentIngestor
+from app.rag import reconcile
+from app.rag.reconcile import reconcile_vectors
+
+
+def _add_vectors(collection, chunks: list[Chunk]) -> None:
+    collection.add(
+        ids=[str(chunk.id) for chunk in chunks],
+        embeddings=[[float(i), 1.0] for i in range(len(chunks))],
+        metadatas=[{"document_id": str(chunk.document_id)} for chunk in chunks],
+    )
+
+
+@pytest.mark.asyncio
+async def test_bulk_delete_removes_rows_and_vectors_in_batches(session_factory):
+    library = DocumentLibrary(name="lib", owner_id=uuid.uuid4(), owner_type="user")
+    async with session_factory() as session:
+        session.add(library)
+        await session.flush()
+        documents = [Document(title=f"d{i}", source_path="p", library_id=library.id) for i in range(3)]
+        session.add_all(documents)
+        await session.flush()
+        chunks = [Chunk(document_id=doc.id, content="c") for doc in documents for _ in range(2)]
+        session.add_all(chunks)
+        await session.commit()
+
+    client = chromadb.EphemeralClient()
+    collection = client.get_or_create_collection(f"library_{library.id}")
+    _add_vectors(collection, chunks)
+
+    doomed = [documents[0].id, documents[1].id]
+    async with session_factory() as session:
+        assert await delete_documents(session, doomed, batch_size=1) == 2
+        await session.commit()
+        remaining = (await session.execute(select(func.count(Chunk.id)))).scalar()
+    assert remaining == 2
+
+    ingestor = DocumentIngestor.__new__(DocumentIngestor)
+    ingestor.settings = Settings(bulk_delete_batch_size=1)
+    ingestor._client = client
+    ingestor.delete_document_vectors(library.id, doomed)
+    ingestor.delete_document_vectors(uuid.uuid4(), doomed)  # 集合不存在时跳过
+    assert sorted(m["document_id"] for m in collection.get()["metadatas"]) == [str(documents[2].id)] * 2
+    client.delete_collection(collection.name)
+
+
+@pytest.mark.asyncio
+async def test_reconcile_removes_orphan_vectors_collections_and_chunk_rows(session_factory):
+    library = DocumentLibrary(name="lib", owner_id=uuid.uuid4(), owner_type="user")
+    async with session_factory() as session:
+        session.add(library)
+        await session.flush()
+        document = Document(title="d", source_path="p", library_id=library.id)
+        session.add(document)
+        await session.flush()
+        live = Chunk(document_id=document.id, content="live")
+        dangling = Chunk(document_id=uuid.uuid4(), content="no document")
+        session.add_all([live, dangling])
+        await session.commit()
+
+    client = chromadb.EphemeralClient()
+    for entry in client.list_collections():
+        client.delete_collection(entry if isinstance(entry, str) else entry.name)
+    collection = client.get_or_create_collection(f"library_{library.id}")
+    stale = Chunk(id=uuid.uuid4(), document_id=document.id, content="re-chunked")
+    _add_vectors(collection, [live, stale, dangling])
+    orphan_collection = client.get_or_create_collection(f"library_{uuid.uuid4()}")
+    _add_vectors(orphan_collection, [Chunk(id=uuid.uuid4(), document_id=uuid.uuid4(), content="x")])
+
+    async with session_factory() as session:
+        preview = await reconcile_vectors(session, client, dry_run=True, page_size=2)
+    assert preview.orphan_chunk_rows == 1
+    assert preview.orphan_vectors == 2 and preview.vectors_scanned == 3
+    assert preview.orphan_collections == [orphan_collection.name]
+    assert collection.count() == 3
+
+    async with session_factory() as session:
+        applied = await reconcile_vectors(session, client, dry_run=False, page_size=2, grace_seconds=0)
+        chunk_rows = (await session.execute(select(func.count(Chunk.id)))).scalar()
+    assert applied.orphan_vectors == 2
+    assert chunk_rows == 1
+    assert collection.get()["ids"] == [str(live.id)]
+    assert [c if isinstance(c, str) else c.name for c in client.list_collections()] == [collection.name]
+
+
+@pytest.mark.asyncio
+async def test_reconcile_keeps_vectors_whose_chunks_commit_during_the_grace_period(session_factory, monkeypatch):
+    library = DocumentLibrary(name="lib", owner_id=uuid.uuid4(), owner_type="user")
+    async with session_factory() as session:
+        session.add(library)
+        await session.flush()
+        document = Document(title="d", source_path="p", library_id=library.id)
+        session.add(document)
+        await session.commit()
+
+    client = chromadb.EphemeralClient()
+    collection = client.get_or_create_collection(f"library_{library.id}")
+    # 向量化已写入向量，chunk 行尚未提交
+    in_flight = Chunk(id=uuid.uuid4(), document_id=document.id, content="fresh")
+    orphan = Chunk(id=uuid.uuid4(), document_id=uuid.uuid4(), content="stale")
+    _add_vectors(collection, [in_flight, orphan])
+
+    async def vectorize_commits(_seconds):
+        async with session_factory() as other:
+            other.add(in_flight)
+            await other.commit()
+
+    monkeypatch.setattr(reconcile.asyncio, "sleep", vectorize_commits)
+    async with session_factory() as session:
+        report = await reconcile_vectors(session, client, dry_run=False)
+    assert report.orphan_vectors == 1
+    assert collection.get()["ids"] == [str(in_flight.id)]
+    client.delete_collection(collection.name)
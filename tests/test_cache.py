@@ -0,0 +1,266 @@
+import asyncio
+
+import pytest
+
+from app.core import cache
+
+
+class FakePipeline:
+    def __init__(self, redis):
+        self.redis = redis
+        self.ops = []
+
+    def incr(self, key):
+        self.ops.append(key)
+        return self
+
+    async def execute(self):
+        return [await self.redis.incr(key) for key in self.ops]
+
+
+class FakeRedis:
+    """只实现搜索缓存用到的命令；记录调用以断言失效不扫描键空间。"""
+
+    def __init__(self):
+        self.store: dict[str, bytes] = {}
+        self.calls: list[str] = []
+
+    async def get(self, key):
+        self.calls.append("get")
+        return self.store.get(key)
+
+    async def mget(self, *keys):
+        self.calls.append("mget")
+        return [self.store.get(k) for k in keys]
+
+    async def setex(self, key, ttl, value):
+        self.calls.append("setex")
+        self.store[key] = value.encode() if isinstance(value, str) else value
+
+    async def incr(self, key):
+        self.calls.append("incr")
+        value = int(self.store.get(key, b"0")) + 1
+        self.store[key] = str(value).encode()
+        return value
+
+    async def scan(self, *args, **kwargs):
+        raise AssertionError("invalidation must not scan the keyspace")
+
+    def pipeline(self, transaction=True):
+        return FakePipeline(self)
+
+
+async def _key_for(redis, query, library_id, user_id="u1"):
+    generation = await cache.get_search_cache_generation(redis, library_id)
+    return cache.generate_search_cache_key(query, library_id, 10, user_id, generation=generation)
+
+
+@pytest.mark.asyncio
+async def test_library_invalidation_hides_stale_entries_without_scanning():
+    redis = FakeRedis()
+    key_a = await _key_for(redis, "pump", "lib-a")
+    key_b = await _key_for(redis, "pump", "lib-b")
+    key_all = await _key_for(redis, "pump", None)
+    for key in (key_a, key_b, key_all):
+        await cache.cache_search_result(redis, key, [{"document_id": "old"}])
+
+    assert await cache.invalidate_search_cache(redis, library_id="lib-a") == 2
+
+    # lib-a 与跨库搜索失效，lib-b 不受影响
+    assert await cache.get_cached_search_result(redis, await _key_for(redis, "pump", "lib-a")) is None
+    assert await cache.get_cached_search_result(redis, await _key_for(redis, "pump", None)) is None
+    assert await cache.get_cached_search_result(redis, await _key_for(redis, "pump", "lib-b")) == [
+        {"document_id": "old"}
+    ]
+
+
+@pytest.mark.asyncio
+async def test_write_from_search_started_before_invalidation_is_never_served():
+    redis = FakeRedis()
+    # 请求在检索开始前读取代数
+    in_flight_key = await _key_for(redis, "valve", "lib-a")
+    # 检索期间文档被删除
+    await cache.invalidate_search_cache(redis, library_id="lib-a")
+    # 慢请求写回旧结果
+    await cache.cache_search_result(redis, in_flight_key, [{"document_id": "deleted"}])
+
+    assert await cache.get_cached_search_result(redis, await _key_for(redis, "valve", "lib-a")) is None
+
+
+@pytest.mark.asyncio
+async def test_global_invalidation_covers_every_library():
+    redis = FakeRedis()
+    key = await _key_for(redis, "motor", "lib-b")
+    await cache.cache_search_result(redis, key, [{"document_id": "x"}])
+
+    await cache.invalidate_search_cache(redis)
+
+    assert await cache.get_cached_search_result(redis, await _key_for(redis, "motor", "lib-b")) is None
+
+
+class FakeTierRedis(FakeRedis):
+    async def mget(self, *keys):
+        self.calls.append("mget")
+        return [self.store.get(k) for k in keys]
+
+    def pipeline(self, transaction=True):
+        redis = self
+
+        class _Pipe:
+            def __init__(self):
+                self.ops = []
+
+            def setex(self, key, ttl, value):
+                self.ops.append((key, ttl, value))
+
+            async def execute(self):
+                for key, ttl, value in self.ops:
+                    await redis.setex(key, ttl, value)
+                    redis.ttls[key] = ttl
+
+        return _Pipe()
+
+
+def _tiered(redis=None, **kwargs):
+    redis = redis if redis is not None else FakeTierRedis()
+    redis.ttls = {}
+    return cache.TieredCache("search", ttl=300, redis_provider=lambda: redis, **kwargs), redis
+
+
+@pytest.mark.asyncio
+async def test_tiered_cache_coalesces_concurrent_misses():
+    tiered, _ = _tiered()
+    calls = 0
+
+    async def compute():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.01)
+        return [{"document_id": "d1"}]
+
+    results = await asyncio.gather(*[tiered.get_or_compute("k", compute) for _ in range(20)])
+    assert calls == 1
+    assert all(r == [{"document_id": "d1"}] for r in results)
+
+
+@pytest.mark.asyncio
+async def test_tiered_cache_followers_recompute_when_leader_is_cancelled():
+    tiered, _ = _tiered()
+    started = asyncio.Event()
+
+    async def hang():
+        started.set()
+        await asyncio.sleep(10)
+
+    leader = asyncio.create_task(tiered.get_or_compute("k", hang))
+    await started.wait()
+    followers = [asyncio.create_task(tiered.get_or_compute("k", _slow_const("v"))) for _ in range(3)]
+    await asyncio.sleep(0)
+    leader.cancel()
+
+    assert await asyncio.gather(*followers) == ["v", "v", "v"]
+    assert leader.cancelled()
+
+
+@pytest.mark.asyncio
+async def test_tiered_cache_serves_from_redis_after_local_eviction_and_uses_negative_ttl():
+    tiered, redis = _tiered(negative_ttl=5)
+    await tiered.get_or_compute("full", _const([1, 2]))
+    await tiered.get_or_compute("empty", _const([]))
+    assert redis.ttls == {"full": 300, "empty": 5}
+
+    tiered.clear_local()
+    assert await tiered.get_or_compute("full", _fail) == [1, 2]
+    assert await tiered.get("empty") == []
+
+
+@pytest.mark.asyncio
+async def test_tiered_cache_early_refresh_recomputes_before_expiry(monkeypatch):
+    tiered, _ = _tiered(local_maxsize=0, early_refresh_beta=1e5)
+    await tiered.get_or_compute("k", _slow_const("old"))
+
+    # 抽中提前刷新（random() 接近 1 时 -ln(1 - r) 很大）
+    monkeypatch.setattr(cache.random, "random", lambda: 0.999999999)
+    assert await tiered.get_or_compute("k", _const("new")) == "new"
+
+    monkeypatch.setattr(cache.random, "random", lambda: 0.0)
+    assert await tiered.get_or_compute("k", _fail) == "new"
+
+
+def _const(value):
+    async def compute():
+        return value
+
+    return compute
+
+
+def _slow_const(value):
+    async def compute():
+        await asyncio.sleep(0.01)
+        return value
+
+    return compute
+
+
+async def _fail():
+    raise AssertionError("should be served from cache")
+
+
+def test_payload_codec_round_trips_every_format_and_reads_legacy_values():
+    import json
+
+    from app.core import serialization as ser
+
+    results = [{"document_id": "d1", "snippet": "离心泵的额定压力" * 50, "score": 0.5}]
+    for serializer in (ser.JsonSerializer(), ser.MsgpackSerializer()):
+        for compressor in (None, ser.ZstdCompressor(), ser.Lz4Compressor()):
+            codec = ser.PayloadCodec(serializer, compressor, compress_threshold=64)
+            data = codec.encode(results, 123.0, 0.25)
+            # 任何写入格式都能被默认配置的读取方解码
+            assert ser.PayloadCodec().decode(data) == (results, 123.0, 0.25)
+            if compressor is not None:
+                assert data[3] == compressor.compression_id
+
+    scores = [0.125, -2.5, 3.0]
+    data = ser.PayloadCodec(ser.Float32Serializer()).encode(scores, 1.0, 0.0)
+    assert ser.PayloadCodec().decode(data)[0] == scores
+    assert len(data) == 20 + 4 * len(scores)
+
+    assert ser.PayloadCodec().decode(json.dumps(scores).encode()) == (scores, None, 0.0)
+    with pytest.raises(ValueError):
+        ser.PayloadCodec().decode(b"\x00\x01 not a cache payload")
+
+
+@pytest.mark.asyncio
+async def test_query_log_counts_replays_top_queries_and_reports_hit_ratio(tmp_path, monkeypatch):
+    from app.core import query_log
+    from app.core.config import Settings
+    from app.core.metrics import record_cache_lookup
+    from app.rag.warmup import warm_caches
+
+    settings = Settings(redis_url="", query_log_path=str(tmp_path / "queries.jsonl"))
+    monkeypatch.setattr(query_log, "get_redis_client", lambda: None)
+
+    class StubRetriever:
+        def __init__(self):
+            self.embedded: set[str] = set()
+            self.calls = []
+
+        async def search(self, query, top_k, library_ids):
+            self.calls.append((query, top_k, library_ids))
+            record_cache_lookup("embedding", query in self.embedded)
+            self.embedded.add(query)
+            return []
+
+    for query in ["泵  振动 ", "泵 振动", "轴承温度"]:
+        query_log.record_query(query, ["4c3f5e0e-8f0c-4cf1-9a55-0b1f0c6f8a11"], 25, settings)
+    await asyncio.gather(*query_log._pending)
+    top = await query_log.top_queries(10, settings)
+    retriever = StubRetriever()
+    report = await warm_caches(retriever, top, rate=0, verify=True)
+    assert [(q.query, q.count) for q in top] == [("泵 振动", 2), ("轴承温度", 1)]
+    assert retriever.calls[0][1] == 25 and str(retriever.calls[0][2][0]) == top[0].library_ids[0]
+    assert report.queries == 2 and report.errors == 0
+    assert report.hit_ratio["embedding"] == 0.0
+    assert report.verify_hit_ratio["embedding"] == 1.0
+    assert report.hit_ratio["rerank"] is None
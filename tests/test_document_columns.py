@@ -0,0 +1,52 @@
+import uuid
+
+import pytest
+from fastapi import Response
+from sqlalchemy import select
+
+from app.api.v1 import docs
+from app.core.user_cache import UserSnapshot
+from app.db.backfill import backfill_document_columns
+from app.db.models import Document, DocumentLibrary
+
+
+@pytest.mark.asyncio
+async def test_backfill_and_vectorized_filter(session_factory):
+    owner_id = uuid.uuid4()
+    library = DocumentLibrary(name="lib", owner_id=owner_id, owner_type="user")
+    async with session_factory() as session:
+        session.add(library)
+        await session.flush()
+        # 004 迁移前入库的文档：字段只在 metadata 中
+        session.add_all(
+            Document(
+                title=f"doc-{i}",
+                source_path="p",
+                library_id=library.id,
+                meta={"file_type": ".pdf", "file_size": 10 * i, "vectorized": i % 2 == 0, "chunk_size": 800},
+            )
+            for i in range(5)
+        )
+        await session.commit()
+
+        assert await backfill_document_columns(session, batch_size=2) == 5
+        assert await backfill_document_columns(session, batch_size=2) == 0
+        rows = (await session.execute(select(Document).order_by(Document.title))).scalars().all()
+        assert [(d.vectorized, d.file_size, d.file_type, d.chunk_size) for d in rows][:2] == [
+            (True, 0, ".pdf", 800),
+            (False, 10, ".pdf", 800),
+        ]
+
+    me = UserSnapshot(id=owner_id, role="operator", is_active=True, is_verified=True)
+
+    async def titles(vectorized: bool | None) -> list[str]:
+        async with session_factory() as session:
+            listed = await docs.list_documents(
+                library.id, Response(), limit=50, cursor=None, offset=0, vectorized=vectorized,
+                session=session, read_session=session, current_user=me,
+            )
+        return sorted(doc.title for doc in listed.data)
+
+    assert await titles(True) == ["doc-0", "doc-2", "doc-4"]
+    assert await titles(False) == ["doc-1", "doc-3"]
+    assert len(await titles(None)) == 5
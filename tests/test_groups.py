@@ -0,0 +1,66 @@
+import uuid
+
+import pytest
+from fastapi import HTTPException
+
+from app.api.v1 import groups
+from app.core.user_cache import UserSnapshot
+from app.db.models import Group, GroupMember, User
+
+
+@pytest.mark.asyncio
+async def test_group_listing_and_detail_are_single_queries(session_factory, sql_statements):
+    users = [User(email=f"u{i}@example.com", password_hash="x") for i in range(4)]
+    member_groups = [Group(name=f"team-{i}") for i in range(5)]
+    outsider_group = Group(name="other")
+    async with session_factory() as session:
+        session.add_all([*users, *member_groups, outsider_group])
+        await session.flush()
+        for i, group in enumerate(member_groups):
+            # 第 i 个群组有 i + 1 名成员，第一个用户在所有群组中
+            session.add_all(GroupMember(group_id=group.id, user_id=users[j].id) for j in range(min(i + 1, 4)))
+        session.add(GroupMember(group_id=outsider_group.id, user_id=users[1].id))
+        await session.commit()
+
+    me = UserSnapshot(id=users[0].id, role="operator", is_active=True, is_verified=True)
+    sql_statements.clear()
+    async with session_factory() as session:
+        listed = (await groups.list_groups(session=session, current_user=me)).data
+    assert len(sql_statements) == 1
+    assert sorted((g.name, g.member_count) for g in listed) == [
+        ("team-0", 1), ("team-1", 2), ("team-2", 3), ("team-3", 4), ("team-4", 4),
+    ]
+
+    sql_statements.clear()
+    async with session_factory() as session:
+        detail = (
+            await groups.get_group(member_groups[2].id, session=session, read_session=session, current_user=me)
+        ).data
+        # 成员身份校验（主库）+ 群组与成员数（副本）
+        assert len(sql_statements) == 2 and detail.member_count == 3
+
+        with pytest.raises(HTTPException) as forbidden:
+            await groups.get_group(outsider_group.id, session=session, read_session=session, current_user=me)
+        assert forbidden.value.status_code == 403
+        with pytest.raises(HTTPException) as missing:
+            await groups.get_group(uuid.uuid4(), session=session, read_session=session, current_user=me)
+        assert missing.value.status_code == 404
+
+
+@pytest.mark.asyncio
+async def test_membership_is_checked_on_primary_not_on_lagging_replica(session_factory, replica_session_factory):
+    group_id, user_id = uuid.uuid4(), uuid.uuid4()
+    # 主库：已被移出；副本：尚未同步
+    for factory, still_member in ((session_factory, False), (replica_session_factory, True)):
+        async with factory() as session:
+            session.add_all([User(id=user_id, email="u@example.com", password_hash="x"), Group(id=group_id, name="team")])
+            if still_member:
+                session.add(GroupMember(group_id=group_id, user_id=user_id))
+            await session.commit()
+
+    me = UserSnapshot(id=user_id, role="operator", is_active=True, is_verified=True)
+    async with session_factory() as primary, replica_session_factory() as replica:
+        for endpoint in (groups.get_group, groups.list_members):
+            with pytest.raises(HTTPException) as forbidden:
+                await endpoint(group_id, session=primary, read_session=replica, current_user=me)
+            assert forbidden.value.status_code == 403
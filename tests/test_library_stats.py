@@ -0,0 +1,50 @@
+import uuid
+
+import pytest
+from sqlalchemy import update
+
+from app.core import library_stats
+from app.db.bulk import delete_documents
+from app.db.models import Chunk, Document, DocumentLibrary, LibraryStats
+
+
+def _counts(stats: LibraryStats) -> tuple[int, int, int, int]:
+    return stats.document_count, stats.chunk_count, stats.total_size_bytes, stats.vectorized_count
+
+
+@pytest.mark.asyncio
+async def test_counters_follow_ingest_delete_and_reconcile(session_factory):
+    library = DocumentLibrary(name="lib", owner_id=uuid.uuid4(), owner_type="user")
+    async with session_factory() as session:
+        session.add(library)
+        await session.flush()
+        # 计数表上线前已有的文档
+        legacy = Document(title="old", source_path="p", library_id=library.id, file_size=100, vectorized=True)
+        session.add(legacy)
+        await session.flush()
+        session.add_all([Chunk(document_id=legacy.id, content="c") for _ in range(3)])
+        await session.commit()
+
+    async with session_factory() as session:
+        # 入库流程：先确保计数行（按现有数据计算），再记录增量
+        await library_stats.ensure_library_stats(session, library.id)
+        new_doc = Document(title="new", source_path="p", library_id=library.id, file_size=50)
+        session.add(new_doc)
+        await library_stats.adjust_library_stats(session, library.id, documents=1, size_bytes=50)
+        await session.commit()
+        stats = await library_stats.get_library_stats(session, library.id)
+        assert _counts(stats) == (2, 3, 150, 1)
+
+    async with session_factory() as session:
+        await library_stats.record_documents_removed(session, [legacy])
+        await delete_documents(session, [legacy.id])
+        await session.commit()
+    async with session_factory() as session:
+        assert _counts(await library_stats.get_library_stats(session, library.id)) == (1, 0, 50, 0)
+
+        await session.execute(update(LibraryStats).values(document_count=7, chunk_count=-2))
+        await session.commit()
+        assert await library_stats.reconcile_library_stats(session) == 1
+    async with session_factory() as session:
+        assert _counts(await library_stats.get_library_stats(session, library.id)) == (1, 0, 50, 0)
+        assert await library_stats.reconcile_library_stats(session) == 0
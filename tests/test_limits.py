@@ -0,0 +1,16 @@
+import pytest
+from fastapi import HTTPException
+
+from app.core.limits import KeyedConcurrencyLimiter
+
+
+def test_login_limiter_rejects_excess_per_key() -> None:
+    limiter = KeyedConcurrencyLimiter(limit=1, name="account")
+    with limiter.acquire("a@example.com"):
+        with pytest.raises(HTTPException) as exc:
+            with limiter.acquire("a@example.com"):
+                pass
+        assert exc.value.status_code == 429
+        with limiter.acquire("b@example.com"):
+            pass
+    assert limiter.active("a@example.com") == 0
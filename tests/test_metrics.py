@@ -0,0 +1,35 @@
+import pytest
+from fastapi.testclient import TestClient
+from prometheus_client.mmap_dict import MmapedDict, mmap_key
+
+from app.core import cache
+from app.core.tracing import trace_span
+from app.main import app
+
+
+def test_metrics_endpoint_exposes_route_and_stage_histograms() -> None:
+    with trace_span("rerank"):
+        pass
+
+    client = TestClient(app)
+    client.get("/")
+    resp = client.get("/metrics")
+    assert resp.status_code == 200
+    body = resp.text
+    assert 'http_request_duration_seconds_count{method="GET",route="/",status="200"}' in body
+    assert 'rag_stage_duration_seconds_count{stage="rerank"}' in body
+    assert 'cache_requests_total{cache="embedding",result="hit"}' in body
+
+
+@pytest.mark.asyncio
+async def test_cache_hit_rate_aggregates_every_worker(tmp_path, monkeypatch) -> None:
+    # 两个 worker 写入的计数文件：命中 3+1，未命中 1+3
+    for pid, (hits, misses) in {101: (3, 1), 102: (1, 3)}.items():
+        values = MmapedDict(str(tmp_path / f"counter_{pid}.db"))
+        for result, value in (("hit", hits), ("miss", misses)):
+            key = mmap_key("cache_requests", "cache_requests_total", ["cache", "result"], ["search", result], "")
+            values.write_value(key, value, 0)
+        values.close()
+    monkeypatch.setenv("PROMETHEUS_MULTIPROC_DIR", str(tmp_path))
+
+    assert await cache.get_cache_hit_rate() == 0.5
@@ -0,0 +1,70 @@
+import datetime as dt
+import uuid
+
+import pytest
+from fastapi import HTTPException, Response
+from sqlalchemy import select
+
+from app.api.v1 import admin
+from app.core.pagination import NEXT_CURSOR_HEADER, decode_cursor, fetch_page
+from app.core.user_cache import UserSnapshot
+from app.db.models import Document, DocumentLibrary, User
+
+
+@pytest.mark.asyncio
+async def test_cursor_pages_cover_every_row_once_in_offset_order(session_factory):
+    library = DocumentLibrary(name="lib", owner_id=uuid.uuid4(), owner_type="user")
+    base = dt.datetime(2024, 1, 1)
+    async with session_factory() as session:
+        session.add(library)
+        await session.flush()
+        # 部分文档 created_at 相同，验证以 id 作为次序兜底
+        session.add_all(
+            Document(title=f"d{i}", source_path="p", library_id=library.id, created_at=base + dt.timedelta(minutes=i // 3))
+            for i in range(8)
+        )
+        await session.commit()
+
+    page_args = dict(created_at_column=Document.created_at, id_column=Document.id, limit=3)
+    query = select(Document).where(Document.library_id == library.id)
+    async with session_factory() as session:
+        everything, no_more = await fetch_page(session, query, created_at_column=Document.created_at, id_column=Document.id, limit=100)
+        assert no_more is None
+
+        walked, cursor, pages = [], None, 0
+        while True:
+            rows, cursor = await fetch_page(session, query, cursor=cursor, **page_args)
+            walked.extend(rows)
+            pages += 1
+            if cursor is None:
+                break
+        offset_rows, _ = await fetch_page(session, query, offset=3, **page_args)
+
+    assert pages == 3
+    assert [doc.id for doc in walked] == [doc.id for doc in everything]
+    assert [doc.id for doc in offset_rows] == [doc.id for doc in everything[3:6]]
+
+
+def test_malformed_cursor_is_rejected():
+    with pytest.raises(HTTPException) as exc:
+        decode_cursor("not-a-cursor")
+    assert exc.value.status_code == 400
+
+
+@pytest.mark.asyncio
+async def test_listing_returns_next_cursor_in_body_and_header(db_session):
+    db_session.add_all(User(email=f"u{i}@example.com", password_hash="x") for i in range(3))
+    await db_session.commit()
+
+    admin_user = UserSnapshot(id=uuid.uuid4(), role="admin", is_active=True, is_verified=True)
+    response = Response()
+    first = await admin.list_all_users(
+        response, limit=2, cursor=None, offset=0, role=None, session=db_session, current_user=admin_user
+    )
+    assert len(first.data) == 2
+    assert first.next_cursor and response.headers[NEXT_CURSOR_HEADER] == first.next_cursor
+    last = await admin.list_all_users(
+        Response(), limit=2, cursor=first.next_cursor, offset=0, role=None, session=db_session, current_user=admin_user
+    )
+    assert len(last.data) == 1 and last.next_cursor is None
+    assert last.model_dump()["next_cursor"] is None
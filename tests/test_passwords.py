@@ -0,0 +1,18 @@
+import pytest
+
+from app.core import passwords
+from app.core.config import Settings
+
+
+@pytest.mark.asyncio
+async def test_password_hashing_runs_off_loop(monkeypatch) -> None:
+    monkeypatch.setattr(passwords, "get_settings", lambda: Settings(bcrypt_rounds=4, password_hash_workers=2))
+    monkeypatch.setattr(passwords, "_executor", None)
+
+    hashed = await passwords.hash_password("s3cret-pass")
+    assert await passwords.verify_password("s3cret-pass", hashed)
+    assert not await passwords.verify_password("wrong", hashed)
+    assert not await passwords.verify_password("s3cret-pass", "not-a-hash")
+    assert hashed.startswith("$2b$04$") and not passwords.needs_rehash(hashed)
+    assert passwords.needs_rehash(passwords.hash_password_sync("s3cret-pass", rounds=5))
+    passwords.shutdown_executor()
@@ -0,0 +1,38 @@
+import asyncio
+import logging
+import time
+
+import pytest
+
+from app.core.profiling import LoopBlockWatchdog, profile_for
+
+
+def blocking_call() -> None:
+    time.sleep(0.3)
+
+
+@pytest.mark.asyncio
+async def test_loop_block_watchdog_logs_blocking_stack(caplog) -> None:
+    with caplog.at_level(logging.WARNING, logger="app.core.profiling"):
+        watchdog = LoopBlockWatchdog(threshold_ms=100, check_interval=0.02)
+        watchdog.start()
+        await asyncio.sleep(0.05)
+        blocking_call()
+        await asyncio.sleep(0.05)
+        watchdog.stop()
+
+    assert any("blocking_call" in record.getMessage() for record in caplog.records)
+
+
+@pytest.mark.asyncio
+async def test_sampling_profiler_returns_collapsed_stacks() -> None:
+    task = asyncio.create_task(profile_for(0.2, interval=0.005))
+    await asyncio.sleep(0.01)
+    time.sleep(0.1)
+    collapsed = await task
+
+    lines = collapsed.strip().splitlines()
+    assert lines
+    stack, count = lines[0].rsplit(" ", 1)
+    assert int(count) > 0
+    assert ";" in stack
@@ -1,3 +1,4 @@
+import asyncio
 import types
 
 import pytest
@@ -5,7 +6,7 @@ import pytest
 from app.core.config import Settings
 from app.rag import ingestion
 from app.rag.pipeline import RAGPipeline
-from app.rag.retriever import LangchainRetriever
+from app.rag.retriever import HybridRetriever, LangchainRetriever
 
 
 class StubEmbeddingFn:
@@ -123,3 +124,177 @@ def test_pipeline_llm_openai(monkeypatch):
     assert captured["base_url"] is None
     assert captured["model"] == "gpt-4o-mini"
 
+
+
+def test_embedding_cache_key_follows_the_embedding_function_in_use():
+    retriever = HybridRetriever.__new__(HybridRetriever)
+    # 配置了 openai 但没有 API Key：实际回退到默认模型
+    retriever.settings = Settings(llm_provider="openai", embedding_model="text-embedding-3-small", openai_api_key="")
+    retriever.embedding_fn = types.SimpleNamespace()
+    fallback_key = retriever._embedding_cache_key("motor")
+
+    retriever.embedding_fn = StubEmbeddingFn(api_key="k", model_name="text-embedding-3-small", api_base=None)
+    assert retriever._embedding_cache_key("motor") != fallback_key
+    assert retriever._embedding_cache_key("motor") == retriever._embedding_cache_key("motor")
+
+
+def test_retrieval_embeds_queries_with_the_ingestion_embedding_fn(monkeypatch):
+    monkeypatch.setattr(ingestion.embedding_functions, "OpenAIEmbeddingFunction", StubEmbeddingFn)
+    # 只配置了嵌入专用 Key：入库与检索都应使用 DashScope 嵌入，而不是一边回退到默认模型
+    settings = Settings(llm_provider="dashscope", dashscope_embedding_api_key="emb-key", dashscope_api_key="")
+
+    retriever = HybridRetriever.__new__(HybridRetriever)
+    LangchainRetriever.__init__(retriever, "chroma://./unused", settings)
+    assert isinstance(ingestion._build_embedding_fn(settings), StubEmbeddingFn)
+    assert isinstance(retriever.embedding_fn, StubEmbeddingFn)
+
+
+class MismatchedCollection:
+    """按查询向量检索时报维度不一致，按文本检索时正常返回（集合由另一嵌入模型写入）。"""
+
+    def __init__(self):
+        self.calls = []
+
+    def query(self, *, n_results, query_embeddings=None, query_texts=None):
+        if query_embeddings is not None:
+            self.calls.append("embeddings")
+            raise ValueError("Collection expecting embedding with dimension of 384, got 1024")
+        self.calls.append("texts")
+        return {
+            "ids": [[f"c{i}"] for i in range(len(query_texts))],
+            "documents": [[text] for text in query_texts],
+            "metadatas": [[{"document_id": f"d{i}"}] for i in range(len(query_texts))],
+            "distances": [[0.5] for _ in query_texts],
+        }
+
+
+@pytest.mark.asyncio
+async def test_vector_search_falls_back_to_query_texts_when_embedding_query_fails():
+    retriever = HybridRetriever.__new__(HybridRetriever)
+    collection = MismatchedCollection()
+    retriever._get_chroma_collection = lambda library_id: collection
+
+    results = await retriever._vector_search_impl("pump", None, 1, [0.1] * 1024)
+    assert collection.calls == ["embeddings", "texts"]
+    assert [(r.document_id, r.text) for r in results] == [("d0", "pump")]
+
+
+@pytest.mark.asyncio
+async def test_search_batch_falls_back_to_query_texts_when_embedding_fails():
+    def unavailable(_texts):
+        raise ConnectionError("embedding provider is down")
+
+    retriever = HybridRetriever.__new__(HybridRetriever)
+    retriever.settings = Settings(use_llm_expansion=False)
+    retriever.query_expander = types.SimpleNamespace(expand_async=lambda q, use_llm: asyncio.sleep(0, q))
+    retriever.embedding_fn = unavailable
+    retriever._embedding_cache = None
+    retriever.reranker = types.SimpleNamespace(is_enabled=lambda: False)
+    collection = MismatchedCollection()
+    retriever._get_chroma_collection = lambda library_id: collection
+
+    results = await retriever.search_batch(["q0", "q1"], top_k=1, use_hybrid=False)
+    assert collection.calls == ["texts"]
+    assert [[chunk.text for chunk in chunks] for chunks in results] == [["q0"], ["q1"]]
+
+
+@pytest.mark.asyncio
+async def test_live_queries_use_the_normalized_text_that_warmup_replays():
+    from app.core.query_log import normalize_query
+
+    embedded = []
+    retriever = HybridRetriever.__new__(HybridRetriever)
+    retriever.settings = Settings(use_llm_expansion=False)
+    retriever.query_expander = types.SimpleNamespace(expand_async=lambda q, use_llm: asyncio.sleep(0, q))
+    retriever.embedding_fn = lambda texts: embedded.extend(texts) or [[0.0] for _ in texts]
+    retriever._embedding_cache = None
+    retriever._get_chroma_collection = lambda library_id: None
+    retriever.reranker = types.SimpleNamespace(is_enabled=lambda: False)
+
+    raw = "  离心泵\t 振动  "
+    await retriever.search(raw, top_k=1, use_hybrid=False)
+    await retriever.search_batch([raw], top_k=1, use_hybrid=False)
+    assert embedded == [normalize_query(raw)] * 2
+
+
+@pytest.mark.asyncio
+async def test_rerank_batch_packs_pairs_into_one_predict_call():
+    from app.rag.reranker import Reranker
+    from app.rag.retriever import RetrievedChunk
+
+    calls = []
+
+    class StubCrossEncoder:
+        def predict(self, pairs, batch_size=32):
+            calls.append(list(pairs))
+            return [float(len(text)) for _, text in pairs]
+
+    reranker = Reranker(enable=False, enable_cache=False)
+    reranker.enable = True
+    reranker.model = StubCrossEncoder()
+
+    def chunk(text):
+        return RetrievedChunk(document_id="d", text=text, score=0.0, metadata={})
+
+    items = [
+        ("q1", [chunk("a"), chunk("ccc"), chunk("bb")]),
+        ("q2", [chunk("xx"), chunk("y")]),
+        ("q3", [chunk("only")]),
+    ]
+    results = await reranker.rerank_batch_async(items, top_k=2)
+
+    assert len(calls) == 1
+    assert len(calls[0]) == 5  # single-candidate queries skip inference
+    assert [c.text for c in results[0]] == ["ccc", "bb"]
+    assert [c.text for c in results[1]] == ["xx", "y"]
+    assert [c.text for c in results[2]] == ["only"]
+
+
+@pytest.mark.asyncio
+async def test_pipeline_run_batch_yields_every_query(monkeypatch):
+    from app.rag.retriever import RetrievedChunk
+
+    class StubRetriever:
+        def __init__(self):
+            self.batch_calls = 0
+
+        async def search_batch(self, queries, top_k=5, library_ids=None):
+            self.batch_calls += 1
+            return [
+                [RetrievedChunk(document_id=str(i), text=q, score=1.0, metadata={})] if i % 2 == 0 else []
+                for i, q in enumerate(queries)
+            ]
+
+    settings = Settings(llm_provider="openai", openai_api_key="", qa_batch_llm_concurrency=2)
+    retriever = StubRetriever()
+    pipeline = RAGPipeline(retriever=retriever, settings=settings)
+
+    results = [item async for item in pipeline.run_batch(["q0", "q1", "q2"], top_k=3)]
+
+    assert retriever.batch_calls == 1
+    assert sorted(index for index, _ in results) == [0, 1, 2]
+    by_index = dict(results)
+    assert by_index[0].references[0]["document_id"] == "0"
+    assert by_index[1].references == []
+    assert all(r.latency_ms >= 0 for r in by_index.values())
+
+
+@pytest.mark.asyncio
+async def test_pipeline_run_records_stage_trace():
+    from app.core.tracing import trace_span
+    from app.rag.retriever import RetrievedChunk
+
+    class StubRetriever:
+        async def search(self, query, top_k=5, library_ids=None):
+            with trace_span("vector_search") as span:
+                span.set(candidates=1)
+            return [RetrievedChunk(document_id="d1", text=query, score=1.0, metadata={})]
+
+    settings = Settings(llm_provider="openai", openai_api_key="", trace_log_enabled=False)
+    pipeline = RAGPipeline(retriever=StubRetriever(), settings=settings)
+
+    result = await pipeline.run("pump pressure", top_k=1)
+
+    span_names = [s["name"] for s in result.trace["spans"]]
+    assert span_names == ["retrieve", "vector_search", "llm"]
+    assert result.trace["total_ms"] >= 0
@@ -0,0 +1,59 @@
+import pytest
+from prometheus_client import REGISTRY
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from app.core.config import settings
+from app.db.models import Base, Group
+from app.db.session import ReadSessionRouter, create_engine, engine_options
+
+
+def _sample(name: str, labels: dict[str, str]) -> float:
+    return REGISTRY.get_sample_value(name, labels) or 0.0
+
+
+async def _database(url: str, role: str, group_name: str | None = None):
+    engine = create_engine(url, settings, role=role)
+    if group_name is not None:
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+        async with AsyncSession(engine) as session:
+            session.add(Group(name=group_name))
+            await session.commit()
+    return engine, async_sessionmaker(bind=engine, expire_on_commit=False, class_=AsyncSession)
+
+
+async def _group_names(router: ReadSessionRouter) -> list[str]:
+    async with router.session() as session:
+        return list((await session.execute(select(Group.name))).scalars().all())
+
+
+@pytest.mark.asyncio
+async def test_reads_use_replica_and_fall_back_to_primary(tmp_path):
+    primary_engine, primary = await _database(f"sqlite+aiosqlite:///{tmp_path / 'primary.db'}", "primary", "on-primary")
+    replica_engine, replica = await _database(f"sqlite+aiosqlite:///{tmp_path / 'replica.db'}", "replica", "on-replica")
+    # 副本文件所在目录不存在，连接必然失败
+    broken_engine, broken = await _database(f"sqlite+aiosqlite:///{tmp_path / 'missing' / 'replica.db'}", "replica")
+
+    waits = _sample("db_pool_wait_seconds_count", {"role": "replica"})
+    assert await _group_names(ReadSessionRouter(primary, replica)) == ["on-replica"]
+    assert _sample("db_pool_wait_seconds_count", {"role": "replica"}) > waits
+    assert await _group_names(ReadSessionRouter(primary)) == ["on-primary"]
+
+    router = ReadSessionRouter(primary, broken, retry_interval=60)
+    fallbacks = _sample("db_read_sessions_total", {"target": "fallback"})
+    assert await _group_names(router) == ["on-primary"]
+    # 回退期内不再尝试副本
+    assert await _group_names(router) == ["on-primary"]
+    assert _sample("db_read_sessions_total", {"target": "fallback"}) == fallbacks + 1
+
+    for engine in (primary_engine, replica_engine, broken_engine):
+        await engine.dispose()
+
+
+def test_pool_settings_apply_to_server_databases():
+    assert engine_options("sqlite+aiosqlite://", settings) == {}
+    options = engine_options("mysql+aiomysql://user:pw@db/industrial_qa", settings, role="replica")
+    assert options["pool_size"] == settings.db_pool_size
+    assert options["pool_recycle"] == settings.db_pool_recycle
+    assert options["pool_pre_ping"] is settings.db_pool_pre_ping
@@ -0,0 +1,21 @@
+import pytest
+
+from app.core import redis_pool
+from app.core.config import Settings
+
+
+@pytest.mark.asyncio
+async def test_shared_redis_client_is_pooled_and_reused(monkeypatch) -> None:
+    monkeypatch.setattr(redis_pool, "_client", None)
+    monkeypatch.setattr(redis_pool, "get_settings", lambda: Settings(redis_url=""))
+    assert redis_pool.get_redis_client() is None
+    assert redis_pool.redis_pool_stats() is None
+
+    settings = Settings(redis_url="redis://localhost:6390/0", redis_max_connections=7)
+    monkeypatch.setattr(redis_pool, "get_settings", lambda: settings)
+    client = redis_pool.get_redis_client()
+    assert client is redis_pool.get_redis_client()
+    assert redis_pool.redis_pool_stats() == {"in_use": 0, "idle": 0, "max": 7}
+
+    await redis_pool.close_redis()
+    assert redis_pool._client is None
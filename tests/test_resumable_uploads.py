@@ -0,0 +1,160 @@
+import datetime as dt
+import hashlib
+import os
+import uuid
+from contextlib import asynccontextmanager
+
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import delete, func, select
+
+from app.api.v1 import docs, uploads
+from app.core.config import get_settings
+from app.core.uploads import PARTS_DIR_NAME, gc_upload_sessions, parts_dir, remove_parts
+from app.db.models import Document, UploadSession, User
+
+PART_SIZE = uploads.MIN_PART_SIZE
+
+
+class _Body:
+    """模拟 Request：分块返回请求体。"""
+
+    def __init__(self, content: bytes) -> None:
+        self.content = content
+
+    async def stream(self):
+        for start in range(0, len(self.content), 16 * 1024):
+            yield self.content[start:start + 16 * 1024]
+
+
+@pytest.mark.asyncio
+async def test_parts_uploaded_out_of_order_are_assembled_into_document(tmp_path, monkeypatch, session_factory):
+    settings = get_settings().model_copy(update={"storage_dir": str(tmp_path), "upload_chunk_size": 32 * 1024})
+    monkeypatch.setattr(docs, "get_settings", lambda: settings)
+    content = os.urandom(PART_SIZE * 2 + 1000)
+    parts = [content[start:start + PART_SIZE] for start in range(0, len(content), PART_SIZE)]
+
+    async def put(session, user, upload_id, number, data, checksum=None):
+        return await uploads.upload_part(
+            upload_id, number, _Body(data), checksum or hashlib.sha256(data).hexdigest(),
+            session=session, current_user=user, settings=settings,
+        )
+
+    async with session_factory() as session:
+        user = User(email="u@example.com", password_hash="x")
+        session.add(user)
+        await session.commit()
+
+        created = await uploads.create_upload(
+            uploads.UploadCreateRequest(
+                filename="../manual.pdf", total_size=len(content), part_size=PART_SIZE,
+                sha256=hashlib.sha256(content).hexdigest(),
+            ),
+            session=session, current_user=user, settings=settings,
+        )
+        upload_id = created.data.upload_id
+        assert created.data.part_count == 3 and created.data.received_parts == []
+        upload_uuid = (await session.execute(select(UploadSession.id))).scalar_one()
+
+        await put(session, user, upload_uuid, 3, parts[2])
+        with pytest.raises(HTTPException) as bad_checksum:
+            await put(session, user, upload_uuid, 1, parts[0], checksum="0" * 64)
+        assert bad_checksum.value.status_code == 400
+        with pytest.raises(HTTPException) as wrong_size:
+            await put(session, user, upload_uuid, 1, parts[0][:-1])
+        assert wrong_size.value.status_code == 400
+        await put(session, user, upload_uuid, 1, parts[0])
+
+        status = await uploads.get_upload(upload_uuid, session=session, current_user=user, settings=settings)
+        assert status.data.received_parts == [1, 3]
+        with pytest.raises(HTTPException) as incomplete:
+            await uploads.complete_upload(upload_uuid, session=session, current_user=user, settings=settings)
+        assert incomplete.value.status_code == 409
+
+        await put(session, user, upload_uuid, 2, parts[1])
+        result = await uploads.complete_upload(upload_uuid, session=session, current_user=user, settings=settings)
+
+        document = await session.get(Document, uuid.UUID(result.data.document_id))
+        assert document.title == "manual.pdf"
+        assert document.content_hash == hashlib.sha256(content).hexdigest()
+        with open(document.source_path, "rb") as stored:
+            assert stored.read() == content
+        assert await session.get(UploadSession, upload_uuid) is None
+        assert not parts_dir(settings, upload_id).exists()
+
+
+@pytest.mark.asyncio
+async def test_concurrent_complete_or_abort_returns_conflict(tmp_path, monkeypatch, session_factory):
+    settings = get_settings().model_copy(update={"storage_dir": str(tmp_path)})
+    monkeypatch.setattr(docs, "get_settings", lambda: settings)
+    content = os.urandom(1000)
+    real_staged_parts = uploads.staged_parts
+
+    async with session_factory() as session:
+        user = User(email="u@example.com", password_hash="x")
+        session.add(user)
+        await session.commit()
+
+        async def start_upload():
+            created = await uploads.create_upload(
+                uploads.UploadCreateRequest(filename="a.pdf", total_size=len(content)),
+                session=session, current_user=user, settings=settings,
+            )
+            upload_id = uuid.UUID(created.data.upload_id)
+            await uploads.upload_part(
+                upload_id, 1, _Body(content), hashlib.sha256(content).hexdigest(),
+                session=session, current_user=user, settings=settings,
+            )
+            return upload_id
+
+        # 另一个 complete 在本次合并期间已删除会话记录
+        @asynccontextmanager
+        async def completed_elsewhere(part_paths, filename, settings):
+            async with session_factory() as other:
+                await other.execute(delete(UploadSession))
+                await other.commit()
+            async with real_staged_parts(part_paths, filename, settings) as staged:
+                yield staged
+
+        # abort 在合并前删除了分片
+        def aborted_elsewhere(part_paths, filename, settings):
+            remove_parts(settings, upload_id)
+            return real_staged_parts(part_paths, filename, settings)
+
+        upload_id = await start_upload()
+        monkeypatch.setattr(uploads, "staged_parts", completed_elsewhere)
+        with pytest.raises(HTTPException) as conflict:
+            await uploads.complete_upload(upload_id, session=session, current_user=user, settings=settings)
+        assert conflict.value.status_code == 409
+
+        upload_id = await start_upload()
+        monkeypatch.setattr(uploads, "staged_parts", aborted_elsewhere)
+        with pytest.raises(HTTPException) as missing:
+            await uploads.complete_upload(upload_id, session=session, current_user=user, settings=settings)
+        assert missing.value.status_code == 409
+
+        assert (await session.execute(select(func.count()).select_from(Document))).scalar() == 0
+
+
+@pytest.mark.asyncio
+async def test_gc_removes_expired_sessions_and_orphaned_parts(tmp_path, session_factory):
+    settings = get_settings().model_copy(update={"storage_dir": str(tmp_path)})
+
+    async with session_factory() as session:
+        user = User(email="u@example.com", password_hash="x")
+        session.add(user)
+        await session.flush()
+        now = dt.datetime.utcnow()
+        expired, active = (
+            UploadSession(user_id=user.id, filename="a.pdf", total_size=1, part_size=1, expires_at=expires_at)
+            for expires_at in (now - dt.timedelta(minutes=1), now + dt.timedelta(hours=1))
+        )
+        session.add_all([expired, active])
+        await session.commit()
+        for upload in (expired, active):
+            parts_dir(settings, upload.id).mkdir(parents=True)
+        (tmp_path / PARTS_DIR_NAME / "orphan").mkdir()
+
+        assert await gc_upload_sessions(session, settings) == 2
+        assert [path.name for path in (tmp_path / PARTS_DIR_NAME).iterdir()] == [str(active.id)]
+        assert (await session.execute(select(func.count()).select_from(UploadSession))).scalar() == 1
@@ -0,0 +1,43 @@
+import time
+
+import pytest
+
+from app.core import revocation
+from app.core.revocation import BloomFilter
+
+
+class _IndexRedis:
+    def __init__(self):
+        self.index = {"old-jti": time.time() + 60, "expired-jti": time.time() - 1}
+
+    async def zremrangebyscore(self, key, low, high):
+        self.index = {k: v for k, v in self.index.items() if v > high}
+
+    async def zrangebyscore(self, key, low, high):
+        return [k.encode() for k in self.index]
+
+
+@pytest.mark.asyncio
+async def test_revocation_filter_skips_redis_for_unrevoked_tokens(monkeypatch) -> None:
+    monkeypatch.setattr(revocation, "get_redis_client", lambda: _IndexRedis())
+    rf = revocation.RevocationFilter(capacity=1000, error_rate=0.001, sync_interval=30)
+    rf._backfilled = True
+    assert rf.might_be_revoked("anything")  # 未同步前不信任过滤器
+
+    assert await rf.sync() == 1
+    assert rf.might_be_revoked("old-jti")
+    assert not rf.might_be_revoked("expired-jti")
+    rf.on_revoked_message(f"new-jti|{time.time()}")
+    assert rf.might_be_revoked("new-jti")
+
+    false_positives = sum(rf.might_be_revoked(f"token-{i}") for i in range(10000))
+    assert false_positives < 50
+
+
+def test_bloom_filter_sizing_meets_error_rate() -> None:
+    bloom = BloomFilter(capacity=5000, error_rate=0.01)
+    for i in range(5000):
+        bloom.add(f"in-{i}")
+    assert all(f"in-{i}" in bloom for i in range(5000))
+    false_positives = sum(f"out-{i}" in bloom for i in range(20000))
+    assert false_positives / 20000 < 0.02
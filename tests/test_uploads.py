@@ -0,0 +1,75 @@
+import hashlib
+import io
+import os
+
+import pytest
+from fastapi import FastAPI, File, HTTPException, UploadFile
+from fastapi.testclient import TestClient
+
+from app.core.config import get_settings
+from app.core.uploads import TMP_DIR_NAME, UploadSizeLimitMiddleware, safe_filename, staged_upload
+
+
+def _upload(content: bytes, filename: str = "manual.pdf") -> UploadFile:
+    return UploadFile(file=io.BytesIO(content), filename=filename)
+
+
+@pytest.mark.asyncio
+async def test_staged_upload_streams_hashes_and_renames(tmp_path):
+    settings = get_settings().model_copy(
+        update={"storage_dir": str(tmp_path), "upload_chunk_size": 64 * 1024, "max_upload_size_mb": 1}
+    )
+    content = os.urandom(700 * 1024)
+    tmp_dir = tmp_path / TMP_DIR_NAME
+
+    async with staged_upload(_upload(content, "../../etc/manual.pdf"), settings) as upload:
+        assert upload.filename == "manual.pdf"
+        assert upload.size == len(content)
+        assert upload.sha256 == hashlib.sha256(content).hexdigest()
+        target = upload.commit(tmp_path / "stored.pdf")
+    assert target.read_bytes() == content
+    assert not any(tmp_dir.iterdir())
+
+    # 未提交（例如权限校验失败）时删除临时文件
+    with pytest.raises(HTTPException):
+        async with staged_upload(_upload(content), settings):
+            raise HTTPException(status_code=403, detail="Forbidden")
+    assert not any(tmp_dir.iterdir())
+
+    with pytest.raises(HTTPException) as too_large:
+        async with staged_upload(_upload(os.urandom(1024 * 1024 + 1)), settings):
+            pass
+    assert too_large.value.status_code == 413
+    assert not any(tmp_dir.iterdir())
+
+
+def test_safe_filename_strips_directories():
+    assert safe_filename("..\\..\\boot.ini") == "boot.ini"
+    assert safe_filename("") == "upload"
+
+
+def test_size_limit_middleware_rejects_before_the_body_is_parsed():
+    app = FastAPI()
+    parsed = []
+
+    @app.post("/ingest")
+    async def ingest(file: UploadFile = File(...)):
+        parsed.append(file.filename)
+        return {"ok": True}
+
+    limit = 1024
+    app.add_middleware(UploadSizeLimitMiddleware, paths=("/ingest",), max_file_bytes=limit)
+    client = TestClient(app)
+    too_big = os.urandom(limit + UploadSizeLimitMiddleware.MULTIPART_OVERHEAD + 1)
+
+    assert client.post("/ingest", files={"file": ("a.pdf", b"small")}).status_code == 200
+    assert client.post("/ingest", files={"file": ("a.pdf", too_big)}).status_code == 413
+
+    # 分块传输（没有 Content-Length）时边接收边计数
+    def chunks():
+        for start in range(0, len(too_big), 8 * 1024):
+            yield too_big[start:start + 8 * 1024]
+
+    response = client.post("/ingest", content=chunks(), headers={"Content-Type": "multipart/form-data; boundary=x"})
+    assert response.status_code == 413
+    assert parsed == ["a.pdf"]
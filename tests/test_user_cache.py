@@ -0,0 +1,54 @@
+import uuid
+from types import SimpleNamespace
+
+import pytest
+from fastapi import HTTPException
+from fastapi.security import HTTPAuthorizationCredentials
+
+from app.core import pubsub, user_cache
+from app.core.config import Settings
+from app.core.security import create_access_token, get_current_principal
+
+
+class _CountingSession:
+    def __init__(self, user_id: uuid.UUID):
+        self.user_id = user_id
+        self.queries = 0
+
+    async def execute(self, _stmt):
+        self.queries += 1
+        row = SimpleNamespace(id=self.user_id, role="admin", is_active=True, is_verified=True)
+        return SimpleNamespace(one_or_none=lambda: row)
+
+
+class _RevokedRedis:
+    async def exists(self, key):
+        return 1
+
+
+def _creds(token: str) -> HTTPAuthorizationCredentials:
+    return HTTPAuthorizationCredentials(scheme="Bearer", credentials=token)
+
+
+@pytest.mark.asyncio
+async def test_current_principal_is_cached_per_token_and_invalidated(monkeypatch) -> None:
+    settings = Settings(jwt_secret="test-secret-" + "x" * 32, aliyun_smtp_password="")
+    monkeypatch.setattr(user_cache, "get_settings", lambda: settings)
+    monkeypatch.setattr(pubsub, "get_redis_client", lambda: None)
+    user_cache._cache.clear()
+    user_id = uuid.uuid4()
+
+    session = _CountingSession(user_id)
+    token = create_access_token(str(user_id), settings)
+    first = await get_current_principal(_creds(token), session, None, settings)
+    second = await get_current_principal(_creds(token), session, None, settings)
+    assert first is second and first.role == "admin"
+    assert session.queries == 1
+
+    await user_cache.invalidate_user(user_id)
+    await get_current_principal(_creds(token), session, None, settings)
+    assert session.queries == 2
+
+    with pytest.raises(HTTPException) as revoked:
+        await get_current_principal(_creds(token), session, _RevokedRedis(), settings)
+    assert revoked.value.detail == "Token revoked"